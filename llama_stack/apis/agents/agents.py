@@ -223,12 +223,29 @@ class AgentConfigCommon(BaseModel):
             self.tool_config = ToolConfig(**params)
 
 
+@json_schema_type
+class ToolExecutionConfig(BaseModel):
+    """How the agent runs the tool calls the model makes in one step.
+
+    :param parallel: (Optional) Whether the tool calls run concurrently. Their events are streamed in the order of the calls either way. Defaults to False.
+    :param max_concurrency: (Optional) How many tool calls run at the same time when they run concurrently. Defaults to 4.
+    :param timeout_seconds: (Optional) How long a tool call may take. A call that times out returns an error to the model.
+    :param tool_timeouts: (Optional) Timeouts of specific tools by tool name, in seconds, overriding timeout_seconds.
+    """
+
+    parallel: Optional[bool] = False
+    max_concurrency: Optional[int] = Field(default=4, ge=1)
+    timeout_seconds: Optional[float] = Field(default=None, gt=0)
+    tool_timeouts: Optional[Dict[str, float]] = Field(default_factory=dict)
+
+
 @json_schema_type
 class AgentConfig(AgentConfigCommon):
     model: str
     instructions: str
     enable_session_persistence: Optional[bool] = False
     response_format: Optional[ResponseFormat] = None
+    tool_execution: Optional[ToolExecutionConfig] = Field(default_factory=ToolExecutionConfig)
 
 
 @json_schema_type
@@ -54,4 +54,14 @@ class VectorIO(Protocol):
         vector_db_id: str,
         query: InterleavedContent,
         params: Optional[Dict[str, Any]] = None,
-    ) -> QueryChunksResponse: ...
+        query_embedding: Optional[List[float]] = None,
+    ) -> QueryChunksResponse:
+        """
+        Query a vector database for the chunks most relevant to a query.
+
+        :param vector_db_id: The identifier of the vector database to query.
+        :param query: The query to search for.
+        :param params: Provider specific query parameters, e.g. max_chunks and score_threshold.
+        :param query_embedding: The embedding of the query, computed with the vector database's embedding model. When provided, the query is not embedded again.
+        """
+        ...
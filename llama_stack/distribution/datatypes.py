@@ -242,6 +242,54 @@ class AuthenticationConfig(BaseModel):
     )
 
 
+class StreamingConfig(BaseModel):
+    coalesce: bool = Field(
+        default=False,
+        description="Batch several pending SSE events into a single write when the client cannot keep up",
+    )
+    coalesce_window_ms: float = Field(
+        default=0,
+        description="How long to wait for more events before flushing a partially filled batch (coalescing mode only)",
+        ge=0,
+    )
+    coalesce_max_bytes: int = Field(
+        default=64 * 1024,
+        description="Largest batch written at once, in bytes; a batch is also flushed as soon as it reaches this size (coalescing mode only)",
+        ge=1,
+    )
+    max_buffered_bytes: int = Field(
+        default=1024 * 1024,
+        description="Maximum number of bytes buffered ahead of the client before the producer is paused",
+        ge=1,
+    )
+
+
+class AdminConfig(BaseModel):
+    enabled: bool = Field(
+        default=False,
+        description="Serve the admin endpoints under /v1/admin: a sampling profiler and a dump of pending asyncio tasks. "
+        "They expose the internals of the server, so only enable them behind authentication or on a private network",
+    )
+    max_profile_seconds: float = Field(
+        default=60,
+        description="Longest profile that can be requested",
+        gt=0,
+    )
+    profile_interval_ms: float = Field(
+        default=10,
+        description="Default interval between two samples of the profiler",
+        gt=0,
+    )
+
+
+class MetricsConfig(BaseModel):
+    enabled: bool = Field(
+        default=False,
+        description="Serve the latency histograms and in-flight request gauges of the server at /metrics, in the Prometheus "
+        "text format. The endpoint goes through authentication like any other route when it is configured",
+    )
+
+
 class ServerConfig(BaseModel):
     port: int = Field(
         default=8321,
@@ -261,6 +309,18 @@ class ServerConfig(BaseModel):
         default=None,
         description="Authentication configuration for the server",
     )
+    streaming: StreamingConfig = Field(
+        default_factory=StreamingConfig,
+        description="Configuration for server-sent event streaming responses",
+    )
+    admin: AdminConfig = Field(
+        default_factory=AdminConfig,
+        description="Configuration for the admin endpoints, which are disabled by default",
+    )
+    metrics: MetricsConfig = Field(
+        default_factory=MetricsConfig,
+        description="Configuration for the Prometheus metrics endpoint, which is disabled by default",
+    )
 
 
 class StackRunConfig(BaseModel):
@@ -28,6 +28,7 @@ from pydantic import BaseModel, TypeAdapter
 from rich.console import Console
 from termcolor import cprint
 
+from llama_stack.apis.telemetry import SpanStatus
 from llama_stack.distribution.build import print_pip_install_help
 from llama_stack.distribution.configure import parse_and_maybe_upgrade_config
 from llama_stack.distribution.datatypes import Api
@@ -282,10 +283,14 @@ class AsyncLlamaStackAsLibraryClient(AsyncLlamaStackClient):
         body |= path_params
         body = self._convert_body(path, options.method, body)
         await start_trace(route, {"__location__": "library_client"})
+        status = SpanStatus.OK
         try:
             result = await matched_func(**body)
+        except Exception:
+            status = SpanStatus.ERROR
+            raise
         finally:
-            await end_trace()
+            await end_trace(status)
 
         json_content = json.dumps(convert_pydantic_to_json_value(result))
 
@@ -331,13 +336,17 @@ class AsyncLlamaStackAsLibraryClient(AsyncLlamaStackClient):
         await start_trace(route, {"__location__": "library_client"})
 
         async def gen():
+            status = SpanStatus.OK
             try:
                 async for chunk in await func(**body):
                     data = json.dumps(convert_pydantic_to_json_value(chunk))
                     sse_event = f"data: {data}\n\n"
                     yield sse_event.encode("utf-8")
+            except Exception:
+                status = SpanStatus.ERROR
+                raise
             finally:
-                await end_trace()
+                await end_trace(status)
 
         wrapped_gen = preserve_contexts_async_generator(gen(), [CURRENT_TRACE_CONTEXT, PROVIDER_DATA_VAR])
 
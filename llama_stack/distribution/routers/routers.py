@@ -4,6 +4,7 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
+import asyncio
 import time
 from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Union
 
@@ -54,15 +55,31 @@ from llama_stack.apis.tools import (
     ToolRuntime,
 )
 from llama_stack.apis.vector_io import Chunk, QueryChunksResponse, VectorIO
-from llama_stack.log import get_logger
+from llama_stack.log import Lazy, StructuredMessage, get_logger
 from llama_stack.models.llama.llama3.chat_format import ChatFormat
 from llama_stack.models.llama.llama3.tokenizer import Tokenizer
 from llama_stack.providers.datatypes import RoutingTable
-from llama_stack.providers.utils.telemetry.tracing import get_current_span
+from llama_stack.providers.utils.telemetry import metrics
+from llama_stack.providers.utils.telemetry.tracing import get_current_span_ids
 
 logger = get_logger(name=__name__, category="core")
 
 
+# Set `token_counting: false` in a model's metadata to only report the token usage returned by its provider
+TOKEN_COUNTING_METADATA_KEY = "token_counting"
+
+TOKEN_USAGE_METRICS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+
+def _provider_id(impl: Any) -> str:
+    return getattr(impl, "__provider_id__", "unknown")
+
+
+def _reported_token_usage(metrics: Optional[List[MetricInResponse]]) -> Dict[str, int]:
+    """Token usage the provider already reported in its response."""
+    return {m.metric: m.value for m in metrics or [] if m.metric in TOKEN_USAGE_METRICS}
+
+
 class VectorIORouter(VectorIO):
     """Routes to an provider based on the vector db identifier"""
 
@@ -88,14 +105,20 @@ class VectorIORouter(VectorIO):
         embedding_dimension: Optional[int] = 384,
         provider_id: Optional[str] = None,
         provider_vector_db_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
     ) -> None:
-        logger.debug(f"VectorIORouter.register_vector_db: {vector_db_id}, {embedding_model}")
+        logger.debug(
+            StructuredMessage(
+                "VectorIORouter.register_vector_db", vector_db_id=vector_db_id, embedding_model=embedding_model
+            )
+        )
         await self.routing_table.register_vector_db(
             vector_db_id,
             embedding_model,
             embedding_dimension,
             provider_id,
             provider_vector_db_id,
+            metadata,
         )
 
     async def insert_chunks(
@@ -105,7 +128,13 @@ class VectorIORouter(VectorIO):
         ttl_seconds: Optional[int] = None,
     ) -> None:
         logger.debug(
-            f"VectorIORouter.insert_chunks: {vector_db_id}, {len(chunks)} chunks, ttl_seconds={ttl_seconds}, chunk_ids={[chunk.metadata['document_id'] for chunk in chunks[:3]]}{' and more...' if len(chunks) > 3 else ''}",
+            StructuredMessage(
+                "VectorIORouter.insert_chunks",
+                vector_db_id=vector_db_id,
+                num_chunks=len(chunks),
+                ttl_seconds=ttl_seconds,
+                document_ids=Lazy(lambda: [chunk.metadata.get("document_id") for chunk in chunks]),
+            )
         )
         return await self.routing_table.get_provider_impl(vector_db_id).insert_chunks(vector_db_id, chunks, ttl_seconds)
 
@@ -114,9 +143,12 @@ class VectorIORouter(VectorIO):
         vector_db_id: str,
         query: InterleavedContent,
         params: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> QueryChunksResponse:
-        logger.debug(f"VectorIORouter.query_chunks: {vector_db_id}")
-        return await self.routing_table.get_provider_impl(vector_db_id).query_chunks(vector_db_id, query, params)
+        logger.debug(StructuredMessage("VectorIORouter.query_chunks", vector_db_id=vector_db_id))
+        provider = self.routing_table.get_provider_impl(vector_db_id)
+        with metrics.VECTOR_QUERY_LATENCY.labels(_provider_id(provider)).time():
+            return await provider.query_chunks(vector_db_id, query, params, query_embedding)
 
 
 class InferenceRouter(Inference):
@@ -133,6 +165,8 @@ class InferenceRouter(Inference):
         if self.telemetry:
             self.tokenizer = Tokenizer.get_instance()
             self.formatter = ChatFormat(self.tokenizer)
+        # tokens an empty completion message counts for, by tool prompt format
+        self._completion_message_tokens: Dict[Optional[ToolPromptFormat], int] = {}
 
     async def initialize(self) -> None:
         logger.debug("InferenceRouter.initialize")
@@ -151,7 +185,14 @@ class InferenceRouter(Inference):
         model_type: Optional[ModelType] = None,
     ) -> None:
         logger.debug(
-            f"InferenceRouter.register_model: {model_id=} {provider_model_id=} {provider_id=} {metadata=} {model_type=}",
+            StructuredMessage(
+                "InferenceRouter.register_model",
+                model_id=model_id,
+                provider_model_id=provider_model_id,
+                provider_id=provider_id,
+                metadata=metadata,
+                model_type=model_type,
+            )
         )
         await self.routing_table.register_model(model_id, provider_model_id, provider_id, metadata, model_type)
 
@@ -173,10 +214,12 @@ class InferenceRouter(Inference):
         Returns:
             List of MetricEvent objects with token usage metrics
         """
-        span = get_current_span()
-        if span is None:
+        # metrics are logged for traces that are sampled out too, against their unrecorded root span
+        span_ids = get_current_span_ids()
+        if span_ids is None:
             logger.warning("No span found for token usage metrics")
             return []
+        trace_id, span_id = span_ids
         metrics = [
             ("prompt_tokens", prompt_tokens),
             ("completion_tokens", completion_tokens),
@@ -186,8 +229,8 @@ class InferenceRouter(Inference):
         for metric_name, value in metrics:
             metric_events.append(
                 MetricEvent(
-                    trace_id=span.trace_id,
-                    span_id=span.span_id,
+                    trace_id=trace_id,
+                    span_id=span_id,
                     metric=metric_name,
                     value=value,
                     timestamp=time.time(),
@@ -213,17 +256,68 @@ class InferenceRouter(Inference):
                 await self.telemetry.log_event(metric)
         return [MetricInResponse(metric=metric.metric, value=metric.value) for metric in metrics]
 
-    async def _count_tokens(
+    def _counts_tokens(self, model: Model) -> bool:
+        return self.telemetry is not None and (model.metadata or {}).get(TOKEN_COUNTING_METADATA_KEY, True) is not False
+
+    def _count_tokens_sync(
         self,
         messages: List[Message] | InterleavedContent,
         tool_prompt_format: Optional[ToolPromptFormat] = None,
-    ) -> Optional[int]:
+    ) -> int:
         if isinstance(messages, list):
             encoded = self.formatter.encode_dialog_prompt(messages, tool_prompt_format)
         else:
             encoded = self.formatter.encode_content(messages)
         return len(encoded.tokens) if encoded and encoded.tokens else 0
 
+    async def _count_tokens(
+        self,
+        messages: List[Message] | InterleavedContent,
+        tool_prompt_format: Optional[ToolPromptFormat] = None,
+    ) -> Optional[int]:
+        # tokenizing a long conversation takes milliseconds of CPU, which must not block the event loop
+        return await asyncio.to_thread(self._count_tokens_sync, messages, tool_prompt_format)
+
+    def _count_delta_tokens(self, text: str) -> int:
+        """Counts the tokens of a streamed delta; deltas are short, so this runs inline."""
+        return len(self.tokenizer.encode(text, bos=False, eos=False)) if text else 0
+
+    def _empty_completion_tokens(self, tool_prompt_format: Optional[ToolPromptFormat]) -> int:
+        """Tokens that the framing of a completion message counts for, without any content."""
+        if tool_prompt_format not in self._completion_message_tokens:
+            self._completion_message_tokens[tool_prompt_format] = self._count_tokens_sync(
+                [CompletionMessage(content="", stop_reason=StopReason.end_of_turn)], tool_prompt_format
+            )
+        return self._completion_message_tokens[tool_prompt_format]
+
+    async def _add_token_usage(
+        self,
+        model: Model,
+        response_metrics: Optional[List[MetricInResponse]],
+        reported_usage: Dict[str, int],
+        prompt_tokens_task: Optional[asyncio.Task],
+        completion_tokens: Optional[int],
+    ) -> Optional[List[MetricInResponse]]:
+        """Logs the token usage of a response and adds the metrics that the provider did not report itself.
+
+        Usage reported by the provider takes precedence over counted tokens.
+        """
+        prompt_tokens = reported_usage.get("prompt_tokens")
+        if prompt_tokens_task is not None:
+            if prompt_tokens is None:
+                prompt_tokens = await prompt_tokens_task
+            else:
+                prompt_tokens_task.cancel()
+        completion_tokens = reported_usage.get("completion_tokens", completion_tokens)
+        if prompt_tokens is None or completion_tokens is None:
+            # token counting is disabled for this model and the provider did not report its usage
+            return response_metrics
+
+        total_tokens = reported_usage.get("total_tokens", prompt_tokens + completion_tokens)
+        token_metrics = await self._compute_and_log_token_usage(prompt_tokens, completion_tokens, total_tokens, model)
+        token_metrics = [m for m in token_metrics if m.metric not in reported_usage]
+        return token_metrics if response_metrics is None else response_metrics + token_metrics
+
     async def chat_completion(
         self,
         model_id: str,
@@ -237,8 +331,17 @@ class InferenceRouter(Inference):
         logprobs: Optional[LogProbConfig] = None,
         tool_config: Optional[ToolConfig] = None,
     ) -> Union[ChatCompletionResponse, AsyncIterator[ChatCompletionResponseStreamChunk]]:
+        start = time.perf_counter()
         logger.debug(
-            f"InferenceRouter.chat_completion: {model_id=}, {stream=}, {messages=}, {tools=}, {tool_config=}, {response_format=}",
+            StructuredMessage(
+                "InferenceRouter.chat_completion",
+                model_id=model_id,
+                stream=stream,
+                messages=messages,
+                tools=tools,
+                tool_config=tool_config,
+                response_format=response_format,
+            )
         )
         if sampling_params is None:
             sampling_params = SamplingParams()
@@ -286,51 +389,70 @@ class InferenceRouter(Inference):
             tool_config=tool_config,
         )
         provider = self.routing_table.get_provider_impl(model_id)
-        prompt_tokens = await self._count_tokens(messages, tool_config.tool_prompt_format)
+        counts_tokens = self._counts_tokens(model)
+        router_overhead = metrics.ROUTER_OVERHEAD.labels("inference", "chat_completion")
+        overhead = time.perf_counter() - start
 
         if stream:
 
             async def stream_generator():
-                completion_text = ""
-                async for chunk in await provider.chat_completion(**params):
-                    if chunk.event.event_type == ChatCompletionResponseEventType.progress:
-                        if chunk.event.delta.type == "text":
-                            completion_text += chunk.event.delta.text
-                    if chunk.event.event_type == ChatCompletionResponseEventType.complete:
-                        completion_tokens = await self._count_tokens(
-                            [
-                                CompletionMessage(
-                                    content=completion_text,
-                                    stop_reason=StopReason.end_of_turn,
-                                )
-                            ],
-                            tool_config.tool_prompt_format,
-                        )
-                        total_tokens = (prompt_tokens or 0) + (completion_tokens or 0)
-                        metrics = await self._compute_and_log_token_usage(
-                            prompt_tokens or 0,
-                            completion_tokens or 0,
-                            total_tokens,
-                            model,
-                        )
-                        chunk.metrics = metrics if chunk.metrics is None else chunk.metrics + metrics
-                    yield chunk
+                # the prompt is tokenized in a worker thread while the provider generates
+                prompt_tokens_task = (
+                    asyncio.create_task(self._count_tokens(messages, tool_config.tool_prompt_format))
+                    if counts_tokens
+                    else None
+                )
+                completion_tokens = (
+                    self._empty_completion_tokens(tool_config.tool_prompt_format) if counts_tokens else None
+                )
+                timer = metrics.TokenStreamTimer("chat_completion", model_id, model.provider_id)
+                try:
+                    async for chunk in await provider.chat_completion(**params):
+                        if chunk.event.event_type == ChatCompletionResponseEventType.progress:
+                            timer.token()
+                            if counts_tokens and chunk.event.delta.type == "text":
+                                completion_tokens += self._count_delta_tokens(chunk.event.delta.text)
+                        if chunk.event.event_type == ChatCompletionResponseEventType.complete:
+                            provider_done = time.perf_counter()
+                            reported_usage = _reported_token_usage(chunk.metrics)
+                            timer.finish(reported_usage.get("completion_tokens", completion_tokens), end=provider_done)
+                            chunk.metrics = await self._add_token_usage(
+                                model, chunk.metrics, reported_usage, prompt_tokens_task, completion_tokens
+                            )
+                            router_overhead.observe(overhead + time.perf_counter() - provider_done)
+                        yield chunk
+                finally:
+                    if prompt_tokens_task is not None and not prompt_tokens_task.done():
+                        prompt_tokens_task.cancel()
 
             return stream_generator()
         else:
-            response = await provider.chat_completion(**params)
-            completion_tokens = await self._count_tokens(
-                [response.completion_message],
-                tool_config.tool_prompt_format,
+            prompt_tokens_task = (
+                asyncio.create_task(self._count_tokens(messages, tool_config.tool_prompt_format))
+                if counts_tokens
+                else None
+            )
+            provider_start = time.perf_counter()
+            try:
+                response = await provider.chat_completion(**params)
+            except BaseException:
+                if prompt_tokens_task is not None:
+                    prompt_tokens_task.cancel()
+                raise
+            provider_done = time.perf_counter()
+            reported_usage = _reported_token_usage(response.metrics)
+            completion_tokens = reported_usage.get("completion_tokens")
+            if completion_tokens is None and counts_tokens:
+                completion_tokens = await self._count_tokens(
+                    [response.completion_message], tool_config.tool_prompt_format
+                )
+            metrics.record_generation(
+                "chat_completion", model_id, model.provider_id, provider_done - provider_start, completion_tokens
             )
-            total_tokens = (prompt_tokens or 0) + (completion_tokens or 0)
-            metrics = await self._compute_and_log_token_usage(
-                prompt_tokens or 0,
-                completion_tokens or 0,
-                total_tokens,
-                model,
+            response.metrics = await self._add_token_usage(
+                model, response.metrics, reported_usage, prompt_tokens_task, completion_tokens
             )
-            response.metrics = metrics if response.metrics is None else response.metrics + metrics
+            router_overhead.observe(overhead + time.perf_counter() - provider_done)
             return response
 
     async def completion(
@@ -342,10 +464,18 @@ class InferenceRouter(Inference):
         stream: Optional[bool] = False,
         logprobs: Optional[LogProbConfig] = None,
     ) -> AsyncGenerator:
+        start = time.perf_counter()
         if sampling_params is None:
             sampling_params = SamplingParams()
         logger.debug(
-            f"InferenceRouter.completion: {model_id=}, {stream=}, {content=}, {sampling_params=}, {response_format=}",
+            StructuredMessage(
+                "InferenceRouter.completion",
+                model_id=model_id,
+                stream=stream,
+                content=content,
+                sampling_params=sampling_params,
+                response_format=response_format,
+            )
         )
         model = await self.routing_table.get_model(model_id)
         if model is None:
@@ -362,39 +492,58 @@ class InferenceRouter(Inference):
             logprobs=logprobs,
         )
 
-        prompt_tokens = await self._count_tokens(content)
+        counts_tokens = self._counts_tokens(model)
+        router_overhead = metrics.ROUTER_OVERHEAD.labels("inference", "completion")
+        overhead = time.perf_counter() - start
 
         if stream:
 
             async def stream_generator():
-                completion_text = ""
-                async for chunk in await provider.completion(**params):
-                    if hasattr(chunk, "delta"):
-                        completion_text += chunk.delta
-                    if hasattr(chunk, "stop_reason") and chunk.stop_reason and self.telemetry:
-                        completion_tokens = await self._count_tokens(completion_text)
-                        total_tokens = (prompt_tokens or 0) + (completion_tokens or 0)
-                        metrics = await self._compute_and_log_token_usage(
-                            prompt_tokens or 0,
-                            completion_tokens or 0,
-                            total_tokens,
-                            model,
-                        )
-                        chunk.metrics = metrics if chunk.metrics is None else chunk.metrics + metrics
-                    yield chunk
+                prompt_tokens_task = asyncio.create_task(self._count_tokens(content)) if counts_tokens else None
+                # the begin-of-text token, which content is encoded with
+                completion_tokens = 1 if counts_tokens else None
+                timer = metrics.TokenStreamTimer("completion", model_id, model.provider_id)
+                try:
+                    async for chunk in await provider.completion(**params):
+                        if getattr(chunk, "delta", None):
+                            timer.token()
+                            if counts_tokens:
+                                completion_tokens += self._count_delta_tokens(chunk.delta)
+                        if hasattr(chunk, "stop_reason") and chunk.stop_reason:
+                            provider_done = time.perf_counter()
+                            reported_usage = _reported_token_usage(chunk.metrics)
+                            timer.finish(reported_usage.get("completion_tokens", completion_tokens), end=provider_done)
+                            chunk.metrics = await self._add_token_usage(
+                                model, chunk.metrics, reported_usage, prompt_tokens_task, completion_tokens
+                            )
+                            router_overhead.observe(overhead + time.perf_counter() - provider_done)
+                        yield chunk
+                finally:
+                    if prompt_tokens_task is not None and not prompt_tokens_task.done():
+                        prompt_tokens_task.cancel()
 
             return stream_generator()
         else:
-            response = await provider.completion(**params)
-            completion_tokens = await self._count_tokens(response.content)
-            total_tokens = (prompt_tokens or 0) + (completion_tokens or 0)
-            metrics = await self._compute_and_log_token_usage(
-                prompt_tokens or 0,
-                completion_tokens or 0,
-                total_tokens,
-                model,
+            prompt_tokens_task = asyncio.create_task(self._count_tokens(content)) if counts_tokens else None
+            provider_start = time.perf_counter()
+            try:
+                response = await provider.completion(**params)
+            except BaseException:
+                if prompt_tokens_task is not None:
+                    prompt_tokens_task.cancel()
+                raise
+            provider_done = time.perf_counter()
+            reported_usage = _reported_token_usage(response.metrics)
+            completion_tokens = reported_usage.get("completion_tokens")
+            if completion_tokens is None and counts_tokens:
+                completion_tokens = await self._count_tokens(response.content)
+            metrics.record_generation(
+                "completion", model_id, model.provider_id, provider_done - provider_start, completion_tokens
+            )
+            response.metrics = await self._add_token_usage(
+                model, response.metrics, reported_usage, prompt_tokens_task, completion_tokens
             )
-            response.metrics = metrics if response.metrics is None else response.metrics + metrics
+            router_overhead.observe(overhead + time.perf_counter() - provider_done)
             return response
 
     async def embeddings(
@@ -405,19 +554,20 @@ class InferenceRouter(Inference):
         output_dimension: Optional[int] = None,
         task_type: Optional[EmbeddingTaskType] = None,
     ) -> EmbeddingsResponse:
-        logger.debug(f"InferenceRouter.embeddings: {model_id}")
+        logger.debug(StructuredMessage("InferenceRouter.embeddings", model_id=model_id, num_contents=len(contents)))
         model = await self.routing_table.get_model(model_id)
         if model is None:
             raise ValueError(f"Model '{model_id}' not found")
         if model.model_type == ModelType.llm:
             raise ValueError(f"Model '{model_id}' is an LLM model and does not support embeddings")
-        return await self.routing_table.get_provider_impl(model_id).embeddings(
-            model_id=model_id,
-            contents=contents,
-            text_truncation=text_truncation,
-            output_dimension=output_dimension,
-            task_type=task_type,
-        )
+        with metrics.PROVIDER_LATENCY.labels("inference", "embeddings", model.provider_id).time():
+            return await self.routing_table.get_provider_impl(model_id).embeddings(
+                model_id=model_id,
+                contents=contents,
+                text_truncation=text_truncation,
+                output_dimension=output_dimension,
+                task_type=task_type,
+            )
 
 
 class SafetyRouter(Safety):
@@ -443,7 +593,7 @@ class SafetyRouter(Safety):
         provider_id: Optional[str] = None,
         params: Optional[Dict[str, Any]] = None,
     ) -> Shield:
-        logger.debug(f"SafetyRouter.register_shield: {shield_id}")
+        logger.debug(StructuredMessage("SafetyRouter.register_shield", shield_id=shield_id))
         return await self.routing_table.register_shield(shield_id, provider_shield_id, provider_id, params)
 
     async def run_shield(
@@ -452,12 +602,14 @@ class SafetyRouter(Safety):
         messages: List[Message],
         params: Dict[str, Any] = None,
     ) -> RunShieldResponse:
-        logger.debug(f"SafetyRouter.run_shield: {shield_id}")
-        return await self.routing_table.get_provider_impl(shield_id).run_shield(
-            shield_id=shield_id,
-            messages=messages,
-            params=params,
-        )
+        logger.debug(StructuredMessage("SafetyRouter.run_shield", shield_id=shield_id))
+        provider = self.routing_table.get_provider_impl(shield_id)
+        with metrics.SHIELD_LATENCY.labels(shield_id, _provider_id(provider)).time():
+            return await provider.run_shield(
+                shield_id=shield_id,
+                messages=messages,
+                params=params,
+            )
 
 
 class DatasetIORouter(DatasetIO):
@@ -484,7 +636,13 @@ class DatasetIORouter(DatasetIO):
         dataset_id: Optional[str] = None,
     ) -> None:
         logger.debug(
-            f"DatasetIORouter.register_dataset: {purpose=} {source=} {metadata=} {dataset_id=}",
+            StructuredMessage(
+                "DatasetIORouter.register_dataset",
+                purpose=purpose,
+                source=source,
+                metadata=metadata,
+                dataset_id=dataset_id,
+            )
         )
         await self.routing_table.register_dataset(
             purpose=purpose,
@@ -500,7 +658,7 @@ class DatasetIORouter(DatasetIO):
         limit: Optional[int] = None,
     ) -> PaginatedResponse:
         logger.debug(
-            f"DatasetIORouter.iterrows: {dataset_id}, {start_index=} {limit=}",
+            StructuredMessage("DatasetIORouter.iterrows", dataset_id=dataset_id, start_index=start_index, limit=limit)
         )
         return await self.routing_table.get_provider_impl(dataset_id).iterrows(
             dataset_id=dataset_id,
@@ -509,7 +667,7 @@ class DatasetIORouter(DatasetIO):
         )
 
     async def append_rows(self, dataset_id: str, rows: List[Dict[str, Any]]) -> None:
-        logger.debug(f"DatasetIORouter.append_rows: {dataset_id}, {len(rows)} rows")
+        logger.debug(StructuredMessage("DatasetIORouter.append_rows", dataset_id=dataset_id, num_rows=len(rows)))
         return await self.routing_table.get_provider_impl(dataset_id).append_rows(
             dataset_id=dataset_id,
             rows=rows,
@@ -538,7 +696,7 @@ class ScoringRouter(Scoring):
         scoring_functions: Dict[str, Optional[ScoringFnParams]] = None,
         save_results_dataset: bool = False,
     ) -> ScoreBatchResponse:
-        logger.debug(f"ScoringRouter.score_batch: {dataset_id}")
+        logger.debug(StructuredMessage("ScoringRouter.score_batch", dataset_id=dataset_id))
         res = {}
         for fn_identifier in scoring_functions.keys():
             score_response = await self.routing_table.get_provider_impl(fn_identifier).score_batch(
@@ -559,7 +717,11 @@ class ScoringRouter(Scoring):
         input_rows: List[Dict[str, Any]],
         scoring_functions: Dict[str, Optional[ScoringFnParams]] = None,
     ) -> ScoreResponse:
-        logger.debug(f"ScoringRouter.score: {len(input_rows)} rows, {len(scoring_functions)} functions")
+        logger.debug(
+            StructuredMessage(
+                "ScoringRouter.score", num_rows=len(input_rows), scoring_functions=Lazy(lambda: list(scoring_functions))
+            )
+        )
         res = {}
         # look up and map each scoring function to its provider impl
         for fn_identifier in scoring_functions.keys():
@@ -593,7 +755,7 @@ class EvalRouter(Eval):
         benchmark_id: str,
         benchmark_config: BenchmarkConfig,
     ) -> Job:
-        logger.debug(f"EvalRouter.run_eval: {benchmark_id}")
+        logger.debug(StructuredMessage("EvalRouter.run_eval", benchmark_id=benchmark_id))
         return await self.routing_table.get_provider_impl(benchmark_id).run_eval(
             benchmark_id=benchmark_id,
             benchmark_config=benchmark_config,
@@ -606,7 +768,7 @@ class EvalRouter(Eval):
         scoring_functions: List[str],
         benchmark_config: BenchmarkConfig,
     ) -> EvaluateResponse:
-        logger.debug(f"EvalRouter.evaluate_rows: {benchmark_id}, {len(input_rows)} rows")
+        logger.debug(StructuredMessage("EvalRouter.evaluate_rows", benchmark_id=benchmark_id, num_rows=len(input_rows)))
         return await self.routing_table.get_provider_impl(benchmark_id).evaluate_rows(
             benchmark_id=benchmark_id,
             input_rows=input_rows,
@@ -619,7 +781,7 @@ class EvalRouter(Eval):
         benchmark_id: str,
         job_id: str,
     ) -> Job:
-        logger.debug(f"EvalRouter.job_status: {benchmark_id}, {job_id}")
+        logger.debug(StructuredMessage("EvalRouter.job_status", benchmark_id=benchmark_id, job_id=job_id))
         return await self.routing_table.get_provider_impl(benchmark_id).job_status(benchmark_id, job_id)
 
     async def job_cancel(
@@ -627,7 +789,7 @@ class EvalRouter(Eval):
         benchmark_id: str,
         job_id: str,
     ) -> None:
-        logger.debug(f"EvalRouter.job_cancel: {benchmark_id}, {job_id}")
+        logger.debug(StructuredMessage("EvalRouter.job_cancel", benchmark_id=benchmark_id, job_id=job_id))
         await self.routing_table.get_provider_impl(benchmark_id).job_cancel(
             benchmark_id,
             job_id,
@@ -638,7 +800,7 @@ class EvalRouter(Eval):
         benchmark_id: str,
         job_id: str,
     ) -> EvaluateResponse:
-        logger.debug(f"EvalRouter.job_result: {benchmark_id}, {job_id}")
+        logger.debug(StructuredMessage("EvalRouter.job_result", benchmark_id=benchmark_id, job_id=job_id))
         return await self.routing_table.get_provider_impl(benchmark_id).job_result(
             benchmark_id,
             job_id,
@@ -660,7 +822,7 @@ class ToolRuntimeRouter(ToolRuntime):
             vector_db_ids: List[str],
             query_config: Optional[RAGQueryConfig] = None,
         ) -> RAGQueryResult:
-            logger.debug(f"ToolRuntimeRouter.RagToolImpl.query: {vector_db_ids}")
+            logger.debug(StructuredMessage("ToolRuntimeRouter.RagToolImpl.query", vector_db_ids=vector_db_ids))
             return await self.routing_table.get_provider_impl("knowledge_search").query(
                 content, vector_db_ids, query_config
             )
@@ -672,7 +834,12 @@ class ToolRuntimeRouter(ToolRuntime):
             chunk_size_in_tokens: int = 512,
         ) -> None:
             logger.debug(
-                f"ToolRuntimeRouter.RagToolImpl.insert: {vector_db_id}, {len(documents)} documents, chunk_size={chunk_size_in_tokens}"
+                StructuredMessage(
+                    "ToolRuntimeRouter.RagToolImpl.insert",
+                    vector_db_id=vector_db_id,
+                    num_documents=len(documents),
+                    chunk_size_in_tokens=chunk_size_in_tokens,
+                )
             )
             return await self.routing_table.get_provider_impl("insert_into_memory").insert(
                 documents, vector_db_id, chunk_size_in_tokens
@@ -699,7 +866,7 @@ class ToolRuntimeRouter(ToolRuntime):
         pass
 
     async def invoke_tool(self, tool_name: str, kwargs: Dict[str, Any]) -> Any:
-        logger.debug(f"ToolRuntimeRouter.invoke_tool: {tool_name}")
+        logger.debug(StructuredMessage("ToolRuntimeRouter.invoke_tool", tool_name=tool_name))
         return await self.routing_table.get_provider_impl(tool_name).invoke_tool(
             tool_name=tool_name,
             kwargs=kwargs,
@@ -708,5 +875,5 @@ class ToolRuntimeRouter(ToolRuntime):
     async def list_runtime_tools(
         self, tool_group_id: Optional[str] = None, mcp_endpoint: Optional[URL] = None
     ) -> ListToolDefsResponse:
-        logger.debug(f"ToolRuntimeRouter.list_runtime_tools: {tool_group_id}")
+        logger.debug(StructuredMessage("ToolRuntimeRouter.list_runtime_tools", tool_group_id=tool_group_id))
         return await self.routing_table.get_provider_impl(tool_group_id).list_tools(tool_group_id, mcp_endpoint)
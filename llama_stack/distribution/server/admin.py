@@ -0,0 +1,179 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from llama_stack.apis.version import LLAMA_STACK_API_VERSION
+from llama_stack.distribution.datatypes import AdminConfig
+from llama_stack.log import get_logger
+
+logger = get_logger(name=__name__, category="server")
+
+
+def _short_filename(filename: str) -> str:
+    site_packages = filename.rfind("site-packages" + os.sep)
+    if site_packages != -1:
+        return filename[site_packages + len("site-packages" + os.sep) :]
+    package = filename.rfind("llama_stack" + os.sep)
+    if package != -1:
+        return filename[package:]
+    return os.path.basename(filename)
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of every thread at a fixed interval, from a thread of its own.
+
+    Each sample holds the GIL for as long as it takes to walk the stacks, which at the default
+    interval of 10ms costs a few percent of one core. The result is a count per distinct stack,
+    in the collapsed format that flamegraph tools (flamegraph.pl, speedscope, inferno) read.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._labels: Dict[object, str] = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self._labels[code] = f"{name} ({_short_filename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def sample(self, counts: Counter, exclude_thread: int) -> None:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == exclude_thread:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+            counts[";".join(reversed(stack))] += 1
+
+    def run(self, duration_seconds: float) -> Counter:
+        """Samples for `duration_seconds` and returns the number of samples of each collapsed stack."""
+        counts = Counter()
+        own_thread = threading.get_ident()
+        deadline = time.monotonic() + duration_seconds
+        while True:
+            self.sample(counts, own_thread)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return counts
+            time.sleep(min(self.interval_seconds, remaining))
+
+    @staticmethod
+    def collapsed(counts: Counter) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class TaskTracker:
+    """Records when asyncio tasks are created, through the task factory of the event loop."""
+
+    def __init__(self):
+        self._created: "weakref.WeakKeyDictionary[asyncio.Task, float]" = weakref.WeakKeyDictionary()
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        previous_factory = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):
+            if previous_factory is not None:
+                task = previous_factory(loop, coro, **kwargs)
+            else:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            self._created[task] = time.monotonic()
+            return task
+
+        loop.set_task_factory(factory)
+
+    def created_at(self, task: asyncio.Task) -> Optional[float]:
+        return self._created.get(task)
+
+
+class TaskInfo(BaseModel):
+    name: str
+    coroutine: str
+    pending_seconds: Optional[float] = None
+    stack: List[str]
+
+
+class ListTasksResponse(BaseModel):
+    data: List[TaskInfo]
+
+
+def dump_tasks(tracker: TaskTracker, stack_limit: int = 16) -> List[TaskInfo]:
+    """Pending tasks of the running event loop, the longest pending first.
+
+    `pending_seconds` is unknown for tasks created before the tracker was installed.
+    """
+    now = time.monotonic()
+    current = asyncio.current_task()
+    tasks = []
+    for task in asyncio.all_tasks():
+        if task is current:
+            continue
+        coro = task.get_coro()
+        created = tracker.created_at(task)
+        tasks.append(
+            TaskInfo(
+                name=task.get_name(),
+                coroutine=getattr(coro, "__qualname__", repr(coro)),
+                pending_seconds=None if created is None else now - created,
+                stack=[
+                    f"{frame.f_code.co_name} ({_short_filename(frame.f_code.co_filename)}:{frame.f_lineno})"
+                    for frame in task.get_stack(limit=stack_limit)
+                ],
+            )
+        )
+    tasks.sort(key=lambda t: -1 if t.pending_seconds is None else t.pending_seconds, reverse=True)
+    return tasks
+
+
+def create_admin_router(config: AdminConfig, task_tracker: TaskTracker) -> APIRouter:
+    router = APIRouter(prefix=f"/{LLAMA_STACK_API_VERSION}/admin", include_in_schema=False)
+    profile_lock = asyncio.Lock()
+
+    @router.get("/profile")
+    async def profile(
+        seconds: float = Query(10, gt=0, description="How long to profile the server for"),
+        interval_ms: Optional[float] = Query(None, gt=0, description="Interval between two samples"),
+    ) -> PlainTextResponse:
+        """Profiles every thread of the server and returns the sampled stacks in the collapsed format."""
+        if seconds > config.max_profile_seconds:
+            raise HTTPException(status_code=400, detail=f"Profiles are limited to {config.max_profile_seconds} seconds")
+        if profile_lock.locked():
+            raise HTTPException(status_code=409, detail="A profile is already running")
+
+        async with profile_lock:
+            profiler = SamplingProfiler((interval_ms or config.profile_interval_ms) / 1000)
+            logger.info(f"Profiling the server for {seconds} seconds")
+            counts = await asyncio.to_thread(profiler.run, seconds)
+
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        return PlainTextResponse(
+            SamplingProfiler.collapsed(counts),
+            headers={"Content-Disposition": f'attachment; filename="llama-stack-{timestamp}.collapsed"'},
+        )
+
+    @router.get("/tasks", response_model=ListTasksResponse)
+    async def tasks() -> ListTasksResponse:
+        """Lists the pending asyncio tasks of the server and where each of them is waiting."""
+        return ListTasksResponse(data=dump_tasks(task_tracker))
+
+    return router
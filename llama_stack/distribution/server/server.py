@@ -10,22 +10,25 @@ import inspect
 import json
 import os
 import sys
+import time
 import traceback
 import warnings
 from contextlib import asynccontextmanager
 from importlib.metadata import version as parse_version
 from pathlib import Path
-from typing import Any, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 import yaml
 from fastapi import Body, FastAPI, HTTPException, Request
 from fastapi import Path as FastapiPath
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, ValidationError
 from typing_extensions import Annotated
 
-from llama_stack.distribution.datatypes import LoggingConfig, StackRunConfig
+from llama_stack.apis.telemetry import SpanStatus
+from llama_stack.apis.version import LLAMA_STACK_API_VERSION
+from llama_stack.distribution.datatypes import LoggingConfig, StackRunConfig, StreamingConfig
 from llama_stack.distribution.distribution import builtin_automatically_routed_apis
 from llama_stack.distribution.request_headers import (
     PROVIDER_DATA_VAR,
@@ -49,6 +52,12 @@ from llama_stack.providers.inline.telemetry.meta_reference.config import Telemet
 from llama_stack.providers.inline.telemetry.meta_reference.telemetry import (
     TelemetryAdapter,
 )
+from llama_stack.providers.utils.telemetry.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    REQUEST_LATENCY,
+    REQUESTS_IN_FLIGHT,
+    render_metrics,
+)
 from llama_stack.providers.utils.telemetry.tracing import (
     CURRENT_TRACE_CONTEXT,
     end_trace,
@@ -56,8 +65,10 @@ from llama_stack.providers.utils.telemetry.tracing import (
     start_trace,
 )
 
+from .admin import TaskTracker, create_admin_router
 from .auth import AuthenticationMiddleware
 from .endpoints import get_all_api_endpoints
+from .streaming import SSEStreamingResponse
 
 REPO_ROOT = Path(__file__).parent.parent.parent.parent
 
@@ -146,6 +157,9 @@ async def shutdown(app):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up")
+    task_tracker = getattr(app.state, "task_tracker", None)
+    if task_tracker is not None:
+        task_tracker.install(asyncio.get_running_loop())
     yield
     logger.info("Shutting down")
     await shutdown(app)
@@ -166,7 +180,6 @@ async def sse_generator(event_gen):
     try:
         async for item in await event_gen:
             yield create_sse_event(item)
-            await asyncio.sleep(0.01)
     except asyncio.CancelledError:
         logger.info("Generator cancelled")
         await event_gen.aclose()
@@ -181,7 +194,7 @@ async def sse_generator(event_gen):
         )
 
 
-def create_dynamic_typed_route(func: Any, method: str, route: str):
+def create_dynamic_typed_route(func: Any, method: str, route: str, streaming_config: Optional[StreamingConfig] = None):
     async def endpoint(request: Request, **kwargs):
         # Get auth attributes from the request scope
         user_attributes = request.scope.get("user_attributes", {})
@@ -195,7 +208,7 @@ def create_dynamic_typed_route(func: Any, method: str, route: str):
                     gen = preserve_contexts_async_generator(
                         sse_generator(func(**kwargs)), [CURRENT_TRACE_CONTEXT, PROVIDER_DATA_VAR]
                     )
-                    return StreamingResponse(gen, media_type="text/event-stream")
+                    return SSEStreamingResponse(gen, config=streaming_config)
                 else:
                     value = func(**kwargs)
                     return await maybe_await(value)
@@ -237,21 +250,67 @@ class TracingMiddleware:
         path = scope.get("path", "")
         if not hasattr(self, "endpoint_impls"):
             self.endpoint_impls = initialize_endpoint_impls(self.impls)
-        _, _, trace_path = find_matching_endpoint(scope.get("method", "GET"), path, self.endpoint_impls)
+        try:
+            _, _, trace_path = find_matching_endpoint(scope.get("method", "GET"), path, self.endpoint_impls)
+        except ValueError:
+            # not an API route, e.g. the admin endpoints or a 404
+            return await self.app(scope, receive, send)
 
         trace_context = await start_trace(trace_path, {"__location__": "server", "raw_path": path})
+        status = SpanStatus.OK
 
         async def send_with_trace_id(message):
+            nonlocal status
             if message["type"] == "http.response.start":
-                headers = message.get("headers", [])
-                headers.append([b"x-trace-id", str(trace_context.trace_id).encode()])
-                message["headers"] = headers
+                if message.get("status", 200) >= 500:
+                    status = SpanStatus.ERROR
+                if trace_context:
+                    headers = message.get("headers", [])
+                    headers.append([b"x-trace-id", str(trace_context.trace_id).encode()])
+                    message["headers"] = headers
             await send(message)
 
         try:
             return await self.app(scope, receive, send_with_trace_id)
+        except Exception:
+            status = SpanStatus.ERROR
+            raise
+        finally:
+            await end_trace(status)
+
+
+class MetricsMiddleware:
+    """Records the latency and the number of in-flight requests of each API."""
+
+    def __init__(self, app, impls):
+        self.app = app
+        self.impls = impls
+
+    async def __call__(self, scope, receive, send):
+        if scope.get("type") != "http":
+            return await self.app(scope, receive, send)
+
+        if not hasattr(self, "endpoint_impls"):
+            self.endpoint_impls = initialize_endpoint_impls(self.impls)
+            self.impl_apis = {id(impl): api.value for api, impl in self.impls.items()}
+        try:
+            func, _, route = find_matching_endpoint(
+                scope.get("method", "GET"), scope.get("path", ""), self.endpoint_impls
+            )
+        except ValueError:
+            return await self.app(scope, receive, send)
+
+        api = self.impl_apis.get(id(getattr(func, "__self__", None)), "unknown")
+        start = time.perf_counter()
+        try:
+            with REQUESTS_IN_FLIGHT.labels(api).track_in_progress():
+                return await self.app(scope, receive, send)
         finally:
-            await end_trace()
+            REQUEST_LATENCY.labels(api, route).observe(time.perf_counter() - start)
+
+
+async def metrics_endpoint() -> Response:
+    return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
 class ClientVersionMiddleware:
@@ -294,6 +353,77 @@ class ClientVersionMiddleware:
         return await self.app(scope, receive, send)
 
 
+def create_app(config: StackRunConfig, impls: Dict[Api, Any]) -> FastAPI:
+    """Build the FastAPI app serving the APIs of a constructed stack."""
+    app = FastAPI(lifespan=lifespan)
+    if not os.environ.get("LLAMA_STACK_DISABLE_VERSION_CHECK"):
+        app.add_middleware(ClientVersionMiddleware)
+
+    # Add authentication middleware if configured
+    if config.server.auth and config.server.auth.endpoint:
+        logger.info(f"Enabling authentication with endpoint: {config.server.auth.endpoint}")
+        app.add_middleware(AuthenticationMiddleware, auth_endpoint=config.server.auth.endpoint)
+
+    all_endpoints = get_all_api_endpoints()
+
+    if config.apis:
+        apis_to_serve = set(config.apis)
+    else:
+        apis_to_serve = set(impls.keys())
+
+    for inf in builtin_automatically_routed_apis():
+        # if we do not serve the corresponding router API, we should not serve the routing table API
+        if inf.router_api.value not in apis_to_serve:
+            continue
+        apis_to_serve.add(inf.routing_table_api.value)
+
+    apis_to_serve.add("inspect")
+    apis_to_serve.add("providers")
+    for api_str in apis_to_serve:
+        api = Api(api_str)
+
+        endpoints = all_endpoints[api]
+        impl = impls[api]
+
+        for endpoint in endpoints:
+            if not hasattr(impl, endpoint.name):
+                # ideally this should be a typing violation already
+                raise ValueError(f"Could not find method {endpoint.name} on {impl}!!")
+
+            impl_method = getattr(impl, endpoint.name)
+
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", category=UserWarning, module="pydantic._internal._fields")
+                getattr(app, endpoint.method)(endpoint.route, response_model=None)(
+                    create_dynamic_typed_route(
+                        impl_method,
+                        endpoint.method,
+                        endpoint.route,
+                        config.server.streaming,
+                    )
+                )
+
+    logger.debug(f"serving APIs: {apis_to_serve}")
+
+    app.exception_handler(RequestValidationError)(global_exception_handler)
+    app.exception_handler(Exception)(global_exception_handler)
+
+    if config.server.admin.enabled:
+        logger.warning(f"Serving the admin endpoints under /{LLAMA_STACK_API_VERSION}/admin")
+        app.state.task_tracker = TaskTracker()
+        app.include_router(create_admin_router(config.server.admin, app.state.task_tracker))
+
+    if config.server.metrics.enabled:
+        # a route rather than a middleware, so that it sits behind the authentication middleware
+        app.get("/metrics", include_in_schema=False)(metrics_endpoint)
+
+    app.__llama_stack_impls__ = impls
+    app.add_middleware(TracingMiddleware, impls=impls)
+    app.add_middleware(MetricsMiddleware, impls=impls)
+
+    return app
+
+
 def main(args: Optional[argparse.Namespace] = None):
     """Start the LlamaStack server."""
     parser = argparse.ArgumentParser(description="Start the LlamaStack server.")
@@ -388,15 +518,6 @@ def main(args: Optional[argparse.Namespace] = None):
     safe_config = redact_sensitive_fields(config.model_dump())
     logger.info(yaml.dump(safe_config, indent=2))
 
-    app = FastAPI(lifespan=lifespan)
-    if not os.environ.get("LLAMA_STACK_DISABLE_VERSION_CHECK"):
-        app.add_middleware(ClientVersionMiddleware)
-
-    # Add authentication middleware if configured
-    if config.server.auth and config.server.auth.endpoint:
-        logger.info(f"Enabling authentication with endpoint: {config.server.auth.endpoint}")
-        app.add_middleware(AuthenticationMiddleware, auth_endpoint=config.server.auth.endpoint)
-
     try:
         impls = asyncio.run(construct_stack(config))
     except InvalidProviderError as e:
@@ -408,51 +529,7 @@ def main(args: Optional[argparse.Namespace] = None):
     else:
         setup_logger(TelemetryAdapter(TelemetryConfig(), {}))
 
-    all_endpoints = get_all_api_endpoints()
-
-    if config.apis:
-        apis_to_serve = set(config.apis)
-    else:
-        apis_to_serve = set(impls.keys())
-
-    for inf in builtin_automatically_routed_apis():
-        # if we do not serve the corresponding router API, we should not serve the routing table API
-        if inf.router_api.value not in apis_to_serve:
-            continue
-        apis_to_serve.add(inf.routing_table_api.value)
-
-    apis_to_serve.add("inspect")
-    apis_to_serve.add("providers")
-    for api_str in apis_to_serve:
-        api = Api(api_str)
-
-        endpoints = all_endpoints[api]
-        impl = impls[api]
-
-        for endpoint in endpoints:
-            if not hasattr(impl, endpoint.name):
-                # ideally this should be a typing violation already
-                raise ValueError(f"Could not find method {endpoint.name} on {impl}!!")
-
-            impl_method = getattr(impl, endpoint.name)
-
-            with warnings.catch_warnings():
-                warnings.filterwarnings("ignore", category=UserWarning, module="pydantic._internal._fields")
-                getattr(app, endpoint.method)(endpoint.route, response_model=None)(
-                    create_dynamic_typed_route(
-                        impl_method,
-                        endpoint.method,
-                        endpoint.route,
-                    )
-                )
-
-    logger.debug(f"serving APIs: {apis_to_serve}")
-
-    app.exception_handler(RequestValidationError)(global_exception_handler)
-    app.exception_handler(Exception)(global_exception_handler)
-
-    app.__llama_stack_impls__ = impls
-    app.add_middleware(TracingMiddleware, impls=impls)
+    app = create_app(config, impls)
 
     import uvicorn
 
@@ -0,0 +1,122 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+from typing import AsyncIterator, List, Optional, Union
+
+from starlette.responses import StreamingResponse
+from starlette.types import Send
+
+from llama_stack.distribution.datatypes import StreamingConfig
+
+
+class _CoalescingBuffer:
+    """Byte-bounded buffer between the event producer and the ASGI send loop.
+
+    The producer is paused once `max_buffered_bytes` are pending, so a slow client
+    applies backpressure all the way back to the provider stream.
+    """
+
+    def __init__(self, max_buffered_bytes: int):
+        self.max_buffered_bytes = max_buffered_bytes
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._closed = False
+        self._cond = asyncio.Condition()
+
+    async def put(self, chunk: bytes) -> None:
+        async with self._cond:
+            # always accept at least one chunk so that oversized events cannot deadlock
+            await self._cond.wait_for(lambda: not self._chunks or self._size < self.max_buffered_bytes)
+            self._chunks.append(chunk)
+            self._size += len(chunk)
+            self._cond.notify_all()
+
+    async def close(self) -> None:
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    async def take(self, window: float, max_bytes: int) -> Optional[List[bytes]]:
+        """Wait for pending chunks and return at most `max_bytes` of them; None once the producer is done.
+
+        Chunks are never split, so a single chunk larger than `max_bytes` is returned on its own.
+        """
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._chunks or self._closed)
+            if not self._chunks:
+                return None
+
+            if window > 0 and self._size < max_bytes and not self._closed:
+                try:
+                    await asyncio.wait_for(
+                        self._cond.wait_for(lambda: self._size >= max_bytes or self._closed),
+                        timeout=window,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+            count, size = 1, len(self._chunks[0])
+            while count < len(self._chunks) and size + len(self._chunks[count]) <= max_bytes:
+                size += len(self._chunks[count])
+                count += 1
+            chunks, self._chunks = self._chunks[:count], self._chunks[count:]
+            self._size -= size
+            self._cond.notify_all()
+            return chunks
+
+
+class SSEStreamingResponse(StreamingResponse):
+    """Streaming response for server-sent events.
+
+    By default every event is written as soon as it is produced, and the next event is
+    only pulled once the ASGI `send` for the previous one has completed. In coalescing
+    mode a producer task keeps pulling events while `send` is blocked on a slow client,
+    and everything that accumulated in the meantime goes out in a single write.
+    """
+
+    def __init__(
+        self,
+        content: AsyncIterator[Union[str, bytes]],
+        config: Optional[StreamingConfig] = None,
+        **kwargs,
+    ):
+        kwargs.setdefault("media_type", "text/event-stream")
+        super().__init__(content, **kwargs)
+        self.config = config or StreamingConfig()
+
+    async def stream_response(self, send: Send) -> None:
+        if not self.config.coalesce:
+            return await super().stream_response(send)
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        buffer = _CoalescingBuffer(self.config.max_buffered_bytes)
+        producer = asyncio.create_task(self._produce(buffer))
+        window = self.config.coalesce_window_ms / 1000
+        try:
+            while (chunks := await buffer.take(window, self.config.coalesce_max_bytes)) is not None:
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+            # surface any error raised while producing
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
+
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _produce(self, buffer: _CoalescingBuffer) -> None:
+        try:
+            async for chunk in self.body_iterator:
+                if not isinstance(chunk, (bytes, memoryview)):
+                    chunk = chunk.encode(self.charset)
+                await buffer.put(bytes(chunk))
+        finally:
+            await buffer.close()
@@ -40,10 +40,9 @@ KEY_VERSION = "v8"
 KEY_FORMAT = f"{REGISTER_PREFIX}:{KEY_VERSION}::" + "{type}:{identifier}"
 
 
-def _get_registry_key_range() -> Tuple[str, str]:
-    """Returns the start and end keys for the registry range query."""
-    start_key = f"{REGISTER_PREFIX}:{KEY_VERSION}"
-    return start_key, f"{start_key}\xff"
+def _get_registry_key_prefix() -> str:
+    """Returns the key prefix shared by all registry entries."""
+    return f"{REGISTER_PREFIX}:{KEY_VERSION}::"
 
 
 def _parse_registry_values(values: List[str]) -> List[RoutableObjectWithProvider]:
@@ -72,9 +71,8 @@ class DiskDistributionRegistry(DistributionRegistry):
         raise NotImplementedError("Disk registry does not have a cache")
 
     async def get_all(self) -> List[RoutableObjectWithProvider]:
-        start_key, end_key = _get_registry_key_range()
-        values = await self.kvstore.range(start_key, end_key)
-        return _parse_registry_values(values)
+        result = await self.kvstore.scan(_get_registry_key_prefix(), with_keys=False)
+        return _parse_registry_values(result.values)
 
     async def get(self, type: str, identifier: str) -> Optional[RoutableObjectWithProvider]:
         json_str = await self.kvstore.get(KEY_FORMAT.format(type=type, identifier=identifier))
@@ -133,9 +131,8 @@ class CachedDiskDistributionRegistry(DiskDistributionRegistry):
             if self._initialized:
                 return
 
-            start_key, end_key = _get_registry_key_range()
-            values = await self.kvstore.range(start_key, end_key)
-            objects = _parse_registry_values(values)
+            result = await self.kvstore.scan(_get_registry_key_prefix(), with_keys=False)
+            objects = _parse_registry_values(result.values)
 
             async with self._locked_cache() as cache:
                 for obj in objects:
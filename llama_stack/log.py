@@ -6,9 +6,11 @@
 
 import logging
 import os
+import reprlib
 from logging.config import dictConfig
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Optional
 
+from pydantic import BaseModel
 from rich.console import Console
 from rich.errors import MarkupError
 from rich.logging import RichHandler
@@ -210,6 +212,94 @@ def setup_logging(category_levels: Dict[str, int], log_file: str | None) -> None
             logger.setLevel(root_level)
 
 
+# Upper bound on the length of a value formatted by `bounded_repr`
+MAX_REPR_LENGTH = 1000
+
+
+class _BoundedRepr(reprlib.Repr):
+    """A `reprlib.Repr` that also abbreviates pydantic models field by field, instead of computing their full repr."""
+
+    def __init__(self):
+        super().__init__()
+        self.maxlevel = 4
+        self.maxdict = self.maxlist = self.maxtuple = self.maxset = self.maxfrozenset = self.maxdeque = 8
+        self.maxstring = 200
+        self.maxother = 200
+        self.maxfields = 8
+
+    def repr1(self, x: Any, level: int) -> str:
+        if isinstance(x, BaseModel):
+            return self.repr_model(x, level)
+        return super().repr1(x, level)
+
+    def repr_model(self, x: BaseModel, level: int) -> str:
+        name = type(x).__name__
+        if level <= 0:
+            return f"{name}(...)"
+        fields = list(type(x).model_fields)
+        parts = [f"{field}={self.repr1(getattr(x, field, None), level - 1)}" for field in fields[: self.maxfields]]
+        if len(fields) > self.maxfields:
+            parts.append("...")
+        return f"{name}({', '.join(parts)})"
+
+
+_bounded_repr = _BoundedRepr()
+
+
+def bounded_repr(value: Any, max_length: int = MAX_REPR_LENGTH) -> str:
+    """repr() of `value`, abbreviating long strings, large containers and deeply nested objects."""
+    text = _bounded_repr.repr(value)
+    if len(text) > max_length:
+        text = text[: max_length - 3] + "..."
+    return text
+
+
+class Lazy:
+    """A log field or argument computed by `fn` only if the record is emitted.
+
+    Example::
+
+        logger.debug("inserting %s", Lazy(lambda: [chunk.metadata["document_id"] for chunk in chunks]))
+    """
+
+    __slots__ = ("fn",)
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+
+    def __repr__(self) -> str:
+        return bounded_repr(self.fn())
+
+    __str__ = __repr__
+
+
+class StructuredMessage:
+    """A log message made of an event name and fields, formatted only if the record is emitted.
+
+    `logger.debug(StructuredMessage("Router.method", model_id=model_id, messages=messages))` costs
+    a single allocation when debug logging is off. When the record is emitted, it reads
+    `Router.method: model_id='...', messages=[...]`, with each field formatted by `bounded_repr`.
+    Handlers can read the raw fields from `record.msg.fields`.
+    """
+
+    __slots__ = ("event", "fields", "_text")
+
+    def __init__(self, event: str, **fields: Any):
+        self.event = event
+        self.fields = fields
+        self._text = None
+
+    def __str__(self) -> str:
+        # every handler formats the record, so format it only once
+        if self._text is None:
+            formatted = ", ".join(
+                f"{key}={value!r}" if isinstance(value, Lazy) else f"{key}={bounded_repr(value)}"
+                for key, value in self.fields.items()
+            )
+            self._text = f"{self.event}: {formatted}" if formatted else self.event
+        return self._text
+
+
 def get_logger(
     name: str, category: str = "uncategorized", config: Optional[LoggingConfig] | None = None
 ) -> logging.LoggerAdapter:
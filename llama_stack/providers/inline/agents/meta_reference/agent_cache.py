@@ -0,0 +1,55 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    # the config module imports this one, and should not import the agent implementation
+    from .agent_instance import ChatAgent
+
+AGENT_CACHE_SIZE = 128
+AGENT_CACHE_TTL_SECONDS = 300
+
+
+class AgentCache:
+    """LRU cache of constructed agents keyed on agent id, with entries expiring after a TTL.
+
+    A cached agent keeps the tools it resolved for its turns, so the TTL bounds how long a change
+    to the registered tool groups, or an agent deleted by another server, goes unnoticed.
+    """
+
+    def __init__(self, max_entries: int = AGENT_CACHE_SIZE, ttl_seconds: float = AGENT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, Tuple[float, "ChatAgent"]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, agent_id: str) -> Optional["ChatAgent"]:
+        entry = self._entries.get(agent_id)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(agent_id, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(agent_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, agent_id: str, agent: "ChatAgent") -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        self._entries[agent_id] = (time.monotonic() + self.ttl_seconds, agent)
+        self._entries.move_to_end(agent_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, agent_id: str) -> None:
+        self._entries.pop(agent_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
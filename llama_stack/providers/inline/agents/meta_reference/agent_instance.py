@@ -4,14 +4,17 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
+import asyncio
 import copy
 import json
 import re
 import secrets
 import string
 import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import AsyncGenerator, List, Optional, Union
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Union
 
 import httpx
 
@@ -34,6 +37,7 @@ from llama_stack.apis.agents import (
     InferenceStep,
     ShieldCallStep,
     StepType,
+    ToolExecutionConfig,
     ToolExecutionStep,
     Turn,
 )
@@ -68,8 +72,9 @@ from llama_stack.models.llama.datatypes import (
 from llama_stack.providers.utils.kvstore import KVStore
 from llama_stack.providers.utils.telemetry import tracing
 
-from .persistence import AgentPersistence
+from .persistence import AgentPersistence, TurnContext
 from .safety import SafetyException, ShieldRunnerMixin
+from .session_cache import SessionHistory, SessionHistoryCache
 
 
 def make_random_string(length: int = 8):
@@ -80,10 +85,23 @@ TOOLS_ATTACHMENT_KEY_REGEX = re.compile(r"__tools_attachment__=(\{.*?\})")
 MEMORY_QUERY_TOOL = "knowledge_search"
 WEB_SEARCH_TOOL = "web_search"
 RAG_TOOL_GROUP = "builtin::rag"
+# distinct tool group selections of a turn whose tools an agent keeps resolved
+TURN_TOOLS_CACHE_SIZE = 16
 
 logger = get_logger(name=__name__, category="agents")
 
 
+@dataclass(frozen=True)
+class TurnTools:
+    """The tools offered to the model in a turn, and the arguments the agent adds to their calls.
+
+    Shared between the turns of an agent that use the same tool groups; never modified.
+    """
+
+    tool_defs: List[ToolDefinition]
+    tool_name_to_args: Dict[str, Dict[str, Any]]
+
+
 class ChatAgent(ShieldRunnerMixin):
     def __init__(
         self,
@@ -96,6 +114,7 @@ class ChatAgent(ShieldRunnerMixin):
         tool_groups_api: ToolGroups,
         vector_io_api: VectorIO,
         persistence_store: KVStore,
+        session_cache: Optional[SessionHistoryCache] = None,
     ):
         self.agent_id = agent_id
         self.agent_config = agent_config
@@ -104,8 +123,11 @@ class ChatAgent(ShieldRunnerMixin):
         self.safety_api = safety_api
         self.vector_io_api = vector_io_api
         self.storage = AgentPersistence(agent_id, persistence_store)
+        self.session_cache = session_cache
         self.tool_runtime_api = tool_runtime_api
         self.tool_groups_api = tool_groups_api
+        # keyed on the tool groups of the turn; the tool groups of the agent never change
+        self._turn_tools: OrderedDict[str, TurnTools] = OrderedDict()
 
         ShieldRunnerMixin.__init__(
             self,
@@ -172,17 +194,36 @@ class ChatAgent(ShieldRunnerMixin):
             messages.extend(self.turn_to_messages(turn))
         return messages
 
+    async def _load_turn_context(self, session_id: str, turn_id: str) -> Tuple[TurnContext, SessionHistory]:
+        """Reads what the turn needs from the store, and the turns of the session unless they are cached."""
+        if self.session_cache is None:
+            context = await self.storage.load_turn_context(session_id, turn_id, with_turns=True)
+            turns, turn_sizes = context.turns, context.turn_sizes
+            return context, SessionHistory(None, turns, [self.turn_to_messages(turn) for turn in turns], turn_sizes)
+
+        key = (self.agent_id, session_id)
+        # the version is read before the turns, so that a turn stored in between makes the next read miss
+        context = await self.storage.load_turn_context(session_id, turn_id)
+        history = self.session_cache.get(key, context.session_version)
+        if history is None:
+            turns, turn_sizes = await self.storage.get_session_turns_with_sizes(session_id)
+            history = SessionHistory(
+                context.session_version, turns, [self.turn_to_messages(turn) for turn in turns], turn_sizes
+            )
+            self.session_cache.put(key, history)
+        return context, history
+
     async def create_and_execute_turn(self, request: AgentTurnCreateRequest) -> AsyncGenerator:
+        turn_id = str(uuid.uuid4())
         span = tracing.get_current_span()
         if span:
             span.set_attribute("session_id", request.session_id)
             span.set_attribute("agent_id", self.agent_id)
             span.set_attribute("request", request.model_dump_json())
-            turn_id = str(uuid.uuid4())
             span.set_attribute("turn_id", turn_id)
 
-        await self._initialize_tools(request.toolgroups)
-        async for chunk in self._run_turn(request, turn_id):
+        tools = await self._get_tools(request.toolgroups)
+        async for chunk in self._run_turn(request, turn_id, tools):
             yield chunk
 
     async def resume_turn(self, request: AgentTurnResumeRequest) -> AsyncGenerator:
@@ -193,49 +234,51 @@ class ChatAgent(ShieldRunnerMixin):
             span.set_attribute("request", request.model_dump_json())
             span.set_attribute("turn_id", request.turn_id)
 
-        await self._initialize_tools()
-        async for chunk in self._run_turn(request):
+        tools = await self._get_tools()
+        async for chunk in self._run_turn(request, tools=tools):
             yield chunk
 
     async def _run_turn(
         self,
         request: Union[AgentTurnCreateRequest, AgentTurnResumeRequest],
         turn_id: Optional[str] = None,
+        tools: Optional[TurnTools] = None,
     ) -> AsyncGenerator:
         assert request.stream is True, "Non-streaming not supported"
 
         is_resume = isinstance(request, AgentTurnResumeRequest)
-        session_info = await self.storage.get_session_info(request.session_id)
-        if session_info is None:
-            raise ValueError(f"Session {request.session_id} not found")
-
-        turns = await self.storage.get_session_turns(request.session_id)
+        if is_resume:
+            turn_id = request.turn_id
+        turn_context, history = await self._load_turn_context(request.session_id, turn_id)
+        turns = history.turns
         if is_resume and len(turns) == 0:
             raise ValueError("No turns found for session")
 
         steps = []
-        messages = await self.get_messages_from_turns(turns)
+        messages = []
+        if self.agent_config.instructions != "":
+            messages.append(SystemMessage(content=self.agent_config.instructions))
+        for turn_messages in history.turn_messages:
+            messages.extend(turn_messages)
         if is_resume:
             tool_response_messages = [
                 ToolResponseMessage(call_id=x.call_id, content=x.content) for x in request.tool_responses
             ]
             messages.extend(tool_response_messages)
             last_turn = turns[-1]
-            last_turn_messages = self.turn_to_messages(last_turn)
             last_turn_messages = [
-                x for x in last_turn_messages if isinstance(x, UserMessage) or isinstance(x, ToolResponseMessage)
+                x for x in history.turn_messages[-1] if isinstance(x, UserMessage) or isinstance(x, ToolResponseMessage)
             ]
             last_turn_messages.extend(tool_response_messages)
 
-            # get steps from the turn
-            steps = last_turn.steps
+            # get steps from the turn; the cached turn itself is shared
+            steps = list(last_turn.steps)
+            turn_context.resume(steps)
 
             # mark tool execution step as complete
             # if there's no tool execution in progress step (due to storage, or tool call parsing on client),
             # we'll create a new tool execution step with current time
-            in_progress_tool_call_step = await self.storage.get_in_progress_tool_call_step(
-                request.session_id, request.turn_id
-            )
+            in_progress_tool_call_step = turn_context.in_progress_tool_call_step
             now = datetime.now(timezone.utc).isoformat()
             tool_execution_step = ToolExecutionStep(
                 step_id=(in_progress_tool_call_step.step_id if in_progress_tool_call_step else str(uuid.uuid4())),
@@ -246,6 +289,7 @@ class ChatAgent(ShieldRunnerMixin):
                 started_at=(in_progress_tool_call_step.started_at if in_progress_tool_call_step else now),
             )
             steps.append(tool_execution_step)
+            await turn_context.checkpoint(steps)
             yield AgentTurnResponseStreamChunk(
                 event=AgentTurnResponseEvent(
                     payload=AgentTurnResponseStepCompletePayload(
@@ -257,7 +301,6 @@ class ChatAgent(ShieldRunnerMixin):
             )
             input_messages = last_turn.input_messages
 
-            turn_id = request.turn_id
             start_time = last_turn.started_at
         else:
             messages.extend(request.messages)
@@ -272,6 +315,8 @@ class ChatAgent(ShieldRunnerMixin):
             sampling_params=self.agent_config.sampling_params,
             stream=request.stream,
             documents=request.documents if not is_resume else None,
+            turn_context=turn_context,
+            tools=tools,
         ):
             if isinstance(chunk, CompletionMessage):
                 output_message = chunk
@@ -281,6 +326,8 @@ class ChatAgent(ShieldRunnerMixin):
             event = chunk.event
             if event.payload.event_type == AgentTurnResponseEventType.step_complete.value:
                 steps.append(event.payload.step_details)
+                # each step is stored as it completes, so that a turn that fails keeps its progress
+                await turn_context.checkpoint(steps)
 
             yield chunk
 
@@ -295,7 +342,17 @@ class ChatAgent(ShieldRunnerMixin):
             completed_at=datetime.now(timezone.utc).isoformat(),
             steps=steps,
         )
-        await self.storage.add_turn_to_session(request.session_id, turn)
+        version = await turn_context.add_turn(turn)
+        if self.session_cache is not None:
+            if version is None:
+                # a turn was stored elsewhere while this one ran; the next turn reloads the session
+                self.session_cache.invalidate((self.agent_id, request.session_id))
+            else:
+                self.session_cache.replace(
+                    (self.agent_id, request.session_id),
+                    history,
+                    history.with_turn(version, turn, self.turn_to_messages(turn), len(turn.model_dump_json())),
+                )
         if output_message.tool_calls:
             chunk = AgentTurnResponseStreamChunk(
                 event=AgentTurnResponseEvent(
@@ -323,6 +380,8 @@ class ChatAgent(ShieldRunnerMixin):
         sampling_params: SamplingParams,
         stream: bool = False,
         documents: Optional[List[Document]] = None,
+        turn_context: Optional[TurnContext] = None,
+        tools: Optional[TurnTools] = None,
     ) -> AsyncGenerator:
         # Doing async generators makes downstream code much simpler and everything amenable to
         # streaming. However, it also makes things complicated here because AsyncGenerators cannot
@@ -345,6 +404,8 @@ class ChatAgent(ShieldRunnerMixin):
             sampling_params,
             stream,
             documents,
+            turn_context,
+            tools,
         ):
             if isinstance(res, bool):
                 return
@@ -445,7 +506,14 @@ class ChatAgent(ShieldRunnerMixin):
         sampling_params: SamplingParams,
         stream: bool = False,
         documents: Optional[List[Document]] = None,
+        turn_context: Optional[TurnContext] = None,
+        tools: Optional[TurnTools] = None,
     ) -> AsyncGenerator:
+        if turn_context is None:
+            turn_context = await self.storage.load_turn_context(session_id, turn_id)
+        if tools is None:
+            tools = await self._get_tools()
+
         # if document is passed in a turn, we parse the raw text of the document
         # and sent it as a user message
         if documents:
@@ -465,19 +533,20 @@ class ChatAgent(ShieldRunnerMixin):
                     TextContentItem(text=attached_context),
                 ]
 
-        session_info = await self.storage.get_session_info(session_id)
+        session_info = turn_context.session_info
         # if the session has a memory bank id, let the memory tool use it
-        if session_info and session_info.vector_db_id:
-            for tool_name in self.tool_name_to_args.keys():
-                if tool_name == MEMORY_QUERY_TOOL:
-                    if "vector_db_ids" not in self.tool_name_to_args[tool_name]:
-                        self.tool_name_to_args[tool_name]["vector_db_ids"] = [session_info.vector_db_id]
-                    else:
-                        self.tool_name_to_args[tool_name]["vector_db_ids"].append(session_info.vector_db_id)
+        if session_info.vector_db_id and MEMORY_QUERY_TOOL in tools.tool_name_to_args:
+            # the tools are shared with other turns, so the arguments of this one are a copy
+            memory_args = tools.tool_name_to_args[MEMORY_QUERY_TOOL]
+            memory_args = {
+                **memory_args,
+                "vector_db_ids": memory_args.get("vector_db_ids", []) + [session_info.vector_db_id],
+            }
+            tools = TurnTools(tools.tool_defs, {**tools.tool_name_to_args, MEMORY_QUERY_TOOL: memory_args})
 
         output_attachments = []
 
-        n_iter = await self.storage.get_num_infer_iters_in_turn(session_id, turn_id) or 0
+        n_iter = turn_context.num_infer_iters
 
         # Build a map of custom tools to their definitions for faster lookup
         client_tools = {}
@@ -503,7 +572,7 @@ class ChatAgent(ShieldRunnerMixin):
                 async for chunk in await self.inference_api.chat_completion(
                     self.agent_config.model,
                     input_messages,
-                    tools=self.tool_defs,
+                    tools=tools.tool_defs,
                     tool_prompt_format=self.agent_config.tool_config.tool_prompt_format,
                     response_format=self.agent_config.response_format,
                     stream=True,
@@ -566,7 +635,7 @@ class ChatAgent(ShieldRunnerMixin):
                 span.set_attribute("output", output_attr)
 
             n_iter += 1
-            await self.storage.set_num_infer_iters_in_turn(session_id, turn_id, n_iter)
+            await turn_context.set_num_infer_iters(n_iter)
 
             stop_reason = stop_reason or StopReason.out_of_tokens
 
@@ -640,70 +709,55 @@ class ChatAgent(ShieldRunnerMixin):
                     else:
                         non_client_tool_calls.append(tool_call)
 
-                # Process non-client tool calls first
-                for tool_call in non_client_tool_calls:
-                    step_id = str(uuid.uuid4())
-                    yield AgentTurnResponseStreamChunk(
-                        event=AgentTurnResponseEvent(
-                            payload=AgentTurnResponseStepStartPayload(
-                                step_type=StepType.tool_execution.value,
-                                step_id=step_id,
+                # Process non-client tool calls first. In parallel mode they all start at once, but their
+                # events are still yielded in the order of the calls, each call's once it has completed.
+                step_ids = [str(uuid.uuid4()) for _ in non_client_tool_calls]
+                executions = []
+                tool_execution = self.agent_config.tool_execution or ToolExecutionConfig()
+                if tool_execution.parallel and len(non_client_tool_calls) > 1:
+                    semaphore = asyncio.Semaphore(tool_execution.max_concurrency or 1)
+                    executions = [
+                        asyncio.create_task(
+                            self._execute_tool_call_bounded(
+                                semaphore, session_id, turn_id, step_ids[i], tool_call, message, tools
                             )
                         )
-                    )
-
-                    yield AgentTurnResponseStreamChunk(
-                        event=AgentTurnResponseEvent(
-                            payload=AgentTurnResponseStepProgressPayload(
-                                step_type=StepType.tool_execution.value,
-                                step_id=step_id,
-                                delta=ToolCallDelta(
-                                    parse_status=ToolCallParseStatus.in_progress,
-                                    tool_call=tool_call,
-                                ),
+                        for i, tool_call in enumerate(non_client_tool_calls)
+                    ]
+                    for execution in executions:
+                        # an execution that fails after an earlier one failed is never awaited
+                        execution.add_done_callback(lambda task: task.cancelled() or task.exception())
+                try:
+                    for i, tool_call in enumerate(non_client_tool_calls):
+                        step_id = step_ids[i]
+                        yield AgentTurnResponseStreamChunk(
+                            event=AgentTurnResponseEvent(
+                                payload=AgentTurnResponseStepStartPayload(
+                                    step_type=StepType.tool_execution.value,
+                                    step_id=step_id,
+                                )
                             )
                         )
-                    )
 
-                    # Execute the tool call
-                    async with tracing.span(
-                        "tool_execution",
-                        {
-                            "tool_name": tool_call.tool_name,
-                            "input": message.model_dump_json(),
-                        },
-                    ) as span:
-                        tool_execution_start_time = datetime.now(timezone.utc).isoformat()
-                        tool_result = await self.execute_tool_call_maybe(
-                            session_id,
-                            tool_call,
-                        )
-                        if tool_result.content is None:
-                            raise ValueError(
-                                f"Tool call result (id: {tool_call.call_id}, name: {tool_call.tool_name}) does not have any content"
+                        yield AgentTurnResponseStreamChunk(
+                            event=AgentTurnResponseEvent(
+                                payload=AgentTurnResponseStepProgressPayload(
+                                    step_type=StepType.tool_execution.value,
+                                    step_id=step_id,
+                                    delta=ToolCallDelta(
+                                        parse_status=ToolCallParseStatus.in_progress,
+                                        tool_call=tool_call,
+                                    ),
+                                )
                             )
-                        result_message = ToolResponseMessage(
-                            call_id=tool_call.call_id,
-                            content=tool_result.content,
                         )
-                        span.set_attribute("output", result_message.model_dump_json())
 
-                        # Store tool execution step
-                        tool_execution_step = ToolExecutionStep(
-                            step_id=step_id,
-                            turn_id=turn_id,
-                            tool_calls=[tool_call],
-                            tool_responses=[
-                                ToolResponse(
-                                    call_id=tool_call.call_id,
-                                    tool_name=tool_call.tool_name,
-                                    content=tool_result.content,
-                                    metadata=tool_result.metadata,
-                                )
-                            ],
-                            started_at=tool_execution_start_time,
-                            completed_at=datetime.now(timezone.utc).isoformat(),
-                        )
+                        if executions:
+                            tool_execution_step, result_message = await executions[i]
+                        else:
+                            tool_execution_step, result_message = await self._execute_tool_call(
+                                session_id, turn_id, step_id, tool_call, message, tools
+                            )
 
                         # Yield the step completion event
                         yield AgentTurnResponseStreamChunk(
@@ -728,12 +782,14 @@ class ChatAgent(ShieldRunnerMixin):
                             # attached file path etc. since the model is trained to only provide a user message
                             # with the summary. We keep all generated attachments and then attach them to final message
                             output_attachments.append(out_attachment)
+                finally:
+                    # a failed call, or a client that went away, stops the calls still running
+                    for execution in executions:
+                        execution.cancel()
 
                 # If there are client tool calls, yield a message with only those tool calls
                 if client_tool_calls:
-                    await self.storage.set_in_progress_tool_call_step(
-                        session_id,
-                        turn_id,
+                    await turn_context.set_in_progress_tool_call_step(
                         ToolExecutionStep(
                             step_id=step_id,
                             turn_id=turn_id,
@@ -754,10 +810,30 @@ class ChatAgent(ShieldRunnerMixin):
                     yield client_message
                     return
 
-    async def _initialize_tools(
+    async def _get_tools(self, toolgroups_for_turn: Optional[List[AgentToolGroup]] = None) -> TurnTools:
+        """The tools of a turn, resolved once for every distinct selection of tool groups."""
+        key = json.dumps(
+            [
+                toolgroup.model_dump(mode="json") if isinstance(toolgroup, AgentToolGroupWithArgs) else toolgroup
+                for toolgroup in toolgroups_for_turn or []
+            ],
+            sort_keys=True,
+        )
+        tools = self._turn_tools.get(key)
+        if tools is not None:
+            self._turn_tools.move_to_end(key)
+            return tools
+
+        tools = await self._resolve_tools(toolgroups_for_turn)
+        self._turn_tools[key] = tools
+        while len(self._turn_tools) > TURN_TOOLS_CACHE_SIZE:
+            self._turn_tools.popitem(last=False)
+        return tools
+
+    async def _resolve_tools(
         self,
         toolgroups_for_turn: Optional[List[AgentToolGroup]] = None,
-    ) -> None:
+    ) -> TurnTools:
         toolgroup_to_args = {}
         for toolgroup in (self.agent_config.toolgroups or []) + (toolgroups_for_turn or []):
             if isinstance(toolgroup, AgentToolGroupWithArgs):
@@ -838,10 +914,7 @@ class ChatAgent(ShieldRunnerMixin):
                     )
                     tool_name_to_args[tool_def.identifier] = toolgroup_to_args.get(toolgroup_name, {})
 
-        self.tool_defs, self.tool_name_to_args = (
-            list(tool_name_to_def.values()),
-            tool_name_to_args,
-        )
+        return TurnTools(list(tool_name_to_def.values()), tool_name_to_args)
 
     def _parse_toolgroup_name(self, toolgroup_name_with_maybe_tool_name: str) -> tuple[str, Optional[str]]:
         """Parse a toolgroup name into its components.
@@ -860,24 +933,97 @@ class ChatAgent(ShieldRunnerMixin):
             tool_group, tool_name = split_names[0], None
         return tool_group, tool_name
 
+    async def _execute_tool_call_bounded(
+        self,
+        semaphore: asyncio.Semaphore,
+        session_id: str,
+        turn_id: str,
+        step_id: str,
+        tool_call: ToolCall,
+        message: CompletionMessage,
+        tools: TurnTools,
+    ) -> Tuple[ToolExecutionStep, ToolResponseMessage]:
+        # runs in a task of its own, concurrently with the other tool calls of the step
+        tracing.fork_trace_context()
+        async with semaphore:
+            return await self._execute_tool_call(session_id, turn_id, step_id, tool_call, message, tools)
+
+    async def _execute_tool_call(
+        self,
+        session_id: str,
+        turn_id: str,
+        step_id: str,
+        tool_call: ToolCall,
+        message: CompletionMessage,
+        tools: TurnTools,
+    ) -> Tuple[ToolExecutionStep, ToolResponseMessage]:
+        async with tracing.span(
+            "tool_execution",
+            {
+                "tool_name": tool_call.tool_name,
+                "input": message.model_dump_json(),
+            },
+        ) as span:
+            tool_execution_start_time = datetime.now(timezone.utc).isoformat()
+            tool_result = await self._execute_tool_call_with_timeout(session_id, tool_call, tools)
+            if tool_result.content is None:
+                raise ValueError(
+                    f"Tool call result (id: {tool_call.call_id}, name: {tool_call.tool_name}) does not have any content"
+                )
+            result_message = ToolResponseMessage(
+                call_id=tool_call.call_id,
+                content=tool_result.content,
+            )
+            span.set_attribute("output", result_message.model_dump_json())
+
+        tool_execution_step = ToolExecutionStep(
+            step_id=step_id,
+            turn_id=turn_id,
+            tool_calls=[tool_call],
+            tool_responses=[
+                ToolResponse(
+                    call_id=tool_call.call_id,
+                    tool_name=tool_call.tool_name,
+                    content=tool_result.content,
+                    metadata=tool_result.metadata,
+                )
+            ],
+            started_at=tool_execution_start_time,
+            completed_at=datetime.now(timezone.utc).isoformat(),
+        )
+        return tool_execution_step, result_message
+
+    async def _execute_tool_call_with_timeout(
+        self, session_id: str, tool_call: ToolCall, tools: TurnTools
+    ) -> ToolInvocationResult:
+        tool_execution = self.agent_config.tool_execution or ToolExecutionConfig()
+        tool_name = _runtime_tool_name(tool_call.tool_name)
+        timeout = (tool_execution.tool_timeouts or {}).get(tool_name, tool_execution.timeout_seconds)
+        if timeout is None:
+            return await self.execute_tool_call_maybe(session_id, tool_call, tools)
+        try:
+            return await asyncio.wait_for(self.execute_tool_call_maybe(session_id, tool_call, tools), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool call {tool_call.call_id} to {tool_name} timed out after {timeout}s")
+            # the model gets to know, and may retry or answer without the tool
+            return ToolInvocationResult(
+                content=f"Tool {tool_name} did not respond within {timeout} seconds",
+                error_message=f"Timed out after {timeout} seconds",
+            )
+
     async def execute_tool_call_maybe(
         self,
         session_id: str,
         tool_call: ToolCall,
+        tools: TurnTools,
     ) -> ToolInvocationResult:
         tool_name = tool_call.tool_name
-        registered_tool_names = [tool_def.tool_name for tool_def in self.tool_defs]
+        registered_tool_names = [tool_def.tool_name for tool_def in tools.tool_defs]
         if tool_name not in registered_tool_names:
             raise ValueError(
                 f"Tool {tool_name} not found in provided tools, registered tools: {', '.join([str(x) for x in registered_tool_names])}"
             )
-        if isinstance(tool_name, BuiltinTool):
-            if tool_name == BuiltinTool.brave_search:
-                tool_name_str = WEB_SEARCH_TOOL
-            else:
-                tool_name_str = tool_name.value
-        else:
-            tool_name_str = tool_name
+        tool_name_str = _runtime_tool_name(tool_name)
 
         logger.info(f"executing tool call: {tool_name_str} with args: {tool_call.arguments}")
         result = await self.tool_runtime_api.invoke_tool(
@@ -886,13 +1032,22 @@ class ChatAgent(ShieldRunnerMixin):
                 "session_id": session_id,
                 # get the arguments generated by the model and augment with toolgroup arg overrides for the agent
                 **tool_call.arguments,
-                **self.tool_name_to_args.get(tool_name_str, {}),
+                **tools.tool_name_to_args.get(tool_name_str, {}),
             },
         )
         logger.debug(f"tool call {tool_name_str} completed with result: {result}")
         return result
 
 
+def _runtime_tool_name(tool_name: Union[BuiltinTool, str]) -> str:
+    """The name a tool call is invoked by in the tool runtime."""
+    if isinstance(tool_name, BuiltinTool):
+        if tool_name == BuiltinTool.brave_search:
+            return WEB_SEARCH_TOOL
+        return tool_name.value
+    return tool_name
+
+
 async def load_data_from_url(url: str) -> str:
     if url.startswith("http"):
         async with httpx.AsyncClient() as client:
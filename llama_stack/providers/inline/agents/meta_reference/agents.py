@@ -39,8 +39,11 @@ from llama_stack.apis.tools import ToolGroups, ToolRuntime
 from llama_stack.apis.vector_io import VectorIO
 from llama_stack.providers.utils.kvstore import InmemoryKVStoreImpl, kvstore_impl
 
+from .agent_cache import AgentCache
 from .agent_instance import ChatAgent
 from .config import MetaReferenceAgentsImplConfig
+from .persistence import AgentPersistence
+from .session_cache import SessionHistoryCache
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -65,6 +68,10 @@ class MetaReferenceAgentsImpl(Agents):
 
         self.in_memory_store = InmemoryKVStoreImpl()
         self.tempdir = tempfile.mkdtemp()
+        self.session_cache = (
+            SessionHistoryCache(config.session_cache_max_bytes) if config.session_cache_max_bytes > 0 else None
+        )
+        self.agent_cache = AgentCache(config.agent_cache_size, config.agent_cache_ttl_seconds)
 
     async def initialize(self) -> None:
         self.persistence_store = await kvstore_impl(self.config.persistence_store)
@@ -88,6 +95,10 @@ class MetaReferenceAgentsImpl(Agents):
         )
 
     async def _get_agent_impl(self, agent_id: str) -> ChatAgent:
+        agent = self.agent_cache.get(agent_id)
+        if agent is not None:
+            return agent
+
         agent_config = await self.persistence_store.get(
             key=f"agent:{agent_id}",
         )
@@ -104,7 +115,7 @@ class MetaReferenceAgentsImpl(Agents):
         except Exception as e:
             raise ValueError(f"Could not validate(?) agent config for {agent_id}") from e
 
-        return ChatAgent(
+        agent = ChatAgent(
             agent_id=agent_id,
             agent_config=agent_config,
             tempdir=self.tempdir,
@@ -116,7 +127,10 @@ class MetaReferenceAgentsImpl(Agents):
             persistence_store=(
                 self.persistence_store if agent_config.enable_session_persistence else self.in_memory_store
             ),
+            session_cache=self.session_cache,
         )
+        self.agent_cache.put(agent_id, agent)
+        return agent
 
     async def create_agent_session(
         self,
@@ -201,11 +215,11 @@ class MetaReferenceAgentsImpl(Agents):
         return turn
 
     async def get_agents_step(self, agent_id: str, session_id: str, turn_id: str, step_id: str) -> AgentStepResponse:
-        turn = await self.get_agents_turn(agent_id, session_id, turn_id)
-        for step in turn.steps:
-            if step.step_id == step_id:
-                return AgentStepResponse(step=step)
-        raise ValueError(f"Provided step_id {step_id} could not be found")
+        agent = await self._get_agent_impl(agent_id)
+        step = await agent.storage.get_turn_step(session_id, turn_id, step_id)
+        if step is None:
+            raise ValueError(f"Provided step_id {step_id} could not be found")
+        return AgentStepResponse(step=step)
 
     async def get_agents_session(
         self,
@@ -228,10 +242,13 @@ class MetaReferenceAgentsImpl(Agents):
         )
 
     async def delete_agents_session(self, agent_id: str, session_id: str) -> None:
-        await self.persistence_store.delete(f"session:{agent_id}:{session_id}")
+        await AgentPersistence(agent_id, self.persistence_store).delete_session(session_id)
+        if self.session_cache is not None:
+            self.session_cache.invalidate((agent_id, session_id))
 
     async def delete_agent(self, agent_id: str) -> None:
         await self.persistence_store.delete(f"agent:{agent_id}")
+        self.agent_cache.invalidate(agent_id)
 
     async def shutdown(self) -> None:
         pass
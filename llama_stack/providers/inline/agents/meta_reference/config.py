@@ -6,14 +6,32 @@
 
 from typing import Any, Dict
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from llama_stack.providers.utils.kvstore import KVStoreConfig
 from llama_stack.providers.utils.kvstore.config import SqliteKVStoreConfig
 
+from .agent_cache import AGENT_CACHE_SIZE, AGENT_CACHE_TTL_SECONDS
+from .session_cache import SESSION_HISTORY_CACHE_MAX_BYTES
+
 
 class MetaReferenceAgentsImplConfig(BaseModel):
     persistence_store: KVStoreConfig
+    session_cache_max_bytes: int = Field(
+        default=SESSION_HISTORY_CACHE_MAX_BYTES,
+        ge=0,
+        description="Total serialized size of the session histories kept in memory between turns, 0 to disable",
+    )
+    agent_cache_size: int = Field(
+        default=AGENT_CACHE_SIZE,
+        ge=0,
+        description="Number of agents kept constructed, with their resolved tools, between requests, 0 to disable",
+    )
+    agent_cache_ttl_seconds: float = Field(
+        default=AGENT_CACHE_TTL_SECONDS,
+        gt=0,
+        description="How long a cached agent is used before its config and tools are loaded again",
+    )
 
     @classmethod
     def sample_run_config(cls, __distro_dir__: str) -> Dict[str, Any]:
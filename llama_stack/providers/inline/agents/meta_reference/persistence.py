@@ -4,22 +4,27 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
+import asyncio
 import json
 import logging
 import uuid
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
-from llama_stack.apis.agents import ToolExecutionStep, Turn
+from llama_stack.apis.agents import Step, ToolExecutionStep, Turn
 from llama_stack.distribution.access_control import check_access
 from llama_stack.distribution.datatypes import AccessAttributes
 from llama_stack.distribution.request_headers import get_auth_attributes
 from llama_stack.providers.utils.kvstore import KVStore
+from llama_stack.providers.utils.kvstore.api import prefix_upper_bound
 
 log = logging.getLogger(__name__)
 
+step_adapter = TypeAdapter(Step)
+
 
 class AgentSessionInfo(BaseModel):
     session_id: str
@@ -30,11 +35,102 @@ class AgentSessionInfo(BaseModel):
     access_attributes: Optional[AccessAttributes] = None
 
 
+@dataclass
+class TurnContext:
+    """What a turn reads from the store before its first inference call, loaded by `AgentPersistence.load_turn_context`.
+
+    The access check of the session is made once, when the context is loaded. The writes a turn
+    makes through its context rely on that check instead of reading the session info again.
+    """
+
+    storage: "AgentPersistence"
+    session_id: str
+    turn_id: str
+    session_info: AgentSessionInfo
+    session_version: Optional[str]
+    in_progress_tool_call_step: Optional[ToolExecutionStep]
+    num_infer_iters: int
+    # whether the turn was stored with its steps inline, before steps were stored as records of their own
+    inline_steps: bool = False
+    # how many steps of the turn are stored as records
+    stored_steps: int = 0
+    # only loaded when asked for
+    turns: Optional[List[Turn]] = None
+    turn_sizes: Optional[List[int]] = None
+
+    def resume(self, steps: List[Step]) -> None:
+        """Records the steps the turn had when it was resumed. Steps that were stored inline are stored again."""
+        self.stored_steps = 0 if self.inline_steps else len(steps)
+
+    async def checkpoint(self, steps: List[Step]) -> None:
+        """Stores the steps of the turn that were completed since the last checkpoint."""
+        if len(steps) > self.stored_steps:
+            await self.storage._add_turn_steps(
+                self.session_id, self.turn_id, self.stored_steps, steps[self.stored_steps :]
+            )
+            self.stored_steps = len(steps)
+
+    async def set_in_progress_tool_call_step(self, step: ToolExecutionStep) -> None:
+        await self.storage._set_in_progress_tool_call_step(self.session_id, self.turn_id, step)
+
+    async def set_num_infer_iters(self, num_infer_iters: int) -> None:
+        await self.storage._set_num_infer_iters_in_turn(self.session_id, self.turn_id, num_infer_iters)
+
+    async def add_turn(self, turn: Turn) -> Optional[str]:
+        """Stores the turn and returns the new version of the session.
+
+        Returns None if another turn was stored in the session since this context was loaded,
+        in which case the history the turn started from is missing that turn.
+        """
+        await self.storage._store_turn(self.session_id, turn, self.stored_steps)
+        self.inline_steps = False
+        self.stored_steps = len(turn.steps)
+        return await self.storage._advance_session_version(self.session_id, self.session_version)
+
+
 class AgentPersistence:
     def __init__(self, agent_id: str, kvstore: KVStore):
         self.agent_id = agent_id
         self.kvstore = kvstore
 
+    async def load_turn_context(self, session_id: str, turn_id: str, with_turns: bool = False) -> TurnContext:
+        """Reads the session info, version and the state of `turn_id` in one round trip to the store.
+
+        With `with_turns`, the turns of the session are scanned at the same time.
+        """
+        read = self.kvstore.multi_get(
+            [
+                f"session:{self.agent_id}:{session_id}",
+                f"session_version:{self.agent_id}:{session_id}",
+                f"session:{self.agent_id}:{session_id}:{turn_id}",
+                f"in_progress_tool_call_step:{self.agent_id}:{session_id}:{turn_id}",
+                f"num_infer_iters_in_turn:{self.agent_id}:{session_id}:{turn_id}",
+            ]
+        )
+        turns = turn_sizes = None
+        if with_turns:
+            values, (_, turns, turn_sizes) = await asyncio.gather(read, self._read_session(session_id))
+        else:
+            values = await read
+        session_value, version, turn_value, step_value, num_infer_iters = values
+
+        session_info = AgentSessionInfo(**json.loads(session_value)) if session_value else None
+        if not session_info or not self._check_session_access(session_info):
+            raise ValueError(f"Session {session_id} not found or access denied")
+
+        return TurnContext(
+            storage=self,
+            session_id=session_id,
+            turn_id=turn_id,
+            session_info=session_info,
+            session_version=version,
+            in_progress_tool_call_step=ToolExecutionStep(**json.loads(step_value)) if step_value else None,
+            num_infer_iters=int(num_infer_iters) if num_infer_iters else 0,
+            inline_steps=bool(turn_value and json.loads(turn_value).get("steps")),
+            turns=turns,
+            turn_sizes=turn_sizes,
+        )
+
     async def create_session(self, name: str) -> str:
         session_id = str(uuid.uuid4())
 
@@ -97,49 +193,153 @@ class AgentPersistence:
             value=session_info.model_dump_json(),
         )
 
-    async def add_turn_to_session(self, session_id: str, turn: Turn):
+    async def delete_session(self, session_id: str) -> None:
+        # the steps of its turns are records of their own, so they go with the session
+        steps_prefix = self._turn_steps_prefix(session_id)
+        await asyncio.gather(
+            self.kvstore.delete(f"session:{self.agent_id}:{session_id}"),
+            self.kvstore.delete_range(steps_prefix, prefix_upper_bound(steps_prefix)),
+        )
+
+    async def add_turn_to_session(self, session_id: str, turn: Turn) -> str:
+        """Stores a turn and returns the new version of the session."""
         if not await self.get_session_if_accessible(session_id):
             raise ValueError(f"Session {session_id} not found or access denied")
 
-        await self.kvstore.set(
-            key=f"session:{self.agent_id}:{session_id}:{turn.turn_id}",
-            value=turn.model_dump_json(),
-        )
+        await self._store_turn(session_id, turn)
+        # written after the turn: a reader that sees the new version also sees the turn
+        version = uuid.uuid4().hex
+        await self.kvstore.set(key=f"session_version:{self.agent_id}:{session_id}", value=version)
+        return version
+
+    def _turn_steps_prefix(self, session_id: str, turn_id: Optional[str] = None) -> str:
+        prefix = f"turn_step:{self.agent_id}:{session_id}:"
+        return f"{prefix}{turn_id}:" if turn_id is not None else prefix
+
+    def _turn_step_items(self, session_id: str, turn_id: str, first_index: int, steps: List[Step]) -> Dict[str, str]:
+        # the index keeps the records of a turn in the order of its steps, the step id finds one of them
+        prefix = self._turn_steps_prefix(session_id, turn_id)
+        return {f"{prefix}{first_index + i:06d}:{step.step_id}": step.model_dump_json() for i, step in enumerate(steps)}
+
+    async def _add_turn_steps(self, session_id: str, turn_id: str, first_index: int, steps: List[Step]) -> None:
+        await self.kvstore.multi_set(self._turn_step_items(session_id, turn_id, first_index, steps))
+
+    async def _store_turn(self, session_id: str, turn: Turn, stored_steps: int = 0) -> None:
+        # the steps are stored as records of their own, the turn itself without them
+        items = self._turn_step_items(session_id, turn.turn_id, stored_steps, turn.steps[stored_steps:])
+        items[f"session:{self.agent_id}:{session_id}:{turn.turn_id}"] = turn.model_copy(
+            update={"steps": []}
+        ).model_dump_json()
+        await self.kvstore.multi_set(items)
+
+    async def _advance_session_version(self, session_id: str, expected: Optional[str]) -> Optional[str]:
+        """Moves the session from version `expected` to a new one, which is returned.
+
+        Returns None if the session was no longer at `expected`, because another turn was stored
+        since, possibly by another server. The session still moves to a new version then, so that
+        no history read before this turn was stored stays current.
+        """
+        key = f"session_version:{self.agent_id}:{session_id}"
+        version = uuid.uuid4().hex
+        if await self.kvstore.compare_and_set(key, expected, version):
+            return version
+        await self.kvstore.set(key=key, value=version)
+        return None
+
+    async def get_session_version(self, session_id: str) -> Optional[str]:
+        """Changes whenever a turn of the session is stored, by this server or any other sharing the store."""
+        return await self.kvstore.get(key=f"session_version:{self.agent_id}:{session_id}")
 
     async def get_session_turns(self, session_id: str) -> List[Turn]:
-        if not await self.get_session_if_accessible(session_id):
-            raise ValueError(f"Session {session_id} not found or access denied")
+        turns, _ = await self.get_session_turns_with_sizes(session_id)
+        return turns
 
-        values = await self.kvstore.range(
-            start_key=f"session:{self.agent_id}:{session_id}:",
-            end_key=f"session:{self.agent_id}:{session_id}:\xff\xff\xff\xff",
+    async def get_session_turns_with_sizes(self, session_id: str) -> Tuple[List[Turn], List[int]]:
+        """The turns of a session, in the order they were completed, and the size of each of them once serialized."""
+        session_info, turns, turn_sizes = await self._read_session(session_id)
+        if not session_info or not self._check_session_access(session_info):
+            raise ValueError(f"Session {session_id} not found or access denied")
+        return turns, turn_sizes
+
+    async def _read_session(self, session_id: str) -> Tuple[Optional[AgentSessionInfo], List[Turn], List[int]]:
+        """The session info and turns of a session, without checking access to it."""
+        # the session info and all of its turns share a key prefix, so fetch them in one scan
+        session_key = f"session:{self.agent_id}:{session_id}"
+        steps_prefix = self._turn_steps_prefix(session_id)
+        result, step_result = await asyncio.gather(
+            self.kvstore.scan(prefix=session_key, with_keys=True),
+            self.kvstore.scan(prefix=steps_prefix, with_keys=True),
         )
+        entries = dict(zip(result.keys, result.values, strict=True))
+
+        session_value = entries.pop(session_key, None)
+        session_info = AgentSessionInfo(**json.loads(session_value)) if session_value else None
+
+        # step records are in key order, which is the order of the steps of each turn
+        step_values: Dict[str, List[str]] = {}
+        for key, value in zip(step_result.keys, step_result.values, strict=True):
+            turn_id = key[len(steps_prefix) :].split(":", 1)[0]
+            step_values.setdefault(turn_id, []).append(value)
+
         turns = []
-        for value in values:
+        for key, value in entries.items():
+            if not key.startswith(f"{session_key}:"):
+                # a different session whose id starts with this one
+                continue
             try:
                 turn = Turn(**json.loads(value))
-                turns.append(turn)
+                values = step_values.get(turn.turn_id, [])
+                turns.append((self._with_steps(turn, values), len(value) + sum(len(v) for v in values)))
             except Exception as e:
                 log.error(f"Error parsing turn: {e}")
                 continue
-        turns.sort(key=lambda x: (x.completed_at or datetime.min))
-        return turns
+        turns.sort(key=lambda x: x[0].completed_at or datetime.min)
+        return session_info, [turn for turn, _ in turns], [size for _, size in turns]
 
     async def get_session_turn(self, session_id: str, turn_id: str) -> Optional[Turn]:
         if not await self.get_session_if_accessible(session_id):
             raise ValueError(f"Session {session_id} not found or access denied")
 
-        value = await self.kvstore.get(
-            key=f"session:{self.agent_id}:{session_id}:{turn_id}",
+        value, step_result = await asyncio.gather(
+            self.kvstore.get(key=f"session:{self.agent_id}:{session_id}:{turn_id}"),
+            self.kvstore.scan(prefix=self._turn_steps_prefix(session_id, turn_id), with_keys=False),
         )
         if not value:
             return None
-        return Turn(**json.loads(value))
+        return self._with_steps(Turn(**json.loads(value)), step_result.values)
+
+    @staticmethod
+    def _with_steps(turn: Turn, step_values: List[str]) -> Turn:
+        # a turn stored with its steps inline keeps them until it is stored again
+        if not turn.steps:
+            turn.steps = [step_adapter.validate_json(value) for value in step_values]
+        return turn
+
+    async def get_turn_step(self, session_id: str, turn_id: str, step_id: str) -> Optional[Step]:
+        """A step of a turn, also while the turn is running. Only that step is decoded."""
+        if not await self.get_session_if_accessible(session_id):
+            raise ValueError(f"Session {session_id} not found or access denied")
+
+        result = await self.kvstore.scan(prefix=self._turn_steps_prefix(session_id, turn_id), with_keys=True)
+        for key, value in zip(result.keys, result.values, strict=True):
+            if key.endswith(f":{step_id}"):
+                return step_adapter.validate_json(value)
+
+        # turns stored before steps were stored as records of their own
+        value = await self.kvstore.get(key=f"session:{self.agent_id}:{session_id}:{turn_id}")
+        if value:
+            for step in Turn(**json.loads(value)).steps:
+                if step.step_id == step_id:
+                    return step
+        return None
 
     async def set_in_progress_tool_call_step(self, session_id: str, turn_id: str, step: ToolExecutionStep):
         if not await self.get_session_if_accessible(session_id):
             raise ValueError(f"Session {session_id} not found or access denied")
 
+        await self._set_in_progress_tool_call_step(session_id, turn_id, step)
+
+    async def _set_in_progress_tool_call_step(self, session_id: str, turn_id: str, step: ToolExecutionStep):
         await self.kvstore.set(
             key=f"in_progress_tool_call_step:{self.agent_id}:{session_id}:{turn_id}",
             value=step.model_dump_json(),
@@ -158,6 +358,9 @@ class AgentPersistence:
         if not await self.get_session_if_accessible(session_id):
             raise ValueError(f"Session {session_id} not found or access denied")
 
+        await self._set_num_infer_iters_in_turn(session_id, turn_id, num_infer_iters)
+
+    async def _set_num_infer_iters_in_turn(self, session_id: str, turn_id: str, num_infer_iters: int):
         await self.kvstore.set(
             key=f"num_infer_iters_in_turn:{self.agent_id}:{session_id}:{turn_id}",
             value=str(num_infer_iters),
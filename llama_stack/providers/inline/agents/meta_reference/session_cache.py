@@ -0,0 +1,98 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from llama_stack.apis.agents import Turn
+from llama_stack.apis.inference import Message
+
+SESSION_HISTORY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+CacheKey = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class SessionHistory:
+    """The decoded turns of a session, and the messages each of them adds to the conversation.
+
+    `version` is the session version these turns were read at. Histories are shared between
+    callers and never modified; a new turn makes a new history.
+    """
+
+    version: Optional[str]
+    turns: List[Turn]
+    turn_messages: List[List[Message]]
+    # serialized size of each turn, which stands in for the memory it takes
+    turn_sizes: List[int]
+
+    @property
+    def size(self) -> int:
+        return sum(self.turn_sizes)
+
+    def with_turn(self, version: str, turn: Turn, messages: List[Message], size: int) -> "SessionHistory":
+        """The history after `turn` was stored. A turn that was resumed replaces its earlier version."""
+        keep = len(self.turns)
+        if self.turns and self.turns[-1].turn_id == turn.turn_id:
+            keep -= 1
+        return SessionHistory(
+            version=version,
+            turns=self.turns[:keep] + [turn],
+            turn_messages=self.turn_messages[:keep] + [messages],
+            turn_sizes=self.turn_sizes[:keep] + [size],
+        )
+
+
+class SessionHistoryCache:
+    """LRU cache of session histories, keyed on (agent id, session id) and bounded by their total size."""
+
+    def __init__(self, max_bytes: int = SESSION_HISTORY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # the size of each cached history, so that it is summed once
+        self._entries: OrderedDict[CacheKey, Tuple[SessionHistory, int]] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey, version: Optional[str]) -> Optional[SessionHistory]:
+        """The cached history of a session, if it is still at `version`."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0].version != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: CacheKey, history: SessionHistory) -> None:
+        self.invalidate(key)
+        size = history.size
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (history, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+
+    def replace(self, key: CacheKey, previous: SessionHistory, history: SessionHistory) -> None:
+        """Replaces `previous` with `history`, unless the session was changed since `previous` was read."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is previous:
+            self.put(key, history)
+        else:
+            # another turn of the session ran at the same time; the next turn reloads it from the store
+            self.invalidate(key)
+
+    def invalidate(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
@@ -5,11 +5,13 @@
 # the root directory of this source tree.
 
 from enum import Enum
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
 from llama_stack.distribution.utils.config_dirs import RUNTIME_BASE_DIR
+from llama_stack.providers.utils.telemetry.trace_protocol import TraceCaptureConfig
+from llama_stack.providers.utils.telemetry.tracing import BackgroundLoggerConfig, TraceSamplingConfig
 
 
 class TelemetrySink(str, Enum):
@@ -19,6 +21,33 @@ class TelemetrySink(str, Enum):
     CONSOLE = "console"
 
 
+class TelemetryRetentionConfig(BaseModel):
+    enabled: bool = Field(
+        default=True,
+        description="Delete traces from the SQLite sink once the TTL of their events has passed",
+    )
+    interval_seconds: float = Field(
+        default=300,
+        gt=0,
+        description="How often expired rows are looked for",
+    )
+    batch_size: int = Field(
+        default=500,
+        ge=1,
+        description="Maximum number of traces or spans deleted in one transaction",
+    )
+    downsample_after_seconds: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="If set, only the root span of traces older than this is kept",
+    )
+    vacuum_pages: int = Field(
+        default=1000,
+        ge=0,
+        description="Maximum number of free pages returned to the file system after each pass, 0 to disable",
+    )
+
+
 class TelemetryConfig(BaseModel):
     otel_trace_endpoint: str = Field(
         default="http://localhost:4318/v1/traces",
@@ -41,6 +70,22 @@ class TelemetryConfig(BaseModel):
         default=(RUNTIME_BASE_DIR / "trace_store.db").as_posix(),
         description="The path to the SQLite database to use for storing traces",
     )
+    event_queue: BackgroundLoggerConfig = Field(
+        default_factory=BackgroundLoggerConfig,
+        description="Queue of span and log events waiting to be written by the background logger",
+    )
+    sampling: TraceSamplingConfig = Field(
+        default_factory=TraceSamplingConfig,
+        description="Which requests are traced",
+    )
+    capture: TraceCaptureConfig = Field(
+        default_factory=TraceCaptureConfig,
+        description="What the spans of traced provider methods record about their arguments and output",
+    )
+    retention: TelemetryRetentionConfig = Field(
+        default_factory=TelemetryRetentionConfig,
+        description="Deletion of expired and old telemetry from the SQLite sink",
+    )
 
     @field_validator("sinks", mode="before")
     @classmethod
@@ -0,0 +1,103 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from llama_stack.log import get_logger
+
+from .config import TelemetryRetentionConfig
+
+logger = get_logger(name=__name__, category="core")
+
+
+def _delete_spans(conn: sqlite3.Connection, span_ids_sql: str, params: List) -> int:
+    """Deletes spans with their events and attributes. `span_ids_sql` is a query or a list of span ids."""
+    conn.execute(f"DELETE FROM span_events WHERE span_id IN ({span_ids_sql})", params)
+    conn.execute(f"DELETE FROM span_attributes WHERE span_id IN ({span_ids_sql})", params)
+    return conn.execute(f"DELETE FROM spans WHERE span_id IN ({span_ids_sql})", params).rowcount
+
+
+class SQLiteRetention:
+    """Deletes expired traces and downsamples old ones in the SQLite trace store.
+
+    A pass is made of bounded batches, each in its own transaction. `run_pending` runs a single
+    batch, so that the span processor can keep writing spans in between.
+    """
+
+    def __init__(self, config: TelemetryRetentionConfig):
+        self.config = config
+        self._next_pass = 0.0
+        self._in_pass = False
+
+    def run_pending(self, conn: sqlite3.Connection, now: Optional[float] = None) -> bool:
+        """Runs the next batch of the current pass, if one is due. Returns True if the pass has more batches."""
+        now = time.time() if now is None else now
+        if not self._in_pass and now < self._next_pass:
+            return False
+
+        self._in_pass = True
+        try:
+            if self._delete_expired_traces(conn, now) or self._downsample(conn, now):
+                return True
+            self._incremental_vacuum(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Telemetry retention pass failed: {e}")
+        self._in_pass = False
+        self._next_pass = now + self.config.interval_seconds
+        return False
+
+    def _delete_expired_traces(self, conn: sqlite3.Connection, now: float) -> bool:
+        trace_ids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT trace_id FROM traces WHERE expires_at < ? ORDER BY expires_at LIMIT ?",
+                (now, self.config.batch_size),
+            )
+        ]
+        if not trace_ids:
+            return False
+
+        placeholders = ", ".join("?" for _ in trace_ids)
+        with conn:
+            deleted_spans = _delete_spans(
+                conn, f"SELECT span_id FROM spans WHERE trace_id IN ({placeholders})", trace_ids
+            )
+            conn.execute(f"DELETE FROM traces WHERE trace_id IN ({placeholders})", trace_ids)
+        logger.debug(f"Deleted {len(trace_ids)} expired traces and their {deleted_spans} spans")
+        return len(trace_ids) == self.config.batch_size
+
+    def _downsample(self, conn: sqlite3.Connection, now: float) -> bool:
+        if self.config.downsample_after_seconds is None:
+            return False
+
+        # end times are ISO 8601 strings in UTC, which sort in time order
+        cutoff = (
+            datetime.fromtimestamp(now, timezone.utc) - timedelta(seconds=self.config.downsample_after_seconds)
+        ).isoformat()
+        span_ids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT span_id FROM spans WHERE end_time < ? AND parent_span_id IS NOT NULL LIMIT ?",
+                (cutoff, self.config.batch_size),
+            )
+        ]
+        if not span_ids:
+            return False
+
+        with conn:
+            _delete_spans(conn, ", ".join("?" for _ in span_ids), span_ids)
+        logger.debug(f"Deleted {len(span_ids)} child spans that ended before {cutoff}")
+        return len(span_ids) == self.config.batch_size
+
+    def _incremental_vacuum(self, conn: sqlite3.Connection) -> None:
+        # only databases created with auto_vacuum=INCREMENTAL can return free pages without a full VACUUM
+        if self.config.vacuum_pages == 0 or conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return
+        # execute() would only free the first page: the pragma frees one page per step
+        conn.executescript(f"PRAGMA incremental_vacuum({int(self.config.vacuum_pages)});")
@@ -9,37 +9,73 @@ import os
 import sqlite3
 import threading
 from datetime import datetime, timezone
+from typing import List, Optional
 
-from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
 from opentelemetry.trace import Span
 from opentelemetry.trace.span import format_span_id, format_trace_id
 
+from .config import TelemetryRetentionConfig
+from .sqlite_retention import SQLiteRetention
+
+# ended spans are written in one transaction once this many are buffered, or after the flush interval
+MAX_BATCH_SIZE = 512
+FLUSH_INTERVAL_SECONDS = 1.0
+# for spans without a __ttl__ attribute; the telemetry adapter sets one on every span
+DEFAULT_TTL_SECONDS = 604800
+
+
+def _isoformat(timestamp_ns: int) -> str:
+    return datetime.fromtimestamp(timestamp_ns / 1e9, timezone.utc).isoformat()
+
+
+def _attribute_value(value):
+    # scalars are stored as the SQL values json_extract() returns for them; sequences as JSON text
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    return json.dumps(list(value), separators=(",", ":"))
+
 
 class SQLiteSpanProcessor(SpanProcessor):
-    def __init__(self, conn_string):
-        """Initialize the SQLite span processor with a connection string."""
+    def __init__(
+        self,
+        conn_string,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        flush_interval_seconds: float = FLUSH_INTERVAL_SECONDS,
+        retention: Optional[TelemetryRetentionConfig] = None,
+    ):
+        """Initialize the SQLite span processor with a connection string.
+
+        Ended spans are buffered and written by a worker thread, in one transaction per batch.
+        The same thread deletes expired traces in between batches, if retention is enabled.
+        """
         self.conn_string = conn_string
-        self._local = threading.local()  # Thread-local storage for connections
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._retention = SQLiteRetention(retention) if retention and retention.enabled else None
+        self._buffer: List[ReadableSpan] = []
+        self._condition = threading.Condition()
+        # force_flush() bumps the requested generation and waits for the worker to catch up
+        self._flush_requested = 0
+        self._flushed = 0
+        self._shutdown = False
         self.setup_database()
-
-    def _get_connection(self):
-        """Get a thread-local database connection."""
-        if not hasattr(self._local, "conn"):
-            try:
-                self._local.conn = sqlite3.connect(self.conn_string)
-            except Exception as e:
-                print(f"Error connecting to SQLite database: {e}")
-                raise
-        return self._local.conn
+        self._worker = threading.Thread(target=self._run, name="sqlite-span-processor", daemon=True)
+        self._worker.start()
 
     def setup_database(self):
-        """Create the necessary tables if they don't exist."""
+        """Create the necessary tables and indexes if they don't exist."""
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(self.conn_string), exist_ok=True)
 
-        conn = self._get_connection()
+        conn = sqlite3.connect(self.conn_string)
         cursor = conn.cursor()
 
+        # takes effect only when the database is created, before any table exists
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # readers of the trace store don't block the writer, nor the writer them
+        cursor.execute("PRAGMA journal_mode=WAL")
+
         cursor.execute(
             """
             CREATE TABLE IF NOT EXISTS traces (
@@ -48,10 +84,19 @@ class SQLiteSpanProcessor(SpanProcessor):
                 root_span_id TEXT,
                 start_time TIMESTAMP,
                 end_time TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                expires_at REAL
             )
         """
         )
+        trace_columns = {row[1] for row in cursor.execute("PRAGMA table_info(traces)")}
+        if "expires_at" not in trace_columns:
+            # databases written before traces expired
+            cursor.execute("ALTER TABLE traces ADD COLUMN expires_at REAL")
+            cursor.execute(
+                "UPDATE traces SET expires_at = (julianday(end_time) - 2440587.5) * 86400.0 + ?",
+                (DEFAULT_TTL_SECONDS,),
+            )
 
         cursor.execute(
             """
@@ -81,6 +126,30 @@ class SQLiteSpanProcessor(SpanProcessor):
         """
         )
 
+        has_span_attributes = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'span_attributes'"
+        ).fetchone()
+        # one row per span attribute, so that spans can be searched by attribute through an index
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS span_attributes (
+                span_id TEXT REFERENCES spans(span_id),
+                key TEXT,
+                value,
+                UNIQUE(span_id, key)
+            )
+        """
+        )
+        if not has_span_attributes:
+            # databases written before the table existed
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO span_attributes (span_id, key, value)
+                SELECT s.span_id, a.key, a.value
+                FROM spans s, json_each(s.attributes) a
+            """
+            )
+
         cursor.execute(
             """
             CREATE INDEX IF NOT EXISTS idx_traces_created_at
@@ -88,19 +157,104 @@ class SQLiteSpanProcessor(SpanProcessor):
         """
         )
 
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_traces_expires_at
+            ON traces(expires_at)
+        """
+        )
+
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_spans_trace_id
+            ON spans(trace_id)
+        """
+        )
+
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_spans_parent_span_id
+            ON spans(parent_span_id)
+        """
+        )
+
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_spans_end_time
+            ON spans(end_time)
+        """
+        )
+
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_span_events_span_id
+            ON span_events(span_id)
+        """
+        )
+
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_span_attributes_key_value
+            ON span_attributes(key, value, span_id)
+        """
+        )
+
         conn.commit()
         cursor.close()
+        conn.close()
 
     def on_start(self, span: Span, parent_context=None):
         """Called when a span starts."""
         pass
 
-    def on_end(self, span: Span):
-        """Called when a span ends. Export the span data to SQLite."""
+    def on_end(self, span: ReadableSpan):
+        """Called when a span ends. Queue the span to be exported to SQLite."""
+        with self._condition:
+            if self._shutdown:
+                return
+            self._buffer.append(span)
+            if len(self._buffer) >= self.max_batch_size:
+                self._condition.notify_all()
+
+    def _run(self):
+        conn = sqlite3.connect(self.conn_string)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        retention_pending = False
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            while True:
+                with self._condition:
+                    self._condition.wait_for(
+                        lambda: (
+                            self._shutdown
+                            or self._flush_requested > self._flushed
+                            or len(self._buffer) >= self.max_batch_size
+                        ),
+                        # while a retention pass is running, its batches alternate with batches of spans
+                        timeout=0 if retention_pending else self.flush_interval_seconds,
+                    )
+                    batch, self._buffer = self._buffer, []
+                    flush_requested = self._flush_requested
+                    shutdown = self._shutdown
 
+                if batch:
+                    self._write_batch(conn, batch)
+
+                with self._condition:
+                    self._flushed = flush_requested
+                    self._condition.notify_all()
+                if shutdown:
+                    return
+                if self._retention is not None:
+                    retention_pending = self._retention.run_pending(conn)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, spans: List[ReadableSpan]):
+        trace_rows = []
+        span_rows = []
+        attribute_rows = []
+        event_rows = []
+        for span in spans:
             trace_id = format_trace_id(span.get_span_context().trace_id)
             span_id = format_span_id(span.get_span_context().span_id)
             service_name = span.resource.attributes.get("service.name", "unknown")
@@ -110,79 +264,101 @@ class SQLiteSpanProcessor(SpanProcessor):
             if parent_context:
                 parent_span_id = format_span_id(parent_context.span_id)
 
-            # Insert into traces
-            cursor.execute(
-                """
-                INSERT INTO traces (
-                    trace_id, service_name, root_span_id, start_time, end_time
-                ) VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT(trace_id) DO UPDATE SET
-                    root_span_id = COALESCE(root_span_id, excluded.root_span_id),
-                    start_time = MIN(excluded.start_time, start_time),
-                    end_time = MAX(excluded.end_time, end_time)
-            """,
+            start_time = _isoformat(span.start_time)
+            end_time = _isoformat(span.end_time)
+            ttl_seconds = span.attributes.get("__ttl__", DEFAULT_TTL_SECONDS)
+            trace_rows.append(
                 (
                     trace_id,
                     service_name,
                     (span_id if span.attributes.get("__root_span__") == "true" else None),
-                    datetime.fromtimestamp(span.start_time / 1e9, timezone.utc).isoformat(),
-                    datetime.fromtimestamp(span.end_time / 1e9, timezone.utc).isoformat(),
-                ),
+                    start_time,
+                    end_time,
+                    span.end_time / 1e9 + ttl_seconds,
+                )
             )
-
-            # Insert into spans
-            cursor.execute(
-                """
-                INSERT INTO spans (
-                    span_id, trace_id, parent_span_id, name,
-                    start_time, end_time, attributes, status,
-                    kind
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+            span_rows.append(
                 (
                     span_id,
                     trace_id,
                     parent_span_id,
                     span.name,
-                    datetime.fromtimestamp(span.start_time / 1e9, timezone.utc).isoformat(),
-                    datetime.fromtimestamp(span.end_time / 1e9, timezone.utc).isoformat(),
+                    start_time,
+                    end_time,
                     json.dumps(dict(span.attributes)),
                     span.status.status_code.name,
                     span.kind.name,
-                ),
+                )
             )
-
+            attribute_rows.extend((span_id, key, _attribute_value(value)) for key, value in span.attributes.items())
             for event in span.events:
-                cursor.execute(
-                    """
-                    INSERT INTO span_events (
-                        span_id, name, timestamp, attributes
-                    ) VALUES (?, ?, ?, ?)
-                """,
+                event_rows.append(
                     (
                         span_id,
                         event.name,
-                        datetime.fromtimestamp(event.timestamp / 1e9, timezone.utc).isoformat(),
+                        _isoformat(event.timestamp),
                         json.dumps(dict(event.attributes)),
-                    ),
+                    )
                 )
 
-            conn.commit()
-            cursor.close()
+        try:
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO traces (
+                        trace_id, service_name, root_span_id, start_time, end_time, expires_at
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(trace_id) DO UPDATE SET
+                        root_span_id = COALESCE(root_span_id, excluded.root_span_id),
+                        start_time = MIN(excluded.start_time, start_time),
+                        end_time = MAX(excluded.end_time, end_time),
+                        expires_at = MAX(excluded.expires_at, COALESCE(expires_at, excluded.expires_at))
+                """,
+                    trace_rows,
+                )
+                # a span that was already exported must not fail the rest of the batch
+                conn.executemany(
+                    """
+                    INSERT INTO spans (
+                        span_id, trace_id, parent_span_id, name,
+                        start_time, end_time, attributes, status,
+                        kind
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(span_id) DO NOTHING
+                """,
+                    span_rows,
+                )
+                conn.executemany(
+                    """
+                    INSERT INTO span_attributes (span_id, key, value) VALUES (?, ?, ?)
+                    ON CONFLICT(span_id, key) DO NOTHING
+                """,
+                    attribute_rows,
+                )
+                conn.executemany(
+                    """
+                    INSERT INTO span_events (
+                        span_id, name, timestamp, attributes
+                    ) VALUES (?, ?, ?, ?)
+                """,
+                    event_rows,
+                )
         except Exception as e:
-            print(f"Error exporting span to SQLite: {e}")
+            print(f"Error exporting {len(spans)} spans to SQLite: {e}")
 
     def shutdown(self):
-        """Cleanup any resources."""
-        # We can't access other threads' connections, so we just close our own
-        if hasattr(self._local, "conn"):
-            try:
-                self._local.conn.close()
-            except Exception as e:
-                print(f"Error closing SQLite connection: {e}")
-            finally:
-                del self._local.conn
+        """Write the remaining spans and stop the worker thread."""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        self._worker.join()
 
     def force_flush(self, timeout_millis=30000):
-        """Force export of spans."""
-        pass
+        """Write all ended spans to the database. Returns False if that took longer than the timeout."""
+        with self._condition:
+            if self._shutdown:
+                return True
+            self._flush_requested += 1
+            target = self._flush_requested
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._flushed >= target, timeout=timeout_millis / 1000)
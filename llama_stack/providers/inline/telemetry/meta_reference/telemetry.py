@@ -33,6 +33,7 @@ from llama_stack.apis.telemetry import (
     UnstructuredLogEvent,
 )
 from llama_stack.distribution.datatypes import Api
+from llama_stack.log import get_logger
 from llama_stack.providers.inline.telemetry.meta_reference.console_span_processor import (
     ConsoleSpanProcessor,
 )
@@ -44,6 +45,8 @@ from llama_stack.providers.utils.telemetry.sqlite_trace_store import SQLiteTrace
 
 from .config import TelemetryConfig, TelemetrySink
 
+logger = get_logger(name=__name__, category="core")
+
 _GLOBAL_STORAGE: dict[str, dict[str | int, Any]] = {
     "active_spans": {},
     "counters": {},
@@ -96,7 +99,9 @@ class TelemetryAdapter(TelemetryDatasetMixin, Telemetry):
                 metric_provider = MeterProvider(resource=resource, metric_readers=[metric_reader])
                 metrics.set_meter_provider(metric_provider)
             if TelemetrySink.SQLITE in self.config.sinks:
-                trace.get_tracer_provider().add_span_processor(SQLiteSpanProcessor(self.config.sqlite_db_path))
+                trace.get_tracer_provider().add_span_processor(
+                    SQLiteSpanProcessor(self.config.sqlite_db_path, retention=self.config.retention)
+                )
             if TelemetrySink.CONSOLE in self.config.sinks:
                 trace.get_tracer_provider().add_span_processor(ConsoleSpanProcessor())
 
@@ -106,6 +111,10 @@ class TelemetryAdapter(TelemetryDatasetMixin, Telemetry):
             self.trace_store = SQLiteTraceStore(self.config.sqlite_db_path)
 
         self._lock = _global_lock
+        # picked up by setup_logger when this adapter backs the tracing background logger
+        self.background_logger_config = self.config.event_queue
+        self.trace_sampling_config = self.config.sampling
+        self.trace_capture_config = self.config.capture
 
     async def initialize(self) -> None:
         pass
@@ -114,6 +123,24 @@ class TelemetryAdapter(TelemetryDatasetMixin, Telemetry):
         trace.get_tracer_provider().force_flush()
 
     async def log_event(self, event: Event, ttl_seconds: int = 604800) -> None:
+        with self._lock:
+            self._log(event, ttl_seconds)
+
+    async def log_events(self, events: List[Event], ttl_seconds: int = 604800) -> None:
+        """Log a batch of events. An event that fails is reported and skipped; the rest are still logged.
+
+        The lock is taken per event rather than for the whole batch: the inference router logs its
+        metrics from the event loop, and must not wait for the background logger to write a batch.
+        """
+        for event in events:
+            try:
+                with self._lock:
+                    self._log(event, ttl_seconds)
+            except Exception:
+                logger.exception(f"Error logging telemetry event {event}")
+
+    def _log(self, event: Event, ttl_seconds: int) -> None:
+        # the caller holds self._lock
         if isinstance(event, UnstructuredLogEvent):
             self._log_unstructured(event, ttl_seconds)
         elif isinstance(event, MetricEvent):
@@ -124,25 +151,24 @@ class TelemetryAdapter(TelemetryDatasetMixin, Telemetry):
             raise ValueError(f"Unknown event type: {event}")
 
     def _log_unstructured(self, event: UnstructuredLogEvent, ttl_seconds: int) -> None:
-        with self._lock:
-            # Use global storage instead of instance storage
-            span_id = int(event.span_id, 16)
-            span = _GLOBAL_STORAGE["active_spans"].get(span_id)
-
-            if span:
-                timestamp_ns = int(event.timestamp.timestamp() * 1e9)
-                span.add_event(
-                    name=event.type,
-                    attributes={
-                        "message": event.message,
-                        "severity": event.severity.value,
-                        "__ttl__": ttl_seconds,
-                        **(event.attributes or {}),
-                    },
-                    timestamp=timestamp_ns,
-                )
-            else:
-                print(f"Warning: No active span found for span_id {span_id}. Dropping event: {event}")
+        # Use global storage instead of instance storage
+        span_id = int(event.span_id, 16)
+        span = _GLOBAL_STORAGE["active_spans"].get(span_id)
+
+        if span:
+            timestamp_ns = int(event.timestamp.timestamp() * 1e9)
+            span.add_event(
+                name=event.type,
+                attributes={
+                    "message": event.message,
+                    "severity": event.severity.value,
+                    "__ttl__": ttl_seconds,
+                    **(event.attributes or {}),
+                },
+                timestamp=timestamp_ns,
+            )
+        else:
+            print(f"Warning: No active span found for span_id {span_id}. Dropping event: {event}")
 
     def _get_or_create_counter(self, name: str, unit: str) -> metrics.Counter:
         assert self.meter is not None
@@ -185,49 +211,48 @@ class TelemetryAdapter(TelemetryDatasetMixin, Telemetry):
         return _GLOBAL_STORAGE["up_down_counters"][name]
 
     def _log_structured(self, event: StructuredLogEvent, ttl_seconds: int) -> None:
-        with self._lock:
-            span_id = int(event.span_id, 16)
-            tracer = trace.get_tracer(__name__)
-            if event.attributes is None:
-                event.attributes = {}
-            event.attributes["__ttl__"] = ttl_seconds
-
-            if isinstance(event.payload, SpanStartPayload):
-                # Check if span already exists to prevent duplicates
-                if span_id in _GLOBAL_STORAGE["active_spans"]:
-                    return
-
-                context = None
-                if event.payload.parent_span_id:
-                    parent_span_id = int(event.payload.parent_span_id, 16)
-                    parent_span = _GLOBAL_STORAGE["active_spans"].get(parent_span_id)
-                    context = trace.set_span_in_context(parent_span)
-                else:
-                    event.attributes["__root_span__"] = "true"
-
-                span = tracer.start_span(
-                    name=event.payload.name,
-                    context=context,
-                    attributes=event.attributes or {},
-                )
-                _GLOBAL_STORAGE["active_spans"][span_id] = span
-
-            elif isinstance(event.payload, SpanEndPayload):
-                span = _GLOBAL_STORAGE["active_spans"].get(span_id)
-                if span:
-                    if event.attributes:
-                        span.set_attributes(event.attributes)
-
-                    status = (
-                        trace.Status(status_code=trace.StatusCode.OK)
-                        if event.payload.status == SpanStatus.OK
-                        else trace.Status(status_code=trace.StatusCode.ERROR)
-                    )
-                    span.set_status(status)
-                    span.end()
-                    _GLOBAL_STORAGE["active_spans"].pop(span_id, None)
+        span_id = int(event.span_id, 16)
+        tracer = trace.get_tracer(__name__)
+        if event.attributes is None:
+            event.attributes = {}
+        event.attributes["__ttl__"] = ttl_seconds
+
+        if isinstance(event.payload, SpanStartPayload):
+            # Check if span already exists to prevent duplicates
+            if span_id in _GLOBAL_STORAGE["active_spans"]:
+                return
+
+            context = None
+            if event.payload.parent_span_id:
+                parent_span_id = int(event.payload.parent_span_id, 16)
+                parent_span = _GLOBAL_STORAGE["active_spans"].get(parent_span_id)
+                context = trace.set_span_in_context(parent_span)
             else:
-                raise ValueError(f"Unknown structured log event: {event}")
+                event.attributes["__root_span__"] = "true"
+
+            span = tracer.start_span(
+                name=event.payload.name,
+                context=context,
+                attributes=event.attributes or {},
+            )
+            _GLOBAL_STORAGE["active_spans"][span_id] = span
+
+        elif isinstance(event.payload, SpanEndPayload):
+            span = _GLOBAL_STORAGE["active_spans"].get(span_id)
+            if span:
+                if event.attributes:
+                    span.set_attributes(event.attributes)
+
+                status = (
+                    trace.Status(status_code=trace.StatusCode.OK)
+                    if event.payload.status == SpanStatus.OK
+                    else trace.Status(status_code=trace.StatusCode.ERROR)
+                )
+                span.set_status(status)
+                span.end()
+                _GLOBAL_STORAGE["active_spans"].pop(span_id, None)
+        else:
+            raise ValueError(f"Unknown structured log event: {event}")
 
     async def query_traces(
         self,
@@ -4,12 +4,23 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class RagToolRuntimeConfig(BaseModel):
+    max_concurrent_fetches: int = Field(
+        default=16,
+        ge=1,
+        description="Maximum number of documents downloaded at the same time while inserting documents",
+    )
+    parse_workers: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Number of processes that parse and chunk inserted documents. Defaults to the number of CPUs",
+    )
+
     @classmethod
     def sample_run_config(cls, __distro_dir__: str, **kwargs: Any) -> Dict[str, Any]:
         return {}
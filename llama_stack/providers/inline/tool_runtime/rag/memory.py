@@ -6,10 +6,13 @@
 
 import asyncio
 import logging
+import multiprocessing
 import secrets
 import string
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any, Dict, List, Optional
 
+import httpx
 from pydantic import TypeAdapter
 
 from llama_stack.apis.common.content_types import (
@@ -31,11 +34,14 @@ from llama_stack.apis.tools import (
     ToolParameter,
     ToolRuntime,
 )
-from llama_stack.apis.vector_io import QueryChunksResponse, VectorIO
+from llama_stack.apis.vector_dbs import VectorDBs
+from llama_stack.apis.vector_io import Chunk, QueryChunksResponse, VectorIO
 from llama_stack.providers.datatypes import ToolsProtocolPrivate
+from llama_stack.providers.utils.inference.prompt_adapter import interleaved_content_as_str
+from llama_stack.providers.utils.memory.embedding_cache import embed_query_cached
 from llama_stack.providers.utils.memory.vector_store import (
-    content_from_doc,
-    make_overlapped_chunks,
+    chunk_fetched_document,
+    fetch_document,
 )
 
 from .config import RagToolRuntimeConfig
@@ -54,16 +60,33 @@ class MemoryToolRuntimeImpl(ToolsProtocolPrivate, ToolRuntime, RAGToolRuntime):
         config: RagToolRuntimeConfig,
         vector_io_api: VectorIO,
         inference_api: Inference,
+        vector_dbs_api: VectorDBs,
     ):
         self.config = config
         self.vector_io_api = vector_io_api
         self.inference_api = inference_api
+        self.vector_dbs_api = vector_dbs_api
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.parse_executor: Optional[ProcessPoolExecutor] = None
 
     async def initialize(self):
-        pass
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.config.max_concurrent_fetches),
+        )
+        # spawn rather than fork: the server process runs an event loop and other threads
+        self.parse_executor = ProcessPoolExecutor(
+            max_workers=self.config.parse_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
 
     async def shutdown(self):
-        pass
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+        if self.parse_executor is not None:
+            # joining the worker processes blocks, so keep it off the event loop
+            executor, self.parse_executor = self.parse_executor, None
+            await asyncio.to_thread(executor.shutdown, cancel_futures=True)
 
     async def register_tool(self, tool: Tool) -> None:
         pass
@@ -77,18 +100,23 @@ class MemoryToolRuntimeImpl(ToolsProtocolPrivate, ToolRuntime, RAGToolRuntime):
         vector_db_id: str,
         chunk_size_in_tokens: int = 512,
     ) -> None:
-        chunks = []
-        for doc in documents:
-            content = await content_from_doc(doc)
-            chunks.extend(
-                make_overlapped_chunks(
-                    doc.document_id,
-                    content,
-                    chunk_size_in_tokens,
-                    chunk_size_in_tokens // 4,
-                )
+        loop = asyncio.get_running_loop()
+        fetch_semaphore = asyncio.Semaphore(self.config.max_concurrent_fetches)
+
+        async def ingest(doc: RAGDocument) -> List[Chunk]:
+            async with fetch_semaphore:
+                fetched = await fetch_document(doc, self.http_client)
+            return await loop.run_in_executor(
+                self.parse_executor,
+                chunk_fetched_document,
+                fetched,
+                chunk_size_in_tokens,
+                chunk_size_in_tokens // 4,
             )
 
+        results = await asyncio.gather(*(ingest(doc) for doc in documents))
+        chunks = [chunk for doc_chunks in results for chunk in doc_chunks]
+
         if not chunks:
             return
 
@@ -112,6 +140,7 @@ class MemoryToolRuntimeImpl(ToolsProtocolPrivate, ToolRuntime, RAGToolRuntime):
             content,
             inference_api=self.inference_api,
         )
+        query_embeddings = await self._embed_query_per_model(query, vector_db_ids)
         tasks = [
             self.vector_io_api.query_chunks(
                 vector_db_id=vector_db_id,
@@ -119,6 +148,7 @@ class MemoryToolRuntimeImpl(ToolsProtocolPrivate, ToolRuntime, RAGToolRuntime):
                 params={
                     "max_chunks": query_config.max_chunks,
                 },
+                query_embedding=query_embeddings[vector_db_id],
             )
             for vector_db_id in vector_db_ids
         ]
@@ -161,6 +191,21 @@ class MemoryToolRuntimeImpl(ToolsProtocolPrivate, ToolRuntime, RAGToolRuntime):
             },
         )
 
+    async def _embed_query_per_model(
+        self, query: InterleavedContent, vector_db_ids: List[str]
+    ) -> Dict[str, List[float]]:
+        """Embed the query once per embedding model used by the vector DBs, keyed by vector DB id."""
+        vector_dbs = await asyncio.gather(
+            *(self.vector_dbs_api.get_vector_db(vector_db_id) for vector_db_id in vector_db_ids)
+        )
+        query_str = interleaved_content_as_str(query)
+        models = list({vector_db.embedding_model for vector_db in vector_dbs})
+        embeddings = await asyncio.gather(
+            *(embed_query_cached(self.inference_api, model, query_str) for model in models)
+        )
+        by_model = {model: embedding.tolist() for model, embedding in zip(models, embeddings, strict=True)}
+        return {vector_db.identifier: by_model[vector_db.embedding_model] for vector_db in vector_dbs}
+
     async def list_runtime_tools(
         self, tool_group_id: Optional[str] = None, mcp_endpoint: Optional[URL] = None
     ) -> ListToolDefsResponse:
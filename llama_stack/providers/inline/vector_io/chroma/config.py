@@ -6,11 +6,17 @@
 
 from typing import Any, Dict
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from llama_stack.providers.utils.memory.config import EmbeddingBatchingConfig
 
 
 class ChromaVectorIOConfig(BaseModel):
     db_path: str
+    embedding_batching: EmbeddingBatchingConfig = Field(
+        default_factory=EmbeddingBatchingConfig,
+        description="How inserted chunks are batched into embeddings requests",
+    )
 
     @classmethod
     def sample_run_config(cls, db_path: str = "${env.CHROMADB_PATH}", **kwargs: Any) -> Dict[str, Any]:
@@ -4,20 +4,68 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
-from typing import Any, Dict
+from enum import Enum
+from typing import Any, Dict, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from llama_stack.providers.utils.kvstore.config import (
     KVStoreConfig,
     SqliteKVStoreConfig,
 )
+from llama_stack.providers.utils.memory.config import EmbeddingBatchingConfig
 from llama_stack.schema_utils import json_schema_type
 
 
+class FaissIndexType(str, Enum):
+    flat = "flat"
+    hnsw = "hnsw"
+    ivf_flat = "ivf_flat"
+    ivf_pq = "ivf_pq"
+
+
+class FaissMetric(str, Enum):
+    l2 = "l2"
+    inner_product = "inner_product"
+    # inner product over L2-normalized vectors
+    cosine = "cosine"
+
+
+class FaissIndexConfig(BaseModel):
+    """Index options for a single vector DB, passed as `metadata["faiss_index"]` when registering it.
+
+    IVF indexes need training, so vectors are searched exactly until enough of them have
+    arrived to train the configured number of lists. `ef_search` and `nprobe` are the
+    defaults for queries and can be overridden per query through `params`.
+    """
+
+    index_type: FaissIndexType = FaissIndexType.flat
+    metric: FaissMetric = FaissMetric.l2
+    hnsw_m: int = Field(default=32, ge=2, description="Number of neighbors per HNSW graph node")
+    ef_construction: int = Field(default=40, ge=1, description="HNSW candidate list size while building")
+    ef_search: int = Field(default=64, ge=1, description="HNSW candidate list size while searching")
+    nlist: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Number of IVF lists. Defaults to 4 * sqrt(number of vectors) each time the index is trained",
+    )
+    nprobe: int = Field(default=8, ge=1, description="Number of IVF lists visited while searching")
+    pq_m: int = Field(default=8, ge=1, description="Number of PQ sub-quantizers, must divide the embedding dimension")
+    pq_nbits: int = Field(default=8, ge=1, le=16, description="Bits per PQ sub-quantizer code")
+
+
 @json_schema_type
 class FaissVectorIOConfig(BaseModel):
     kvstore: KVStoreConfig
+    index_dir: Optional[str] = Field(
+        default=None,
+        description="Directory for the on-disk faiss index files. Defaults to a faiss_indexes directory next to "
+        "the sqlite kvstore, or under the runtime directory for other kvstore types",
+    )
+    embedding_batching: EmbeddingBatchingConfig = Field(
+        default_factory=EmbeddingBatchingConfig,
+        description="How inserted chunks are batched into embeddings requests",
+    )
 
     @classmethod
     def sample_run_config(cls, __distro_dir__: str, **kwargs: Any) -> Dict[str, Any]:
@@ -9,7 +9,14 @@ import base64
 import io
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import math
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from urllib.parse import quote
 
 import faiss
 import numpy as np
@@ -19,99 +26,433 @@ from llama_stack.apis.common.content_types import InterleavedContent
 from llama_stack.apis.inference.inference import Inference
 from llama_stack.apis.vector_dbs import VectorDB
 from llama_stack.apis.vector_io import Chunk, QueryChunksResponse, VectorIO
+from llama_stack.distribution.utils.config_dirs import RUNTIME_BASE_DIR
 from llama_stack.providers.datatypes import VectorDBsProtocolPrivate
-from llama_stack.providers.utils.kvstore import kvstore_impl
-from llama_stack.providers.utils.kvstore.api import KVStore
+from llama_stack.providers.utils.kvstore import InmemoryKVStoreImpl, kvstore_impl
+from llama_stack.providers.utils.kvstore.api import KVStore, prefix_upper_bound
+from llama_stack.providers.utils.kvstore.config import SqliteKVStoreConfig
 from llama_stack.providers.utils.memory.vector_store import (
     EmbeddingIndex,
     VectorDBWithIndex,
 )
 
-from .config import FaissVectorIOConfig
+from .config import FaissIndexConfig, FaissIndexType, FaissMetric, FaissVectorIOConfig
 
 logger = logging.getLogger(__name__)
 
 VERSION = "v3"
 VECTOR_DBS_PREFIX = f"vector_dbs:{VERSION}::"
-FAISS_INDEX_PREFIX = f"faiss_index:{VERSION}::"
+# whole index serialized as text inside a single JSON blob, migrated on startup
+LEGACY_FAISS_INDEX_PREFIX = f"faiss_index:{VERSION}::"
+
+INDEX_VERSION = "v4"
+FAISS_INDEX_PREFIX = f"faiss_index:{INDEX_VERSION}::"
+FAISS_CHUNK_PREFIX = f"faiss_chunk:{INDEX_VERSION}::"
+
+VECTORS_FILE = "vectors.f32"
+# the snapshot is only rewritten once the vectors added since the last one outnumber it,
+# which keeps the total bytes written linear in the number of vectors
+MIN_SNAPSHOT_VECTORS = 10_000
+ADD_BATCH_SIZE = 10_000
+# IVF inverted lists are mapped through faiss' on-disk lists, everything else through
+# zero-copy mapping of the stored codes; faiss rejects combining the two
+IVF_MMAP_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+# faiss wants at least this many training vectors per centroid, and samples at most
+# MAX_TRAIN_POINTS_PER_CENTROID of them
+MIN_TRAIN_POINTS_PER_CENTROID = 39
+MAX_TRAIN_POINTS_PER_CENTROID = 256
+
+
+def _chunk_key(bank_id: str, chunk_id: int) -> str:
+    return f"{FAISS_CHUNK_PREFIX}{bank_id}::{chunk_id:012d}"
+
+
+def faiss_metric(config: FaissIndexConfig) -> int:
+    return faiss.METRIC_L2 if config.metric == FaissMetric.l2 else faiss.METRIC_INNER_PRODUCT
+
+
+def index_description(config: FaissIndexConfig, ntotal: int) -> str:
+    """faiss.index_factory description of the index to build over `ntotal` vectors.
+
+    IVF indexes fall back to an exact index until there are enough vectors to train them.
+    """
+    if config.index_type == FaissIndexType.flat:
+        return "Flat"
+    if config.index_type == FaissIndexType.hnsw:
+        return f"HNSW{config.hnsw_m},Flat"
+
+    nlist = config.nlist or min(max(int(4 * math.sqrt(ntotal)), 1), 65536)
+    min_train_vectors = MIN_TRAIN_POINTS_PER_CENTROID * nlist
+    if config.index_type == FaissIndexType.ivf_pq:
+        min_train_vectors = max(min_train_vectors, MIN_TRAIN_POINTS_PER_CENTROID * 2**config.pq_nbits)
+    if ntotal < min_train_vectors:
+        return "Flat"
+    if config.index_type == FaissIndexType.ivf_pq:
+        return f"IVF{nlist},PQ{config.pq_m}x{config.pq_nbits}"
+    return f"IVF{nlist},Flat"
+
+
+def train_index(config: FaissIndexConfig, dimension: int, vectors: NDArray) -> faiss.Index:
+    """Create an empty index for `vectors`, trained on a sample of them if it needs training."""
+    index = faiss.index_factory(dimension, index_description(config, len(vectors)), faiss_metric(config))
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = config.ef_construction
+    if not index.is_trained:
+        sample_size = min(len(vectors), MAX_TRAIN_POINTS_PER_CENTROID * faiss.extract_index_ivf(index).nlist)
+        rows = np.sort(np.random.default_rng(0).choice(len(vectors), sample_size, replace=False))
+        index.train(np.ascontiguousarray(vectors[rows]))
+    return index
+
+
+def add_vectors(index: faiss.Index, vectors: NDArray) -> None:
+    # vectors may be a memmap; copy them in bounded batches
+    for start in range(0, len(vectors), ADD_BATCH_SIZE):
+        index.add(np.ascontiguousarray(vectors[start : start + ADD_BATCH_SIZE]))
+
+
+def search_params(index: faiss.Index, config: FaissIndexConfig, params: Dict[str, Any]):
+    """Per-query search parameters for `index`, from the query params or the index config."""
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=int(params.get("ef_search", config.ef_search)))
+    if faiss.try_extract_index_ivf(index) is not None:
+        return faiss.SearchParametersIVF(nprobe=int(params.get("nprobe", config.nprobe)))
+    return None
+
+
+class _ReadWriteLock:
+    """Lets any number of threads search an index while no thread adds to it.
+
+    faiss indexes do not support adding and searching at the same time. Waiting writers
+    hold off new readers, so that a steady stream of queries cannot starve inserts.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class _IndexState(NamedTuple):
+    """The indexes a query searches. Replaced as a whole, so a query never mixes two snapshots."""
+
+    snapshot: Optional[faiss.Index]
+    snapshot_ntotal: int
+    snapshot_description: Optional[str]
+    # vectors added since the snapshot; added to in place, under the tail lock
+    tail: faiss.Index
 
 
 class FaissIndex(EmbeddingIndex):
-    def __init__(self, dimension: int, kvstore: KVStore | None = None, bank_id: str | None = None):
-        self.index = faiss.IndexFlatL2(dimension)
-        self.chunk_by_index: dict[int, Chunk] = {}
-        self.kvstore = kvstore
-        self.bank_id = bank_id
+    """Faiss index persisted as raw files plus append-only chunk records.
+
+    On disk each bank has:
+    - an append-only log of raw float32 vectors, in id order
+    - optionally a snapshot written with `faiss.write_index`, holding the first
+      `snapshot_ntotal` vectors, which is memory-mapped read-only on load
+    - for trained (IVF) snapshots, the empty trained index, used to index the tail
+
+    The snapshot uses the index type from `index_config`, and is retrained from the log
+    every time it is rewritten.
+
+    Chunks are stored one KVStore key per vector id, next to a metadata record holding
+    the committed vector count. Adding chunks only appends the new vectors to the log
+    and writes the new chunk records, so persisting a batch costs O(batch) bytes.
+    Vectors added since the snapshot live in an in-memory tail index, rebuilt from the
+    log on load; queries search both and merge the results.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        kvstore: KVStore | None = None,
+        bank_id: str | None = None,
+        storage_dir: str | None = None,
+        index_config: FaissIndexConfig | None = None,
+    ):
+        self.index_config = index_config or FaissIndexConfig()
+        if self.index_config.index_type == FaissIndexType.ivf_pq and dimension % self.index_config.pq_m:
+            raise ValueError(f"pq_m ({self.index_config.pq_m}) must divide the embedding dimension ({dimension})")
+        self.dimension = dimension
+        self.bank_id = bank_id or "default"
+        self.persistent = kvstore is not None and bank_id is not None and storage_dir is not None
+        self.kvstore = kvstore if self.persistent else InmemoryKVStoreImpl()
+        self.storage_dir = Path(storage_dir) / quote(self.bank_id, safe="") if self.persistent else None
+
+        self._state = _IndexState(None, 0, None, self._new_tail(0, None))
+        self._tail_lock = _ReadWriteLock()
+        self._lock = asyncio.Lock()
 
     @classmethod
-    async def create(cls, dimension: int, kvstore: KVStore | None = None, bank_id: str | None = None):
-        instance = cls(dimension, kvstore, bank_id)
+    async def create(
+        cls,
+        dimension: int,
+        kvstore: KVStore | None = None,
+        bank_id: str | None = None,
+        storage_dir: str | None = None,
+        index_config: FaissIndexConfig | None = None,
+    ):
+        instance = cls(dimension, kvstore, bank_id, storage_dir, index_config)
         await instance.initialize()
         return instance
 
-    async def initialize(self) -> None:
-        if not self.kvstore:
-            return
+    @property
+    def snapshot(self) -> Optional[faiss.Index]:
+        return self._state.snapshot
+
+    @property
+    def snapshot_ntotal(self) -> int:
+        return self._state.snapshot_ntotal
+
+    @property
+    def snapshot_description(self) -> Optional[str]:
+        return self._state.snapshot_description
 
-        index_key = f"{FAISS_INDEX_PREFIX}{self.bank_id}"
-        stored_data = await self.kvstore.get(index_key)
+    @property
+    def tail(self) -> faiss.Index:
+        return self._state.tail
 
-        if stored_data:
-            data = json.loads(stored_data)
-            self.chunk_by_index = {int(k): Chunk.model_validate_json(v) for k, v in data["chunk_by_index"].items()}
+    @property
+    def ntotal(self) -> int:
+        return self.snapshot_ntotal + self.tail.ntotal
 
-            buffer = io.BytesIO(base64.b64decode(data["faiss_index"]))
-            self.index = faiss.deserialize_index(np.loadtxt(buffer, dtype=np.uint8))
+    @property
+    def meta_key(self) -> str:
+        return f"{FAISS_INDEX_PREFIX}{self.bank_id}"
 
-    async def _save_index(self):
-        if not self.kvstore or not self.bank_id:
+    @property
+    def vectors_path(self) -> Path:
+        return self.storage_dir / VECTORS_FILE
+
+    def _snapshot_path(self, ntotal: int) -> Path:
+        return self.storage_dir / f"index.{ntotal}.faiss"
+
+    def _trained_path(self, ntotal: int) -> Path:
+        return self.storage_dir / f"trained.{ntotal}.faiss"
+
+    def _new_tail(self, snapshot_ntotal: int, snapshot_description: Optional[str]) -> faiss.Index:
+        if snapshot_description and snapshot_description.startswith("IVF"):
+            # reuse the snapshot's training so the tail needs none
+            return faiss.read_index(str(self._trained_path(snapshot_ntotal)))
+        if self.index_config.index_type == FaissIndexType.hnsw:
+            return train_index(self.index_config, self.dimension, np.empty((0, self.dimension), dtype=np.float32))
+        return faiss.index_factory(self.dimension, "Flat", faiss_metric(self.index_config))
+
+    async def initialize(self) -> None:
+        if not self.persistent:
             return
 
-        np_index = faiss.serialize_index(self.index)
-        buffer = io.BytesIO()
-        np.savetxt(buffer, np_index)
-        data = {
-            "chunk_by_index": {k: v.model_dump_json() for k, v in self.chunk_by_index.items()},
-            "faiss_index": base64.b64encode(buffer.getvalue()).decode("utf-8"),
-        }
+        await self._load(await self.kvstore.get(self.meta_key))
 
-        index_key = f"{FAISS_INDEX_PREFIX}{self.bank_id}"
-        await self.kvstore.set(key=index_key, value=json.dumps(data))
+    async def _load(self, stored_meta: Optional[str]) -> None:
+        if not stored_meta:
+            return
+        meta = json.loads(stored_meta)
+        self._state = await asyncio.to_thread(
+            self._open_files, meta["ntotal"], meta["snapshot_ntotal"], meta["snapshot_index"]
+        )
+
+    def _open_files(self, ntotal: int, snapshot_ntotal: int, snapshot_description: Optional[str]) -> _IndexState:
+        row_bytes = self.dimension * np.dtype(np.float32).itemsize
+        logged = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        if logged < ntotal:
+            raise ValueError(f"Vector log for {self.bank_id} has {logged} vectors, expected {ntotal}")
+        if logged > ntotal:
+            # vectors appended by a batch that never committed its chunks
+            os.truncate(self.vectors_path, ntotal * row_bytes)
+
+        snapshot = None
+        if snapshot_ntotal:
+            path = self._snapshot_path(snapshot_ntotal)
+            flags = IVF_MMAP_FLAGS if snapshot_description.startswith("IVF") else MMAP_FLAGS
+            try:
+                snapshot = faiss.read_index(str(path), flags)
+            except RuntimeError:
+                snapshot = faiss.read_index(str(path))
+
+        tail = self._new_tail(snapshot_ntotal, snapshot_description)
+        if ntotal > snapshot_ntotal:
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(ntotal, self.dimension))
+            add_vectors(tail, vectors[snapshot_ntotal:])
+        return _IndexState(snapshot, snapshot_ntotal, snapshot_description, tail)
+
+    def _write_vectors(self, start: int, vectors: NDArray) -> None:
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        row_bytes = self.dimension * np.dtype(np.float32).itemsize
+        # written at the offset of the first uncommitted vector rather than appended, so that rows
+        # left behind by a batch whose chunks never committed are overwritten instead of shifting
+        # every later vector away from its chunk id
+        with open(os.open(self.vectors_path, os.O_RDWR | os.O_CREAT, 0o644), "r+b") as f:
+            f.truncate(start * row_bytes)
+            f.seek(start * row_bytes)
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _meta(self, ntotal: int, snapshot_ntotal: int, snapshot_description: Optional[str]) -> str:
+        return json.dumps(
+            {"ntotal": ntotal, "snapshot_ntotal": snapshot_ntotal, "snapshot_index": snapshot_description}
+        )
 
     async def delete(self):
-        if not self.kvstore or not self.bank_id:
+        if not self.persistent:
             return
 
-        await self.kvstore.delete(f"{FAISS_INDEX_PREFIX}{self.bank_id}")
+        await self.kvstore.delete(self.meta_key)
+        chunk_prefix = f"{FAISS_CHUNK_PREFIX}{self.bank_id}::"
+        await self.kvstore.delete_range(chunk_prefix, prefix_upper_bound(chunk_prefix))
+        await asyncio.to_thread(shutil.rmtree, self.storage_dir, True)
 
     async def add_chunks(self, chunks: List[Chunk], embeddings: NDArray):
         # Add dimension check
         embedding_dim = embeddings.shape[1] if len(embeddings.shape) > 1 else embeddings.shape[0]
-        if embedding_dim != self.index.d:
-            raise ValueError(f"Embedding dimension mismatch. Expected {self.index.d}, got {embedding_dim}")
-
-        indexlen = len(self.chunk_by_index)
-        for i, chunk in enumerate(chunks):
-            self.chunk_by_index[indexlen + i] = chunk
-
-        self.index.add(np.array(embeddings).astype(np.float32))
-
-        # Save updated index
-        await self._save_index()
-
-    async def query(self, embedding: NDArray, k: int, score_threshold: float) -> QueryChunksResponse:
-        distances, indices = await asyncio.to_thread(self.index.search, embedding.reshape(1, -1).astype(np.float32), k)
+        if embedding_dim != self.dimension:
+            raise ValueError(f"Embedding dimension mismatch. Expected {self.dimension}, got {embedding_dim}")
+
+        vectors = np.array(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        if self.index_config.metric == FaissMetric.cosine:
+            faiss.normalize_L2(vectors)
+        async with self._lock:
+            start = self.ntotal
+            items = {_chunk_key(self.bank_id, start + i): chunk.model_dump_json() for i, chunk in enumerate(chunks)}
+            if self.persistent:
+                await asyncio.to_thread(self._write_vectors, start, vectors)
+                items[self.meta_key] = self._meta(start + len(vectors), self.snapshot_ntotal, self.snapshot_description)
+            # the metadata record commits the new vectors together with their chunks
+            await self.kvstore.multi_set(items)
+            await asyncio.to_thread(self._add_to_tail, vectors)
+
+            if self.persistent and self.tail.ntotal >= max(MIN_SNAPSHOT_VECTORS, self.snapshot_ntotal):
+                await self._write_snapshot()
+
+    def _add_to_tail(self, vectors: NDArray) -> None:
+        with self._tail_lock.write():
+            add_vectors(self.tail, vectors)
+
+    async def _write_snapshot(self) -> None:
+        ntotal = self.ntotal
+        old_snapshot_ntotal = self.snapshot_ntotal
+        description = await asyncio.to_thread(self._build_snapshot, ntotal)
+        await self.kvstore.set(self.meta_key, self._meta(ntotal, ntotal, description))
+        # queries that already started keep searching the indexes they read
+        self._state = await asyncio.to_thread(self._open_files, ntotal, ntotal, description)
+        if old_snapshot_ntotal:
+            await asyncio.to_thread(self._snapshot_path(old_snapshot_ntotal).unlink, True)
+            await asyncio.to_thread(self._trained_path(old_snapshot_ntotal).unlink, True)
+
+    def _build_snapshot(self, ntotal: int) -> str:
+        vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(ntotal, self.dimension))
+        index = train_index(self.index_config, self.dimension, vectors)
+        description = index_description(self.index_config, ntotal)
+        if description.startswith("IVF"):
+            self._write_index_file(index, self._trained_path(ntotal))
+        add_vectors(index, vectors)
+        self._write_index_file(index, self._snapshot_path(ntotal))
+        return description
+
+    def _write_index_file(self, index: faiss.Index, path: Path) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        faiss.write_index(index, str(tmp_path))
+        os.replace(tmp_path, path)
+
+    def _search(self, embedding: NDArray, k: int, params: Dict[str, Any]):
+        query = embedding.reshape(1, -1).astype(np.float32)
+        if self.index_config.metric == FaissMetric.cosine:
+            faiss.normalize_L2(query)
+        # one reference, so that the snapshot, its size and the tail all come from the same state
+        state = self._state
+        distances, indices = [], []
+
+        def search(index: faiss.Index, offset: int) -> None:
+            d, i = index.search(query, k, params=search_params(index, self.index_config, params))
+            distances.append(d[0])
+            indices.append(np.where(i[0] >= 0, i[0] + offset, -1))
+
+        if state.snapshot is not None and state.snapshot.ntotal:
+            search(state.snapshot, 0)
+        with self._tail_lock.read():
+            if state.tail.ntotal:
+                search(state.tail, state.snapshot_ntotal)
+        if not distances:
+            return [], []
+
+        distances, indices = np.concatenate(distances), np.concatenate(indices)
+        valid = indices >= 0
+        distances, indices = distances[valid], indices[valid]
+        # L2 returns distances, inner product returns similarities
+        sort_key = distances if self.index_config.metric == FaissMetric.l2 else -distances
+        order = np.argsort(sort_key, kind="stable")[:k]
+        return distances[order], indices[order]
+
+    async def query(
+        self,
+        embedding: NDArray,
+        k: int,
+        score_threshold: float,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> QueryChunksResponse:
+        distances, indices = await asyncio.to_thread(self._search, embedding, k, params or {})
+        stored_chunks = await self.kvstore.multi_get([_chunk_key(self.bank_id, int(i)) for i in indices])
 
         chunks = []
         scores = []
-        for d, i in zip(distances[0], indices[0], strict=False):
-            if i < 0:
+        for d, stored_chunk in zip(distances, stored_chunks, strict=True):
+            if stored_chunk is None:
                 continue
-            chunks.append(self.chunk_by_index[int(i)])
-            scores.append(1.0 / float(d))
+            chunks.append(Chunk.model_validate_json(stored_chunk))
+            scores.append(1.0 / float(d) if self.index_config.metric == FaissMetric.l2 else float(d))
 
         return QueryChunksResponse(chunks=chunks, scores=scores)
 
+    async def migrate_legacy(self, stored_data: str) -> None:
+        """Convert an index saved in the legacy single-blob format into the on-disk format."""
+        data = json.loads(stored_data)
+        buffer = io.BytesIO(base64.b64decode(data["faiss_index"]))
+        # the legacy writer used np.savetxt's default float format for the serialized bytes
+        legacy_index = faiss.deserialize_index(np.loadtxt(buffer, dtype=np.float64).astype(np.uint8))
+        chunk_by_index = {int(k): Chunk.model_validate_json(v) for k, v in data["chunk_by_index"].items()}
+
+        if legacy_index.ntotal:
+            vectors = legacy_index.reconstruct_n(0, legacy_index.ntotal)
+            chunks = [chunk_by_index[i] for i in range(legacy_index.ntotal)]
+            await self.add_chunks(chunks, vectors)
+        await self.kvstore.delete(f"{LEGACY_FAISS_INDEX_PREFIX}{self.bank_id}")
+        logger.info(f"Migrated faiss index {self.bank_id} ({legacy_index.ntotal} vectors) to {INDEX_VERSION}")
+
+
+def _index_config(vector_db: VectorDB) -> FaissIndexConfig:
+    return FaissIndexConfig.model_validate(vector_db.metadata.get("faiss_index", {}))
+
 
 class FaissVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
     def __init__(self, config: FaissVectorIOConfig, inference_api: Inference) -> None:
@@ -120,21 +461,40 @@ class FaissVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         self.cache: dict[str, VectorDBWithIndex] = {}
         self.kvstore: KVStore | None = None
 
+    @property
+    def index_dir(self) -> str:
+        if self.config.index_dir:
+            return self.config.index_dir
+        if isinstance(self.config.kvstore, SqliteKVStoreConfig):
+            return (Path(self.config.kvstore.db_path).parent / "faiss_indexes").as_posix()
+        return (RUNTIME_BASE_DIR / "faiss_indexes").as_posix()
+
     async def initialize(self) -> None:
         self.kvstore = await kvstore_impl(self.config.kvstore)
-        # Load existing banks from kvstore
-        start_key = VECTOR_DBS_PREFIX
-        end_key = f"{VECTOR_DBS_PREFIX}\xff"
-        stored_vector_dbs = await self.kvstore.range(start_key, end_key)
-
-        for vector_db_data in stored_vector_dbs:
-            vector_db = VectorDB.model_validate_json(vector_db_data)
-            index = VectorDBWithIndex(
-                vector_db,
-                await FaissIndex.create(vector_db.embedding_dimension, self.kvstore, vector_db.identifier),
-                self.inference_api,
+        # Load existing banks and their index metadata from kvstore in two round trips
+        stored_vector_dbs = await self.kvstore.scan(VECTOR_DBS_PREFIX, with_keys=False)
+        vector_dbs = [VectorDB.model_validate_json(data) for data in stored_vector_dbs.values]
+        stored = await self.kvstore.multi_get(
+            [f"{FAISS_INDEX_PREFIX}{vector_db.identifier}" for vector_db in vector_dbs]
+            + [f"{LEGACY_FAISS_INDEX_PREFIX}{vector_db.identifier}" for vector_db in vector_dbs]
+        )
+        stored_metas, stored_legacy = stored[: len(vector_dbs)], stored[len(vector_dbs) :]
+
+        for vector_db, stored_meta, legacy_data in zip(vector_dbs, stored_metas, stored_legacy, strict=True):
+            faiss_index = FaissIndex(
+                vector_db.embedding_dimension,
+                self.kvstore,
+                vector_db.identifier,
+                self.index_dir,
+                _index_config(vector_db),
+            )
+            if stored_meta:
+                await faiss_index._load(stored_meta)
+            elif legacy_data:
+                await faiss_index.migrate_legacy(legacy_data)
+            self.cache[vector_db.identifier] = VectorDBWithIndex(
+                vector_db, faiss_index, self.inference_api, batching=self.config.embedding_batching
             )
-            self.cache[vector_db.identifier] = index
 
     async def shutdown(self) -> None:
         # Cleanup if needed
@@ -146,6 +506,15 @@ class FaissVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
     ) -> None:
         assert self.kvstore is not None
 
+        # validates the index options before anything is persisted
+        index = await FaissIndex.create(
+            vector_db.embedding_dimension,
+            self.kvstore,
+            vector_db.identifier,
+            self.index_dir,
+            _index_config(vector_db),
+        )
+
         key = f"{VECTOR_DBS_PREFIX}{vector_db.identifier}"
         await self.kvstore.set(
             key=key,
@@ -155,8 +524,9 @@ class FaissVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         # Store in cache
         self.cache[vector_db.identifier] = VectorDBWithIndex(
             vector_db=vector_db,
-            index=await FaissIndex.create(vector_db.embedding_dimension, self.kvstore, vector_db.identifier),
+            index=index,
             inference_api=self.inference_api,
+            batching=self.config.embedding_batching,
         )
 
     async def list_vector_dbs(self) -> List[VectorDB]:
@@ -190,9 +560,19 @@ class FaissVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         vector_db_id: str,
         query: InterleavedContent,
         params: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> QueryChunksResponse:
         index = self.cache.get(vector_db_id)
         if index is None:
             raise ValueError(f"Vector DB {vector_db_id} not found")
 
-        return await index.query_chunks(query, params)
+        if params is None:
+            params = {}
+        # the faiss index also takes the search tuning parameters (ef_search, nprobe) from params
+        query_vector = await index.embed_query(query, query_embedding)
+        return await index.index.query(
+            query_vector,
+            params.get("max_chunks", 3),
+            params.get("score_threshold", 0.0),
+            params,
+        )
@@ -6,14 +6,19 @@
 
 from typing import Any, Dict
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from llama_stack.providers.utils.memory.config import EmbeddingBatchingConfig
 from llama_stack.schema_utils import json_schema_type
 
 
 @json_schema_type
 class MilvusVectorIOConfig(BaseModel):
     db_path: str
+    embedding_batching: EmbeddingBatchingConfig = Field(
+        default_factory=EmbeddingBatchingConfig,
+        description="How inserted chunks are batched into embeddings requests",
+    )
 
     @classmethod
     def sample_run_config(cls, __distro_dir__: str, **kwargs: Any) -> Dict[str, Any]:
@@ -6,11 +6,22 @@
 
 from typing import Any, Dict
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from llama_stack.providers.utils.memory.config import EmbeddingBatchingConfig
 
 
 class SQLiteVectorIOConfig(BaseModel):
     db_path: str
+    reader_threads: int = Field(
+        default=4,
+        ge=1,
+        description="Number of threads, each with its own connection, that serve concurrent queries",
+    )
+    embedding_batching: EmbeddingBatchingConfig = Field(
+        default_factory=EmbeddingBatchingConfig,
+        description="How inserted chunks are batched into embeddings requests",
+    )
 
     @classmethod
     def sample_run_config(cls, __distro_dir__: str) -> Dict[str, Any]:
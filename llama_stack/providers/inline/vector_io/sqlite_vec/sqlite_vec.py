@@ -7,10 +7,13 @@
 import asyncio
 import hashlib
 import logging
+import os
 import sqlite3
 import struct
+import threading
 import uuid
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 
 import numpy as np
 import sqlite_vec
@@ -24,21 +27,109 @@ from llama_stack.providers.utils.memory.vector_store import EmbeddingIndex, Vect
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+]
+# number of prepared statements sqlite3 keeps per connection
+CACHED_STATEMENTS = 256
+DEFAULT_READER_THREADS = 4
+
 
 def serialize_vector(vector: List[float]) -> bytes:
     """Serialize a list of floats into a compact binary representation."""
     return struct.pack(f"{len(vector)}f", *vector)
 
 
-def _create_sqlite_connection(db_path):
+def _create_sqlite_connection(db_path, check_same_thread: bool = True):
     """Create a SQLite connection with sqlite_vec extension loaded."""
-    connection = sqlite3.connect(db_path)
+    connection = sqlite3.connect(db_path, check_same_thread=check_same_thread, cached_statements=CACHED_STATEMENTS)
     connection.enable_load_extension(True)
     sqlite_vec.load(connection)
     connection.enable_load_extension(False)
     return connection
 
 
+class _SQLiteVecConnectionPool:
+    """Thread-confined connections to one database, opened once with sqlite_vec loaded.
+
+    Writes run on a single writer thread and queries on a pool of reader threads. Each
+    thread keeps its own connection for the lifetime of the pool, so the extension is
+    loaded once per thread and repeated statements are served from the connection's
+    statement cache. In WAL mode queries never wait for an ongoing ingest.
+    """
+
+    def __init__(self, db_path: str, reader_threads: int):
+        self.db_path = db_path
+        self.refcount = 0
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-vec-writer")
+        if db_path == ":memory:":
+            # separate connections to an in-memory database see different databases
+            self.readers = self.writer
+        else:
+            self.readers = ThreadPoolExecutor(max_workers=reader_threads, thread_name_prefix="sqlite-vec-reader")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = _create_sqlite_connection(self.db_path, check_same_thread=False)
+            for pragma in PRAGMAS:
+                connection.execute(pragma)
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        return fn(self._connection())
+
+    async def write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self.writer, self._run, fn)
+
+    async def read(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self.readers, self._run, fn)
+
+    def close(self) -> None:
+        self.writer.shutdown(wait=True)
+        if self.readers is not self.writer:
+            self.readers.shutdown(wait=True)
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+
+_pools: Dict[str, _SQLiteVecConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _acquire_pool(db_path: str, reader_threads: int = DEFAULT_READER_THREADS) -> _SQLiteVecConnectionPool:
+    key = db_path if db_path == ":memory:" else os.path.realpath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = _SQLiteVecConnectionPool(db_path, reader_threads)
+        pool.refcount += 1
+        return pool
+
+
+def _release_pool(pool: _SQLiteVecConnectionPool) -> None:
+    with _pools_lock:
+        pool.refcount -= 1
+        if pool.refcount > 0:
+            return
+        for key, registered in list(_pools.items()):
+            if registered is pool:
+                del _pools[key]
+    pool.close()
+
+
 class SQLiteVecIndex(EmbeddingIndex):
     """
     An index implementation that stores embeddings in a SQLite virtual table using sqlite-vec.
@@ -47,22 +138,28 @@ class SQLiteVecIndex(EmbeddingIndex):
       - A virtual table (vec_chunks_{bank_id}) that holds the serialized vector.
     """
 
-    def __init__(self, dimension: int, db_path: str, bank_id: str):
+    def __init__(self, dimension: int, db_path: str, bank_id: str, reader_threads: int = DEFAULT_READER_THREADS):
         self.dimension = dimension
         self.db_path = db_path
         self.bank_id = bank_id
         self.metadata_table = f"chunks_{bank_id}".replace("-", "_")
         self.vector_table = f"vec_chunks_{bank_id}".replace("-", "_")
+        self.pool = _acquire_pool(db_path, reader_threads)
 
     @classmethod
-    async def create(cls, dimension: int, db_path: str, bank_id: str):
-        instance = cls(dimension, db_path, bank_id)
+    async def create(cls, dimension: int, db_path: str, bank_id: str, reader_threads: int = DEFAULT_READER_THREADS):
+        instance = cls(dimension, db_path, bank_id, reader_threads)
         await instance.initialize()
         return instance
 
+    async def close(self) -> None:
+        """Release this index's reference to the shared connection pool."""
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await asyncio.to_thread(_release_pool, pool)
+
     async def initialize(self) -> None:
-        def _init_tables():
-            connection = _create_sqlite_connection(self.db_path)
+        def _init_tables(connection):
             cur = connection.cursor()
             try:
                 # Create the table to store chunk metadata.
@@ -80,13 +177,11 @@ class SQLiteVecIndex(EmbeddingIndex):
                 connection.commit()
             finally:
                 cur.close()
-                connection.close()
 
-        await asyncio.to_thread(_init_tables)
+        await self.pool.write(_init_tables)
 
     async def delete(self) -> None:
-        def _drop_tables():
-            connection = _create_sqlite_connection(self.db_path)
+        def _drop_tables(connection):
             cur = connection.cursor()
             try:
                 cur.execute(f"DROP TABLE IF EXISTS {self.metadata_table};")
@@ -94,9 +189,9 @@ class SQLiteVecIndex(EmbeddingIndex):
                 connection.commit()
             finally:
                 cur.close()
-                connection.close()
 
-        await asyncio.to_thread(_drop_tables)
+        await self.pool.write(_drop_tables)
+        await self.close()
 
     async def add_chunks(self, chunks: List[Chunk], embeddings: NDArray, batch_size: int = 500):
         """
@@ -107,8 +202,7 @@ class SQLiteVecIndex(EmbeddingIndex):
         """
         assert all(isinstance(chunk.content, str) for chunk in chunks), "SQLiteVecIndex only supports text chunks"
 
-        def _execute_all_batch_inserts():
-            connection = _create_sqlite_connection(self.db_path)
+        def _execute_all_batch_inserts(connection):
             cur = connection.cursor()
 
             try:
@@ -145,17 +239,17 @@ class SQLiteVecIndex(EmbeddingIndex):
                     cur.executemany(f"INSERT INTO {self.vector_table} (id, embedding) VALUES (?, ?);", embedding_data)
                 connection.commit()
 
-            except sqlite3.Error as e:
-                connection.rollback()  # Rollback on failure
+            except Exception as e:
+                # the writer connection is shared, so no failure may leave its transaction open
+                connection.rollback()
                 logger.error(f"Error inserting into {self.vector_table}: {e}")
                 raise
 
             finally:
                 cur.close()
-                connection.close()
 
-        # Process all batches in a single thread
-        await asyncio.to_thread(_execute_all_batch_inserts)
+        # Process all batches in a single transaction on the writer thread
+        await self.pool.write(_execute_all_batch_inserts)
 
     async def query(self, embedding: NDArray, k: int, score_threshold: float) -> QueryChunksResponse:
         """
@@ -165,8 +259,7 @@ class SQLiteVecIndex(EmbeddingIndex):
         emb_list = embedding.tolist() if isinstance(embedding, np.ndarray) else list(embedding)
         emb_blob = serialize_vector(emb_list)
 
-        def _execute_query():
-            connection = _create_sqlite_connection(self.db_path)
+        def _execute_query(connection):
             cur = connection.cursor()
 
             try:
@@ -181,9 +274,8 @@ class SQLiteVecIndex(EmbeddingIndex):
                 return cur.fetchall()
             finally:
                 cur.close()
-                connection.close()
 
-        rows = await asyncio.to_thread(_execute_query)
+        rows = await self.pool.read(_execute_query)
 
         chunks, scores = [], []
         for _id, chunk_json, distance in rows:
@@ -210,11 +302,13 @@ class SQLiteVecVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         self.config = config
         self.inference_api = inference_api
         self.cache: Dict[str, VectorDBWithIndex] = {}
+        self.pool: Optional[_SQLiteVecConnectionPool] = None
 
     async def initialize(self) -> None:
-        def _setup_connection():
-            # Open a connection to the SQLite database (the file is specified in the config).
-            connection = _create_sqlite_connection(self.config.db_path)
+        # the registry and every index share the connection pool of the database file
+        self.pool = _acquire_pool(self.config.db_path, self.config.reader_threads)
+
+        def _setup_connection(connection):
             cur = connection.cursor()
             try:
                 # Create a table to persist vector DB registrations.
@@ -231,24 +325,27 @@ class SQLiteVecVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
                 return rows
             finally:
                 cur.close()
-                connection.close()
 
-        rows = await asyncio.to_thread(_setup_connection)
+        rows = await self.pool.write(_setup_connection)
         for row in rows:
             vector_db_data = row[0]
             vector_db = VectorDB.model_validate_json(vector_db_data)
             index = await SQLiteVecIndex.create(
-                vector_db.embedding_dimension, self.config.db_path, vector_db.identifier
+                vector_db.embedding_dimension, self.config.db_path, vector_db.identifier, self.config.reader_threads
+            )
+            self.cache[vector_db.identifier] = VectorDBWithIndex(
+                vector_db, index, self.inference_api, batching=self.config.embedding_batching
             )
-            self.cache[vector_db.identifier] = VectorDBWithIndex(vector_db, index, self.inference_api)
 
     async def shutdown(self) -> None:
-        # nothing to do since we don't maintain a persistent connection
-        pass
+        for vector_db_with_index in self.cache.values():
+            await vector_db_with_index.index.close()
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await asyncio.to_thread(_release_pool, pool)
 
     async def register_vector_db(self, vector_db: VectorDB) -> None:
-        def _register_db():
-            connection = _create_sqlite_connection(self.config.db_path)
+        def _register_db(connection):
             cur = connection.cursor()
             try:
                 cur.execute(
@@ -258,11 +355,14 @@ class SQLiteVecVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
                 connection.commit()
             finally:
                 cur.close()
-                connection.close()
 
-        await asyncio.to_thread(_register_db)
-        index = await SQLiteVecIndex.create(vector_db.embedding_dimension, self.config.db_path, vector_db.identifier)
-        self.cache[vector_db.identifier] = VectorDBWithIndex(vector_db, index, self.inference_api)
+        await self.pool.write(_register_db)
+        index = await SQLiteVecIndex.create(
+            vector_db.embedding_dimension, self.config.db_path, vector_db.identifier, self.config.reader_threads
+        )
+        self.cache[vector_db.identifier] = VectorDBWithIndex(
+            vector_db, index, self.inference_api, batching=self.config.embedding_batching
+        )
 
     async def list_vector_dbs(self) -> List[VectorDB]:
         return [v.vector_db for v in self.cache.values()]
@@ -274,17 +374,15 @@ class SQLiteVecVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         await self.cache[vector_db_id].index.delete()
         del self.cache[vector_db_id]
 
-        def _delete_vector_db_from_registry():
-            connection = _create_sqlite_connection(self.config.db_path)
+        def _delete_vector_db_from_registry(connection):
             cur = connection.cursor()
             try:
                 cur.execute("DELETE FROM vector_dbs WHERE id = ?", (vector_db_id,))
                 connection.commit()
             finally:
                 cur.close()
-                connection.close()
 
-        await asyncio.to_thread(_delete_vector_db_from_registry)
+        await self.pool.write(_delete_vector_db_from_registry)
 
     async def insert_chunks(self, vector_db_id: str, chunks: List[Chunk], ttl_seconds: Optional[int] = None) -> None:
         if vector_db_id not in self.cache:
@@ -294,11 +392,15 @@ class SQLiteVecVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         await self.cache[vector_db_id].insert_chunks(chunks)
 
     async def query_chunks(
-        self, vector_db_id: str, query: Any, params: Optional[Dict[str, Any]] = None
+        self,
+        vector_db_id: str,
+        query: Any,
+        params: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> QueryChunksResponse:
         if vector_db_id not in self.cache:
             raise ValueError(f"Vector DB {vector_db_id} not found")
-        return await self.cache[vector_db_id].query_chunks(query, params)
+        return await self.cache[vector_db_id].query_chunks(query, params, query_embedding)
 
 
 def generate_chunk_id(document_id: str, chunk_text: str) -> str:
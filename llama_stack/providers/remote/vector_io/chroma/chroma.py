@@ -127,7 +127,10 @@ class ChromaVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
             )
         )
         self.cache[vector_db.identifier] = VectorDBWithIndex(
-            vector_db, ChromaIndex(self.client, collection), self.inference_api
+            vector_db,
+            ChromaIndex(self.client, collection),
+            self.inference_api,
+            batching=self.config.embedding_batching,
         )
 
     async def unregister_vector_db(self, vector_db_id: str) -> None:
@@ -149,10 +152,11 @@ class ChromaVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         vector_db_id: str,
         query: InterleavedContent,
         params: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> QueryChunksResponse:
         index = await self._get_and_cache_vector_db_index(vector_db_id)
 
-        return await index.query_chunks(query, params)
+        return await index.query_chunks(query, params, query_embedding)
 
     async def _get_and_cache_vector_db_index(self, vector_db_id: str) -> VectorDBWithIndex:
         if vector_db_id in self.cache:
@@ -164,6 +168,8 @@ class ChromaVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         collection = await maybe_await(self.client.get_collection(vector_db_id))
         if not collection:
             raise ValueError(f"Vector DB {vector_db_id} not found in Chroma")
-        index = VectorDBWithIndex(vector_db, ChromaIndex(self.client, collection), self.inference_api)
+        index = VectorDBWithIndex(
+            vector_db, ChromaIndex(self.client, collection), self.inference_api, batching=self.config.embedding_batching
+        )
         self.cache[vector_db_id] = index
         return index
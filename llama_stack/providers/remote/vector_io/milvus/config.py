@@ -6,8 +6,9 @@
 
 from typing import Any, Dict, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from llama_stack.providers.utils.memory.config import EmbeddingBatchingConfig
 from llama_stack.schema_utils import json_schema_type
 
 
@@ -16,6 +17,10 @@ class MilvusVectorIOConfig(BaseModel):
     uri: str
     token: Optional[str] = None
     consistency_level: str = "Strong"
+    embedding_batching: EmbeddingBatchingConfig = Field(
+        default_factory=EmbeddingBatchingConfig,
+        description="How inserted chunks are batched into embeddings requests",
+    )
 
     @classmethod
     def sample_run_config(cls, __distro_dir__: str, **kwargs: Any) -> Dict[str, Any]:
@@ -120,6 +120,7 @@ class MilvusVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
             vector_db=vector_db,
             index=MilvusIndex(self.client, vector_db.identifier, consistency_level=consistency_level),
             inference_api=self.inference_api,
+            batching=self.config.embedding_batching,
         )
 
         self.cache[vector_db.identifier] = index
@@ -136,6 +137,7 @@ class MilvusVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
             vector_db=vector_db,
             index=MilvusIndex(client=self.client, collection_name=vector_db.identifier),
             inference_api=self.inference_api,
+            batching=self.config.embedding_batching,
         )
         self.cache[vector_db_id] = index
         return index
@@ -162,12 +164,13 @@ class MilvusVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         vector_db_id: str,
         query: InterleavedContent,
         params: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> QueryChunksResponse:
         index = await self._get_and_cache_vector_db_index(vector_db_id)
         if not index:
             raise ValueError(f"Vector DB {vector_db_id} not found")
 
-        return await index.query_chunks(query, params)
+        return await index.query_chunks(query, params, query_embedding)
 
 
 def generate_chunk_id(document_id: str, chunk_text: str) -> str:
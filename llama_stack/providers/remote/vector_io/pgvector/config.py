@@ -8,6 +8,7 @@ from typing import Any, Dict
 
 from pydantic import BaseModel, Field
 
+from llama_stack.providers.utils.memory.config import EmbeddingBatchingConfig
 from llama_stack.schema_utils import json_schema_type
 
 
@@ -18,6 +19,10 @@ class PGVectorVectorIOConfig(BaseModel):
     db: str = Field(default="postgres")
     user: str = Field(default="postgres")
     password: str = Field(default="mysecretpassword")
+    embedding_batching: EmbeddingBatchingConfig = Field(
+        default_factory=EmbeddingBatchingConfig,
+        description="How inserted chunks are batched into embeddings requests",
+    )
 
     @classmethod
     def sample_run_config(
@@ -171,7 +171,9 @@ class PGVectorVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         upsert_models(self.conn, [(vector_db.identifier, vector_db)])
 
         index = PGVectorIndex(vector_db, vector_db.embedding_dimension, self.conn)
-        self.cache[vector_db.identifier] = VectorDBWithIndex(vector_db, index, self.inference_api)
+        self.cache[vector_db.identifier] = VectorDBWithIndex(
+            vector_db, index, self.inference_api, batching=self.config.embedding_batching
+        )
 
     async def unregister_vector_db(self, vector_db_id: str) -> None:
         await self.cache[vector_db_id].index.delete()
@@ -191,9 +193,10 @@ class PGVectorVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         vector_db_id: str,
         query: InterleavedContent,
         params: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> QueryChunksResponse:
         index = await self._get_and_cache_vector_db_index(vector_db_id)
-        return await index.query_chunks(query, params)
+        return await index.query_chunks(query, params, query_embedding)
 
     async def _get_and_cache_vector_db_index(self, vector_db_id: str) -> VectorDBWithIndex:
         if vector_db_id in self.cache:
@@ -201,5 +204,7 @@ class PGVectorVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
 
         vector_db = await self.vector_db_store.get_vector_db(vector_db_id)
         index = PGVectorIndex(vector_db, vector_db.embedding_dimension, self.conn)
-        self.cache[vector_db_id] = VectorDBWithIndex(vector_db, index, self.inference_api)
+        self.cache[vector_db_id] = VectorDBWithIndex(
+            vector_db, index, self.inference_api, batching=self.config.embedding_batching
+        )
         return self.cache[vector_db_id]
@@ -122,6 +122,7 @@ class QdrantVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
             vector_db=vector_db,
             index=QdrantIndex(self.client, vector_db.identifier),
             inference_api=self.inference_api,
+            batching=self.config.embedding_batching,
         )
 
         self.cache[vector_db.identifier] = index
@@ -143,6 +144,7 @@ class QdrantVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
             vector_db=vector_db,
             index=QdrantIndex(client=self.client, collection_name=vector_db.identifier),
             inference_api=self.inference_api,
+            batching=self.config.embedding_batching,
         )
         self.cache[vector_db_id] = index
         return index
@@ -164,9 +166,10 @@ class QdrantVectorIOAdapter(VectorIO, VectorDBsProtocolPrivate):
         vector_db_id: str,
         query: InterleavedContent,
         params: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> QueryChunksResponse:
         index = await self._get_and_cache_vector_db_index(vector_db_id)
         if not index:
             raise ValueError(f"Vector DB {vector_db_id} not found")
 
-        return await index.query_chunks(query, params)
+        return await index.query_chunks(query, params, query_embedding)
@@ -6,7 +6,9 @@
 
 from typing import Any, Dict
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from llama_stack.providers.utils.memory.config import EmbeddingBatchingConfig
 
 
 class WeaviateRequestProviderData(BaseModel):
@@ -15,6 +17,11 @@ class WeaviateRequestProviderData(BaseModel):
 
 
 class WeaviateVectorIOConfig(BaseModel):
+    embedding_batching: EmbeddingBatchingConfig = Field(
+        default_factory=EmbeddingBatchingConfig,
+        description="How inserted chunks are batched into embeddings requests",
+    )
+
     @classmethod
     def sample_run_config(cls, **kwargs: Any) -> Dict[str, Any]:
         return {}
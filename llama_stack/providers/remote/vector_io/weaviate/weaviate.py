@@ -142,6 +142,7 @@ class WeaviateVectorIOAdapter(
             vector_db,
             WeaviateIndex(client=client, collection_name=vector_db.identifier),
             self.inference_api,
+            batching=self.config.embedding_batching,
         )
 
     async def _get_and_cache_vector_db_index(self, vector_db_id: str) -> Optional[VectorDBWithIndex]:
@@ -160,6 +161,7 @@ class WeaviateVectorIOAdapter(
             vector_db=vector_db,
             index=WeaviateIndex(client=client, collection_name=vector_db.identifier),
             inference_api=self.inference_api,
+            batching=self.config.embedding_batching,
         )
         self.cache[vector_db_id] = index
         return index
@@ -181,9 +183,10 @@ class WeaviateVectorIOAdapter(
         vector_db_id: str,
         query: InterleavedContent,
         params: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> QueryChunksResponse:
         index = await self._get_and_cache_vector_db_index(vector_db_id)
         if not index:
             raise ValueError(f"Vector DB {vector_db_id} not found")
 
-        return await index.query_chunks(query, params)
+        return await index.query_chunks(query, params, query_embedding)
@@ -6,7 +6,7 @@
 import json
 import logging
 import warnings
-from typing import AsyncGenerator, Dict, Iterable, List, Optional, Union
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional, Union
 
 from openai import AsyncStream
 from openai.types.chat import (
@@ -83,6 +83,7 @@ from llama_stack.apis.inference import (
     TopPSamplingStrategy,
     UserMessage,
 )
+from llama_stack.apis.telemetry import MetricInResponse
 from llama_stack.models.llama.datatypes import (
     BuiltinTool,
     StopReason,
@@ -207,16 +208,31 @@ def convert_openai_completion_logprobs_stream(text: str, logprobs: Optional[Unio
     return None
 
 
+def usage_metrics(response: Any) -> Optional[List[MetricInResponse]]:
+    """Token usage reported in the `usage` field of an OpenAI-compatible response, if any."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    metrics = []
+    for name in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        if value is not None:
+            metrics.append(MetricInResponse(metric=name, value=value))
+    return metrics or None
+
+
 def process_completion_response(
     response: OpenAICompatCompletionResponse,
 ) -> CompletionResponse:
     choice = response.choices[0]
+    metrics = usage_metrics(response)
     # drop suffix <eot_id> if present and return stop reason as end of turn
     if choice.text.endswith("<|eot_id|>"):
         return CompletionResponse(
             stop_reason=StopReason.end_of_turn,
             content=choice.text[: -len("<|eot_id|>")],
             logprobs=convert_openai_completion_logprobs(choice.logprobs),
+            metrics=metrics,
         )
     # drop suffix <eom_id> if present and return stop reason as end of message
     if choice.text.endswith("<|eom_id|>"):
@@ -224,11 +240,13 @@ def process_completion_response(
             stop_reason=StopReason.end_of_message,
             content=choice.text[: -len("<|eom_id|>")],
             logprobs=convert_openai_completion_logprobs(choice.logprobs),
+            metrics=metrics,
         )
     return CompletionResponse(
         stop_reason=get_stop_reason(choice.finish_reason),
         content=choice.text,
         logprobs=convert_openai_completion_logprobs(choice.logprobs),
+        metrics=metrics,
     )
 
 
@@ -237,6 +255,7 @@ def process_chat_completion_response(
     request: ChatCompletionRequest,
 ) -> ChatCompletionResponse:
     choice = response.choices[0]
+    metrics = usage_metrics(response)
     if choice.finish_reason == "tool_calls":
         if not choice.message or not choice.message.tool_calls:
             raise ValueError("Tool calls are not present in the response")
@@ -250,6 +269,7 @@ def process_chat_completion_response(
                     content=json.dumps(tool_calls, default=lambda x: x.model_dump()),
                 ),
                 logprobs=None,
+                metrics=metrics,
             )
         else:
             # Otherwise, return tool calls as normal
@@ -261,6 +281,7 @@ def process_chat_completion_response(
                     content="",
                 ),
                 logprobs=None,
+                metrics=metrics,
             )
 
     # TODO: This does not work well with tool calls for vLLM remote provider
@@ -295,6 +316,7 @@ def process_chat_completion_response(
             tool_calls=raw_message.tool_calls,
         ),
         logprobs=None,
+        metrics=metrics,
     )
 
 
@@ -4,8 +4,24 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
+import sys
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Protocol
+from typing import Dict, List, Optional, Protocol
+
+
+@dataclass
+class KVScanResult:
+    """A page of results from `KVStore.scan`, ordered by key.
+
+    :param values: Values of the matching keys
+    :param keys: The matching keys, only populated when scanning with `with_keys=True`
+    :param cursor: Opaque cursor to pass to the next `scan` call, None once the scan is exhausted
+    """
+
+    values: List[str]
+    keys: Optional[List[str]] = None
+    cursor: Optional[str] = None
 
 
 class KVStore(Protocol):
@@ -17,3 +33,46 @@ class KVStore(Protocol):
     async def delete(self, key: str) -> None: ...
 
     async def range(self, start_key: str, end_key: str) -> List[str]: ...
+
+    async def multi_get(self, keys: List[str]) -> List[Optional[str]]:
+        """Fetch several keys in one round trip; the result is aligned with `keys`."""
+        ...
+
+    async def multi_set(self, items: Dict[str, str], expiration: Optional[datetime] = None) -> None:
+        """Atomically set several keys in one round trip."""
+        ...
+
+    async def delete_range(self, start_key: str, end_key: str) -> None:
+        """Delete every key in [start_key, end_key)."""
+        ...
+
+    async def compare_and_set(self, key: str, expected: Optional[str], value: str) -> bool:
+        """Atomically set `key` to `value` if it currently holds `expected` (None: if it is absent or expired).
+
+        The new value does not expire. Returns whether the value was set.
+        """
+        ...
+
+    async def scan(
+        self,
+        prefix: str,
+        with_keys: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> KVScanResult:
+        """Return keys starting with `prefix` in key order, `limit` at a time, resuming after `cursor`."""
+        ...
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with `prefix`, or None if unbounded.
+
+    Valid for stores that order keys by code point (or equivalently, by UTF-8 bytes).
+    """
+    while prefix:
+        last = ord(prefix[-1])
+        if last < sys.maxunicode:
+            # surrogates never appear in encodable keys, so skip over them
+            return prefix[:-1] + chr(0xE000 if 0xD7FF <= last < 0xE000 else last + 1)
+        prefix = prefix[:-1]
+    return None
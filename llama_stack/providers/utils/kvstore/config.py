@@ -71,6 +71,13 @@ class PostgresKVStoreConfig(CommonConfig):
     user: str
     password: Optional[str] = None
     table_name: str = "llamastack_kvstore"
+    min_pool_size: int = Field(default=1, ge=0, description="Connections kept open in the pool")
+    max_pool_size: int = Field(default=10, ge=1, description="Upper bound on concurrent connections")
+    expiration_cleanup_interval: float = Field(
+        default=300,
+        ge=0,
+        description="Seconds between server-side deletions of expired keys, 0 to disable",
+    )
 
     @classmethod
     def sample_run_config(cls, table_name: str = "llamastack_kvstore"):
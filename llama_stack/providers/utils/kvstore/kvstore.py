@@ -4,14 +4,17 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
-from .api import KVStore
+from llama_stack.providers.utils.telemetry.metrics import KVSTORE_OP_LATENCY
+
+from .api import KVScanResult, KVStore
 from .config import KVStoreConfig, KVStoreType
 
 
 def kvstore_dependencies():
-    return ["aiosqlite", "psycopg2-binary", "redis", "pymongo"]
+    return ["aiosqlite", "asyncpg", "redis", "pymongo"]
 
 
 class InmemoryKVStoreImpl(KVStore):
@@ -24,12 +27,118 @@ class InmemoryKVStoreImpl(KVStore):
     async def get(self, key: str) -> Optional[str]:
         return self._store.get(key)
 
-    async def set(self, key: str, value: str) -> None:
+    async def set(self, key: str, value: str, expiration: Optional[datetime] = None) -> None:
         self._store[key] = value
 
+    async def delete(self, key: str) -> None:
+        self._store.pop(key, None)
+
     async def range(self, start_key: str, end_key: str) -> List[str]:
         return [self._store[key] for key in self._store.keys() if key >= start_key and key < end_key]
 
+    async def multi_get(self, keys: List[str]) -> List[Optional[str]]:
+        return [self._store.get(key) for key in keys]
+
+    async def multi_set(self, items: Dict[str, str], expiration: Optional[datetime] = None) -> None:
+        self._store.update(items)
+
+    async def delete_range(self, start_key: str, end_key: str) -> None:
+        for key in [key for key in self._store if start_key <= key < end_key]:
+            del self._store[key]
+
+    async def compare_and_set(self, key: str, expected: Optional[str], value: str) -> bool:
+        if self._store.get(key) != expected:
+            return False
+        self._store[key] = value
+        return True
+
+    async def scan(
+        self,
+        prefix: str,
+        with_keys: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> KVScanResult:
+        keys = sorted(key for key in self._store if key.startswith(prefix) and (cursor is None or key > cursor))
+        next_cursor = None
+        if limit is not None and len(keys) > limit:
+            keys = keys[:limit]
+            next_cursor = keys[-1]
+        return KVScanResult(
+            values=[self._store[key] for key in keys],
+            keys=keys if with_keys else None,
+            cursor=next_cursor,
+        )
+
+
+class InstrumentedKVStore(KVStore):
+    """Records the latency of every operation on the wrapped store in the kvstore metrics."""
+
+    def __init__(self, store: KVStore, store_type: str):
+        self.store = store
+        self._latency = {
+            op: KVSTORE_OP_LATENCY.labels(store_type, op)
+            for op in (
+                "get",
+                "set",
+                "delete",
+                "range",
+                "multi_get",
+                "multi_set",
+                "delete_range",
+                "compare_and_set",
+                "scan",
+            )
+        }
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.store, name)
+
+    async def initialize(self) -> None:
+        await self.store.initialize()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._latency["get"].time():
+            return await self.store.get(key)
+
+    async def set(self, key: str, value: str, expiration: Optional[datetime] = None) -> None:
+        with self._latency["set"].time():
+            return await self.store.set(key, value, expiration)
+
+    async def delete(self, key: str) -> None:
+        with self._latency["delete"].time():
+            return await self.store.delete(key)
+
+    async def range(self, start_key: str, end_key: str) -> List[str]:
+        with self._latency["range"].time():
+            return await self.store.range(start_key, end_key)
+
+    async def multi_get(self, keys: List[str]) -> List[Optional[str]]:
+        with self._latency["multi_get"].time():
+            return await self.store.multi_get(keys)
+
+    async def multi_set(self, items: Dict[str, str], expiration: Optional[datetime] = None) -> None:
+        with self._latency["multi_set"].time():
+            return await self.store.multi_set(items, expiration)
+
+    async def delete_range(self, start_key: str, end_key: str) -> None:
+        with self._latency["delete_range"].time():
+            return await self.store.delete_range(start_key, end_key)
+
+    async def compare_and_set(self, key: str, expected: Optional[str], value: str) -> bool:
+        with self._latency["compare_and_set"].time():
+            return await self.store.compare_and_set(key, expected, value)
+
+    async def scan(
+        self,
+        prefix: str,
+        with_keys: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> KVScanResult:
+        with self._latency["scan"].time():
+            return await self.store.scan(prefix, with_keys=with_keys, limit=limit, cursor=cursor)
+
 
 async def kvstore_impl(config: KVStoreConfig) -> KVStore:
     if config.type == KVStoreType.redis.value:
@@ -52,4 +161,4 @@ async def kvstore_impl(config: KVStoreConfig) -> KVStore:
         raise ValueError(f"Unknown kvstore type {config.type}")
 
     await impl.initialize()
-    return impl
+    return InstrumentedKVStore(impl, config.type)
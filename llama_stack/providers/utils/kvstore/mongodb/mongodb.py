@@ -6,16 +6,21 @@
 
 import logging
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pymongo import AsyncMongoClient
+from pymongo import AsyncMongoClient, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 
 from llama_stack.providers.utils.kvstore import KVStore
 
+from ..api import KVScanResult, prefix_upper_bound
 from ..config import MongoDBKVStoreConfig
 
 log = logging.getLogger(__name__)
 
+# "Transaction numbers are only allowed on a replica set member or mongos"
+TRANSACTIONS_NOT_SUPPORTED = 20
+
 
 class MongoDBKVStoreImpl(KVStore):
     def __init__(self, config: MongoDBKVStoreConfig):
@@ -43,6 +48,11 @@ class MongoDBKVStoreImpl(KVStore):
             return key
         return f"{self.config.namespace}:{key}"
 
+    def _strip_namespace(self, key: str) -> str:
+        if not self.config.namespace:
+            return key
+        return key[len(self.config.namespace) + 1 :]
+
     async def set(self, key: str, value: str, expiration: Optional[datetime] = None) -> None:
         key = self._namespaced_key(key)
         update_query = {"$set": {"value": value, "expiration": expiration}}
@@ -69,3 +79,81 @@ class MongoDBKVStoreImpl(KVStore):
         async for doc in cursor:
             result.append(doc["value"])
         return result
+
+    async def multi_get(self, keys: List[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        namespaced = [self._namespaced_key(key) for key in keys]
+        found = {}
+        async for doc in self.collection.find({"key": {"$in": namespaced}}, {"key": 1, "value": 1, "_id": 0}):
+            found[doc["key"]] = doc["value"]
+        return [found.get(key) for key in namespaced]
+
+    async def multi_set(self, items: Dict[str, str], expiration: Optional[datetime] = None) -> None:
+        if not items:
+            return
+        operations = [
+            UpdateOne(
+                {"key": self._namespaced_key(key)},
+                {"$set": {"value": value, "expiration": expiration}},
+                upsert=True,
+            )
+            for key, value in items.items()
+        ]
+        # multi-document atomicity needs a replica set; wrap the batch in a transaction when one is available
+        async with self.conn.start_session() as session:
+            try:
+                async with await session.start_transaction():
+                    await self.collection.bulk_write(operations, ordered=True, session=session)
+            except OperationFailure as e:
+                if e.code != TRANSACTIONS_NOT_SUPPORTED:
+                    raise
+                await self.collection.bulk_write(operations, ordered=True)
+
+    async def compare_and_set(self, key: str, expected: Optional[str], value: str) -> bool:
+        key = self._namespaced_key(key)
+        update = {"$set": {"value": value, "expiration": None}}
+        if expected is not None:
+            # single-document updates are atomic
+            result = await self.collection.update_one({"key": key, "value": expected}, update)
+            return result.matched_count == 1
+        try:
+            result = await self.collection.update_one({"key": key}, {"$setOnInsert": update["$set"]}, upsert=True)
+        except DuplicateKeyError:
+            # a concurrent upsert inserted the key first, which a unique index on `key` reports
+            return False
+        return result.upserted_id is not None
+
+    async def delete_range(self, start_key: str, end_key: str) -> None:
+        await self.collection.delete_many(
+            {"key": {"$gte": self._namespaced_key(start_key), "$lt": self._namespaced_key(end_key)}}
+        )
+
+    async def scan(
+        self,
+        prefix: str,
+        with_keys: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> KVScanResult:
+        key_filter = {"$gte": self._namespaced_key(prefix)}
+        if (upper := prefix_upper_bound(self._namespaced_key(prefix))) is not None:
+            key_filter["$lt"] = upper
+        if cursor is not None:
+            key_filter["$gt"] = self._namespaced_key(cursor)
+
+        find = self.collection.find({"key": key_filter}, {"key": 1, "value": 1, "_id": 0}).sort("key", 1)
+        if limit is not None:
+            # fetch one extra document to find out whether there is another page
+            find = find.limit(limit + 1)
+        docs = [doc async for doc in find]
+
+        next_cursor = None
+        if limit is not None and len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = self._strip_namespace(docs[-1]["key"])
+        return KVScanResult(
+            values=[doc["value"] for doc in docs],
+            keys=[self._strip_namespace(doc["key"]) for doc in docs] if with_keys else None,
+            cursor=next_cursor,
+        )
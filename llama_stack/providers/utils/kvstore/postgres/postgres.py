@@ -4,99 +4,274 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
+import asyncio
 import logging
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 
-import psycopg2
-from psycopg2.extras import DictCursor
+import asyncpg
 
-from ..api import KVStore
+from ..api import KVScanResult, KVStore, prefix_upper_bound
 from ..config import PostgresKVStoreConfig
 
 log = logging.getLogger(__name__)
 
+# number of expired rows removed per DELETE statement during cleanup
+CLEANUP_BATCH_SIZE = 1000
+
+
+def _to_utc(expiration: Optional[datetime]) -> Optional[datetime]:
+    # expirations are stored as naive UTC timestamps; naive inputs are interpreted as
+    # local time, matching the other backends
+    if expiration is None:
+        return None
+    return expiration.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _terminate(pool: asyncpg.Pool) -> None:
+    try:
+        pool.terminate()
+    except RuntimeError:
+        # the pool's event loop is already closed; its sockets are released with the pool
+        pass
+
 
 class PostgresKVStoreImpl(KVStore):
+    """KVStore backed by a bounded asyncpg connection pool.
+
+    asyncpg pools are bound to the event loop they were created on, so a pool is kept
+    per running loop (the library client drives each request on a fresh loop). All
+    statements use fixed SQL text, which asyncpg prepares once per connection and
+    serves from its statement cache afterwards.
+    """
+
     def __init__(self, config: PostgresKVStoreConfig):
         self.config = config
-        self.conn = None
-        self.cursor = None
+        self._pools: Dict[asyncio.AbstractEventLoop, asyncpg.Pool] = {}
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+        table = config.table_name
+        not_expired = "(expiration IS NULL OR expiration > (NOW() AT TIME ZONE 'UTC'))"
+        self._sql_set = f"""
+            INSERT INTO {table} (key, value, expiration)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (key) DO UPDATE
+            SET value = EXCLUDED.value, expiration = EXCLUDED.expiration
+            """
+        self._sql_multi_set = f"""
+            INSERT INTO {table} (key, value, expiration)
+            SELECT * FROM unnest($1::text[], $2::text[], $3::timestamp[])
+            ON CONFLICT (key) DO UPDATE
+            SET value = EXCLUDED.value, expiration = EXCLUDED.expiration
+            """
+        self._sql_get = f"SELECT value FROM {table} WHERE key = $1 AND {not_expired}"
+        self._sql_multi_get = f"SELECT key, value FROM {table} WHERE key = ANY($1::text[]) AND {not_expired}"
+        self._sql_delete = f"DELETE FROM {table} WHERE key = $1"
+        self._sql_delete_range = f"DELETE FROM {table} WHERE key >= $1 AND key < $2"
+        self._sql_range = f"SELECT value FROM {table} WHERE key >= $1 AND key < $2 AND {not_expired} ORDER BY key"
+        # an absent key is inserted, an expired one overwritten; RETURNING yields a row only if the value was set
+        self._sql_insert_if_absent = f"""
+            INSERT INTO {table} AS t (key, value, expiration) VALUES ($1, $2, NULL)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expiration = NULL
+            WHERE t.expiration <= (NOW() AT TIME ZONE 'UTC')
+            RETURNING key
+            """
+        self._sql_compare_and_set = f"""
+            UPDATE {table} SET value = $2, expiration = NULL
+            WHERE key = $1 AND value = $3 AND {not_expired}
+            RETURNING key
+            """
+        # scans are range predicates on the primary key so that they can use its btree index; a
+        # variant is prepared for each combination of cursor and upper bound instead of folding the
+        # missing ones into `$n IS NULL OR ...`, which would keep the planner from using the index
+        self._sql_scan = {}
+        for has_cursor in (False, True):
+            for has_upper in (False, True):
+                conditions = ["key > $1" if has_cursor else "key >= $1"]
+                if has_upper:
+                    conditions.append("key < $3")
+                self._sql_scan[has_cursor, has_upper] = f"""
+                    SELECT key, value FROM {table}
+                    WHERE {" AND ".join(conditions)} AND {not_expired}
+                    ORDER BY key
+                    LIMIT $2
+                    """
+        self._sql_cleanup = f"""
+            DELETE FROM {table} WHERE key IN (
+                SELECT key FROM {table}
+                WHERE expiration <= (NOW() AT TIME ZONE 'UTC')
+                LIMIT $1
+            )
+            """
 
     async def initialize(self) -> None:
         try:
-            self.conn = psycopg2.connect(
-                host=self.config.host,
-                port=self.config.port,
-                database=self.config.db,
-                user=self.config.user,
-                password=self.config.password,
-            )
-            self.conn.autocommit = True
-            self.cursor = self.conn.cursor(cursor_factory=DictCursor)
-
-            # Create table if it doesn't exist
-            self.cursor.execute(
-                f"""
-                CREATE TABLE IF NOT EXISTS {self.config.table_name} (
-                    key TEXT PRIMARY KEY,
-                    value TEXT,
-                    expiration TIMESTAMP
+            pool = await self._get_pool()
+            async with pool.acquire() as conn:
+                await conn.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {self.config.table_name} (
+                        key TEXT PRIMARY KEY,
+                        value TEXT,
+                        expiration TIMESTAMP
+                    )
+                    """
+                )
+                await conn.execute(
+                    f"""
+                    CREATE INDEX IF NOT EXISTS {self.config.table_name}_expiration_idx
+                    ON {self.config.table_name} (expiration) WHERE expiration IS NOT NULL
+                    """
                 )
-                """
-            )
         except Exception as e:
             log.exception("Could not connect to PostgreSQL database server")
             raise RuntimeError("Could not connect to PostgreSQL database server") from e
 
+        await self.cleanup_expired()
+        if self.config.expiration_cleanup_interval > 0:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def shutdown(self) -> None:
+        if self._cleanup_task:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
+        loop = asyncio.get_running_loop()
+        pools, self._pools = self._pools, {}
+        for pool_loop, pool in pools.items():
+            if pool_loop is loop:
+                await pool.close()
+            else:
+                _terminate(pool)
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is not None:
+            return pool
+
+        # pools of loops that have since been closed can no longer be used
+        for stale_loop in [other for other in self._pools if other.is_closed()]:
+            _terminate(self._pools.pop(stale_loop))
+
+        pool = await asyncpg.create_pool(
+            host=self.config.host,
+            port=self.config.port,
+            database=self.config.db,
+            user=self.config.user,
+            password=self.config.password,
+            min_size=min(self.config.min_pool_size, self.config.max_pool_size),
+            max_size=self.config.max_pool_size,
+        )
+        if loop in self._pools:
+            # another task on this loop created a pool while we were connecting
+            await pool.close()
+            return self._pools[loop]
+        self._pools[loop] = pool
+        return pool
+
+    async def cleanup_expired(self) -> int:
+        """Delete expired keys on the server in bounded batches; returns the number removed."""
+        pool = await self._get_pool()
+        removed = 0
+        while True:
+            status = await pool.execute(self._sql_cleanup, CLEANUP_BATCH_SIZE)
+            count = int(status.split()[-1])
+            removed += count
+            if count < CLEANUP_BATCH_SIZE:
+                return removed
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.expiration_cleanup_interval)
+            try:
+                await self.cleanup_expired()
+            except Exception:
+                log.exception("Failed to clean up expired keys")
+
     def _namespaced_key(self, key: str) -> str:
         if not self.config.namespace:
             return key
         return f"{self.config.namespace}:{key}"
 
+    def _strip_namespace(self, key: str) -> str:
+        if not self.config.namespace:
+            return key
+        return key[len(self.config.namespace) + 1 :]
+
     async def set(self, key: str, value: str, expiration: Optional[datetime] = None) -> None:
-        key = self._namespaced_key(key)
-        self.cursor.execute(
-            f"""
-            INSERT INTO {self.config.table_name} (key, value, expiration)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (key) DO UPDATE
-            SET value = EXCLUDED.value, expiration = EXCLUDED.expiration
-            """,
-            (key, value, expiration),
-        )
+        pool = await self._get_pool()
+        await pool.execute(self._sql_set, self._namespaced_key(key), value, _to_utc(expiration))
 
     async def get(self, key: str) -> Optional[str]:
-        key = self._namespaced_key(key)
-        self.cursor.execute(
-            f"""
-            SELECT value FROM {self.config.table_name}
-            WHERE key = %s
-            AND (expiration IS NULL OR expiration > NOW())
-            """,
-            (key,),
-        )
-        result = self.cursor.fetchone()
-        return result[0] if result else None
+        pool = await self._get_pool()
+        return await pool.fetchval(self._sql_get, self._namespaced_key(key))
 
     async def delete(self, key: str) -> None:
-        key = self._namespaced_key(key)
-        self.cursor.execute(
-            f"DELETE FROM {self.config.table_name} WHERE key = %s",
-            (key,),
-        )
+        pool = await self._get_pool()
+        await pool.execute(self._sql_delete, self._namespaced_key(key))
 
     async def range(self, start_key: str, end_key: str) -> List[str]:
-        start_key = self._namespaced_key(start_key)
-        end_key = self._namespaced_key(end_key)
-
-        self.cursor.execute(
-            f"""
-            SELECT value FROM {self.config.table_name}
-            WHERE key >= %s AND key < %s
-            AND (expiration IS NULL OR expiration > NOW())
-            ORDER BY key
-            """,
-            (start_key, end_key),
+        pool = await self._get_pool()
+        rows = await pool.fetch(self._sql_range, self._namespaced_key(start_key), self._namespaced_key(end_key))
+        return [row["value"] for row in rows]
+
+    async def multi_get(self, keys: List[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        pool = await self._get_pool()
+        namespaced = [self._namespaced_key(key) for key in keys]
+        rows = await pool.fetch(self._sql_multi_get, namespaced)
+        found = {row["key"]: row["value"] for row in rows}
+        return [found.get(key) for key in namespaced]
+
+    async def multi_set(self, items: Dict[str, str], expiration: Optional[datetime] = None) -> None:
+        if not items:
+            return
+        pool = await self._get_pool()
+        expires_at = _to_utc(expiration)
+        # a single statement is atomic
+        await pool.execute(
+            self._sql_multi_set,
+            [self._namespaced_key(key) for key in items],
+            list(items.values()),
+            [expires_at] * len(items),
+        )
+
+    async def compare_and_set(self, key: str, expected: Optional[str], value: str) -> bool:
+        pool = await self._get_pool()
+        key = self._namespaced_key(key)
+        if expected is None:
+            return await pool.fetchval(self._sql_insert_if_absent, key, value) is not None
+        return await pool.fetchval(self._sql_compare_and_set, key, value, expected) is not None
+
+    async def delete_range(self, start_key: str, end_key: str) -> None:
+        pool = await self._get_pool()
+        await pool.execute(self._sql_delete_range, self._namespaced_key(start_key), self._namespaced_key(end_key))
+
+    async def scan(
+        self,
+        prefix: str,
+        with_keys: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> KVScanResult:
+        prefix = self._namespaced_key(prefix)
+        upper = prefix_upper_bound(prefix)
+        after = self._namespaced_key(cursor) if cursor is not None else None
+        if after is not None and after < prefix:
+            after = None
+        # fetch one extra row to find out whether there is another page; NULL means no limit
+        args = [prefix if after is None else after, limit + 1 if limit is not None else None]
+        if upper is not None:
+            args.append(upper)
+        pool = await self._get_pool()
+        rows = await pool.fetch(self._sql_scan[after is not None, upper is not None], *args)
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._strip_namespace(rows[-1]["key"])
+        return KVScanResult(
+            values=[row["value"] for row in rows],
+            keys=[self._strip_namespace(row["key"]) for row in rows] if with_keys else None,
+            cursor=next_cursor,
         )
-        return [row[0] for row in self.cursor.fetchall()]
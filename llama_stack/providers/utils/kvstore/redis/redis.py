@@ -4,14 +4,27 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
+import os
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from redis.asyncio import Redis
 
-from ..api import KVStore
+from ..api import KVScanResult, KVStore
 from ..config import RedisKVStoreConfig
 
+# KEYS[1]: the key; ARGV: whether the key must be absent, the expected value, the new value
+COMPARE_AND_SET_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if ARGV[1] == '1' then
+    if current then return 0 end
+elseif current ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[3])
+return 1
+"""
+
 
 class RedisKVStoreImpl(KVStore):
     def __init__(self, config: RedisKVStoreConfig):
@@ -25,6 +38,23 @@ class RedisKVStoreImpl(KVStore):
             return key
         return f"{self.config.namespace}:{key}"
 
+    def _strip_namespace(self, key: str) -> str:
+        if not self.config.namespace:
+            return key
+        return key[len(self.config.namespace) + 1 :]
+
+    @staticmethod
+    def _decode(value):
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def _keys_with_prefix(self, prefix: str) -> List[str]:
+        # escape glob metacharacters so the prefix is matched literally
+        pattern = "".join("\\" + c if c in "*?[]\\" else c for c in prefix) + "*"
+        keys = []
+        async for key in self.redis.scan_iter(match=pattern, count=1000):
+            keys.append(self._decode(key))
+        return sorted(keys)
+
     async def set(self, key: str, value: str, expiration: Optional[datetime] = None) -> None:
         key = self._namespaced_key(key)
         await self.redis.set(key, value)
@@ -68,3 +98,67 @@ class RedisKVStoreImpl(KVStore):
             ]
 
         return []
+
+    async def multi_get(self, keys: List[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        values = await self.redis.mget([self._namespaced_key(key) for key in keys])
+        return [self._decode(value) for value in values]
+
+    async def multi_set(self, items: Dict[str, str], expiration: Optional[datetime] = None) -> None:
+        if not items:
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key, value in items.items():
+                key = self._namespaced_key(key)
+                pipe.set(key, value)
+                if expiration:
+                    pipe.expireat(key, expiration)
+            await pipe.execute()
+
+    async def compare_and_set(self, key: str, expected: Optional[str], value: str) -> bool:
+        # a script runs atomically; SET without KEEPTTL drops any expiration
+        swapped = await self.redis.eval(
+            COMPARE_AND_SET_SCRIPT,
+            1,
+            self._namespaced_key(key),
+            "1" if expected is None else "0",
+            expected or "",
+            value,
+        )
+        return bool(swapped)
+
+    async def delete_range(self, start_key: str, end_key: str) -> None:
+        start_key = self._namespaced_key(start_key)
+        end_key = self._namespaced_key(end_key)
+        # only keys sharing the common prefix of both bounds can fall in the range
+        candidates = await self._keys_with_prefix(os.path.commonprefix([start_key, end_key]))
+        keys = [key for key in candidates if start_key <= key < end_key]
+        if keys:
+            await self.redis.delete(*keys)
+
+    async def scan(
+        self,
+        prefix: str,
+        with_keys: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> KVScanResult:
+        keys = await self._keys_with_prefix(self._namespaced_key(prefix))
+        if cursor is not None:
+            cursor = self._namespaced_key(cursor)
+            keys = [key for key in keys if key > cursor]
+
+        next_cursor = None
+        if limit is not None and len(keys) > limit:
+            keys = keys[:limit]
+            next_cursor = self._strip_namespace(keys[-1])
+
+        values = await self.redis.mget(keys) if keys else []
+        # keys may expire between SCAN and MGET
+        pairs = [(key, self._decode(value)) for key, value in zip(keys, values, strict=True) if value is not None]
+        return KVScanResult(
+            values=[value for _, value in pairs],
+            keys=[self._strip_namespace(key) for key, _ in pairs] if with_keys else None,
+            cursor=next_cursor,
+        )
@@ -4,25 +4,234 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
+import asyncio
 import os
+import sqlite3
+import threading
+import time
 from datetime import datetime
-from typing import List, Optional
+from queue import Empty, SimpleQueue
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-import aiosqlite
-
-from ..api import KVStore
+from ..api import KVScanResult, KVStore, prefix_upper_bound
 from ..config import SqliteKVStoreConfig
 
+# upper bound on the number of queued operations applied in one group commit
+MAX_BATCH_SIZE = 256
+
+# stay well below SQLITE_MAX_VARIABLE_NUMBER on older sqlite builds
+MAX_QUERY_PARAMS = 500
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+]
+
+_STOP = object()
+
+
+def _resolve(future: asyncio.Future, result: Any = None, exc: Optional[BaseException] = None) -> None:
+    def _set():
+        if future.done():
+            return
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    try:
+        future.get_loop().call_soon_threadsafe(_set)
+    except RuntimeError:
+        # the submitting event loop has been closed; nobody is waiting for this result
+        pass
+
+
+class _SqliteWorker:
+    """A sqlite3 connection confined to a dedicated thread.
+
+    Operations can be submitted from any event loop and are resolved on the loop that
+    submitted them. Writes which queue up while a previous batch is executing are
+    applied in a single transaction and share one commit, each inside its own savepoint
+    so that a failing write does not affect the others.
+    """
+
+    def __init__(self, db_path: str, name: str):
+        self.db_path = db_path
+        self._queue: SimpleQueue = SimpleQueue()
+        self._closed = False
+        self._error: Optional[Exception] = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    async def execute(self, fn: Callable[[sqlite3.Connection], Any], write: bool = False) -> Any:
+        if self._closed:
+            raise RuntimeError(f"sqlite connection to {self.db_path} is closed")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put((future, fn, write))
+        return await future
+
+    def close(self) -> None:
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+        except Exception as e:
+            self._error = e
+            return
+        finally:
+            self._ready.set()
+
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < MAX_BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except Empty:
+                        break
+
+                stop = _STOP in batch
+                if stop:
+                    batch = batch[: batch.index(_STOP)]
+                self._process(conn, batch)
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _process(self, conn: sqlite3.Connection, batch: List[Tuple[asyncio.Future, Callable, bool]]) -> None:
+        committed = []
+        in_transaction = False
+        for future, fn, write in batch:
+            if not write:
+                try:
+                    _resolve(future, fn(conn))
+                except Exception as e:
+                    _resolve(future, exc=e)
+                continue
+
+            try:
+                if not in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                    in_transaction = True
+                conn.execute("SAVEPOINT kvstore_write")
+                try:
+                    result = fn(conn)
+                except Exception:
+                    conn.execute("ROLLBACK TO kvstore_write")
+                    raise
+                finally:
+                    conn.execute("RELEASE kvstore_write")
+            except Exception as e:
+                _resolve(future, exc=e)
+            else:
+                committed.append((future, result))
+
+        if not in_transaction:
+            return
+        try:
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for future, _ in committed:
+                _resolve(future, exc=e)
+            return
+        for future, result in committed:
+            _resolve(future, result)
+
+
+class _SqlitePool:
+    """One writer and one reader connection to a database file.
+
+    In WAL mode readers never block the writer (and vice versa), and since a write is
+    only acknowledged after its commit, reads always observe acknowledged writes.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.refcount = 0
+        self.writer = _SqliteWorker(db_path, name=f"kvstore-writer:{db_path}")
+        if db_path == ":memory:":
+            # separate connections to an in-memory database see different databases
+            self.reader = self.writer
+        else:
+            self.reader = _SqliteWorker(db_path, name=f"kvstore-reader:{db_path}")
+        self.inode = _inode(db_path)
+
+    def close(self) -> None:
+        self.writer.close()
+        if self.reader is not self.writer:
+            self.reader.close()
+
+
+def _inode(db_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(db_path)
+    except (FileNotFoundError, ValueError):
+        return None
+    return st.st_dev, st.st_ino
+
+
+_pools: Dict[str, _SqlitePool] = {}
+_pools_lock = threading.Lock()
+
+
+def _acquire_pool(db_path: str) -> _SqlitePool:
+    key = db_path if db_path == ":memory:" else os.path.realpath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None and key != ":memory:" and pool.inode != _inode(key):
+            # the file was removed or replaced underneath us; close the stale connections
+            # so their WAL files do not leak into the new database
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = _SqlitePool(key)
+            _pools[key] = pool
+        pool.refcount += 1
+        return pool
+
+
+def _release_pool(pool: _SqlitePool) -> None:
+    with _pools_lock:
+        pool.refcount -= 1
+        if pool.refcount > 0:
+            return
+        if _pools.get(pool.db_path) is pool:
+            del _pools[pool.db_path]
+    pool.close()
+
+
+def _expiration_timestamp(expiration: Optional[datetime]) -> Optional[float]:
+    # naive datetimes are interpreted as local time, matching the redis backend
+    return expiration.timestamp() if expiration else None
+
 
 class SqliteKVStoreImpl(KVStore):
     def __init__(self, config: SqliteKVStoreConfig):
         self.db_path = config.db_path
         self.table_name = "kvstore"
+        self.pool: Optional[_SqlitePool] = None
 
     async def initialize(self):
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
+        self.pool = await asyncio.to_thread(_acquire_pool, self.db_path)
+
+        def create_table(conn: sqlite3.Connection) -> None:
+            conn.execute(
                 f"""
                 CREATE TABLE IF NOT EXISTS {self.table_name} (
                     key TEXT PRIMARY KEY,
@@ -31,38 +240,154 @@ class SqliteKVStoreImpl(KVStore):
                 )
             """
             )
-            await db.commit()
+            conn.execute(f"DELETE FROM {self.table_name} WHERE expiration <= ?", (time.time(),))
+
+        await self.pool.writer.execute(create_table, write=True)
+
+    async def shutdown(self) -> None:
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await asyncio.to_thread(_release_pool, pool)
 
     async def set(self, key: str, value: str, expiration: Optional[datetime] = None) -> None:
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
+        params = (key, value, _expiration_timestamp(expiration))
+        await self.pool.writer.execute(
+            lambda conn: conn.execute(
                 f"INSERT OR REPLACE INTO {self.table_name} (key, value, expiration) VALUES (?, ?, ?)",
-                (key, value, expiration),
-            )
-            await db.commit()
+                params,
+            ),
+            write=True,
+        )
 
     async def get(self, key: str) -> Optional[str]:
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(f"SELECT value, expiration FROM {self.table_name} WHERE key = ?", (key,)) as cursor:
-                row = await cursor.fetchone()
-                if row is None:
-                    return None
-                value, expiration = row
-                return value
+        params = (key, time.time())
+
+        def fetch(conn: sqlite3.Connection) -> Optional[str]:
+            row = conn.execute(
+                f"SELECT value FROM {self.table_name} WHERE key = ? AND (expiration IS NULL OR expiration > ?)",
+                params,
+            ).fetchone()
+            return row[0] if row else None
+
+        return await self.pool.reader.execute(fetch)
 
     async def delete(self, key: str) -> None:
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(f"DELETE FROM {self.table_name} WHERE key = ?", (key,))
-            await db.commit()
+        await self.pool.writer.execute(
+            lambda conn: conn.execute(f"DELETE FROM {self.table_name} WHERE key = ?", (key,)),
+            write=True,
+        )
 
     async def range(self, start_key: str, end_key: str) -> List[str]:
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                f"SELECT key, value, expiration FROM {self.table_name} WHERE key >= ? AND key <= ?",
+        params = (start_key, end_key, time.time())
+
+        def fetch(conn: sqlite3.Connection) -> List[str]:
+            rows = conn.execute(
+                f"""
+                SELECT value FROM {self.table_name}
+                WHERE key >= ? AND key <= ? AND (expiration IS NULL OR expiration > ?)
+                """,
+                params,
+            ).fetchall()
+            return [row[0] for row in rows]
+
+        return await self.pool.reader.execute(fetch)
+
+    async def multi_get(self, keys: List[str]) -> List[Optional[str]]:
+        now = time.time()
+
+        def fetch(conn: sqlite3.Connection) -> List[Optional[str]]:
+            found: Dict[str, str] = {}
+            # read all chunks from a single snapshot
+            conn.execute("BEGIN")
+            try:
+                for i in range(0, len(keys), MAX_QUERY_PARAMS):
+                    chunk = keys[i : i + MAX_QUERY_PARAMS]
+                    rows = conn.execute(
+                        f"""
+                        SELECT key, value FROM {self.table_name}
+                        WHERE key IN ({",".join("?" * len(chunk))}) AND (expiration IS NULL OR expiration > ?)
+                        """,
+                        (*chunk, now),
+                    )
+                    found.update(rows)
+            finally:
+                conn.execute("COMMIT")
+            return [found.get(key) for key in keys]
+
+        if not keys:
+            return []
+        return await self.pool.reader.execute(fetch)
+
+    async def multi_set(self, items: Dict[str, str], expiration: Optional[datetime] = None) -> None:
+        expires_at = _expiration_timestamp(expiration)
+        params = [(key, value, expires_at) for key, value in items.items()]
+        if not params:
+            return
+        # a single write operation runs inside its own savepoint, so this is all-or-nothing
+        await self.pool.writer.execute(
+            lambda conn: conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table_name} (key, value, expiration) VALUES (?, ?, ?)",
+                params,
+            ),
+            write=True,
+        )
+
+    async def compare_and_set(self, key: str, expected: Optional[str], value: str) -> bool:
+        now = time.time()
+
+        def swap(conn: sqlite3.Connection) -> bool:
+            # writes run in an IMMEDIATE transaction, so no other writer can change the key in between
+            row = conn.execute(
+                f"SELECT value FROM {self.table_name} WHERE key = ? AND (expiration IS NULL OR expiration > ?)",
+                (key, now),
+            ).fetchone()
+            if (row[0] if row else None) != expected:
+                return False
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table_name} (key, value, expiration) VALUES (?, ?, NULL)",
+                (key, value),
+            )
+            return True
+
+        return await self.pool.writer.execute(swap, write=True)
+
+    async def delete_range(self, start_key: str, end_key: str) -> None:
+        await self.pool.writer.execute(
+            lambda conn: conn.execute(
+                f"DELETE FROM {self.table_name} WHERE key >= ? AND key < ?",
                 (start_key, end_key),
-            ) as cursor:
-                result = []
-                async for row in cursor:
-                    _, value, _ = row
-                    result.append(value)
-                return result
+            ),
+            write=True,
+        )
+
+    async def scan(
+        self,
+        prefix: str,
+        with_keys: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> KVScanResult:
+        conditions = ["key >= ?", "(expiration IS NULL OR expiration > ?)"]
+        params: List[Any] = [prefix, time.time()]
+        if (upper := prefix_upper_bound(prefix)) is not None:
+            conditions.append("key < ?")
+            params.append(upper)
+        if cursor is not None:
+            conditions.append("key > ?")
+            params.append(cursor)
+        query = f"SELECT key, value FROM {self.table_name} WHERE {' AND '.join(conditions)} ORDER BY key"
+        if limit is not None:
+            # fetch one extra row to find out whether there is another page
+            query += " LIMIT ?"
+            params.append(limit + 1)
+
+        rows = await self.pool.reader.execute(lambda conn: conn.execute(query, params).fetchall())
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1][0]
+        return KVScanResult(
+            values=[value for _, value in rows],
+            keys=[key for key, _ in rows] if with_keys else None,
+            cursor=next_cursor,
+        )
@@ -0,0 +1,35 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+# limits for a single embeddings request made while inserting chunks
+EMBEDDING_BATCH_SIZE = 128
+EMBEDDING_BATCH_MAX_TOKENS = 32768
+EMBEDDING_MAX_CONCURRENCY = 4
+
+
+class EmbeddingBatchingConfig(BaseModel):
+    """How chunks are split into embeddings requests when they are inserted into a vector DB."""
+
+    batch_size: int = Field(
+        default=EMBEDDING_BATCH_SIZE,
+        ge=1,
+        description="Maximum number of chunks in a single embeddings request",
+    )
+    max_batch_tokens: Optional[int] = Field(
+        default=EMBEDDING_BATCH_MAX_TOKENS,
+        ge=1,
+        description="Maximum number of tokens in a single embeddings request, or null for no limit. "
+        "A chunk larger than this is embedded on its own",
+    )
+    max_concurrency: int = Field(
+        default=EMBEDDING_MAX_CONCURRENCY,
+        ge=1,
+        description="Maximum number of embeddings requests in flight for a single insert",
+    )
@@ -0,0 +1,111 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from llama_stack.apis.inference import Inference
+
+# sized for query strings; one 4096-d embedding is 16KiB
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = 600
+
+CacheKey = Tuple[str, str]
+
+
+class EmbeddingCache:
+    """LRU cache of embeddings keyed on (embedding model, text), with entries expiring after a TTL.
+
+    Concurrent lookups of a key that is not cached yet share a single embedding call.
+    Cached vectors are read-only and shared between callers.
+    """
+
+    def __init__(
+        self, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE, ttl_seconds: float = QUERY_EMBEDDING_CACHE_TTL_SECONDS
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[CacheKey, Tuple[float, NDArray]] = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model: str, text: str) -> Optional[NDArray]:
+        key = (model, text)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, vector = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return vector
+
+    def put(self, model: str, text: str, vector: NDArray) -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        key = (model, text)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_compute(self, model: str, text: str, compute: Callable[[], Awaitable[NDArray]]) -> NDArray:
+        vector = self.get(model, text)
+        if vector is not None:
+            self.hits += 1
+            return vector
+
+        key = (model, text)
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        # futures are bound to their loop; callers on other loops compute their own
+        if inflight is not None and inflight.get_loop() is loop:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            vector = np.array(await compute(), dtype=np.float32)
+            vector.setflags(write=False)
+            self.put(model, text, vector)
+            future.set_result(vector)
+            return vector
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # the exception is re-raised here; don't also report it as never retrieved
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+
+query_embedding_cache = EmbeddingCache()
+
+
+async def embed_query_cached(inference_api: Inference, model: str, text: str) -> NDArray:
+    """Embed a query string with `model`, served from the process-wide query embedding cache."""
+
+    async def compute() -> NDArray:
+        response = await inference_api.embeddings(model, [text])
+        return response.embeddings[0]
+
+    return await query_embedding_cache.get_or_compute(model, text, compute)
@@ -3,13 +3,14 @@
 #
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
+import asyncio
 import base64
 import io
 import logging
 import re
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from urllib.parse import unquote
 
 import httpx
@@ -29,9 +30,14 @@ from llama_stack.providers.datatypes import Api
 from llama_stack.providers.utils.inference.prompt_adapter import (
     interleaved_content_as_str,
 )
+from llama_stack.providers.utils.memory.config import EmbeddingBatchingConfig
+from llama_stack.providers.utils.memory.embedding_cache import embed_query_cached
 
 log = logging.getLogger(__name__)
 
+# called with (chunks inserted so far, total chunks)
+InsertProgressCallback = Callable[[int, int], None]
+
 
 def parse_pdf(data: bytes) -> str:
     # For PDF and DOC/DOCX files, we can't reliably convert to string
@@ -114,31 +120,56 @@ def concat_interleaved_content(content: List[InterleavedContent]) -> Interleaved
     return ret
 
 
-async def content_from_doc(doc: RAGDocument) -> str:
+@dataclass
+class FetchedDocument:
+    """The raw content of a RAGDocument, with any remote URL already downloaded.
+
+    Exactly one of `data_url`, `pdf_bytes` and `text` is set. Extracting the text from it
+    does no I/O, so it can be done in another process.
+    """
+
+    document_id: str
+    data_url: Optional[str] = None
+    pdf_bytes: Optional[bytes] = None
+    text: Optional[str] = None
+
+
+async def fetch_document(doc: RAGDocument, client: Optional[httpx.AsyncClient] = None) -> FetchedDocument:
     if isinstance(doc.content, URL):
-        if doc.content.uri.startswith("data:"):
-            return content_from_data(doc.content.uri)
-        else:
-            async with httpx.AsyncClient() as client:
-                r = await client.get(doc.content.uri)
-            if doc.mime_type == "application/pdf":
-                return parse_pdf(r.content)
-            else:
-                return r.text
-
-    pattern = re.compile("^(https?://|file://|data:)")
-    if pattern.match(doc.content):
-        if doc.content.startswith("data:"):
-            return content_from_data(doc.content)
-        else:
-            async with httpx.AsyncClient() as client:
-                r = await client.get(doc.content)
-            if doc.mime_type == "application/pdf":
-                return parse_pdf(r.content)
-            else:
-                return r.text
+        uri = doc.content.uri
+    elif re.match("^(https?://|file://|data:)", doc.content):
+        uri = doc.content
+    else:
+        return FetchedDocument(document_id=doc.document_id, text=interleaved_content_as_str(doc.content))
+
+    if uri.startswith("data:"):
+        return FetchedDocument(document_id=doc.document_id, data_url=uri)
+
+    if client is None:
+        async with httpx.AsyncClient() as client:
+            r = await client.get(uri)
+    else:
+        r = await client.get(uri)
+    if doc.mime_type == "application/pdf":
+        return FetchedDocument(document_id=doc.document_id, pdf_bytes=r.content)
+    return FetchedDocument(document_id=doc.document_id, text=r.text)
+
+
+def content_from_fetched(fetched: FetchedDocument) -> str:
+    if fetched.data_url is not None:
+        return content_from_data(fetched.data_url)
+    if fetched.pdf_bytes is not None:
+        return parse_pdf(fetched.pdf_bytes)
+    return fetched.text
+
 
-    return interleaved_content_as_str(doc.content)
+def chunk_fetched_document(fetched: FetchedDocument, window_len: int, overlap_len: int) -> List[Chunk]:
+    """Parse a fetched document and split it into chunks. CPU bound; meant to run in a worker process."""
+    return make_overlapped_chunks(fetched.document_id, content_from_fetched(fetched), window_len, overlap_len)
+
+
+async def content_from_doc(doc: RAGDocument, client: Optional[httpx.AsyncClient] = None) -> str:
+    return content_from_fetched(await fetch_document(doc, client))
 
 
 def make_overlapped_chunks(document_id: str, text: str, window_len: int, overlap_len: int) -> List[Chunk]:
@@ -163,6 +194,34 @@ def make_overlapped_chunks(document_id: str, text: str, window_len: int, overlap
     return chunks
 
 
+def _chunk_token_count(chunk: Chunk) -> int:
+    token_count = chunk.metadata.get("token_count")
+    if isinstance(token_count, int):
+        return token_count
+    # rough estimate for chunks that were not produced by make_overlapped_chunks
+    return len(interleaved_content_as_str(chunk.content)) // 4 + 1
+
+
+def batch_chunks(chunks: List[Chunk], max_chunks: int, max_tokens: Optional[int] = None) -> Iterator[List[Chunk]]:
+    """Split chunks into consecutive batches of at most `max_chunks` chunks and `max_tokens` tokens.
+
+    A chunk that exceeds `max_tokens` on its own is put in a batch by itself.
+    """
+    if max_chunks < 1:
+        raise ValueError(f"max_chunks must be at least 1, got {max_chunks}")
+    batch: List[Chunk] = []
+    batch_tokens = 0
+    for chunk in chunks:
+        tokens = _chunk_token_count(chunk) if max_tokens is not None else 0
+        if batch and (len(batch) >= max_chunks or (max_tokens is not None and batch_tokens + tokens > max_tokens)):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(chunk)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
 class EmbeddingIndex(ABC):
     @abstractmethod
     async def add_chunks(self, chunks: List[Chunk], embeddings: NDArray):
@@ -182,29 +241,85 @@ class VectorDBWithIndex:
     vector_db: VectorDB
     index: EmbeddingIndex
     inference_api: Api.inference
+    batching: EmbeddingBatchingConfig = field(default_factory=EmbeddingBatchingConfig)
 
     async def insert_chunks(
         self,
         chunks: List[Chunk],
+        batch_size: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        progress_callback: Optional[InsertProgressCallback] = None,
     ) -> None:
-        embeddings_response = await self.inference_api.embeddings(
-            self.vector_db.embedding_model, [x.content for x in chunks]
-        )
-        embeddings = np.array(embeddings_response.embeddings)
-
-        await self.index.add_chunks(chunks, embeddings)
+        """Embed and insert chunks in batches.
+
+        `batch_size`, `max_batch_tokens` and `max_concurrency` default to the values in `batching`.
+        At most `max_concurrency` embedding requests are in flight at a time, and each batch is
+        written to the index as soon as it is embedded, so only a few batches of embeddings are
+        held in memory at once. Batches may be written in a different order than `chunks`.
+        """
+        if batch_size is None:
+            batch_size = self.batching.batch_size
+        if max_batch_tokens is None:
+            max_batch_tokens = self.batching.max_batch_tokens
+        if max_concurrency is None:
+            max_concurrency = self.batching.max_concurrency
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        batches = batch_chunks(chunks, batch_size, max_batch_tokens)
+        total = len(chunks)
+        inserted = 0
+        # indexes are not safe for concurrent writes
+        write_lock = asyncio.Lock()
+
+        async def worker():
+            nonlocal inserted
+            for batch in batches:
+                embeddings_response = await self.inference_api.embeddings(
+                    self.vector_db.embedding_model, [x.content for x in batch]
+                )
+                embeddings = np.asarray(embeddings_response.embeddings, dtype=np.float32)
+                del embeddings_response
+                async with write_lock:
+                    await self.index.add_chunks(batch, embeddings)
+                inserted += len(batch)
+                log.debug(f"Inserted {inserted}/{total} chunks into vector db {self.vector_db.identifier}")
+                if progress_callback is not None:
+                    progress_callback(inserted, total)
+
+        workers = [asyncio.create_task(worker()) for _ in range(max_concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
     async def query_chunks(
         self,
         query: InterleavedContent,
         params: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> QueryChunksResponse:
         if params is None:
             params = {}
         k = params.get("max_chunks", 3)
         score_threshold = params.get("score_threshold", 0.0)
 
-        query_str = interleaved_content_as_str(query)
-        embeddings_response = await self.inference_api.embeddings(self.vector_db.embedding_model, [query_str])
-        query_vector = np.array(embeddings_response.embeddings[0], dtype=np.float32)
+        query_vector = await self.embed_query(query, query_embedding)
         return await self.index.query(query_vector, k, score_threshold)
+
+    async def embed_query(
+        self,
+        query: InterleavedContent,
+        query_embedding: Optional[List[float]] = None,
+    ) -> NDArray:
+        if query_embedding is not None:
+            if len(query_embedding) != self.vector_db.embedding_dimension:
+                raise ValueError(
+                    f"Query embedding dimension mismatch. Expected {self.vector_db.embedding_dimension}, "
+                    f"got {len(query_embedding)}"
+                )
+            return np.array(query_embedding, dtype=np.float32)
+        query_str = interleaved_content_as_str(query)
+        return await embed_query_cached(self.inference_api, self.vector_db.embedding_model, query_str)
@@ -0,0 +1,333 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+"""In-process metrics, rendered in the Prometheus text format by the server's `/metrics` endpoint.
+
+Metrics are aggregated in memory and never go through the telemetry event queue. Every thread
+updates its own shard of a metric, so recording a value takes no lock; shards are only summed
+when the metrics are rendered.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKENS_PER_SECOND_BUCKETS = (1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500, 1000)
+
+
+class _Sharded:
+    """Keeps one shard per thread. Shards are created once per thread; appending to a list is atomic."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+
+    def _new_shard(self):
+        raise NotImplementedError
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = self._new_shard()
+            self._shards.append(shard)
+        return shard
+
+
+class _HistogramShard:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, num_buckets: int):
+        # the last slot counts observations above the largest bucket
+        self.counts = [0] * (num_buckets + 1)
+        self.sum = 0.0
+
+
+class HistogramChild(_Sharded):
+    def __init__(self, buckets: Tuple[float, ...]):
+        super().__init__()
+        self._buckets = buckets
+
+    def _new_shard(self):
+        return _HistogramShard(len(self._buckets))
+
+    def observe(self, value: float) -> None:
+        shard = self._shard()
+        shard.counts[bisect.bisect_left(self._buckets, value)] += 1
+        shard.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Returns the cumulative count of each bucket (the last one is +Inf) and the sum of all observations."""
+        counts = [0] * (len(self._buckets) + 1)
+        total = 0.0
+        for shard in list(self._shards):
+            for i, count in enumerate(shard.counts):
+                counts[i] += count
+            total += shard.sum
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        return counts, total
+
+
+class _GaugeShard:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+
+class GaugeChild(_Sharded):
+    def _new_shard(self):
+        return _GaugeShard()
+
+    def inc(self, amount: float = 1) -> None:
+        self._shard().value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self._shard().value -= amount
+
+    @contextmanager
+    def track_in_progress(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def value(self) -> float:
+        return sum(shard.value for shard in list(self._shards))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str, **labels: str):
+        if labels:
+            values = tuple(labels[name] for name in self.label_names)
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            # setdefault is atomic, so concurrent callers end up sharing one child
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _label_string(self, values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.label_names, values, strict=True))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+        for values, child in sorted(self._children.copy().items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        raise NotImplementedError
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def labels(self, *values: str, **labels: str) -> HistogramChild:
+        return super().labels(*values, **labels)
+
+    def _render_child(self, values, child: HistogramChild) -> List[str]:
+        counts, total = child.snapshot()
+        lines = []
+        for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+            le = "+Inf" if bound == math.inf else _format_number(bound)
+            lines.append(f"{self.name}_bucket{self._label_string(values, ('le', le))} {count}")
+        labels = self._label_string(values)
+        lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+        lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def labels(self, *values: str, **labels: str) -> GaugeChild:
+        return super().labels(*values, **labels)
+
+    def _render_child(self, values, child: GaugeChild) -> List[str]:
+        return [f"{self.name}{self._label_string(values)} {_format_number(child.value())}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, description: str, label_names: Sequence[str] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, description, label_names, **kwargs))
+
+    def gauge(self, name: str, description: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, description, label_names))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "llama_stack_request_duration_seconds",
+    "Time to serve a request, until the last byte of the response is sent",
+    ("api", "route"),
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "llama_stack_requests_in_flight",
+    "Requests currently being served",
+    ("api",),
+)
+ROUTER_OVERHEAD = REGISTRY.histogram(
+    "llama_stack_router_overhead_seconds",
+    "Time spent in a router outside of the provider call: resource lookup, validation and token counting",
+    ("api", "method"),
+)
+PROVIDER_LATENCY = REGISTRY.histogram(
+    "llama_stack_provider_latency_seconds",
+    "Time spent in a provider call, until its response is complete",
+    ("api", "method", "provider_id"),
+)
+TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "llama_stack_time_to_first_token_seconds",
+    "Time from calling a provider until it streams the first chunk",
+    ("model_id", "provider_id"),
+)
+INTER_TOKEN_LATENCY = REGISTRY.histogram(
+    "llama_stack_inter_token_latency_seconds",
+    "Time between consecutive streamed chunks",
+    ("model_id", "provider_id"),
+)
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "llama_stack_tokens_per_second",
+    "Completion tokens generated per second of provider time",
+    ("model_id", "provider_id"),
+    buckets=TOKENS_PER_SECOND_BUCKETS,
+)
+KVSTORE_OP_LATENCY = REGISTRY.histogram(
+    "llama_stack_kvstore_operation_duration_seconds",
+    "Latency of key-value store operations",
+    ("store", "operation"),
+)
+VECTOR_QUERY_LATENCY = REGISTRY.histogram(
+    "llama_stack_vector_query_duration_seconds",
+    "Latency of vector database queries",
+    ("provider_id",),
+)
+SHIELD_LATENCY = REGISTRY.histogram(
+    "llama_stack_shield_duration_seconds",
+    "Latency of safety shield runs",
+    ("shield_id", "provider_id"),
+)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def record_generation(
+    method: str,
+    model_id: str,
+    provider_id: str,
+    elapsed: float,
+    completion_tokens: Optional[int],
+) -> None:
+    """Records the latency and throughput of a non-streaming inference call."""
+    PROVIDER_LATENCY.labels("inference", method, provider_id).observe(elapsed)
+    if completion_tokens and elapsed > 0:
+        TOKENS_PER_SECOND.labels(model_id, provider_id).observe(completion_tokens / elapsed)
+
+
+class TokenStreamTimer:
+    """Records time-to-first-token, inter-token latency, provider latency and tokens/s of one streamed response."""
+
+    def __init__(self, method: str, model_id: str, provider_id: str):
+        self._provider_latency = PROVIDER_LATENCY.labels("inference", method, provider_id)
+        self._time_to_first_token = TIME_TO_FIRST_TOKEN.labels(model_id, provider_id)
+        self._inter_token_latency = INTER_TOKEN_LATENCY.labels(model_id, provider_id)
+        self._tokens_per_second = TOKENS_PER_SECOND.labels(model_id, provider_id)
+        self.start = time.perf_counter()
+        self._last_token = None
+
+    def token(self) -> None:
+        now = time.perf_counter()
+        if self._last_token is None:
+            self._time_to_first_token.observe(now - self.start)
+        else:
+            self._inter_token_latency.observe(now - self._last_token)
+        self._last_token = now
+
+    def finish(self, completion_tokens: Optional[int] = None, end: Optional[float] = None) -> None:
+        elapsed = (end or time.perf_counter()) - self.start
+        self._provider_latency.observe(elapsed)
+        if completion_tokens and elapsed > 0:
+            self._tokens_per_second.observe(completion_tokens / elapsed)
@@ -6,7 +6,7 @@
 
 import json
 from datetime import datetime
-from typing import Dict, List, Optional, Protocol
+from typing import Dict, List, Optional, Protocol, Tuple
 
 import aiosqlite
 
@@ -29,6 +29,49 @@ class TraceStore(Protocol):
         max_depth: Optional[int] = None,
     ) -> Dict[str, SpanWithStatus]: ...
 
+    async def query_spans(
+        self,
+        attribute_filters: Optional[List[QueryCondition]] = None,
+        attributes_to_return: Optional[List[str]] = None,
+        max_depth: Optional[int] = None,
+        cursor: Optional[str] = None,
+        page_size: int = 100,
+    ) -> Tuple[List[Span], Optional[str]]: ...
+
+
+def _json_path(key: str) -> str:
+    # quoted, so that keys with dots such as "service.name" are not read as nested objects
+    return '$."' + key.replace('"', '\\"') + '"'
+
+
+def _attribute_filter_clause(attribute_filters: Optional[List[QueryCondition]]) -> Tuple[str, list]:
+    """A condition on `t.trace_id` that holds for the traces with a span matching all the filters.
+
+    The filters are looked up in the span_attributes table through idx_span_attributes_key_value.
+    """
+    if not attribute_filters:
+        return "", []
+
+    ops_map = {"eq": "=", "ne": "!=", "gt": ">", "lt": "<"}
+    joins = []
+    params = []
+    for i, condition in enumerate(attribute_filters[1:], start=1):
+        joins.append(
+            f"JOIN span_attributes a{i} ON a{i}.span_id = a0.span_id"
+            f" AND a{i}.key = ? AND a{i}.value {ops_map[condition.op.value]} ?"
+        )
+        params.extend([condition.key, condition.value])
+    first = attribute_filters[0]
+    params.extend([first.key, first.value])
+    clause = f"""t.trace_id IN (
+        SELECT s.trace_id
+        FROM span_attributes a0
+        {" ".join(joins)}
+        JOIN spans s ON s.span_id = a0.span_id
+        WHERE a0.key = ? AND a0.value {ops_map[first.op.value]} ?
+    )"""
+    return clause, params
+
 
 class SQLiteTraceStore(TraceStore):
     def __init__(self, conn_string: str):
@@ -41,20 +84,6 @@ class SQLiteTraceStore(TraceStore):
         offset: Optional[int] = 0,
         order_by: Optional[List[str]] = None,
     ) -> List[Trace]:
-        def build_where_clause() -> tuple[str, list]:
-            if not attribute_filters:
-                return "", []
-
-            ops_map = {"eq": "=", "ne": "!=", "gt": ">", "lt": "<"}
-
-            conditions = [
-                f"json_extract(s.attributes, '$.{condition.key}') {ops_map[condition.op.value]} ?"
-                for condition in attribute_filters
-            ]
-            params = [condition.value for condition in attribute_filters]
-            where_clause = " WHERE " + " AND ".join(conditions)
-            return where_clause, params
-
         def build_order_clause() -> str:
             if not order_by:
                 return ""
@@ -68,27 +97,16 @@ class SQLiteTraceStore(TraceStore):
 
         # Build the main query
         base_query = """
-            WITH matching_traces AS (
-                SELECT DISTINCT t.trace_id
-                FROM traces t
-                JOIN spans s ON t.trace_id = s.trace_id
-                {where_clause}
-            ),
-            filtered_traces AS (
-                SELECT t.trace_id, t.root_span_id, t.start_time, t.end_time
-                FROM matching_traces mt
-                JOIN traces t ON mt.trace_id = t.trace_id
-                LEFT JOIN spans s ON t.trace_id = s.trace_id
-                {order_clause}
-            )
-            SELECT DISTINCT trace_id, root_span_id, start_time, end_time
-            FROM filtered_traces
+            SELECT t.trace_id, t.root_span_id, t.start_time, t.end_time
+            FROM traces t
+            {where_clause}
+            {order_clause}
             LIMIT {limit} OFFSET {offset}
         """
 
-        where_clause, params = build_where_clause()
+        filter_clause, params = _attribute_filter_clause(attribute_filters)
         query = base_query.format(
-            where_clause=where_clause,
+            where_clause=f"WHERE {filter_clause}" if filter_clause else "",
             order_clause=build_order_clause(),
             limit=limit,
             offset=offset,
@@ -165,6 +183,104 @@ class SQLiteTraceStore(TraceStore):
 
                 return spans_by_id
 
+    async def query_spans(
+        self,
+        attribute_filters: Optional[List[QueryCondition]] = None,
+        attributes_to_return: Optional[List[str]] = None,
+        max_depth: Optional[int] = None,
+        cursor: Optional[str] = None,
+        page_size: int = 100,
+    ) -> Tuple[List[Span], Optional[str]]:
+        """Returns the spans of the next `page_size` traces that match the filters, ordered by trace_id.
+
+        Only the spans within `max_depth` of the root of their trace, and that have every attribute
+        in `attributes_to_return`, are returned. Pass the returned cursor to get the next page; it is
+        None after the last page. Pages are found by trace_id (keyset pagination), so that a page costs
+        the same however deep into the results it is.
+        """
+        filter_clause, filter_params = _attribute_filter_clause(attribute_filters)
+        attributes_select = "s.attributes"
+        attributes_params = []
+        required_clause = ""
+        required_params = []
+        if attributes_to_return:
+            attributes_select = "json_object({})".format(
+                ", ".join("?, json_extract(s.attributes, ?)" for _ in attributes_to_return)
+            )
+            for key in attributes_to_return:
+                attributes_params.extend([key, _json_path(key)])
+            required_clause = "WHERE " + " AND ".join(
+                "json_extract(s.attributes, ?) IS NOT NULL" for _ in attributes_to_return
+            )
+            required_params = [_json_path(key) for key in attributes_to_return]
+
+        # traces of the page without a matching span still get a row, so that the cursor moves past them
+        query = f"""
+        WITH RECURSIVE page AS (
+            SELECT t.trace_id, t.root_span_id
+            FROM traces t
+            WHERE t.trace_id > ? AND t.root_span_id IS NOT NULL
+            {"AND " + filter_clause if filter_clause else ""}
+            ORDER BY t.trace_id
+            LIMIT ?
+        ),
+        span_tree(span_id, depth) AS (
+            SELECT root_span_id, 1 FROM page
+
+            UNION ALL
+
+            SELECT s.span_id, st.depth + 1
+            FROM spans s
+            JOIN span_tree st ON s.parent_span_id = st.span_id
+            WHERE (? IS NULL OR st.depth < ?)
+        ),
+        matching_spans AS (
+            SELECT s.*, st.depth, {attributes_select} AS filtered_attributes
+            FROM span_tree st
+            JOIN spans s ON s.span_id = st.span_id
+            {required_clause}
+        )
+        SELECT page.trace_id AS page_trace_id, m.*
+        FROM page
+        LEFT JOIN matching_spans m ON m.trace_id = page.trace_id
+        ORDER BY page.trace_id, m.depth, m.start_time
+        """
+        params = [
+            cursor or "",
+            *filter_params,
+            page_size,
+            max_depth,
+            max_depth,
+            *attributes_params,
+            *required_params,
+        ]
+
+        spans = []
+        page_traces = set()
+        last_trace_id = None
+        async with aiosqlite.connect(self.conn_string) as conn:
+            conn.row_factory = aiosqlite.Row
+            async with conn.execute(query, params) as rows:
+                async for row in rows:
+                    last_trace_id = row["page_trace_id"]
+                    page_traces.add(last_trace_id)
+                    if row["span_id"] is None:
+                        continue
+                    spans.append(
+                        Span(
+                            span_id=row["span_id"],
+                            trace_id=row["trace_id"],
+                            parent_span_id=row["parent_span_id"],
+                            name=row["name"],
+                            start_time=datetime.fromisoformat(row["start_time"]),
+                            end_time=datetime.fromisoformat(row["end_time"]),
+                            attributes=json.loads(row["filtered_attributes"]),
+                        )
+                    )
+
+        next_cursor = last_trace_id if len(page_traces) == page_size else None
+        return spans, next_cursor
+
     async def get_trace(self, trace_id: str) -> Trace:
         query = "SELECT * FROM traces WHERE trace_id = ?"
         async with aiosqlite.connect(self.conn_string) as conn:
@@ -5,33 +5,152 @@
 # the root directory of this source tree.
 
 import asyncio
+import fnmatch
 import inspect
 import json
 from functools import wraps
-from typing import Any, AsyncGenerator, Callable, Type, TypeVar
+from typing import Any, AsyncGenerator, Callable, Dict, Optional, Tuple, Type, TypeVar
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from llama_stack.models.llama.datatypes import Primitive
 
 T = TypeVar("T")
 
+# lists of numbers longer than this (embeddings, logprobs, ...) are summarized by their length
+MAX_NUMBERS_IN_LIST = 16
+
+
+class TraceCaptureConfig(BaseModel):
+    capture_args: bool = Field(
+        default=True,
+        description="Record the arguments of traced provider methods in their spans",
+    )
+    capture_output: bool = Field(
+        default=True,
+        description="Record the return value of traced provider methods in their spans",
+    )
+    max_attribute_bytes: Optional[int] = Field(
+        default=16384,
+        ge=64,
+        description="Span attributes longer than this are truncated; no limit if null",
+    )
+    method_overrides: Dict[str, bool] = Field(
+        default_factory=dict,
+        description="Turn capture of arguments and output on (true) or off (false) for the methods matching "
+        'a "Class.method" fnmatch pattern, e.g. {"*.embeddings": false}',
+    )
+
+
+CAPTURE_CONFIG = TraceCaptureConfig()
+_capture_by_method: Dict[Tuple[str, str], Tuple[bool, bool]] = {}
+
+
+def set_capture_config(config: TraceCaptureConfig) -> None:
+    global CAPTURE_CONFIG
+    CAPTURE_CONFIG = config
+    _capture_by_method.clear()
+
+
+def trace_capture(args: bool = True, output: bool = True) -> Callable[[Callable], Callable]:
+    """Decorate a protocol or provider method to choose whether its spans record arguments and output.
+
+    `method_overrides` in the telemetry config take precedence.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        method.__trace_capture__ = (args, output)
+        return method
+
+    return decorator
+
+
+def _capture_policy(class_name: str, method_name: str, declared: Optional[Tuple[bool, bool]]) -> Tuple[bool, bool]:
+    key = (class_name, method_name)
+    policy = _capture_by_method.get(key)
+    if policy is None:
+        qualified_name = f"{class_name}.{method_name}"
+        override = next(
+            (
+                enabled
+                for pattern, enabled in CAPTURE_CONFIG.method_overrides.items()
+                if fnmatch.fnmatchcase(qualified_name, pattern)
+            ),
+            None,
+        )
+        if override is not None:
+            policy = (override, override)
+        else:
+            args, output = declared or (True, True)
+            policy = (args and CAPTURE_CONFIG.capture_args, output and CAPTURE_CONFIG.capture_output)
+        _capture_by_method[key] = policy
+    return policy
+
+
+def _truncate(text: str, max_bytes: Optional[int]) -> str:
+    if max_bytes is None or len(text) <= max_bytes // 4:
+        return text
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    return encoded[:max_bytes].decode("utf-8", errors="ignore") + f"...<truncated {len(encoded) - max_bytes} bytes>"
+
 
 def serialize_value(value: Any) -> Primitive:
-    return str(_prepare_for_json(value))
+    return _truncate(str(_prepare_for_json(value)), CAPTURE_CONFIG.max_attribute_bytes)
+
+
+class LazyValue:
+    """A span attribute that is serialized only when its span is written out."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def resolve(self) -> Primitive:
+        try:
+            return serialize_value(self.value)
+        except Exception as e:
+            return f"<could not serialize {type(self.value).__name__}: {e}>"
+
+
+def _summarize_numbers(value: Any) -> Optional[str]:
+    if not value:
+        return None
+    first = value[0]
+    if isinstance(first, (int, float)) and not isinstance(first, bool) and len(value) > MAX_NUMBERS_IN_LIST:
+        return f"<{len(value)} numbers>"
+    if (
+        isinstance(first, (list, tuple))
+        and len(first) > MAX_NUMBERS_IN_LIST
+        and isinstance(first[0], (int, float))
+        and not isinstance(first[0], bool)
+    ):
+        return f"<{len(value)} vectors of dimension {len(first)}>"
+    return None
 
 
 def _prepare_for_json(value: Any) -> str:
-    """Serialize a single value into JSON-compatible format."""
+    """Serialize a single value into JSON-compatible format. Large binary and numeric values are summarized."""
     if value is None:
         return ""
     elif isinstance(value, (str, int, float, bool)):
         return value
     elif hasattr(value, "_name_"):
         return value._name_
+    elif isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    elif hasattr(value, "shape") and hasattr(value, "dtype"):
+        # numpy arrays and tensors
+        return f"<array of shape {tuple(value.shape)} and dtype {value.dtype}>"
     elif isinstance(value, BaseModel):
-        return json.loads(value.model_dump_json())
+        return {name: _prepare_for_json(field_value) for name, field_value in value}
     elif isinstance(value, (list, tuple, set)):
+        if isinstance(value, (list, tuple)):
+            summary = _summarize_numbers(value)
+            if summary is not None:
+                return summary
         return [_prepare_for_json(item) for item in value]
     elif isinstance(value, dict):
         return {str(k): _prepare_for_json(v) for k, v in value.items()}
@@ -49,38 +168,45 @@ def trace_protocol(cls: Type[T]) -> Type[T]:
     and its inheriting classes.
     """
 
-    def trace_method(method: Callable) -> Callable:
+    def trace_method(method: Callable, declared_capture: Optional[Tuple[bool, bool]] = None) -> Callable:
         is_async = asyncio.iscoroutinefunction(method)
         is_async_gen = inspect.isasyncgenfunction(method)
 
+        span_type = "async_generator" if is_async_gen else "async" if is_async else "sync"
+        param_names = list(inspect.signature(method).parameters.keys())[1:]  # Skip 'self'
+
         def create_span_context(self: Any, *args: Any, **kwargs: Any) -> tuple:
             class_name = self.__class__.__name__
             method_name = method.__name__
-            span_type = "async_generator" if is_async_gen else "async" if is_async else "sync"
-            sig = inspect.signature(method)
-            param_names = list(sig.parameters.keys())[1:]  # Skip 'self'
-            combined_args = {}
-            for i, arg in enumerate(args):
-                param_name = param_names[i] if i < len(param_names) else f"position_{i + 1}"
-                combined_args[param_name] = serialize_value(arg)
-            for k, v in kwargs.items():
-                combined_args[str(k)] = serialize_value(v)
+            capture_args, capture_output = _capture_policy(class_name, method_name, declared_capture)
 
             span_attributes = {
                 "__autotraced__": True,
                 "__class__": class_name,
                 "__method__": method_name,
                 "__type__": span_type,
-                "__args__": str(combined_args),
             }
+            if capture_args:
+                combined_args = {}
+                for i, arg in enumerate(args):
+                    param_name = param_names[i] if i < len(param_names) else f"position_{i + 1}"
+                    combined_args[param_name] = arg
+                for k, v in kwargs.items():
+                    combined_args[str(k)] = v
+                span_attributes["__args__"] = LazyValue(combined_args)
 
-            return class_name, method_name, span_attributes
+            return class_name, method_name, span_attributes, capture_output
 
         @wraps(method)
         async def async_gen_wrapper(self: Any, *args: Any, **kwargs: Any) -> AsyncGenerator:
             from llama_stack.providers.utils.telemetry import tracing
 
-            class_name, method_name, span_attributes = create_span_context(self, *args, **kwargs)
+            if not tracing.is_recording():
+                async for item in method(self, *args, **kwargs):
+                    yield item
+                return
+
+            class_name, method_name, span_attributes, _ = create_span_context(self, *args, **kwargs)
 
             with tracing.span(f"{class_name}.{method_name}", span_attributes) as span:
                 try:
@@ -95,12 +221,16 @@ def trace_protocol(cls: Type[T]) -> Type[T]:
         async def async_wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
             from llama_stack.providers.utils.telemetry import tracing
 
-            class_name, method_name, span_attributes = create_span_context(self, *args, **kwargs)
+            if not tracing.is_recording():
+                return await method(self, *args, **kwargs)
+
+            class_name, method_name, span_attributes, capture_output = create_span_context(self, *args, **kwargs)
 
             with tracing.span(f"{class_name}.{method_name}", span_attributes) as span:
                 try:
                     result = await method(self, *args, **kwargs)
-                    span.set_attribute("output", serialize_value(result))
+                    if capture_output:
+                        span.set_attribute("output", LazyValue(result))
                     return result
                 except Exception as e:
                     span.set_attribute("error", str(e))
@@ -110,12 +240,16 @@ def trace_protocol(cls: Type[T]) -> Type[T]:
         def sync_wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
             from llama_stack.providers.utils.telemetry import tracing
 
-            class_name, method_name, span_attributes = create_span_context(self, *args, **kwargs)
+            if not tracing.is_recording():
+                return method(self, *args, **kwargs)
+
+            class_name, method_name, span_attributes, capture_output = create_span_context(self, *args, **kwargs)
 
             with tracing.span(f"{class_name}.{method_name}", span_attributes) as span:
                 try:
                     result = method(self, *args, **kwargs)
-                    span.set_attribute("output", serialize_value(result))
+                    if capture_output:
+                        span.set_attribute("output", LazyValue(result))
                     return result
                 except Exception as e:
                     span.set_attribute("error", str(e))
@@ -136,7 +270,11 @@ def trace_protocol(cls: Type[T]) -> Type[T]:
 
         for name, method in vars(cls_child).items():
             if inspect.isfunction(method) and not name.startswith("_"):
-                setattr(cls_child, name, trace_method(method))  # noqa: B010
+                # a trace_capture() on the implementation wins over one on the protocol
+                declared_capture = getattr(method, "__trace_capture__", None) or getattr(
+                    getattr(cls, name, None), "__trace_capture__", None
+                )
+                setattr(cls_child, name, trace_method(method, declared_capture))  # noqa: B010
 
     cls.__init_subclass__ = classmethod(__init_subclass__)
 
@@ -6,15 +6,21 @@
 
 import asyncio
 import contextvars
+import fnmatch
 import logging
-import queue
 import random
 import threading
+import time
+from collections import deque
 from datetime import datetime, timezone
+from enum import Enum
 from functools import wraps
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field
 
 from llama_stack.apis.telemetry import (
+    Event,
     LogSeverity,
     Span,
     SpanEndPayload,
@@ -25,7 +31,12 @@ from llama_stack.apis.telemetry import (
     UnstructuredLogEvent,
 )
 from llama_stack.log import get_logger
-from llama_stack.providers.utils.telemetry.trace_protocol import serialize_value
+from llama_stack.providers.utils.telemetry.trace_protocol import (
+    LazyValue,
+    TraceCaptureConfig,
+    serialize_value,
+    set_capture_config,
+)
 
 logger = get_logger(__name__, category="core")
 
@@ -70,47 +81,294 @@ def generate_trace_id() -> str:
     return trace_id_to_str(trace_id)
 
 
+class DeferredEvent:
+    """A span event with LazyValue attributes, which are serialized only when the event is written."""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, **fields: Any):
+        self.fields = fields
+
+    def resolve(self) -> StructuredLogEvent:
+        attributes = {
+            key: value.resolve() if isinstance(value, LazyValue) else value
+            for key, value in self.fields["attributes"].items()
+        }
+        return StructuredLogEvent(**{**self.fields, "attributes": attributes})
+
+
+def resolve_event(event: Union[Event, DeferredEvent]) -> Event:
+    return event.resolve() if isinstance(event, DeferredEvent) else event
+
+
+def _span_event(span: Span, timestamp: datetime, payload: Any) -> Union[StructuredLogEvent, DeferredEvent]:
+    fields = dict(trace_id=span.trace_id, span_id=span.span_id, timestamp=timestamp, payload=payload)
+    attributes = span.attributes
+    if attributes and any(isinstance(value, LazyValue) for value in attributes.values()):
+        # snapshot the attributes that are set now; the values themselves are serialized later
+        return DeferredEvent(attributes=dict(attributes), **fields)
+    return StructuredLogEvent(attributes=attributes, **fields)
+
+
 CURRENT_TRACE_CONTEXT = contextvars.ContextVar("trace_context", default=None)
 BACKGROUND_LOGGER = None
+TRACE_SAMPLER = None
+
+
+class OverflowPolicy(str, Enum):
+    # discard the oldest queued event to make room for the new one
+    DROP_OLDEST = "drop_oldest"
+    # make the caller wait for room, up to block_timeout_seconds, then drop the new event
+    BLOCK = "block"
+    # once the queue is half full, admit new events with a probability that falls to zero as it fills up
+    SAMPLE = "sample"
+
+
+class BackgroundLoggerConfig(BaseModel):
+    capacity: int = Field(
+        default=10000,
+        ge=1,
+        description="Maximum number of telemetry events waiting to be written",
+    )
+    overflow_policy: OverflowPolicy = Field(
+        default=OverflowPolicy.DROP_OLDEST,
+        description="What to do with new events when the queue is full",
+    )
+    batch_size: int = Field(
+        default=500,
+        ge=1,
+        description="Maximum number of events written in one call to the telemetry API",
+    )
+    block_timeout_seconds: float = Field(
+        default=1.0,
+        ge=0,
+        description="How long the block overflow policy waits for room before dropping an event",
+    )
+
+
+# at most one "dropped events" warning is logged per interval
+DROPPED_EVENTS_WARNING_INTERVAL_SECONDS = 10.0
 
 
 class BackgroundLogger:
-    def __init__(self, api: Telemetry, capacity: int = 1000):
+    """Writes telemetry events to the telemetry API from a worker thread.
+
+    Events are queued without blocking the caller (unless the overflow policy is `block`).
+    The worker runs a single long-lived event loop and drains the queue in batches through
+    the API's `log_events`, falling back to `log_event` for APIs that don't have it.
+    """
+
+    def __init__(self, api: Telemetry, config: Optional[BackgroundLoggerConfig] = None):
         self.api = api
-        self.log_queue = queue.Queue(maxsize=capacity)
-        self.worker_thread = threading.Thread(target=self._process_logs, daemon=True)
+        self.config = config or BackgroundLoggerConfig()
+        self.log_queue: Deque[Event] = deque()
+        self.condition = threading.Condition()
+        self.in_progress = 0
+        self.processed_events = 0
+        self.failed_events = 0
+        self.dropped_events = 0
+        self._reported_dropped_events = 0
+        self._last_drop_warning = float("-inf")
+        self.worker_thread = threading.Thread(target=self._process_logs, name="telemetry-logger", daemon=True)
         self.worker_thread.start()
 
-    def log_event(self, event):
-        try:
-            self.log_queue.put_nowait(event)
-        except queue.Full:
-            logger.error("Log queue is full, dropping event")
+    def log_event(self, event: Event) -> None:
+        with self.condition:
+            if len(self.log_queue) >= self.config.capacity:
+                if not self._make_room():
+                    self.dropped_events += 1
+                    return
+            elif self.config.overflow_policy == OverflowPolicy.SAMPLE and not self._admit_sampled():
+                self.dropped_events += 1
+                return
+            self.log_queue.append(event)
+            self.condition.notify_all()
+
+    def _make_room(self) -> bool:
+        # called with the condition held and the queue full
+        if self.config.overflow_policy == OverflowPolicy.DROP_OLDEST:
+            self.log_queue.popleft()
+            self.dropped_events += 1
+            return True
+        if self.config.overflow_policy == OverflowPolicy.BLOCK and threading.current_thread() is not self.worker_thread:
+            return self.condition.wait_for(
+                lambda: len(self.log_queue) < self.config.capacity, timeout=self.config.block_timeout_seconds
+            )
+        return False
+
+    def _admit_sampled(self) -> bool:
+        low_watermark = self.config.capacity // 2
+        if len(self.log_queue) < low_watermark:
+            return True
+        room = (self.config.capacity - len(self.log_queue)) / (self.config.capacity - low_watermark)
+        return random.random() < room
+
+    def stats(self) -> Dict[str, int]:
+        with self.condition:
+            return {
+                "queued_events": len(self.log_queue),
+                "processed_events": self.processed_events,
+                "failed_events": self.failed_events,
+                "dropped_events": self.dropped_events,
+            }
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued event has been written. Returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.log_queue and not self.in_progress, timeout=timeout)
+
+    def _next_batch(self) -> List[Event]:
+        with self.condition:
+            self.condition.wait_for(lambda: self.log_queue)
+            batch_size = min(self.config.batch_size, len(self.log_queue))
+            batch = [self.log_queue.popleft() for _ in range(batch_size)]
+            self.in_progress = len(batch)
+            # wake up producers waiting for room
+            self.condition.notify_all()
+            return batch
+
+    async def _write_batch(self, batch: List[Event]) -> None:
+        batch = [resolve_event(event) for event in batch]
+        log_events = getattr(self.api, "log_events", None)
+        if log_events is not None:
+            await log_events(batch)
+            return
+        for event in batch:
+            await self.api.log_event(event)
 
     def _process_logs(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
         while True:
+            batch = self._next_batch()
+            failed = 0
             try:
-                event = self.log_queue.get()
-                # figure out how to use a thread's native loop
-                asyncio.run(self.api.log_event(event))
+                loop.run_until_complete(self._write_batch(batch))
             except Exception:
-                import traceback
+                failed = len(batch)
+                logger.exception(f"Error writing {len(batch)} telemetry events")
+            with self.condition:
+                self.processed_events += len(batch) - failed
+                self.failed_events += failed
+                self.in_progress = 0
+                self.condition.notify_all()
+            self._warn_dropped_events()
+
+    def _warn_dropped_events(self):
+        # logged from the worker thread: logging from log_event could recurse through TelemetryHandler
+        now = time.monotonic()
+        if now - self._last_drop_warning < DROPPED_EVENTS_WARNING_INTERVAL_SECONDS:
+            return
+        with self.condition:
+            dropped = self.dropped_events - self._reported_dropped_events
+            self._reported_dropped_events = self.dropped_events
+        if dropped:
+            self._last_drop_warning = now
+            logger.warning(
+                f"Telemetry event queue overflowed: dropped {dropped} events "
+                f"(capacity {self.config.capacity}, policy {self.config.overflow_policy.value})"
+            )
+
+
+class TraceSamplingConfig(BaseModel):
+    sample_rate: float = Field(
+        default=1.0,
+        ge=0,
+        le=1,
+        description="Fraction of requests that are traced, decided when the request starts",
+    )
+    route_sample_rates: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Sample rates for specific routes, overriding sample_rate. Keys are routes such as "
+        "/v1/inference/chat-completion and may contain fnmatch wildcards",
+    )
+    tail_sampling: bool = Field(
+        default=False,
+        description="Also record the requests that were not sampled, and keep their traces if they fail "
+        "or take longer than tail_latency_threshold_ms",
+    )
+    tail_latency_threshold_ms: Optional[float] = Field(
+        default=None,
+        ge=0,
+        description="Unsampled traces that take longer than this are kept when tail sampling is enabled",
+    )
+    tail_max_buffered_events: int = Field(
+        default=1000,
+        ge=1,
+        description="Maximum number of events held for an unsampled trace; later events are dropped",
+    )
+
+
+class TraceSampler:
+    """Decides which traces are recorded: up front by route (head sampling), and at the end by outcome (tail sampling)."""
+
+    def __init__(self, config: TraceSamplingConfig):
+        self.config = config
+        self._rates_by_route: Dict[str, float] = {}
+
+    def sample_rate(self, route: str) -> float:
+        rate = self._rates_by_route.get(route)
+        if rate is None:
+            rate = self.config.route_sample_rates.get(route)
+            if rate is None:
+                rate = next(
+                    (
+                        rate
+                        for pattern, rate in self.config.route_sample_rates.items()
+                        if fnmatch.fnmatchcase(route, pattern)
+                    ),
+                    self.config.sample_rate,
+                )
+            self._rates_by_route[route] = rate
+        return rate
 
-                traceback.print_exc()
-                print("Error processing log event")
-            finally:
-                self.log_queue.task_done()
+    def should_sample(self, route: str) -> bool:
+        rate = self.sample_rate(route)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
 
-    def __del__(self):
-        self.log_queue.join()
+    def should_keep(self, duration_seconds: float, error: bool) -> bool:
+        if error:
+            return True
+        threshold_ms = self.config.tail_latency_threshold_ms
+        return threshold_ms is not None and duration_seconds * 1000 >= threshold_ms
 
 
 class TraceContext:
-    spans: List[Span] = []
+    """The spans of one trace.
+
+    A context that is not `recording` was sampled out: it only carries ids, and no spans are
+    created or logged for it. A `buffered` context records its events in memory until the trace
+    ends, when the tail sampler decides whether to log them.
+    """
 
-    def __init__(self, logger: BackgroundLogger, trace_id: str):
+    def __init__(
+        self,
+        logger: BackgroundLogger,
+        trace_id: str,
+        recording: bool = True,
+        buffered: bool = False,
+        max_buffered_events: int = 1000,
+    ):
         self.logger = logger
         self.trace_id = trace_id
+        self.recording = recording
+        self.buffered = buffered
+        self.spans: List[Span] = []
+        # span id reported for metrics of traces that are not recorded
+        self.root_span_id: Optional[str] = None if recording else generate_span_id()
+        self.error = False
+        self.start_time = time.monotonic()
+        self.max_buffered_events = max_buffered_events
+        self.buffered_events: List[Event] = []
+        self.dropped_buffered_events = 0
+
+    def _log_event(self, event: Event):
+        if not self.buffered:
+            self.logger.log_event(event)
+        elif len(self.buffered_events) < self.max_buffered_events:
+            self.buffered_events.append(event)
+        else:
+            self.dropped_buffered_events += 1
 
     def push_span(self, name: str, attributes: Dict[str, Any] = None) -> Span:
         current_span = self.get_current_span()
@@ -122,14 +380,14 @@ class TraceContext:
             parent_span_id=current_span.span_id if current_span else None,
             attributes=attributes,
         )
-
-        self.logger.log_event(
-            StructuredLogEvent(
-                trace_id=span.trace_id,
-                span_id=span.span_id,
-                timestamp=span.start_time,
-                attributes=span.attributes,
-                payload=SpanStartPayload(
+        if self.root_span_id is None:
+            self.root_span_id = span.span_id
+
+        self._log_event(
+            _span_event(
+                span,
+                span.start_time,
+                SpanStartPayload(
                     name=span.name,
                     parent_span_id=span.parent_span_id,
                 ),
@@ -141,14 +399,14 @@ class TraceContext:
 
     def pop_span(self, status: SpanStatus = SpanStatus.OK):
         span = self.spans.pop()
+        if status == SpanStatus.ERROR:
+            self.error = True
         if span is not None:
-            self.logger.log_event(
-                StructuredLogEvent(
-                    trace_id=span.trace_id,
-                    span_id=span.span_id,
-                    timestamp=span.start_time,
-                    attributes=span.attributes,
-                    payload=SpanEndPayload(
+            self._log_event(
+                _span_event(
+                    span,
+                    span.start_time,
+                    SpanEndPayload(
                         status=status,
                     ),
                 )
@@ -157,27 +415,100 @@ class TraceContext:
     def get_current_span(self):
         return self.spans[-1] if self.spans else None
 
+    def log_event(self, event: Event):
+        """Log an event that belongs to this trace, such as a log line of the current span."""
+        self._log_event(event)
+
+    def finish(self, sampler: Optional[TraceSampler]):
+        """Called once the root span has ended: hand buffered events over if the trace is kept."""
+        if not self.buffered:
+            return
+        events, self.buffered_events = self.buffered_events, []
+        if sampler is None or not sampler.should_keep(time.monotonic() - self.start_time, self.error):
+            return
+        if self.dropped_buffered_events:
+            logger.warning(
+                f"Trace {self.trace_id} is kept by tail sampling but {self.dropped_buffered_events} of its "
+                f"events were dropped (tail_max_buffered_events={self.max_buffered_events})"
+            )
+        for event in events:
+            self.logger.log_event(event)
 
-def setup_logger(api: Telemetry, level: int = logging.INFO):
-    global BACKGROUND_LOGGER
+    def fork(self) -> "TraceContext":
+        return _TaskTraceContext(self)
+
+
+class _TaskTraceContext(TraceContext):
+    """The view of a trace from a task that runs concurrently with other tasks of the trace.
+
+    It starts with the spans open in the task that created it, and has a span stack of its own so that
+    the spans of concurrent tasks don't nest in each other. Everything else is shared with the trace.
+    """
+
+    def __init__(self, trace: TraceContext):
+        object.__setattr__(self, "_trace", trace)
+        object.__setattr__(self, "spans", list(trace.spans))
+
+    def __getattr__(self, name):
+        return getattr(self._trace, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._trace, name, value)
+
+
+def fork_trace_context() -> None:
+    """Gives the current task a span stack of its own.
+
+    Call it first thing in a task that runs concurrently with other tasks of the same trace. Tasks
+    start with a copy of the context of their creator, so this does not change the creator's spans.
+    """
+    context = CURRENT_TRACE_CONTEXT.get()
+    if context is not None and context.recording:
+        CURRENT_TRACE_CONTEXT.set(context.fork())
+
+
+def setup_logger(
+    api: Telemetry,
+    level: int = logging.INFO,
+    config: Optional[BackgroundLoggerConfig] = None,
+    sampling: Optional[TraceSamplingConfig] = None,
+    capture: Optional[TraceCaptureConfig] = None,
+):
+    global BACKGROUND_LOGGER, TRACE_SAMPLER
 
     if BACKGROUND_LOGGER is None:
-        BACKGROUND_LOGGER = BackgroundLogger(api)
+        BACKGROUND_LOGGER = BackgroundLogger(api, config or getattr(api, "background_logger_config", None))
+    if TRACE_SAMPLER is None:
+        TRACE_SAMPLER = TraceSampler(sampling or getattr(api, "trace_sampling_config", None) or TraceSamplingConfig())
+    capture = capture or getattr(api, "trace_capture_config", None)
+    if capture is not None:
+        set_capture_config(capture)
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
     root_logger.addHandler(TelemetryHandler())
 
 
 async def start_trace(name: str, attributes: Dict[str, Any] = None) -> TraceContext:
-    global CURRENT_TRACE_CONTEXT, BACKGROUND_LOGGER
+    global CURRENT_TRACE_CONTEXT, BACKGROUND_LOGGER, TRACE_SAMPLER
 
     if BACKGROUND_LOGGER is None:
         logger.debug("No Telemetry implementation set. Skipping trace initialization...")
         return
 
     trace_id = generate_trace_id()
-    context = TraceContext(BACKGROUND_LOGGER, trace_id)
-    context.push_span(name, {"__root__": True, **(attributes or {})})
+    if TRACE_SAMPLER is None or TRACE_SAMPLER.should_sample(name):
+        context = TraceContext(BACKGROUND_LOGGER, trace_id)
+    elif TRACE_SAMPLER.config.tail_sampling:
+        context = TraceContext(
+            BACKGROUND_LOGGER,
+            trace_id,
+            buffered=True,
+            max_buffered_events=TRACE_SAMPLER.config.tail_max_buffered_events,
+        )
+    else:
+        context = TraceContext(BACKGROUND_LOGGER, trace_id, recording=False)
+    if context.recording:
+        context.push_span(name, {"__root__": True, **(attributes or {})})
 
     CURRENT_TRACE_CONTEXT.set(context)
     return context
@@ -191,10 +522,18 @@ async def end_trace(status: SpanStatus = SpanStatus.OK):
         logger.debug("No trace context to end")
         return
 
-    context.pop_span(status)
+    if context.recording:
+        context.pop_span(status)
+        context.finish(TRACE_SAMPLER)
     CURRENT_TRACE_CONTEXT.set(None)
 
 
+def is_recording() -> bool:
+    """Whether spans of the current trace are recorded. Lets callers skip building span attributes."""
+    context = CURRENT_TRACE_CONTEXT.get()
+    return context is not None and context.recording
+
+
 def severity(levelname: str) -> LogSeverity:
     if levelname == "DEBUG":
         return LogSeverity.DEBUG
@@ -231,7 +570,7 @@ class TelemetryHandler(logging.Handler):
         if span is None:
             return
 
-        BACKGROUND_LOGGER.log_event(
+        context.log_event(
             UnstructuredLogEvent(
                 trace_id=span.trace_id,
                 span_id=span.span_id,
@@ -245,6 +584,12 @@ class TelemetryHandler(logging.Handler):
         pass
 
 
+def _exit_status(exc_type) -> SpanStatus:
+    if exc_type is not None and issubclass(exc_type, Exception):
+        return SpanStatus.ERROR
+    return SpanStatus.OK
+
+
 class SpanContextManager:
     def __init__(self, name: str, attributes: Dict[str, Any] = None):
         self.name = name
@@ -257,6 +602,8 @@ class SpanContextManager:
         if not context:
             logger.debug("No trace context to push span")
             return self
+        if not context.recording:
+            return self
 
         self.span = context.push_span(self.name, self.attributes)
         return self
@@ -267,14 +614,16 @@ class SpanContextManager:
         if not context:
             logger.debug("No trace context to pop span")
             return
+        if self.span is None:
+            return
 
-        context.pop_span()
+        context.pop_span(_exit_status(exc_type))
 
     def set_attribute(self, key: str, value: Any):
         if self.span:
             if self.span.attributes is None:
                 self.span.attributes = {}
-            self.span.attributes[key] = serialize_value(value)
+            self.span.attributes[key] = value if isinstance(value, LazyValue) else serialize_value(value)
 
     async def __aenter__(self):
         global CURRENT_TRACE_CONTEXT
@@ -282,6 +631,8 @@ class SpanContextManager:
         if not context:
             logger.debug("No trace context to push span")
             return self
+        if not context.recording:
+            return self
 
         self.span = context.push_span(self.name, self.attributes)
         return self
@@ -292,8 +643,10 @@ class SpanContextManager:
         if not context:
             logger.debug("No trace context to pop span")
             return
+        if self.span is None:
+            return
 
-        context.pop_span()
+        context.pop_span(_exit_status(exc_type))
 
     def __call__(self, func: Callable):
         @wraps(func)
@@ -320,6 +673,17 @@ def span(name: str, attributes: Dict[str, Any] = None):
     return SpanContextManager(name, attributes)
 
 
+def get_current_span_ids() -> Optional[Tuple[str, str]]:
+    """The trace and span ids that events of the current context should refer to, even if the trace is not recorded."""
+    context = CURRENT_TRACE_CONTEXT.get()
+    if context is None:
+        return None
+    span = context.get_current_span()
+    if span is not None:
+        return span.trace_id, span.span_id
+    return context.trace_id, context.root_span_id
+
+
 def get_current_span() -> Optional[Span]:
     global CURRENT_TRACE_CONTEXT
     if CURRENT_TRACE_CONTEXT is None:
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+# Measures build time, recall@k and single-query latency of the inline faiss
+# provider's index types on synthetic clustered embeddings, sweeping the
+# per-query tuning parameters (ef_search for HNSW, nprobe for IVF). Indexes are
+# built with the same helpers the provider uses for its snapshots.
+#
+# Run this script:
+# python scripts/benchmarks/faiss_ann.py --sizes 10000,100000,1000000 --dimension 384
+# python scripts/benchmarks/faiss_ann.py --sizes 5000000 --index_types ivf_pq --pq_m 48
+
+import time
+
+import faiss
+import fire
+import numpy as np
+
+from llama_stack.providers.inline.vector_io.faiss.config import FaissIndexConfig, FaissIndexType, FaissMetric
+from llama_stack.providers.inline.vector_io.faiss.faiss import (
+    add_vectors,
+    index_description,
+    search_params,
+    train_index,
+)
+
+SWEEPS = {
+    FaissIndexType.flat: [{}],
+    FaissIndexType.hnsw: [{"ef_search": ef} for ef in (16, 32, 64, 128, 256)],
+    FaissIndexType.ivf_flat: [{"nprobe": nprobe} for nprobe in (1, 4, 16, 64)],
+    FaissIndexType.ivf_pq: [{"nprobe": nprobe} for nprobe in (1, 4, 16, 64)],
+}
+
+
+def synthetic_embeddings(n: int, dimension: int, num_clusters: int, spread: float, seed: int) -> np.ndarray:
+    # unit vectors scattered around random centers, roughly like sentence embeddings
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dimension), dtype=np.float32)
+    vectors = np.empty((n, dimension), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        end = min(start + 100_000, n)
+        labels = rng.integers(0, num_clusters, end - start)
+        vectors[start:end] = centers[labels] + spread * rng.standard_normal((end - start, dimension), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def ground_truth(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    _, indices = faiss.knn(queries, vectors, k)
+    return indices
+
+
+def run(index, config: FaissIndexConfig, queries: np.ndarray, truth: np.ndarray, k: int, params: dict):
+    latencies = []
+    found = 0
+    for query, expected in zip(queries, truth, strict=True):
+        start = time.perf_counter()
+        _, indices = index.search(query.reshape(1, -1), k, params=search_params(index, config, params))
+        latencies.append(time.perf_counter() - start)
+        found += len(set(indices[0]) & set(expected))
+    latencies_ms = np.array(latencies) * 1000
+    return found / truth.size, np.percentile(latencies_ms, 50), np.percentile(latencies_ms, 99)
+
+
+def _as_list(value) -> list:
+    # fire parses "a,b" into a tuple, and a single value into a scalar
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return str(value).split(",")
+
+
+def main(
+    sizes: str = "10000,100000",
+    dimension: int = 384,
+    index_types: str = "flat,hnsw,ivf_flat,ivf_pq",
+    num_queries: int = 200,
+    k: int = 10,
+    num_clusters: int = 1000,
+    spread: float = 1.0,
+    hnsw_m: int = 32,
+    pq_m: int = 32,
+    threads: int = 0,
+):
+    if threads:
+        faiss.omp_set_num_threads(threads)
+    sizes = [int(size) for size in _as_list(sizes)]
+    index_types = [FaissIndexType(t) for t in _as_list(index_types)]
+
+    print(f"{'vectors':>9} {'index':<20} {'params':<16} {'build s':>8} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in sizes:
+        # queries come from the same distribution as the bank, but are not in it
+        vectors = synthetic_embeddings(size + num_queries, dimension, num_clusters, spread, seed=0)
+        vectors, queries = vectors[:size], vectors[size:]
+        truth = ground_truth(vectors, queries, k)
+
+        for index_type in index_types:
+            config = FaissIndexConfig(index_type=index_type, metric=FaissMetric.l2, hnsw_m=hnsw_m, pq_m=pq_m)
+            start = time.perf_counter()
+            index = train_index(config, dimension, vectors)
+            add_vectors(index, vectors)
+            build_seconds = time.perf_counter() - start
+            description = index_description(config, size)
+
+            for params in SWEEPS[index_type]:
+                recall, p50, p99 = run(index, config, queries, truth, k, params)
+                param_str = ",".join(f"{key}={value}" for key, value in params.items()) or "-"
+                print(
+                    f"{size:>9} {description:<20} {param_str:<16} {build_seconds:>8.1f} {recall:>7.3f} {p50:>8.3f} {p99:>8.3f}"
+                )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
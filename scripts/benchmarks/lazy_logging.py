@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+# Measures what the debug log line of `InferenceRouter.chat_completion` costs per
+# request, with debug logging off and on: an eager f-string of the full request
+# (the previous behavior) against a `StructuredMessage`, which is only formatted
+# when the record is emitted and abbreviates large values.
+#
+# Run this script:
+# python scripts/benchmarks/lazy_logging.py --messages 50 --message_chars 4000
+# python scripts/benchmarks/lazy_logging.py --messages 50 --message_chars 4000 --iterations 200
+
+import io
+import logging
+import timeit
+
+import fire
+
+from llama_stack.apis.inference import ToolConfig, UserMessage
+from llama_stack.log import StructuredMessage
+
+
+def make_logger(level: int) -> logging.LoggerAdapter:
+    logger = logging.getLogger(f"lazy_logging_benchmark.{logging.getLevelName(level)}")
+    logger.handlers = [logging.StreamHandler(io.StringIO())]
+    logger.propagate = False
+    logger.setLevel(level)
+    return logging.LoggerAdapter(logger, {"category": "core"})
+
+
+def eager(logger, model_id, stream, messages, tools, tool_config, response_format):
+    logger.debug(
+        f"InferenceRouter.chat_completion: {model_id=}, {stream=}, {messages=}, {tools=}, {tool_config=}, {response_format=}",
+    )
+
+
+def lazy(logger, model_id, stream, messages, tools, tool_config, response_format):
+    logger.debug(
+        StructuredMessage(
+            "InferenceRouter.chat_completion",
+            model_id=model_id,
+            stream=stream,
+            messages=messages,
+            tools=tools,
+            tool_config=tool_config,
+            response_format=response_format,
+        )
+    )
+
+
+def main(messages: int = 50, message_chars: int = 4000, iterations: int = 1000):
+    request = dict(
+        model_id="meta-llama/Llama-3.1-8B-Instruct",
+        stream=False,
+        messages=[UserMessage(content="x" * message_chars) for _ in range(messages)],
+        tools=[],
+        tool_config=ToolConfig(),
+        response_format=None,
+    )
+    print(f"{messages} messages of {message_chars} characters, {iterations} iterations")
+    for level in (logging.INFO, logging.DEBUG):
+        logger = make_logger(level)
+        results = {}
+        for name, fn in (("f-string", eager), ("StructuredMessage", lazy)):
+            seconds = timeit.timeit(lambda fn=fn, logger=logger: fn(logger, **request), number=iterations)
+            results[name] = seconds / iterations * 1e6
+        speedup = results["f-string"] / results["StructuredMessage"]
+        print(
+            f"  debug {'on ' if level == logging.DEBUG else 'off'}: f-string {results['f-string']:.1f} us, "
+            f"StructuredMessage {results['StructuredMessage']:.1f} us per call ({speedup:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+# Measures query latency/throughput of SQLiteVecIndex while inserts run at the
+# same time. `--per_call_connections` reproduces the previous behaviour of
+# opening a connection (and loading sqlite_vec) for every operation, for
+# comparison with the pooled connections.
+#
+# Run this script:
+# python scripts/benchmarks/sqlite_vec_concurrency.py --num_vectors 20000 --readers 8 --writers 1
+# python scripts/benchmarks/sqlite_vec_concurrency.py --num_vectors 20000 --readers 8 --per_call_connections
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import fire
+import numpy as np
+
+from llama_stack.apis.vector_io import Chunk
+from llama_stack.providers.inline.vector_io.sqlite_vec.sqlite_vec import SQLiteVecIndex, _create_sqlite_connection
+
+
+class PerCallConnections:
+    """Opens and closes a fresh connection for every operation, like the index used to."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def _run(self, fn):
+        connection = _create_sqlite_connection(self.db_path)
+        try:
+            return fn(connection)
+        finally:
+            connection.close()
+
+    async def read(self, fn):
+        return await asyncio.to_thread(self._run, fn)
+
+    async def write(self, fn):
+        return await asyncio.to_thread(self._run, fn)
+
+
+def make_chunks(start: int, count: int):
+    return [Chunk(content=f"chunk {i}", metadata={"document_id": f"doc-{i}"}) for i in range(start, start + count)]
+
+
+async def run(
+    num_vectors: int,
+    dimension: int,
+    readers: int,
+    writers: int,
+    batch_size: int,
+    duration: float,
+    k: int,
+    per_call_connections: bool,
+):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        index = await SQLiteVecIndex.create(dimension, db_path, "bench", reader_threads=max(readers, 1))
+        pooled = index.pool
+        for start in range(0, num_vectors, 1000):
+            count = min(1000, num_vectors - start)
+            await index.add_chunks(make_chunks(start, count), rng.random((count, dimension), dtype=np.float32))
+        if per_call_connections:
+            index.pool = PerCallConnections(db_path)
+
+        latencies = []
+        inserted = 0
+        next_id = num_vectors
+        deadline = time.perf_counter() + duration
+
+        async def reader():
+            while time.perf_counter() < deadline:
+                query = rng.random(dimension, dtype=np.float32)
+                start = time.perf_counter()
+                await index.query(query, k, 0.0)
+                latencies.append(time.perf_counter() - start)
+
+        async def writer():
+            nonlocal inserted, next_id
+            while time.perf_counter() < deadline:
+                start, next_id = next_id, next_id + batch_size
+                await index.add_chunks(
+                    make_chunks(start, batch_size), rng.random((batch_size, dimension), dtype=np.float32)
+                )
+                inserted += batch_size
+
+        await asyncio.gather(*[reader() for _ in range(readers)], *[writer() for _ in range(writers)])
+
+        index.pool = pooled
+        await index.delete()
+
+    latencies_ms = np.array(latencies) * 1000
+    mode = "per-call connections" if per_call_connections else "pooled connections"
+    print(f"{mode}: {readers} readers, {writers} writers, {num_vectors} vectors of dimension {dimension}")
+    if len(latencies_ms):
+        print(
+            f"  queries: {len(latencies_ms) / duration:.1f}/s, "
+            f"p50 {np.percentile(latencies_ms, 50):.2f} ms, p99 {np.percentile(latencies_ms, 99):.2f} ms"
+        )
+    # queries slow down as the bank grows, so compare runs with similar final sizes
+    print(f"  inserts: {inserted / duration:.1f} chunks/s, final bank size {num_vectors + inserted}")
+
+
+def main(
+    num_vectors: int = 10000,
+    dimension: int = 384,
+    readers: int = 4,
+    writers: int = 1,
+    batch_size: int = 50,
+    duration: float = 10.0,
+    k: int = 5,
+    per_call_connections: bool = False,
+):
+    asyncio.run(run(num_vectors, dimension, readers, writers, batch_size, duration, k, per_call_connections))
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+# Measures time-to-first-byte and tokens/s of SSE streaming through
+# `create_dynamic_typed_route`, served by uvicorn on loopback, with a fake
+# provider that emits `ChatCompletionResponseStreamChunk` deltas.
+#
+# Run this script:
+# python scripts/benchmarks/sse_streaming.py --num_tokens 2000 --runs 5
+
+import asyncio
+import socket
+import threading
+import time
+from statistics import median
+
+import fire
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from llama_stack.apis.common.content_types import TextDelta
+from llama_stack.apis.inference import (
+    ChatCompletionResponseEvent,
+    ChatCompletionResponseEventType,
+    ChatCompletionResponseStreamChunk,
+)
+from llama_stack.distribution.datatypes import StreamingConfig
+from llama_stack.distribution.server.server import create_dynamic_typed_route
+
+
+class FakeInference:
+    def __init__(self, token_delay: float = 0, legacy_sleep: bool = False):
+        self.token_delay = token_delay
+        self.legacy_sleep = legacy_sleep
+
+    async def chat_completion(self, num_tokens: int, stream: bool = False):
+        async def gen():
+            for i in range(num_tokens):
+                if self.token_delay:
+                    await asyncio.sleep(self.token_delay)
+                yield ChatCompletionResponseStreamChunk(
+                    event=ChatCompletionResponseEvent(
+                        event_type=ChatCompletionResponseEventType.progress,
+                        delta=TextDelta(text=f"tok{i} "),
+                    )
+                )
+                if self.legacy_sleep:
+                    # reproduces the fixed per-event sleep the SSE generator used to have
+                    await asyncio.sleep(0.01)
+
+        return gen()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve(provider: FakeInference, streaming_config: StreamingConfig) -> tuple[uvicorn.Server, int]:
+    app = FastAPI()
+    app.post("/chat", response_model=None)(
+        create_dynamic_typed_route(provider.chat_completion, "post", "/chat", streaming_config)
+    )
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, port
+
+
+def _measure(port: int, num_tokens: int, read_delay: float) -> tuple[float, float]:
+    with httpx.Client(timeout=None) as client:
+        start = time.perf_counter()
+        ttfb = None
+        tokens = 0
+        with client.stream(
+            "POST", f"http://127.0.0.1:{port}/chat", json={"num_tokens": num_tokens, "stream": True}
+        ) as r:
+            for chunk in r.iter_bytes():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+                tokens += chunk.count(b"data: ")
+                if read_delay:
+                    time.sleep(read_delay)
+        elapsed = time.perf_counter() - start
+    assert tokens == num_tokens, f"expected {num_tokens} events, got {tokens}"
+    return ttfb, num_tokens / elapsed
+
+
+def main(num_tokens: int = 1000, runs: int = 3, token_delay: float = 0, read_delay: float = 0):
+    """
+    :param num_tokens: number of deltas emitted per streamed response
+    :param runs: number of requests per mode; the median is reported
+    :param token_delay: simulated provider inter-token latency in seconds
+    :param read_delay: simulated slow client, seconds slept after every read
+    """
+    modes = {
+        "legacy (10ms sleep)": (FakeInference(token_delay, legacy_sleep=True), StreamingConfig()),
+        "immediate": (FakeInference(token_delay), StreamingConfig()),
+        "coalesce": (FakeInference(token_delay), StreamingConfig(coalesce=True)),
+        "coalesce 5ms": (FakeInference(token_delay), StreamingConfig(coalesce=True, coalesce_window_ms=5)),
+    }
+    print(f"{'mode':<22}{'ttfb ms':>10}{'tokens/s':>12}")
+    for name, (provider, streaming_config) in modes.items():
+        server, port = _serve(provider, streaming_config)
+        try:
+            results = [_measure(port, num_tokens, read_delay) for _ in range(runs)]
+        finally:
+            server.should_exit = True
+        ttfb = median(r[0] for r in results)
+        tps = median(r[1] for r in results)
+        print(f"{name:<22}{ttfb * 1000:>10.2f}{tps:>12.0f}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
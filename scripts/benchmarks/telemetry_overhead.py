@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+# Measures the cost of tracing a request: the time the request itself spends
+# emitting span/log events, and how long the background logger takes to write
+# them all. `--legacy` reproduces the previous logger, which ran
+# `asyncio.run(api.log_event(event))` for every event from a queue capped at
+# 1000 events.
+#
+# Run this script:
+# python scripts/benchmarks/telemetry_overhead.py --requests 2000 --spans_per_request 5
+# python scripts/benchmarks/telemetry_overhead.py --requests 2000 --spans_per_request 5 --legacy
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+import fire
+import numpy as np
+
+from llama_stack.providers.inline.telemetry.meta_reference.config import TelemetryConfig
+from llama_stack.providers.inline.telemetry.meta_reference.telemetry import TelemetryAdapter
+from llama_stack.providers.utils.telemetry import tracing
+from llama_stack.providers.utils.telemetry.tracing import BackgroundLogger, BackgroundLoggerConfig
+
+
+class LegacyBackgroundLogger:
+    """The previous BackgroundLogger: one event loop per event, drops when 1000 events are queued."""
+
+    def __init__(self, api, capacity: int = 1000):
+        self.api = api
+        self.log_queue = queue.Queue(maxsize=capacity)
+        self.dropped_events = 0
+        threading.Thread(target=self._process_logs, daemon=True).start()
+
+    def log_event(self, event):
+        try:
+            self.log_queue.put_nowait(event)
+        except queue.Full:
+            self.dropped_events += 1
+
+    def _process_logs(self):
+        while True:
+            event = self.log_queue.get()
+            try:
+                asyncio.run(self.api.log_event(event))
+            finally:
+                self.log_queue.task_done()
+
+    def flush(self, timeout=None):
+        self.log_queue.join()
+        return True
+
+    def stats(self):
+        return {"dropped_events": self.dropped_events}
+
+
+async def traced_request(spans_per_request: int, logs_per_span: int, log: logging.Logger):
+    await tracing.start_trace("request", {"bench": True})
+    for i in range(spans_per_request):
+        async with tracing.span(f"step-{i}", {"index": i}):
+            for _ in range(logs_per_span):
+                log.info("doing work")
+    await tracing.end_trace()
+
+
+async def run(requests: int, concurrency: int, spans_per_request: int, logs_per_span: int):
+    log = logging.getLogger("telemetry_overhead")
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await traced_request(spans_per_request, logs_per_span, log)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies
+
+
+def main(
+    requests: int = 2000,
+    concurrency: int = 16,
+    spans_per_request: int = 5,
+    logs_per_span: int = 1,
+    legacy: bool = False,
+    capacity: int = 10000,
+    overflow_policy: str = "drop_oldest",
+):
+    api = TelemetryAdapter(TelemetryConfig(sinks=[]), {})
+    if legacy:
+        background_logger = LegacyBackgroundLogger(api)
+    else:
+        background_logger = BackgroundLogger(
+            api, BackgroundLoggerConfig(capacity=capacity, overflow_policy=overflow_policy)
+        )
+    tracing.BACKGROUND_LOGGER = background_logger
+    log = logging.getLogger("telemetry_overhead")
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    log.addHandler(tracing.TelemetryHandler())
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run(requests, concurrency, spans_per_request, logs_per_span))
+    produced = time.perf_counter() - start
+    background_logger.flush()
+    drained = time.perf_counter() - start
+
+    events = requests * (2 + spans_per_request * (2 + logs_per_span))
+    latencies_us = np.array(latencies) * 1e6
+    print(f"{'legacy' if legacy else 'batched'} logger: {requests} requests, {events} events")
+    print(
+        f"  per request: mean {latencies_us.mean():.1f} us, p50 {np.percentile(latencies_us, 50):.1f} us, "
+        f"p99 {np.percentile(latencies_us, 99):.1f} us"
+    )
+    print(f"  requests done in {produced:.2f} s, all events written after {drained:.2f} s")
+    dropped = background_logger.stats()["dropped_events"]
+    print(f"  {events - dropped} events written ({(events - dropped) / drained:.0f}/s), {dropped} dropped")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,101 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import pytest
+
+from llama_stack.apis.agents import AgentConfig, AgentToolGroupWithArgs
+from llama_stack.apis.tools import ListToolsResponse, Tool, ToolHost
+from llama_stack.providers.inline.agents.meta_reference.agent_instance import MEMORY_QUERY_TOOL
+from llama_stack.providers.inline.agents.meta_reference.agents import MetaReferenceAgentsImpl
+from llama_stack.providers.inline.agents.meta_reference.config import MetaReferenceAgentsImplConfig
+from llama_stack.providers.utils.kvstore.config import SqliteKVStoreConfig
+
+
+class FakeToolGroups:
+    def __init__(self):
+        self.listed = []
+
+    async def list_tools(self, toolgroup_id):
+        self.listed.append(toolgroup_id)
+        tool_names = [MEMORY_QUERY_TOOL] if toolgroup_id == "builtin::rag" else ["lookup", "convert"]
+        return ListToolsResponse(
+            data=[
+                Tool(
+                    identifier=name,
+                    provider_id="test",
+                    toolgroup_id=toolgroup_id,
+                    tool_host=ToolHost.distribution,
+                    description=name,
+                    parameters=[],
+                )
+                for name in tool_names
+            ]
+        )
+
+
+@pytest.fixture
+async def agents_impl(tmp_path):
+    config = MetaReferenceAgentsImplConfig(
+        persistence_store=SqliteKVStoreConfig(db_path=str(tmp_path / "agents_store.db")),
+    )
+    impl = MetaReferenceAgentsImpl(config, None, None, None, None, FakeToolGroups())
+    await impl.initialize()
+    return impl
+
+
+@pytest.mark.asyncio
+async def test_agents_are_constructed_once(agents_impl):
+    agent_config = AgentConfig(model="test-model", instructions="", toolgroups=["test::tools"])
+    agent_id = (await agents_impl.create_agent(agent_config)).agent_id
+
+    agent = await agents_impl._get_agent_impl(agent_id)
+    assert await agents_impl._get_agent_impl(agent_id) is agent
+
+    await agents_impl.delete_agent(agent_id)
+    with pytest.raises(ValueError):
+        await agents_impl._get_agent_impl(agent_id)
+
+
+@pytest.mark.asyncio
+async def test_tools_are_resolved_once_per_selection(agents_impl):
+    agent_config = AgentConfig(model="test-model", instructions="", toolgroups=["test::tools"])
+    agent = await agents_impl._get_agent_impl((await agents_impl.create_agent(agent_config)).agent_id)
+    listed = agents_impl.tool_groups_api.listed
+
+    tools = await agent._get_tools()
+    assert [tool.tool_name for tool in tools.tool_defs] == ["lookup", "convert"]
+    assert await agent._get_tools() is tools
+
+    turn_tools = await agent._get_tools(["test::tools/lookup"])
+    assert [tool.tool_name for tool in turn_tools.tool_defs] == ["lookup"]
+    assert await agent._get_tools(["test::tools/lookup"]) is turn_tools
+    assert listed == ["test::tools", "test::tools"]
+
+
+@pytest.mark.asyncio
+async def test_session_vector_db_does_not_leak_into_shared_tools(agents_impl):
+    rag = AgentToolGroupWithArgs(name="builtin::rag", args={"vector_db_ids": ["shared"]})
+    agent_config = AgentConfig(model="test-model", instructions="", toolgroups=[rag])
+    agent = await agents_impl._get_agent_impl((await agents_impl.create_agent(agent_config)).agent_id)
+    tools = await agent._get_tools()
+
+    session_id = await agent.create_session("session")
+    await agent.storage.add_vector_db_to_session(session_id, "session-db")
+    context = await agent.storage.load_turn_context(session_id, "turn")
+
+    class StopError(Exception):
+        pass
+
+    async def chat_completion(*args, **kwargs):
+        raise StopError()
+
+    agent.inference_api = type("FakeInference", (), {"chat_completion": staticmethod(chat_completion)})
+    for _ in range(2):
+        with pytest.raises(StopError):
+            async for _ in agent._run(session_id, "turn", [], None, turn_context=context, tools=tools):
+                pass
+
+    assert tools.tool_name_to_args[MEMORY_QUERY_TOOL] == {"vector_db_ids": ["shared"]}
@@ -0,0 +1,185 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+import time
+
+import pytest
+
+from llama_stack.apis.agents import (
+    AgentConfig,
+    AgentTurnResponseStepCompletePayload,
+    StepType,
+    ToolExecutionConfig,
+)
+from llama_stack.apis.common.content_types import TextDelta, ToolCallDelta, ToolCallParseStatus
+from llama_stack.apis.inference import (
+    ChatCompletionResponseEvent,
+    ChatCompletionResponseEventType,
+    ChatCompletionResponseStreamChunk,
+    CompletionMessage,
+    StopReason,
+    ToolDefinition,
+    UserMessage,
+)
+from llama_stack.apis.tools import ToolInvocationResult
+from llama_stack.models.llama.datatypes import ToolCall
+from llama_stack.providers.inline.agents.meta_reference.agent_instance import ChatAgent, TurnTools
+from llama_stack.providers.utils.kvstore.config import SqliteKVStoreConfig
+from llama_stack.providers.utils.kvstore.sqlite import SqliteKVStoreImpl
+
+TOOL_LATENCY = {"search_a": 0.2, "search_b": 0.1, "search_c": 0.15}
+
+
+class FakeInference:
+    """Calls every tool once, then answers."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def chat_completion(self, model, messages, **kwargs):
+        self.calls += 1
+        first_call = self.calls == 1
+
+        async def stream():
+            if first_call:
+                for i, tool_name in enumerate(TOOL_LATENCY):
+                    yield ChatCompletionResponseStreamChunk(
+                        event=ChatCompletionResponseEvent(
+                            event_type=ChatCompletionResponseEventType.progress,
+                            delta=ToolCallDelta(
+                                parse_status=ToolCallParseStatus.succeeded,
+                                tool_call=ToolCall(call_id=f"call-{i}", tool_name=tool_name, arguments={}),
+                            ),
+                            stop_reason=StopReason.end_of_message,
+                        )
+                    )
+            else:
+                yield ChatCompletionResponseStreamChunk(
+                    event=ChatCompletionResponseEvent(
+                        event_type=ChatCompletionResponseEventType.progress,
+                        delta=TextDelta(text="done"),
+                        stop_reason=StopReason.end_of_turn,
+                    )
+                )
+
+        return stream()
+
+
+class FakeToolRuntime:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    async def invoke_tool(self, tool_name, kwargs):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(TOOL_LATENCY[tool_name])
+        finally:
+            self.running -= 1
+        return ToolInvocationResult(content=f"{tool_name} result")
+
+
+@pytest.fixture
+async def kvstore(tmp_path):
+    kvstore = SqliteKVStoreImpl(SqliteKVStoreConfig(db_path=str(tmp_path / "agents_store.db")))
+    await kvstore.initialize()
+    return kvstore
+
+
+async def run_step(kvstore, tool_execution: ToolExecutionConfig):
+    agent = ChatAgent(
+        agent_id="agent",
+        agent_config=AgentConfig(model="test-model", instructions="", tool_execution=tool_execution),
+        tempdir="/tmp",
+        inference_api=FakeInference(),
+        safety_api=None,
+        tool_runtime_api=FakeToolRuntime(),
+        tool_groups_api=None,
+        vector_io_api=None,
+        persistence_store=kvstore,
+    )
+    tools = TurnTools([ToolDefinition(tool_name=name) for name in TOOL_LATENCY], {})
+    session_id = await agent.create_session("session")
+
+    start = time.monotonic()
+    tool_events = []
+    steps = []
+    async for chunk in agent._run(
+        session_id,
+        "turn",
+        [UserMessage(content="search")],
+        agent.agent_config.sampling_params,
+        stream=True,
+        tools=tools,
+    ):
+        if isinstance(chunk, CompletionMessage):
+            # the end of the turn, as far as ChatAgent.run is concerned
+            break
+        payload = chunk.event.payload
+        if payload.step_type != StepType.tool_execution:
+            continue
+        tool_events.append((type(payload).__name__, payload.step_id))
+        if isinstance(payload, AgentTurnResponseStepCompletePayload):
+            steps.append(payload.step_details)
+    elapsed = time.monotonic() - start
+    return agent, elapsed, tool_events, steps
+
+
+def assert_events_in_call_order(tool_events, steps):
+    step_ids = [step.step_id for step in steps]
+    assert [step.tool_calls[0].call_id for step in steps] == ["call-0", "call-1", "call-2"]
+    expected = []
+    for step_id in step_ids:
+        expected += [
+            ("AgentTurnResponseStepStartPayload", step_id),
+            ("AgentTurnResponseStepProgressPayload", step_id),
+            ("AgentTurnResponseStepCompletePayload", step_id),
+        ]
+    assert tool_events == expected
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_run_sequentially_by_default(kvstore):
+    agent, elapsed, tool_events, steps = await run_step(kvstore, ToolExecutionConfig())
+    assert agent.tool_runtime_api.max_running == 1
+    assert elapsed >= sum(TOOL_LATENCY.values())
+    assert_events_in_call_order(tool_events, steps)
+
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls(kvstore):
+    agent, elapsed, tool_events, steps = await run_step(kvstore, ToolExecutionConfig(parallel=True))
+    assert agent.tool_runtime_api.max_running == 3
+    assert elapsed < sum(TOOL_LATENCY.values())
+    assert_events_in_call_order(tool_events, steps)
+    assert [step.tool_responses[0].content for step in steps] == [f"{name} result" for name in TOOL_LATENCY]
+
+
+@pytest.mark.asyncio
+async def test_parallel_tool_calls_are_bounded(kvstore):
+    agent, _, tool_events, steps = await run_step(kvstore, ToolExecutionConfig(parallel=True, max_concurrency=2))
+    assert agent.tool_runtime_api.max_running == 2
+    assert_events_in_call_order(tool_events, steps)
+
+
+@pytest.mark.asyncio
+async def test_tool_call_timeouts(kvstore, monkeypatch):
+    # wide margins around the timeouts, so that a slow machine does not fail the test
+    monkeypatch.setitem(TOOL_LATENCY, "search_a", 5)
+    monkeypatch.setitem(TOOL_LATENCY, "search_b", 0.01)
+    monkeypatch.setitem(TOOL_LATENCY, "search_c", 0.6)
+    _, _, _, steps = await run_step(
+        kvstore,
+        ToolExecutionConfig(parallel=True, timeout_seconds=0.5, tool_timeouts={"search_c": 5}),
+    )
+    contents = [step.tool_responses[0].content for step in steps]
+    assert contents == [
+        "Tool search_a did not respond within 0.5 seconds",
+        "search_b result",
+        "search_c result",
+    ]
@@ -173,3 +173,30 @@ async def test_tool_call_and_infer_iters_access_control(mock_get_auth_attributes
     # Regular user cannot set inference iterations (should raise ValueError)
     with pytest.raises(ValueError):
         await agent_persistence.set_num_infer_iters_in_turn(session_id, turn_id, 10)
+
+
+@pytest.mark.asyncio
+@patch("llama_stack.providers.inline.agents.meta_reference.persistence.get_auth_attributes")
+async def test_turn_context_access_control(mock_get_auth_attributes, test_setup):
+    agent_persistence = test_setup
+
+    mock_get_auth_attributes.return_value = {"roles": ["admin"]}
+    session_id = await agent_persistence.create_session("Restricted Session")
+    turn_id = str(uuid.uuid4())
+    await agent_persistence.set_num_infer_iters_in_turn(session_id, turn_id, 3)
+
+    context = await agent_persistence.load_turn_context(session_id, turn_id, with_turns=True)
+    assert context.session_info.session_id == session_id
+    assert context.num_infer_iters == 3
+    assert context.in_progress_tool_call_step is None
+    assert context.turns == []
+
+    # the access check was made when the context was loaded
+    mock_get_auth_attributes.return_value = {"roles": ["user"]}
+    await context.set_num_infer_iters(4)
+
+    with pytest.raises(ValueError):
+        await agent_persistence.load_turn_context(session_id, turn_id)
+
+    mock_get_auth_attributes.return_value = {"roles": ["admin"]}
+    assert await agent_persistence.get_num_infer_iters_in_turn(session_id, turn_id) == 4
@@ -0,0 +1,253 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import pytest
+
+from llama_stack.apis.agents import (
+    AgentConfig,
+    AgentTurnCreateRequest,
+    AgentTurnResponseEvent,
+    AgentTurnResponseStepCompletePayload,
+    AgentTurnResponseStreamChunk,
+    InferenceStep,
+    StepType,
+    Turn,
+)
+from llama_stack.apis.inference import CompletionMessage, StopReason, SystemMessage, UserMessage
+from llama_stack.providers.inline.agents.meta_reference.agent_instance import ChatAgent
+from llama_stack.providers.inline.agents.meta_reference.persistence import AgentPersistence
+from llama_stack.providers.inline.agents.meta_reference.session_cache import SessionHistory, SessionHistoryCache
+from llama_stack.providers.utils.kvstore.config import SqliteKVStoreConfig
+from llama_stack.providers.utils.kvstore.sqlite import SqliteKVStoreImpl
+
+
+@pytest.fixture
+async def kvstore(tmp_path):
+    kvstore = SqliteKVStoreImpl(SqliteKVStoreConfig(db_path=str(tmp_path / "agents_store.db")))
+    await kvstore.initialize()
+    return kvstore
+
+
+def make_agent(kvstore, session_cache):
+    agent = ChatAgent(
+        agent_id="agent",
+        agent_config=AgentConfig(model="test-model", instructions="Be brief."),
+        tempdir="/tmp",
+        inference_api=None,
+        safety_api=None,
+        tool_runtime_api=None,
+        tool_groups_api=None,
+        vector_io_api=None,
+        persistence_store=kvstore,
+        session_cache=session_cache,
+    )
+    agent.model_inputs = []
+
+    async def run(session_id, turn_id, input_messages, sampling_params, stream, documents, turn_context, tools):
+        agent.model_inputs.append([m.content for m in input_messages])
+        message = CompletionMessage(content=f"answer {len(agent.model_inputs)}", stop_reason=StopReason.end_of_turn)
+        step = InferenceStep(step_id=f"{turn_id}-inference", turn_id=turn_id, model_response=message)
+        yield AgentTurnResponseStreamChunk(
+            event=AgentTurnResponseEvent(
+                payload=AgentTurnResponseStepCompletePayload(
+                    step_type=StepType.inference.value, step_id=step.step_id, step_details=step
+                )
+            )
+        )
+        yield message
+
+    agent.run = run
+    return agent
+
+
+def count_loads(agent):
+    loads = []
+    load = agent.storage.get_session_turns_with_sizes
+
+    async def counted(session_id):
+        loads.append(session_id)
+        return await load(session_id)
+
+    agent.storage.get_session_turns_with_sizes = counted
+    return loads
+
+
+def record_store_calls(agent):
+    calls = []
+    kvstore = agent.storage.kvstore
+    for name in ("get", "multi_get", "scan", "set"):
+        method = getattr(kvstore, name)
+
+        async def recorded(*args, _name=name, _method=method, **kwargs):
+            calls.append(_name)
+            return await _method(*args, **kwargs)
+
+        setattr(kvstore, name, recorded)
+
+    run = agent.run
+
+    def recorded_run(*args, **kwargs):
+        calls.append("inference")
+        return run(*args, **kwargs)
+
+    agent.run = recorded_run
+    return calls
+
+
+async def run_turn(agent, session_id, text):
+    request = AgentTurnCreateRequest(
+        agent_id=agent.agent_id,
+        session_id=session_id,
+        messages=[UserMessage(content=text)],
+        stream=True,
+    )
+    return [chunk async for chunk in agent._run_turn(request, turn_id=f"turn-{text}")]
+
+
+@pytest.mark.asyncio
+async def test_history_is_appended_without_reloading(kvstore):
+    cache = SessionHistoryCache()
+    agent = make_agent(kvstore, cache)
+    loads = count_loads(agent)
+    session_id = await agent.create_session("session")
+
+    for text in ["q1", "q2", "q3"]:
+        await run_turn(agent, session_id, text)
+
+    assert loads == [session_id]
+    assert agent.model_inputs[-1] == ["Be brief.", "q1", "answer 1", "q2", "answer 2", "q3"]
+
+    # the cached history is the one the store holds
+    stored = await agent.storage.get_session_turns(session_id)
+    cached = cache.get((agent.agent_id, session_id), await agent.storage.get_session_version(session_id))
+    assert [t.turn_id for t in cached.turns] == [t.turn_id for t in stored]
+    assert cached.turn_messages == [agent.turn_to_messages(t) for t in stored]
+
+
+@pytest.mark.asyncio
+async def test_turns_stored_elsewhere_are_reloaded(kvstore):
+    agent = make_agent(kvstore, SessionHistoryCache())
+    loads = count_loads(agent)
+    session_id = await agent.create_session("session")
+    await run_turn(agent, session_id, "q1")
+
+    # another server, with a cache of its own, runs a turn of the same session
+    await run_turn(make_agent(kvstore, SessionHistoryCache()), session_id, "q2")
+
+    await run_turn(agent, session_id, "q3")
+    assert loads == [session_id, session_id]
+    assert agent.model_inputs[-1] == ["Be brief.", "q1", "answer 1", "q2", "answer 1", "q3"]
+
+
+@pytest.mark.asyncio
+async def test_turn_stored_elsewhere_during_a_turn_is_not_lost(kvstore):
+    agent = make_agent(kvstore, SessionHistoryCache())
+    loads = count_loads(agent)
+    session_id = await agent.create_session("session")
+    await run_turn(agent, session_id, "q1")
+
+    run = agent.run
+
+    async def run_while_another_server_stores_a_turn(*args, **kwargs):
+        # another server, sharing the store, completes a turn of the same session meanwhile
+        other_turn = Turn(
+            turn_id="turn-elsewhere",
+            session_id=session_id,
+            input_messages=[UserMessage(content="elsewhere")],
+            steps=[],
+            output_message=CompletionMessage(content="answer elsewhere", stop_reason=StopReason.end_of_turn),
+            started_at="2025-01-01T00:00:00Z",
+            completed_at="2025-01-01T00:00:01Z",
+        )
+        await AgentPersistence(agent.agent_id, kvstore).add_turn_to_session(session_id, other_turn)
+        async for chunk in run(*args, **kwargs):
+            yield chunk
+
+    agent.run = run_while_another_server_stores_a_turn
+    await run_turn(agent, session_id, "q2")
+    agent.run = run
+
+    await run_turn(agent, session_id, "q3")
+    assert loads == [session_id, session_id]
+    assert "elsewhere" in agent.model_inputs[-1]
+    assert agent.model_inputs[-1][-1] == "q3"
+
+
+@pytest.mark.asyncio
+async def test_works_without_cache(kvstore):
+    agent = make_agent(kvstore, None)
+    session_id = await agent.create_session("session")
+    await run_turn(agent, session_id, "q1")
+    await run_turn(agent, session_id, "q2")
+    assert agent.model_inputs[-1] == ["Be brief.", "q1", "answer 1", "q2"]
+
+
+@pytest.mark.asyncio
+async def test_turn_setup_reads_the_store_once(kvstore):
+    agent = make_agent(kvstore, SessionHistoryCache())
+    session_id = await agent.create_session("session")
+    await run_turn(agent, session_id, "q1")
+
+    calls = record_store_calls(agent)
+    await run_turn(agent, session_id, "q2")
+    assert calls[: calls.index("inference")] == ["multi_get"]
+
+    # without a cache, the turns and their steps are scanned at the same time
+    agent = make_agent(kvstore, None)
+    calls = record_store_calls(agent)
+    await run_turn(agent, session_id, "q3")
+    assert sorted(calls[: calls.index("inference")]) == ["multi_get", "scan", "scan"]
+
+
+def history(version, sizes):
+    return SessionHistory(version=version, turns=[], turn_messages=[], turn_sizes=sizes)
+
+
+def test_cache_evicts_least_recently_used_within_budget():
+    cache = SessionHistoryCache(max_bytes=100)
+    cache.put(("a", "1"), history("v", [40]))
+    cache.put(("a", "2"), history("v", [40]))
+    assert cache.get(("a", "1"), "v") is not None
+    cache.put(("a", "3"), history("v", [40]))
+
+    assert cache.get(("a", "2"), "v") is None
+    assert cache.get(("a", "1"), "v") is not None
+    assert cache.get(("a", "3"), "v") is not None
+    assert cache.get(("a", "3"), "other version") is None
+
+    cache.put(("a", "4"), history("v", [60, 60]))
+    assert cache.get(("a", "4"), "v") is None
+
+
+def test_concurrent_turns_invalidate_the_session():
+    cache = SessionHistoryCache()
+    key = ("a", "1")
+    initial = history("v1", [])
+    cache.put(key, initial)
+
+    cache.replace(key, initial, history("v2", [10]))
+    # a second turn that started from the same history would drop the first one's turn
+    cache.replace(key, initial, history("v3", [10]))
+    assert cache.get(key, "v2") is None
+    assert cache.get(key, "v3") is None
+
+
+def test_resumed_turn_replaces_its_earlier_version():
+    def turn(turn_id, content):
+        return Turn(
+            turn_id=turn_id,
+            session_id="1",
+            input_messages=[UserMessage(content="q")],
+            steps=[],
+            output_message=CompletionMessage(content=content, stop_reason=StopReason.end_of_turn),
+            started_at="2025-01-01T00:00:00Z",
+        )
+
+    first = history("v1", []).with_turn("v2", turn("t1", "a"), [SystemMessage(content="x")], 10)
+    resumed = first.with_turn("v3", turn("t1", "b"), [], 20)
+    assert [t.output_message.content for t in resumed.turns] == ["b"]
+    assert resumed.turn_sizes == [20]
+    assert resumed.size == 20
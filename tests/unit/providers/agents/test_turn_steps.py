@@ -0,0 +1,155 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import json
+
+import pytest
+
+from llama_stack.apis.agents import (
+    AgentConfig,
+    AgentTurnCreateRequest,
+    AgentTurnResponseEvent,
+    AgentTurnResponseStepCompletePayload,
+    AgentTurnResponseStreamChunk,
+    InferenceStep,
+    StepType,
+    Turn,
+)
+from llama_stack.apis.inference import CompletionMessage, StopReason, UserMessage
+from llama_stack.providers.inline.agents.meta_reference.agent_instance import ChatAgent
+from llama_stack.providers.utils.kvstore.config import SqliteKVStoreConfig
+from llama_stack.providers.utils.kvstore.sqlite import SqliteKVStoreImpl
+
+
+@pytest.fixture
+async def kvstore(tmp_path):
+    kvstore = SqliteKVStoreImpl(SqliteKVStoreConfig(db_path=str(tmp_path / "agents_store.db")))
+    await kvstore.initialize()
+    return kvstore
+
+
+def inference_step(turn_id, i):
+    message = CompletionMessage(content=f"answer {i}", stop_reason=StopReason.end_of_turn)
+    return InferenceStep(step_id=f"{turn_id}-step-{i}", turn_id=turn_id, model_response=message)
+
+
+def make_agent(kvstore, num_steps, fail=False):
+    agent = ChatAgent(
+        agent_id="agent",
+        agent_config=AgentConfig(model="test-model", instructions=""),
+        tempdir="/tmp",
+        inference_api=None,
+        safety_api=None,
+        tool_runtime_api=None,
+        tool_groups_api=None,
+        vector_io_api=None,
+        persistence_store=kvstore,
+    )
+
+    async def run(session_id, turn_id, input_messages, sampling_params, stream, documents, turn_context, tools):
+        for i in range(num_steps):
+            step = inference_step(turn_id, i)
+            yield AgentTurnResponseStreamChunk(
+                event=AgentTurnResponseEvent(
+                    payload=AgentTurnResponseStepCompletePayload(
+                        step_type=StepType.inference.value, step_id=step.step_id, step_details=step
+                    )
+                )
+            )
+        if fail:
+            raise RuntimeError("inference failed")
+        yield step.model_response
+
+    agent.run = run
+    return agent
+
+
+async def run_turn(agent, session_id, turn_id):
+    request = AgentTurnCreateRequest(
+        agent_id=agent.agent_id,
+        session_id=session_id,
+        messages=[UserMessage(content="question")],
+        stream=True,
+    )
+    return [chunk async for chunk in agent._run_turn(request, turn_id=turn_id)]
+
+
+@pytest.mark.asyncio
+async def test_steps_are_stored_as_records(kvstore):
+    agent = make_agent(kvstore, num_steps=12)
+    session_id = await agent.create_session("session")
+    await run_turn(agent, session_id, "turn")
+
+    stored = json.loads(await kvstore.get(f"session:agent:{session_id}:turn"))
+    assert stored["steps"] == []
+
+    turn = await agent.storage.get_session_turn(session_id, "turn")
+    assert [step.step_id for step in turn.steps] == [f"turn-step-{i}" for i in range(12)]
+    assert [step.step_id for step in (await agent.storage.get_session_turns(session_id))[0].steps] == [
+        step.step_id for step in turn.steps
+    ]
+
+    step = await agent.storage.get_turn_step(session_id, "turn", "turn-step-11")
+    assert step.model_response.content == "answer 11"
+    assert await agent.storage.get_turn_step(session_id, "turn", "other") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_turn_keeps_its_completed_steps(kvstore):
+    agent = make_agent(kvstore, num_steps=2, fail=True)
+    session_id = await agent.create_session("session")
+    with pytest.raises(RuntimeError):
+        await run_turn(agent, session_id, "turn")
+
+    assert await agent.storage.get_session_turns(session_id) == []
+    step = await agent.storage.get_turn_step(session_id, "turn", "turn-step-1")
+    assert step.model_response.content == "answer 1"
+
+
+@pytest.mark.asyncio
+async def test_turns_with_inline_steps_are_migrated_when_stored_again(kvstore):
+    agent = make_agent(kvstore, num_steps=0)
+    session_id = await agent.create_session("session")
+    turn = Turn(
+        turn_id="turn",
+        session_id=session_id,
+        input_messages=[UserMessage(content="question")],
+        steps=[inference_step("turn", 0), inference_step("turn", 1)],
+        output_message=CompletionMessage(content="answer", stop_reason=StopReason.end_of_turn),
+        started_at="2025-01-01T00:00:00Z",
+    )
+    # stored the way turns were before steps had records of their own
+    await kvstore.set(f"session:agent:{session_id}:turn", turn.model_dump_json())
+    assert (await agent.storage.get_turn_step(session_id, "turn", "turn-step-1")).step_id == "turn-step-1"
+
+    context = await agent.storage.load_turn_context(session_id, "turn")
+    assert context.inline_steps
+    steps = list(turn.steps)
+    context.resume(steps)
+    steps.append(inference_step("turn", 2))
+    await context.checkpoint(steps)
+
+    # until the turn is stored again, it reads as it was
+    assert len((await agent.storage.get_session_turn(session_id, "turn")).steps) == 2
+
+    await context.add_turn(turn.model_copy(update={"steps": steps}))
+    stored = await agent.storage.get_session_turn(session_id, "turn")
+    assert [step.step_id for step in stored.steps] == ["turn-step-0", "turn-step-1", "turn-step-2"]
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_session_deletes_its_steps(kvstore):
+    agent = make_agent(kvstore, num_steps=3)
+    session_id = await agent.create_session("session")
+    other_session_id = await agent.create_session("other")
+    await run_turn(agent, session_id, "turn")
+    await run_turn(agent, other_session_id, "turn")
+
+    await agent.storage.delete_session(session_id)
+
+    assert await agent.storage.get_session_info(session_id) is None
+    assert (await kvstore.scan(prefix=agent.storage._turn_steps_prefix(session_id))).values == []
+    assert len((await kvstore.scan(prefix=agent.storage._turn_steps_prefix(other_session_id))).values) == 3
@@ -0,0 +1,112 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import sqlite3
+import time
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.trace import Status, StatusCode, set_span_in_context
+
+from llama_stack.providers.inline.telemetry.meta_reference.config import TelemetryRetentionConfig
+from llama_stack.providers.inline.telemetry.meta_reference.sqlite_retention import SQLiteRetention
+from llama_stack.providers.inline.telemetry.meta_reference.sqlite_span_processor import SQLiteSpanProcessor
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "trace_store.db")
+
+
+def write_traces(db_path, ttls):
+    processor = SQLiteSpanProcessor(db_path, flush_interval_seconds=60)
+    provider = TracerProvider()
+    provider.add_span_processor(processor)
+    tracer = provider.get_tracer(__name__)
+    for ttl in ttls:
+        root = tracer.start_span("root", attributes={"__root_span__": "true", "__ttl__": ttl})
+        child = tracer.start_span("child", context=set_span_in_context(root), attributes={"__ttl__": ttl})
+        child.add_event("log", attributes={"__ttl__": ttl})
+        child.set_status(Status(StatusCode.OK))
+        child.end()
+        root.set_status(Status(StatusCode.OK))
+        root.end()
+    processor.shutdown()
+
+
+def count_rows(conn):
+    return {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("traces", "spans", "span_events", "span_attributes")
+    }
+
+
+def run_pass(retention, conn, now):
+    batches = 1
+    while retention.run_pending(conn, now):
+        batches += 1
+    return batches
+
+
+def test_expired_traces_are_deleted_in_batches(db_path):
+    write_traces(db_path, ttls=[60, 60, 60, 3600])
+    retention = SQLiteRetention(TelemetryRetentionConfig(batch_size=2))
+
+    with sqlite3.connect(db_path) as conn:
+        assert run_pass(retention, conn, time.time()) == 1
+        assert count_rows(conn)["traces"] == 4
+
+        # the next pass is not due before the interval
+        assert not retention.run_pending(conn, time.time() + 120)
+        assert count_rows(conn)["traces"] == 4
+
+        retention = SQLiteRetention(TelemetryRetentionConfig(batch_size=2))
+        assert run_pass(retention, conn, time.time() + 120) == 2
+        assert count_rows(conn) == {"traces": 1, "spans": 2, "span_events": 1, "span_attributes": 3}
+
+
+def test_downsampling_keeps_root_spans(db_path):
+    write_traces(db_path, ttls=[3600, 3600])
+    retention = SQLiteRetention(TelemetryRetentionConfig(downsample_after_seconds=60))
+
+    with sqlite3.connect(db_path) as conn:
+        run_pass(retention, conn, time.time() + 120)
+        assert count_rows(conn) == {"traces": 2, "spans": 2, "span_events": 0, "span_attributes": 4}
+        assert {row[0] for row in conn.execute("SELECT name FROM spans")} == {"root"}
+
+
+def test_new_databases_vacuum_incrementally(db_path):
+    write_traces(db_path, ttls=[60] * 50)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        run_pass(SQLiteRetention(TelemetryRetentionConfig()), conn, time.time() + 120)
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+
+def test_existing_traces_get_the_default_expiry(db_path):
+    write_traces(db_path, ttls=[60])
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DROP INDEX idx_traces_expires_at")
+        conn.execute("ALTER TABLE traces DROP COLUMN expires_at")
+
+    SQLiteSpanProcessor(db_path).shutdown()
+    with sqlite3.connect(db_path) as conn:
+        expires_at = conn.execute("SELECT expires_at FROM traces").fetchone()[0]
+    assert expires_at == pytest.approx(time.time() + 604800, abs=60)
+
+
+def test_processor_runs_retention(db_path):
+    write_traces(db_path, ttls=[0])
+    processor = SQLiteSpanProcessor(db_path, flush_interval_seconds=0.01, retention=TelemetryRetentionConfig())
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with sqlite3.connect(db_path) as conn:
+            if count_rows(conn)["traces"] == 0:
+                break
+        time.sleep(0.01)
+    processor.shutdown()
+    with sqlite3.connect(db_path) as conn:
+        assert count_rows(conn)["traces"] == 0
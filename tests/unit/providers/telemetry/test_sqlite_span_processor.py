@@ -0,0 +1,231 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import sqlite3
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.trace import Status, StatusCode, set_span_in_context
+
+from llama_stack.apis.telemetry import QueryCondition, QueryConditionOp
+from llama_stack.providers.inline.telemetry.meta_reference.sqlite_span_processor import SQLiteSpanProcessor
+from llama_stack.providers.utils.telemetry import dataset_mixin
+from llama_stack.providers.utils.telemetry.dataset_mixin import TelemetryDatasetMixin
+from llama_stack.providers.utils.telemetry.sqlite_trace_store import SQLiteTraceStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "traces" / "trace_store.db")
+
+
+@pytest.fixture
+def processor(db_path):
+    # a long interval, so that nothing is written before force_flush unless the batch fills up
+    processor = SQLiteSpanProcessor(db_path, max_batch_size=1000, flush_interval_seconds=60)
+    yield processor
+    processor.shutdown()
+
+
+def make_tracer(processor):
+    provider = TracerProvider()
+    provider.add_span_processor(processor)
+    return provider.get_tracer(__name__)
+
+
+def emit_trace(tracer, session_id: str, children: int = 2):
+    root = tracer.start_span("root", attributes={"__root_span__": "true", "session_id": session_id})
+    context = set_span_in_context(root)
+    for i in range(children):
+        child = tracer.start_span(f"child-{i}", context=context, attributes={"index": i})
+        child.add_event("log", attributes={"message": f"event {i}"})
+        child.set_status(Status(StatusCode.OK))
+        child.end()
+    # the telemetry adapter always sets a status before ending a span
+    root.set_status(Status(StatusCode.OK))
+    root.end()
+    return format(root.get_span_context().span_id, "016x")
+
+
+def count_rows(db_path, table):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_spans_are_buffered_until_flush(processor, db_path):
+    tracer = make_tracer(processor)
+    emit_trace(tracer, "a")
+    assert count_rows(db_path, "spans") == 0
+
+    assert processor.force_flush()
+    assert count_rows(db_path, "traces") == 1
+    assert count_rows(db_path, "spans") == 3
+    assert count_rows(db_path, "span_events") == 2
+
+
+def test_full_batch_is_written_without_flush(db_path):
+    processor = SQLiteSpanProcessor(db_path, max_batch_size=3, flush_interval_seconds=60)
+    tracer = make_tracer(processor)
+    emit_trace(tracer, "a")
+    with processor._condition:
+        assert processor._condition.wait_for(lambda: not processor._buffer, timeout=5)
+    processor.shutdown()
+    assert count_rows(db_path, "spans") == 3
+
+
+def test_shutdown_writes_remaining_spans(processor, db_path):
+    emit_trace(make_tracer(processor), "a")
+    processor.shutdown()
+    assert count_rows(db_path, "spans") == 3
+
+
+def test_indexes_are_created(processor, db_path):
+    with sqlite3.connect(db_path) as conn:
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM spans WHERE parent_span_id = ?", ("x",)).fetchall()
+    assert {"idx_spans_trace_id", "idx_spans_parent_span_id", "idx_span_events_span_id"} <= indexes
+    assert "idx_spans_parent_span_id" in str(plan)
+
+
+@pytest.mark.asyncio
+async def test_trace_store_queries(processor, db_path):
+    tracer = make_tracer(processor)
+    root_a = emit_trace(tracer, "a")
+    emit_trace(tracer, "b", children=3)
+    processor.force_flush()
+    store = SQLiteTraceStore(db_path)
+
+    traces = await store.query_traces(order_by=["start_time"])
+    assert len(traces) == 2
+
+    traces = await store.query_traces(
+        attribute_filters=[QueryCondition(key="session_id", op=QueryConditionOp.EQ, value="a")]
+    )
+    assert [t.root_span_id for t in traces] == [root_a]
+
+    tree = await store.get_span_tree(root_a)
+    assert sorted(span.name for span in tree.values()) == ["child-0", "child-1", "root"]
+
+
+def test_span_attributes_are_indexed(processor, db_path):
+    emit_trace(make_tracer(processor), "a")
+    processor.force_flush()
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT key, value FROM span_attributes WHERE key != '__root_span__'").fetchall()
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT span_id FROM span_attributes WHERE key = ? AND value = ?", ("session_id", "a")
+        ).fetchall()
+    assert sorted(rows) == [("index", 0), ("index", 1), ("session_id", "a")]
+    assert "idx_span_attributes_key_value" in str(plan)
+
+
+def test_span_attributes_are_backfilled(processor, db_path):
+    emit_trace(make_tracer(processor), "a")
+    processor.force_flush()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DROP TABLE span_attributes")
+
+    SQLiteSpanProcessor(db_path).shutdown()
+    assert count_rows(db_path, "span_attributes") == 4
+
+
+@pytest.mark.asyncio
+async def test_query_traces_with_several_filters(processor, db_path):
+    tracer = make_tracer(processor)
+    emit_trace(tracer, "a")
+    root_b = emit_trace(tracer, "b", children=3)
+    processor.force_flush()
+    store = SQLiteTraceStore(db_path)
+
+    traces = await store.query_traces(
+        attribute_filters=[
+            QueryCondition(key="index", op=QueryConditionOp.GT, value=1),
+            QueryCondition(key="index", op=QueryConditionOp.LT, value=3),
+        ]
+    )
+    assert [t.root_span_id for t in traces] == [root_b]
+
+    # the conditions must hold for the same span
+    traces = await store.query_traces(
+        attribute_filters=[
+            QueryCondition(key="session_id", op=QueryConditionOp.EQ, value="a"),
+            QueryCondition(key="index", op=QueryConditionOp.EQ, value=0),
+        ]
+    )
+    assert traces == []
+
+
+@pytest.mark.asyncio
+async def test_query_spans_pages_through_traces(processor, db_path):
+    tracer = make_tracer(processor)
+    for i in range(5):
+        emit_trace(tracer, f"session-{i}")
+    processor.force_flush()
+    store = SQLiteTraceStore(db_path)
+
+    pages = []
+    cursor = None
+    while True:
+        spans, cursor = await store.query_spans(attributes_to_return=["index"], cursor=cursor, page_size=2)
+        pages.append(spans)
+        if cursor is None:
+            break
+    assert [len(page) for page in pages] == [4, 4, 2]
+    spans = [span for page in pages for span in page]
+    assert len({span.span_id for span in spans}) == 10
+    assert all(set(span.attributes) == {"index"} for span in spans)
+    trace_ids = [span.trace_id for span in spans]
+    assert trace_ids == sorted(trace_ids)
+
+
+@pytest.mark.asyncio
+async def test_query_spans_filters_and_depth(processor, db_path):
+    tracer = make_tracer(processor)
+    root_a = emit_trace(tracer, "a")
+    emit_trace(tracer, "b")
+    processor.force_flush()
+    store = SQLiteTraceStore(db_path)
+    session_a = [QueryCondition(key="session_id", op=QueryConditionOp.EQ, value="a")]
+
+    spans, cursor = await store.query_spans(attribute_filters=session_a)
+    assert cursor is None
+    assert [span.name for span in spans] == ["root", "child-0", "child-1"]
+    assert spans[1].parent_span_id == root_a
+    assert spans[0].attributes["session_id"] == "a"
+
+    spans, _ = await store.query_spans(attribute_filters=session_a, max_depth=1)
+    assert [span.span_id for span in spans] == [root_a]
+
+
+class RecordingDatasetIO:
+    def __init__(self):
+        self.appended = []
+
+    async def append_rows(self, dataset_id, rows):
+        self.appended.append((dataset_id, rows))
+
+
+class DatasetTelemetry(TelemetryDatasetMixin):
+    def __init__(self, db_path):
+        self.datasetio_api = RecordingDatasetIO()
+        self.trace_store = SQLiteTraceStore(db_path)
+
+
+@pytest.mark.asyncio
+async def test_save_spans_to_dataset_appends_each_page(monkeypatch, processor, db_path):
+    monkeypatch.setattr(dataset_mixin, "SPAN_QUERY_PAGE_SIZE", 2)
+    tracer = make_tracer(processor)
+    for i in range(3):
+        emit_trace(tracer, f"session-{i}")
+    processor.force_flush()
+    telemetry = DatasetTelemetry(db_path)
+
+    response = await telemetry.query_spans(attribute_filters=[], attributes_to_return=["session_id"])
+    assert sorted(span.attributes["session_id"] for span in response.data) == ["session-0", "session-1", "session-2"]
+
+    await telemetry.save_spans_to_dataset(attribute_filters=[], attributes_to_save=["index"], dataset_id="eval")
+    assert [len(rows) for _, rows in telemetry.datasetio_api.appended] == [4, 2]
+    assert {row["index"] for _, rows in telemetry.datasetio_api.appended for row in rows} == {0, 1}
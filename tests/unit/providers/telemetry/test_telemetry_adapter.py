@@ -0,0 +1,75 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from llama_stack.apis.telemetry import (
+    LogSeverity,
+    SpanEndPayload,
+    SpanStartPayload,
+    SpanStatus,
+    StructuredLogEvent,
+    UnstructuredLogEvent,
+)
+from llama_stack.providers.inline.telemetry.meta_reference import telemetry
+from llama_stack.providers.inline.telemetry.meta_reference.config import TelemetryConfig
+from llama_stack.providers.inline.telemetry.meta_reference.telemetry import TelemetryAdapter
+
+SPAN_ID = "00000000000000aa"
+
+
+class CountingLock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquisitions = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.acquisitions += 1
+
+    def __exit__(self, *exc):
+        self.lock.release()
+
+
+def log(span_id: str, message: str) -> UnstructuredLogEvent:
+    return UnstructuredLogEvent(
+        trace_id="t",
+        span_id=span_id,
+        timestamp=datetime.now(timezone.utc),
+        message=message,
+        severity=LogSeverity.INFO,
+    )
+
+
+def span_event(payload) -> StructuredLogEvent:
+    return StructuredLogEvent(trace_id="t", span_id=SPAN_ID, timestamp=datetime.now(timezone.utc), payload=payload)
+
+
+@pytest.mark.asyncio
+async def test_log_events_locks_each_event_and_skips_failing_events():
+    adapter = TelemetryAdapter(TelemetryConfig(sinks=[]), {})
+    adapter._lock = CountingLock()
+
+    await adapter.log_events([span_event(SpanStartPayload(name="span"))])
+    span = telemetry._GLOBAL_STORAGE["active_spans"][int(SPAN_ID, 16)]
+
+    await adapter.log_events(
+        [
+            # not a hex span id
+            log("not-a-span", "bad"),
+            log(SPAN_ID, "good"),
+            span_event(SpanEndPayload(status=SpanStatus.OK)),
+        ]
+    )
+
+    # one acquisition per event, so that a batch does not hold the lock for long
+    assert adapter._lock.acquisitions == 4
+    assert [event.attributes["message"] for event in span.events] == ["good"]
+    assert not span.is_recording()
+    assert int(SPAN_ID, 16) not in telemetry._GLOBAL_STORAGE["active_spans"]
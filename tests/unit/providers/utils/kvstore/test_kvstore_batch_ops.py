@@ -0,0 +1,108 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import sqlite3
+
+import pytest
+import pytest_asyncio
+
+from llama_stack.providers.utils.kvstore import InmemoryKVStoreImpl
+from llama_stack.providers.utils.kvstore.api import prefix_upper_bound
+from llama_stack.providers.utils.kvstore.config import SqliteKVStoreConfig
+from llama_stack.providers.utils.kvstore.sqlite import SqliteKVStoreImpl
+
+
+@pytest_asyncio.fixture(params=["inmemory", "sqlite"])
+async def kvstore(request, tmp_path):
+    if request.param == "inmemory":
+        store = InmemoryKVStoreImpl()
+    else:
+        store = SqliteKVStoreImpl(SqliteKVStoreConfig(db_path=str(tmp_path / "kvstore.db")))
+    await store.initialize()
+    yield store
+    if hasattr(store, "shutdown"):
+        await store.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_multi_get_preserves_order_and_missing_keys(kvstore):
+    await kvstore.multi_set({"a": "1", "b": "2", "c": "3"})
+    assert await kvstore.multi_get(["c", "missing", "a"]) == ["3", None, "1"]
+    assert await kvstore.multi_get([]) == []
+
+
+@pytest.mark.asyncio
+async def test_multi_get_many_keys(kvstore):
+    items = {f"key:{i:05d}": str(i) for i in range(1200)}
+    await kvstore.multi_set(items)
+    assert await kvstore.multi_get(list(items)) == list(items.values())
+
+
+@pytest.mark.asyncio
+async def test_delete_range_is_half_open(kvstore):
+    await kvstore.multi_set({"k:1": "1", "k:2": "2", "k:3": "3"})
+    await kvstore.delete_range("k:1", "k:3")
+    assert await kvstore.multi_get(["k:1", "k:2", "k:3"]) == [None, None, "3"]
+
+
+@pytest.mark.asyncio
+async def test_scan_with_keys(kvstore):
+    await kvstore.multi_set({"p:b": "2", "p:a": "1", "q:a": "x", "p": "root"})
+    result = await kvstore.scan("p:")
+    assert result.keys == ["p:a", "p:b"]
+    assert result.values == ["1", "2"]
+    assert result.cursor is None
+
+    result = await kvstore.scan("p:", with_keys=False)
+    assert result.keys is None
+    assert result.values == ["1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_scan_pagination(kvstore):
+    await kvstore.multi_set({f"page:{i:02d}": str(i) for i in range(7)})
+
+    keys, cursor = [], None
+    while True:
+        result = await kvstore.scan("page:", limit=3, cursor=cursor)
+        assert len(result.keys) <= 3
+        keys.extend(result.keys)
+        cursor = result.cursor
+        if cursor is None:
+            break
+    assert keys == [f"page:{i:02d}" for i in range(7)]
+
+
+@pytest.mark.asyncio
+async def test_compare_and_set(kvstore):
+    assert await kvstore.compare_and_set("k", None, "v1")
+    assert not await kvstore.compare_and_set("k", None, "other")
+    assert not await kvstore.compare_and_set("k", "stale", "other")
+    assert await kvstore.compare_and_set("k", "v1", "v2")
+    assert await kvstore.get("k") == "v2"
+
+
+@pytest.mark.asyncio
+async def test_sqlite_multi_set_is_atomic(tmp_path):
+    store = SqliteKVStoreImpl(SqliteKVStoreConfig(db_path=str(tmp_path / "atomic.db")))
+    await store.initialize()
+    try:
+
+        def failing_batch(conn):
+            conn.execute(f"INSERT INTO {store.table_name} (key, value) VALUES ('x', '1')")
+            raise sqlite3.IntegrityError("boom")
+
+        with pytest.raises(sqlite3.IntegrityError):
+            await store.pool.writer.execute(failing_batch, write=True)
+        assert await store.get("x") is None
+    finally:
+        await store.shutdown()
+
+
+def test_prefix_upper_bound():
+    assert prefix_upper_bound("abc") == "abd"
+    assert prefix_upper_bound("") is None
+    assert prefix_upper_bound("a\U0010ffff") == "b"
@@ -0,0 +1,163 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+
+from llama_stack.providers.utils.kvstore.config import PostgresKVStoreConfig
+
+# These tests run against a throwaway local Postgres server provided by `pgserver`.
+#
+# How to run this test:
+#
+# pip install asyncpg pgserver
+# pytest tests/unit/providers/utils/kvstore/test_postgres_kvstore.py -v -s --asyncio-mode=auto
+
+asyncpg = pytest.importorskip("asyncpg")
+pgserver = pytest.importorskip("pgserver")
+
+from llama_stack.providers.utils.kvstore.postgres import PostgresKVStoreImpl  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def postgres_server(tmp_path_factory):
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="stop")
+    yield server
+    server.cleanup()
+
+
+@pytest.fixture
+def postgres_config(postgres_server):
+    # pgserver listens on a unix socket inside its data directory
+    socket_dir = postgres_server.get_uri().split("host=")[-1]
+    return PostgresKVStoreConfig(
+        host=socket_dir,
+        db="postgres",
+        user="postgres",
+        table_name=f"kvstore_{uuid.uuid4().hex[:8]}",
+        max_pool_size=4,
+        expiration_cleanup_interval=0,
+    )
+
+
+@pytest_asyncio.fixture
+async def kvstore(postgres_config):
+    store = PostgresKVStoreImpl(postgres_config)
+    await store.initialize()
+    yield store
+    await store.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_set_get_delete(kvstore):
+    await kvstore.set("a", "1")
+    assert await kvstore.get("a") == "1"
+    await kvstore.set("a", "2")
+    assert await kvstore.get("a") == "2"
+    await kvstore.delete("a")
+    assert await kvstore.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_batch_operations(kvstore):
+    await kvstore.multi_set({f"k:{i}": str(i) for i in range(5)})
+    assert await kvstore.multi_get(["k:4", "missing", "k:0"]) == ["4", None, "0"]
+    assert await kvstore.range("k:1", "k:3") == ["1", "2"]
+
+    page = await kvstore.scan("k:", limit=2)
+    assert page.keys == ["k:0", "k:1"]
+    rest = await kvstore.scan("k:", cursor=page.cursor)
+    assert rest.keys == ["k:2", "k:3", "k:4"]
+    assert rest.cursor is None
+
+    await kvstore.delete_range("k:0", "k:3")
+    assert (await kvstore.scan("k:", with_keys=False)).values == ["3", "4"]
+
+
+@pytest.mark.asyncio
+async def test_scan_bounds(kvstore):
+    await kvstore.multi_set({"j": "0", "k": "1", "k:a": "2", "k:b": "3", "k;": "4", "l": "5"})
+    assert (await kvstore.scan("k:")).keys == ["k:a", "k:b"]
+    assert (await kvstore.scan("k:", cursor="k:a")).keys == ["k:b"]
+    # a cursor before the prefix does not widen the scan
+    assert (await kvstore.scan("k:", cursor="a")).keys == ["k:a", "k:b"]
+    assert (await kvstore.scan("")).keys == ["j", "k", "k:a", "k:b", "k;", "l"]
+    page = await kvstore.scan("", limit=4)
+    assert (await kvstore.scan("", cursor=page.cursor)).keys == ["k;", "l"]
+
+
+@pytest.mark.asyncio
+async def test_scan_uses_primary_key_index(kvstore):
+    await kvstore.multi_set({f"k:{i}": str(i) for i in range(5)})
+    pool = await kvstore._get_pool()
+    async with pool.acquire() as conn:
+        # the table is too small for the planner to pick the index on its own
+        await conn.execute("SET enable_seqscan = off")
+        try:
+            for (has_cursor, has_upper), sql in kvstore._sql_scan.items():
+                args = ["k:1" if has_cursor else "k:", 3] + (["k;"] if has_upper else [])
+                plan = "\n".join(row[0] for row in await conn.fetch(f"EXPLAIN {sql}", *args))
+                assert "Index" in plan, plan
+        finally:
+            await conn.execute("RESET enable_seqscan")
+
+
+@pytest.mark.asyncio
+async def test_compare_and_set(kvstore):
+    assert await kvstore.compare_and_set("k", None, "v1")
+    assert not await kvstore.compare_and_set("k", None, "other")
+    assert not await kvstore.compare_and_set("k", "stale", "other")
+    assert await kvstore.compare_and_set("k", "v1", "v2")
+    assert await kvstore.get("k") == "v2"
+
+    # an expired key counts as absent
+    await kvstore.set("expired", "old", expiration=datetime.now(timezone.utc) - timedelta(seconds=5))
+    assert not await kvstore.compare_and_set("expired", "old", "new")
+    assert await kvstore.compare_and_set("expired", None, "new")
+    assert await kvstore.get("expired") == "new"
+
+
+@pytest.mark.asyncio
+async def test_namespace_is_transparent(postgres_config):
+    store = PostgresKVStoreImpl(postgres_config.model_copy(update={"namespace": "ns"}))
+    await store.initialize()
+    try:
+        await store.set("key", "value")
+        result = await store.scan("k")
+        assert result.keys == ["key"]
+    finally:
+        await store.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_expiration_filtered_and_cleaned_up(kvstore):
+    now = datetime.now(timezone.utc)
+    await kvstore.set("expired", "old", expiration=now - timedelta(seconds=5))
+    await kvstore.multi_set({"fresh": "new"}, expiration=now + timedelta(hours=1))
+
+    assert await kvstore.get("expired") is None
+    assert await kvstore.get("fresh") == "new"
+    assert await kvstore.cleanup_expired() == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_bounded_pool(kvstore, postgres_config):
+    await asyncio.gather(*(kvstore.set(f"c:{i:03d}", str(i)) for i in range(100)))
+    assert len((await kvstore.scan("c:")).keys) == 100
+
+    pool = await kvstore._get_pool()
+    assert pool.get_size() <= postgres_config.max_pool_size
+
+
+def test_usable_from_multiple_event_loops(postgres_config):
+    store = PostgresKVStoreImpl(postgres_config)
+    asyncio.run(store.initialize())
+    asyncio.run(store.set("loop", "1"))
+    assert asyncio.run(store.get("loop")) == "1"
@@ -0,0 +1,109 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+
+from llama_stack.providers.utils.kvstore.config import SqliteKVStoreConfig
+from llama_stack.providers.utils.kvstore.sqlite import SqliteKVStoreImpl
+
+
+@pytest_asyncio.fixture
+async def kvstore(tmp_path):
+    store = SqliteKVStoreImpl(SqliteKVStoreConfig(db_path=str(tmp_path / "kvstore.db")))
+    await store.initialize()
+    yield store
+    await store.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_set_get_delete_range(kvstore):
+    await kvstore.set("a:1", "one")
+    await kvstore.set("a:2", "two")
+    await kvstore.set("b:1", "other")
+
+    assert await kvstore.get("a:1") == "one"
+    assert await kvstore.range("a:", "a:\xff") == ["one", "two"]
+
+    await kvstore.delete("a:1")
+    assert await kvstore.get("a:1") is None
+
+
+@pytest.mark.asyncio
+async def test_wal_mode_enabled(kvstore):
+    conn = sqlite3.connect(kvstore.db_path)
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        conn.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sets_are_group_committed(kvstore):
+    await asyncio.gather(*(kvstore.set(f"key:{i:04d}", str(i)) for i in range(500)))
+    values = await kvstore.range("key:", "key:\xff")
+    assert values == [str(i) for i in range(500)]
+
+
+@pytest.mark.asyncio
+async def test_failing_write_does_not_abort_batch(kvstore):
+    def bad_write(conn):
+        conn.execute("INSERT INTO missing_table VALUES (1)")
+
+    results = await asyncio.gather(
+        kvstore.set("k1", "v1"),
+        kvstore.pool.writer.execute(bad_write, write=True),
+        kvstore.set("k2", "v2"),
+        return_exceptions=True,
+    )
+    assert isinstance(results[1], sqlite3.OperationalError)
+    assert await kvstore.get("k1") == "v1"
+    assert await kvstore.get("k2") == "v2"
+
+
+@pytest.mark.asyncio
+async def test_expiration_is_enforced(kvstore):
+    now = datetime.now(timezone.utc)
+    await kvstore.set("expired", "old", expiration=now - timedelta(seconds=1))
+    await kvstore.set("fresh", "new", expiration=now + timedelta(hours=1))
+
+    assert await kvstore.get("expired") is None
+    assert await kvstore.get("fresh") == "new"
+    assert await kvstore.range("expired", "fresh") == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_instances_share_connections(tmp_path):
+    config = SqliteKVStoreConfig(db_path=str(tmp_path / "shared.db"))
+    first, second = SqliteKVStoreImpl(config), SqliteKVStoreImpl(config)
+    await first.initialize()
+    await second.initialize()
+    try:
+        assert first.pool is second.pool
+        await first.set("k", "v")
+        assert await second.get("k") == "v"
+    finally:
+        await first.shutdown()
+        await second.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_recreated_database_file_is_not_reused(tmp_path):
+    config = SqliteKVStoreConfig(db_path=str(tmp_path / "recreated.db"))
+    store = SqliteKVStoreImpl(config)
+    await store.initialize()
+    await store.set("k", "v")
+
+    os.remove(config.db_path)
+    fresh = SqliteKVStoreImpl(config)
+    await fresh.initialize()
+    assert await fresh.get("k") is None
+    await fresh.shutdown()
@@ -0,0 +1,118 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import threading
+from datetime import datetime, timezone
+
+from llama_stack.apis.telemetry import LogSeverity, UnstructuredLogEvent
+from llama_stack.providers.utils.telemetry.tracing import (
+    BackgroundLogger,
+    BackgroundLoggerConfig,
+    OverflowPolicy,
+)
+
+
+def make_event(i: int) -> UnstructuredLogEvent:
+    return UnstructuredLogEvent(
+        trace_id="t",
+        span_id="s",
+        timestamp=datetime.now(timezone.utc),
+        message=str(i),
+        severity=LogSeverity.INFO,
+    )
+
+
+class BatchingTelemetry:
+    def __init__(self):
+        self.batches = []
+        # blocks the worker until set, so that events pile up in the queue
+        self.gate = threading.Event()
+        self.gate.set()
+
+    async def log_events(self, events):
+        self.gate.wait()
+        self.batches.append([int(e.message) for e in events])
+
+
+class SingleEventTelemetry:
+    def __init__(self):
+        self.events = []
+
+    async def log_event(self, event):
+        if event.message == "bad":
+            raise ValueError("bad event")
+        self.events.append(event.message)
+
+
+def test_events_are_written_in_batches():
+    api = BatchingTelemetry()
+    api.gate.clear()
+    background_logger = BackgroundLogger(api, BackgroundLoggerConfig(batch_size=4))
+    for i in range(10):
+        background_logger.log_event(make_event(i))
+    api.gate.set()
+
+    assert background_logger.flush(timeout=5)
+    assert [i for batch in api.batches for i in batch] == list(range(10))
+    assert all(len(batch) <= 4 for batch in api.batches)
+    assert len(api.batches) < 10
+    assert background_logger.stats()["processed_events"] == 10
+
+
+def test_falls_back_to_log_event():
+    api = SingleEventTelemetry()
+    background_logger = BackgroundLogger(api)
+    background_logger.log_event(make_event(1))
+    assert background_logger.flush(timeout=5)
+    assert api.events == ["1"]
+
+
+def test_worker_survives_failed_batches():
+    api = SingleEventTelemetry()
+    background_logger = BackgroundLogger(api)
+    background_logger.log_event(make_event(1).model_copy(update={"message": "bad"}))
+    assert background_logger.flush(timeout=5)
+    background_logger.log_event(make_event(2))
+    assert background_logger.flush(timeout=5)
+    assert api.events == ["2"]
+    assert background_logger.stats()["failed_events"] == 1
+
+
+def fill_queue(policy: OverflowPolicy, **kwargs):
+    api = BatchingTelemetry()
+    api.gate.clear()
+    background_logger = BackgroundLogger(
+        api, BackgroundLoggerConfig(capacity=4, batch_size=1, overflow_policy=policy, **kwargs)
+    )
+    # the worker takes event 0 and waits on the gate; the rest fill the queue
+    background_logger.log_event(make_event(0))
+    background_logger.condition.acquire()
+    background_logger.condition.wait_for(lambda: background_logger.in_progress)
+    background_logger.condition.release()
+    for i in range(1, 11):
+        background_logger.log_event(make_event(i))
+    api.gate.set()
+    assert background_logger.flush(timeout=5)
+    return [i for batch in api.batches for i in batch], background_logger.stats()
+
+
+def test_drop_oldest_policy():
+    written, stats = fill_queue(OverflowPolicy.DROP_OLDEST)
+    assert written == [0, 7, 8, 9, 10]
+    assert stats["dropped_events"] == 6
+
+
+def test_block_policy_drops_after_timeout():
+    written, stats = fill_queue(OverflowPolicy.BLOCK, block_timeout_seconds=0.01)
+    assert written == [0, 1, 2, 3, 4]
+    assert stats["dropped_events"] == 6
+
+
+def test_sample_policy_never_exceeds_capacity():
+    written, stats = fill_queue(OverflowPolicy.SAMPLE)
+    assert written[:3] == [0, 1, 2]
+    assert len(written) <= 5
+    assert stats["dropped_events"] == 11 - len(written)
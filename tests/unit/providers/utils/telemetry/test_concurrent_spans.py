@@ -0,0 +1,66 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+
+import pytest
+
+from llama_stack.apis.telemetry import SpanEndPayload, SpanStartPayload, SpanStatus
+from llama_stack.providers.utils.telemetry import tracing
+from llama_stack.providers.utils.telemetry.tracing import TraceSampler, TraceSamplingConfig
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.events = []
+
+    def log_event(self, event):
+        self.events.append(tracing.resolve_event(event))
+
+
+@pytest.fixture
+def recording_logger(monkeypatch):
+    logger = RecordingLogger()
+    monkeypatch.setattr(tracing, "BACKGROUND_LOGGER", logger)
+    monkeypatch.setattr(tracing, "TRACE_SAMPLER", TraceSampler(TraceSamplingConfig()))
+    return logger
+
+
+async def step(name: str, delay: float, fail: bool = False):
+    tracing.fork_trace_context()
+    async with tracing.span(name):
+        await asyncio.sleep(delay)
+        async with tracing.span(f"{name}.inner"):
+            await asyncio.sleep(delay)
+            if fail:
+                raise ValueError(name)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tasks_have_their_own_span_stacks(recording_logger):
+    await tracing.start_trace("/v1/test")
+    async with tracing.span("parent"):
+        results = await asyncio.gather(step("a", 0.02), step("b", 0.01, fail=True), return_exceptions=True)
+        assert isinstance(results[1], ValueError)
+        assert tracing.get_current_span().name == "parent"
+    context = tracing.CURRENT_TRACE_CONTEXT.get()
+    assert context.error
+    await tracing.end_trace()
+
+    starts = {
+        e.payload.name: (e.span_id, e.payload.parent_span_id)
+        for e in recording_logger.events
+        if isinstance(e.payload, SpanStartPayload)
+    }
+    assert starts["a"][1] == starts["parent"][0]
+    assert starts["b"][1] == starts["parent"][0]
+    assert starts["a.inner"][1] == starts["a"][0]
+    assert starts["b.inner"][1] == starts["b"][0]
+
+    statuses = {e.span_id: e.payload.status for e in recording_logger.events if isinstance(e.payload, SpanEndPayload)}
+    assert statuses[starts["a.inner"][0]] == SpanStatus.OK
+    assert statuses[starts["b.inner"][0]] == SpanStatus.ERROR
+    assert len(statuses) == len(starts)
@@ -0,0 +1,163 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from llama_stack.apis.common.content_types import TextDelta
+from llama_stack.apis.inference import (
+    ChatCompletionResponseEvent,
+    ChatCompletionResponseEventType,
+    ChatCompletionResponseStreamChunk,
+    UserMessage,
+)
+from llama_stack.apis.models import ModelType
+from llama_stack.distribution.routers.routers import InferenceRouter
+from llama_stack.providers.utils.kvstore.kvstore import InmemoryKVStoreImpl, InstrumentedKVStore
+from llama_stack.providers.utils.telemetry import metrics
+from llama_stack.providers.utils.telemetry.metrics import MetricsRegistry
+
+
+def test_histogram_buckets_and_rendering():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", ("api",), buckets=(0.1, 1))
+    child = histogram.labels(api="inference")
+    for value in (0.05, 0.1, 0.5, 3):
+        child.observe(value)
+
+    assert child.snapshot() == ([2, 3, 4], 3.65)
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{api="inference",le="0.1"} 2',
+        'latency_seconds_bucket{api="inference",le="1"} 3',
+        'latency_seconds_bucket{api="inference",le="+Inf"} 4',
+        'latency_seconds_sum{api="inference"} 3.65',
+        'latency_seconds_count{api="inference"} 4',
+    ]
+
+
+def test_labels_are_validated_and_escaped():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("in_flight", "In flight", ("api",))
+    with pytest.raises(ValueError):
+        gauge.labels("a", "b")
+    gauge.labels('say "hi"').inc()
+    assert 'in_flight{api="say \\"hi\\""} 1' in registry.render()
+    with pytest.raises(ValueError):
+        registry.gauge("in_flight", "In flight")
+
+
+def test_concurrent_updates_are_not_lost():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("h", "h").labels()
+    gauge = registry.gauge("g", "g").labels()
+
+    def work():
+        for _ in range(10000):
+            histogram.observe(0.01)
+            gauge.inc()
+        for _ in range(5000):
+            gauge.dec()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    counts, _ = histogram.snapshot()
+    assert counts[-1] == 80000
+    assert gauge.value() == 40000
+
+
+def test_token_stream_timer(monkeypatch):
+    now = [10.0]
+    monkeypatch.setattr(metrics.time, "perf_counter", lambda: now[0])
+    timer = metrics.TokenStreamTimer("chat_completion", "test-model", "test-provider")
+    for delay in (0.5, 0.1, 0.1, 0.1):
+        now[0] += delay
+        timer.token()
+    timer.finish(completion_tokens=4)
+
+    ttft, _ = metrics.TIME_TO_FIRST_TOKEN.labels("test-model", "test-provider").snapshot()
+    inter_token, _ = metrics.INTER_TOKEN_LATENCY.labels("test-model", "test-provider").snapshot()
+    tokens_per_second, total = metrics.TOKENS_PER_SECOND.labels("test-model", "test-provider").snapshot()
+    assert ttft[-1] == 1
+    assert inter_token[-1] == 3
+    assert tokens_per_second[-1] == 1
+    assert total == pytest.approx(5.0)
+
+
+@pytest.mark.asyncio
+async def test_instrumented_kvstore():
+    store = InstrumentedKVStore(InmemoryKVStoreImpl(), "test-store")
+    await store.set("a", "1")
+    await store.multi_set({"b": "2", "c": "3"})
+    assert await store.get("a") == "1"
+    assert (await store.scan("", limit=2)).keys == ["a", "b"]
+    # attributes of the wrapped store are still reachable
+    assert store._store == {"a": "1", "b": "2", "c": "3"}
+
+    counts = {
+        op: metrics.KVSTORE_OP_LATENCY.labels("test-store", op).snapshot()[0][-1]
+        for op in ("get", "set", "multi_set", "scan", "delete")
+    }
+    assert counts == {"get": 1, "set": 1, "multi_set": 1, "scan": 1, "delete": 0}
+
+
+class StreamingProvider:
+    async def chat_completion(self, **kwargs):
+        async def stream():
+            yield ChatCompletionResponseStreamChunk(
+                event=ChatCompletionResponseEvent(
+                    event_type=ChatCompletionResponseEventType.start, delta=TextDelta(text="")
+                )
+            )
+            for word in ("hello", " world"):
+                yield ChatCompletionResponseStreamChunk(
+                    event=ChatCompletionResponseEvent(
+                        event_type=ChatCompletionResponseEventType.progress, delta=TextDelta(text=word)
+                    )
+                )
+            yield ChatCompletionResponseStreamChunk(
+                event=ChatCompletionResponseEvent(
+                    event_type=ChatCompletionResponseEventType.complete, delta=TextDelta(text="")
+                )
+            )
+
+        return stream()
+
+
+class RoutingTable:
+    async def get_model(self, model_id):
+        return SimpleNamespace(model_id=model_id, provider_id="stream-provider", model_type=ModelType.llm, metadata={})
+
+    def get_provider_impl(self, model_id):
+        return StreamingProvider()
+
+
+class Telemetry:
+    async def log_event(self, event):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_router_records_streaming_metrics():
+    router = InferenceRouter(RoutingTable(), Telemetry())
+    stream = await router.chat_completion("stream-model", [UserMessage(content="hi")], stream=True)
+    chunks = [chunk async for chunk in stream]
+    assert len(chunks) == 4
+
+    def count(histogram, *labels):
+        return histogram.labels(*labels).snapshot()[0][-1]
+
+    assert count(metrics.TIME_TO_FIRST_TOKEN, "stream-model", "stream-provider") == 1
+    assert count(metrics.INTER_TOKEN_LATENCY, "stream-model", "stream-provider") == 1
+    assert count(metrics.PROVIDER_LATENCY, "inference", "chat_completion", "stream-provider") == 1
+    assert count(metrics.ROUTER_OVERHEAD, "inference", "chat_completion") >= 1
@@ -0,0 +1,128 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import numpy as np
+import pytest
+
+from llama_stack.apis.inference import EmbeddingsResponse
+from llama_stack.apis.telemetry import SpanEndPayload, SpanStartPayload
+from llama_stack.providers.utils.telemetry import trace_protocol, tracing
+from llama_stack.providers.utils.telemetry.trace_protocol import (
+    TraceCaptureConfig,
+    serialize_value,
+    set_capture_config,
+    trace_capture,
+)
+from llama_stack.providers.utils.telemetry.tracing import DeferredEvent, TraceSampler, TraceSamplingConfig
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.events = []
+
+    def log_event(self, event):
+        self.events.append(event)
+
+    def span_attributes(self, name):
+        """Attributes of the span end event of the span called `name`."""
+        events = [tracing.resolve_event(e) for e in self.events]
+        span_ids = {e.span_id for e in events if isinstance(e.payload, SpanStartPayload) and e.payload.name == name}
+        return next(e.attributes for e in events if isinstance(e.payload, SpanEndPayload) and e.span_id in span_ids)
+
+
+@pytest.fixture
+def recording_logger(monkeypatch):
+    logger = RecordingLogger()
+    monkeypatch.setattr(tracing, "BACKGROUND_LOGGER", logger)
+    monkeypatch.setattr(tracing, "TRACE_SAMPLER", TraceSampler(TraceSamplingConfig()))
+    return logger
+
+
+@pytest.fixture
+def capture_config():
+    def configure(**kwargs):
+        set_capture_config(TraceCaptureConfig(**kwargs))
+
+    yield configure
+    set_capture_config(TraceCaptureConfig())
+
+
+@trace_protocol.trace_protocol
+class Embedder:
+    async def embed(self, texts: list) -> EmbeddingsResponse: ...
+
+    @trace_capture(args=False, output=False)
+    async def secret(self, password: str) -> str: ...
+
+
+class EmbedderImpl(Embedder):
+    async def embed(self, texts: list) -> EmbeddingsResponse:
+        return EmbeddingsResponse(embeddings=[[0.5] * 384 for _ in texts])
+
+    async def secret(self, password: str) -> str:
+        return password
+
+    async def echo(self, value: str) -> str:
+        return value
+
+
+async def call(coro_fn, *args):
+    await tracing.start_trace("/v1/test")
+    try:
+        return await coro_fn(*args)
+    finally:
+        await tracing.end_trace()
+
+
+def test_large_values_are_summarized():
+    embeddings = EmbeddingsResponse(embeddings=[[0.1] * 384 for _ in range(3)])
+    assert serialize_value(embeddings) == str({"embeddings": "<3 vectors of dimension 384>"})
+    assert serialize_value(np.zeros((2, 8), dtype=np.float32)) == "<array of shape (2, 8) and dtype float32>"
+    assert serialize_value(b"\x89PNG" * 100) == "<400 bytes>"
+    assert serialize_value([1, 2, 3]) == "[1, 2, 3]"
+
+
+def test_attributes_are_truncated(capture_config):
+    capture_config(max_attribute_bytes=100)
+    value = serialize_value("x" * 1000)
+    assert value.startswith("x" * 100)
+    assert value.endswith("...<truncated 900 bytes>")
+
+    capture_config(max_attribute_bytes=None)
+    assert serialize_value("x" * 100000) == "x" * 100000
+
+
+@pytest.mark.asyncio
+async def test_args_and_output_are_serialized_when_written(recording_logger, monkeypatch):
+    serialized = []
+    original = trace_protocol.serialize_value
+    monkeypatch.setattr(trace_protocol, "serialize_value", lambda value: serialized.append(value) or original(value))
+
+    await call(EmbedderImpl().embed, ["a", "b"])
+    assert serialized == []
+    assert any(isinstance(e, DeferredEvent) for e in recording_logger.events)
+
+    attributes = recording_logger.span_attributes("EmbedderImpl.embed")
+    assert attributes["__args__"] == str({"texts": ["a", "b"]})
+    assert attributes["output"] == str({"embeddings": "<2 vectors of dimension 384>"})
+
+
+@pytest.mark.asyncio
+async def test_capture_opt_out_on_protocol_method(recording_logger):
+    assert await call(EmbedderImpl().secret, "hunter2") == "hunter2"
+    attributes = recording_logger.span_attributes("EmbedderImpl.secret")
+    assert "__args__" not in attributes
+    assert "output" not in attributes
+
+
+@pytest.mark.asyncio
+async def test_method_overrides(recording_logger, capture_config):
+    capture_config(capture_args=False, capture_output=False, method_overrides={"*.echo": True})
+    await call(EmbedderImpl().echo, "hello")
+    await call(EmbedderImpl().embed, ["a"])
+
+    assert recording_logger.span_attributes("EmbedderImpl.echo")["output"] == "hello"
+    assert "output" not in recording_logger.span_attributes("EmbedderImpl.embed")
@@ -0,0 +1,138 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import pytest
+
+from llama_stack.apis.telemetry import SpanEndPayload, SpanStartPayload, SpanStatus
+from llama_stack.providers.utils.telemetry import trace_protocol, tracing
+from llama_stack.providers.utils.telemetry.tracing import TraceSampler, TraceSamplingConfig
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.events = []
+
+    def log_event(self, event):
+        self.events.append(tracing.resolve_event(event))
+
+    def span_names(self):
+        return [e.payload.name for e in self.events if isinstance(getattr(e, "payload", None), SpanStartPayload)]
+
+
+@pytest.fixture
+def recording_logger(monkeypatch):
+    logger = RecordingLogger()
+    monkeypatch.setattr(tracing, "BACKGROUND_LOGGER", logger)
+    return logger
+
+
+def use_sampling(monkeypatch, **kwargs):
+    monkeypatch.setattr(tracing, "TRACE_SAMPLER", TraceSampler(TraceSamplingConfig(**kwargs)))
+
+
+@trace_protocol.trace_protocol
+class Service:
+    async def work(self, value: str) -> str: ...
+
+
+class ServiceImpl(Service):
+    async def work(self, value: str) -> str:
+        return value
+
+
+async def traced_request(route: str, fail: bool = False):
+    await tracing.start_trace(route)
+    status = SpanStatus.OK
+    try:
+        service = ServiceImpl()
+        await service.work("hello")
+        if fail:
+            async with tracing.span("failing-step"):
+                raise ValueError("boom")
+    except ValueError:
+        status = SpanStatus.ERROR
+    finally:
+        await tracing.end_trace(status)
+
+
+def test_route_sample_rates():
+    sampler = TraceSampler(
+        TraceSamplingConfig(
+            sample_rate=0.5,
+            route_sample_rates={"/v1/health": 0.0, "/v1/inference/*": 1.0},
+        )
+    )
+    assert sampler.sample_rate("/v1/health") == 0.0
+    assert sampler.sample_rate("/v1/inference/chat-completion") == 1.0
+    assert sampler.sample_rate("/v1/agents") == 0.5
+    assert not any(sampler.should_sample("/v1/health") for _ in range(100))
+    assert all(sampler.should_sample("/v1/inference/completion") for _ in range(100))
+
+
+def test_head_sampling_ratio(monkeypatch):
+    use_sampling(monkeypatch, sample_rate=0.25)
+    sampled = sum(tracing.TRACE_SAMPLER.should_sample("/v1/models") for _ in range(4000))
+    assert 800 < sampled < 1200
+
+
+@pytest.mark.asyncio
+async def test_sampled_trace_is_recorded(monkeypatch, recording_logger):
+    use_sampling(monkeypatch, sample_rate=1.0)
+    await traced_request("/v1/test")
+    assert recording_logger.span_names() == ["/v1/test", "ServiceImpl.work"]
+
+
+@pytest.mark.asyncio
+async def test_unsampled_trace_costs_nothing(monkeypatch, recording_logger):
+    use_sampling(monkeypatch, sample_rate=0.0)
+    serialized = []
+    monkeypatch.setattr(trace_protocol, "serialize_value", lambda value: serialized.append(value) or "")
+
+    context = await tracing.start_trace("/v1/test")
+    assert not context.recording
+    assert tracing.get_current_span() is None
+    assert tracing.get_current_span_ids() == (context.trace_id, context.root_span_id)
+    assert await ServiceImpl().work("hello") == "hello"
+    await tracing.end_trace()
+
+    assert recording_logger.events == []
+    assert serialized == []
+
+
+@pytest.mark.asyncio
+async def test_tail_sampling_keeps_failed_traces(monkeypatch, recording_logger):
+    use_sampling(monkeypatch, sample_rate=0.0, tail_sampling=True)
+
+    await traced_request("/v1/ok")
+    assert recording_logger.events == []
+
+    await traced_request("/v1/failed", fail=True)
+    assert recording_logger.span_names() == ["/v1/failed", "ServiceImpl.work", "failing-step"]
+    statuses = [e.payload.status for e in recording_logger.events if isinstance(e.payload, SpanEndPayload)]
+    assert statuses == [SpanStatus.OK, SpanStatus.ERROR, SpanStatus.ERROR]
+
+
+@pytest.mark.asyncio
+async def test_tail_sampling_keeps_slow_traces(monkeypatch, recording_logger):
+    use_sampling(monkeypatch, sample_rate=0.0, tail_sampling=True, tail_latency_threshold_ms=1000)
+    now = [100.0]
+    monkeypatch.setattr(tracing.time, "monotonic", lambda: now[0])
+
+    await tracing.start_trace("/v1/slow")
+    now[0] += 2
+    await tracing.end_trace()
+    assert recording_logger.span_names() == ["/v1/slow"]
+
+
+@pytest.mark.asyncio
+async def test_tail_sampling_bounds_buffered_events(monkeypatch, recording_logger):
+    use_sampling(monkeypatch, sample_rate=0.0, tail_sampling=True, tail_max_buffered_events=3)
+    await tracing.start_trace("/v1/big")
+    for i in range(5):
+        async with tracing.span(f"step-{i}"):
+            pass
+    await tracing.end_trace(SpanStatus.ERROR)
+    assert len(recording_logger.events) == 3
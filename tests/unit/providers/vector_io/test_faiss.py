@@ -0,0 +1,340 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+import base64
+import io
+import json
+import threading
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from llama_stack.apis.vector_dbs import VectorDB
+from llama_stack.apis.vector_io import Chunk, QueryChunksResponse
+from llama_stack.providers.inline.vector_io.faiss import faiss as faiss_provider
+from llama_stack.providers.inline.vector_io.faiss.config import (
+    FaissIndexConfig,
+    FaissIndexType,
+    FaissMetric,
+    FaissVectorIOConfig,
+)
+from llama_stack.providers.inline.vector_io.faiss.faiss import (
+    FAISS_INDEX_PREFIX,
+    LEGACY_FAISS_INDEX_PREFIX,
+    VECTOR_DBS_PREFIX,
+    FaissIndex,
+    FaissVectorIOAdapter,
+    index_description,
+)
+from llama_stack.providers.utils.kvstore.config import SqliteKVStoreConfig
+from llama_stack.providers.utils.kvstore.sqlite import SqliteKVStoreImpl
+
+# This test is a unit test for the FaissVectorIOAdapter class. This should only contain
+# tests which are specific to this class. More general (API-level) tests should be placed in
+# tests/integration/vector_io/
+#
+# How to run this test:
+#
+# pytest tests/unit/providers/vector_io/test_faiss.py \
+# -v -s --tb=short --disable-warnings --asyncio-mode=auto
+
+
+@pytest_asyncio.fixture
+async def kvstore(tmp_path):
+    store = SqliteKVStoreImpl(SqliteKVStoreConfig(db_path=str(tmp_path / "faiss_store.db")))
+    await store.initialize()
+    yield store
+    await store.shutdown()
+
+
+@pytest_asyncio.fixture
+async def faiss_index(kvstore, embedding_dimension, tmp_path):
+    return await FaissIndex.create(embedding_dimension, kvstore, "test_bank", str(tmp_path / "indexes"))
+
+
+async def _reload(index: FaissIndex) -> FaissIndex:
+    return await FaissIndex.create(
+        index.dimension, index.kvstore, index.bank_id, str(index.storage_dir.parent), index.index_config
+    )
+
+
+@pytest.mark.asyncio
+async def test_add_and_query(faiss_index, sample_chunks, sample_embeddings):
+    await faiss_index.add_chunks(sample_chunks, sample_embeddings)
+
+    response = await faiss_index.query(sample_embeddings[3] + 0.01, k=2, score_threshold=0.0)
+    assert isinstance(response, QueryChunksResponse)
+    assert len(response.chunks) == 2
+    assert response.chunks[0].content == sample_chunks[3].content
+
+
+@pytest.mark.asyncio
+async def test_dimension_mismatch(faiss_index, sample_chunks, embedding_dimension):
+    with pytest.raises(ValueError):
+        await faiss_index.add_chunks(sample_chunks[:1], np.zeros((1, embedding_dimension + 1), dtype=np.float32))
+
+
+@pytest.mark.asyncio
+async def test_add_only_writes_new_data(faiss_index, sample_chunks, sample_embeddings, embedding_dimension):
+    await faiss_index.add_chunks(sample_chunks[:10], sample_embeddings[:10])
+    row_bytes = embedding_dimension * 4
+    assert faiss_index.vectors_path.stat().st_size == 10 * row_bytes
+
+    await faiss_index.add_chunks(sample_chunks[10:12], sample_embeddings[10:12])
+    assert faiss_index.vectors_path.stat().st_size == 12 * row_bytes
+    assert json.loads(await faiss_index.kvstore.get(faiss_index.meta_key)) == {
+        "ntotal": 12,
+        "snapshot_ntotal": 0,
+        "snapshot_index": None,
+    }
+
+    reloaded = await _reload(faiss_index)
+    assert reloaded.ntotal == 12
+    response = await reloaded.query(sample_embeddings[11] + 0.01, k=1, score_threshold=0.0)
+    assert response.chunks[0].content == sample_chunks[11].content
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_memory_mapped(
+    faiss_index, sample_chunks, sample_embeddings, embedding_dimension, monkeypatch
+):
+    monkeypatch.setattr(faiss_provider, "MIN_SNAPSHOT_VECTORS", 8)
+    await faiss_index.add_chunks(sample_chunks[:8], sample_embeddings[:8])
+    assert faiss_index.snapshot_ntotal == 8
+    assert faiss_index.tail.ntotal == 0
+
+    # vectors added after the snapshot are served from the tail until the next snapshot
+    await faiss_index.add_chunks(sample_chunks[8:12], sample_embeddings[8:12])
+    assert faiss_index.snapshot_ntotal == 8
+    assert faiss_index.tail.ntotal == 4
+
+    reloaded = await _reload(faiss_index)
+    assert reloaded.snapshot_ntotal == 8
+    assert reloaded.tail.ntotal == 4
+    for i in (2, 10):
+        response = await reloaded.query(sample_embeddings[i] + 0.01, k=3, score_threshold=0.0)
+        assert response.chunks[0].content == sample_chunks[i].content
+
+    await reloaded.add_chunks(sample_chunks[12:16], sample_embeddings[12:16])
+    assert reloaded.snapshot_ntotal == 16
+    assert [p.name for p in reloaded.storage_dir.glob("index.*.faiss")] == ["index.16.faiss"]
+
+
+@pytest.mark.asyncio
+async def test_queries_during_adds_and_snapshots(faiss_index, embedding_dimension, monkeypatch):
+    monkeypatch.setattr(faiss_provider, "MIN_SNAPSHOT_VECTORS", 4)
+    rng = np.random.default_rng(0)
+    vectors = rng.random((64, embedding_dimension), dtype=np.float32)
+    chunks = [Chunk(content=f"chunk {i}", metadata={"document_id": f"doc-{i}"}) for i in range(len(vectors))]
+    await faiss_index.add_chunks(chunks[:4], vectors[:4])
+
+    async def add():
+        for start in range(4, len(vectors), 2):
+            await faiss_index.add_chunks(chunks[start : start + 2], vectors[start : start + 2])
+
+    async def query():
+        for _ in range(50):
+            i = int(rng.integers(4))
+            response = await faiss_index.query(vectors[i] + 0.01, k=2, score_threshold=0.0)
+            # a query that mixed two snapshots would shift ids or return a chunk twice
+            assert response.chunks[0].content == f"chunk {i}"
+            assert len({chunk.content for chunk in response.chunks}) == len(response.chunks)
+
+    await asyncio.gather(add(), *[query() for _ in range(4)])
+    assert faiss_index.ntotal == len(vectors)
+
+
+def test_tail_is_not_searched_while_vectors_are_added():
+    lock = faiss_provider._ReadWriteLock()
+    events = []
+
+    def search():
+        with lock.read():
+            events.append("read")
+
+    with lock.write():
+        reader = threading.Thread(target=search)
+        reader.start()
+        reader.join(timeout=0.1)
+        assert events == []
+    reader.join(timeout=5)
+    assert events == ["read"]
+
+
+@pytest.mark.asyncio
+async def test_uncommitted_vectors_are_discarded(faiss_index, sample_chunks, sample_embeddings, embedding_dimension):
+    await faiss_index.add_chunks(sample_chunks[:4], sample_embeddings[:4])
+    # simulate a crash between appending vectors and committing their chunks
+    faiss_index._write_vectors(4, sample_embeddings[4:6])
+
+    reloaded = await _reload(faiss_index)
+    assert reloaded.ntotal == 4
+    assert reloaded.vectors_path.stat().st_size == 4 * embedding_dimension * 4
+
+
+@pytest.mark.asyncio
+async def test_failed_add_does_not_shift_later_vectors(faiss_index, sample_chunks, sample_embeddings, monkeypatch):
+    # the fourth vector triggers a snapshot, which is built from the vector log
+    monkeypatch.setattr(faiss_provider, "MIN_SNAPSHOT_VECTORS", 4)
+    await faiss_index.add_chunks(sample_chunks[:2], sample_embeddings[:2])
+
+    multi_set = faiss_index.kvstore.multi_set
+
+    async def failing_multi_set(items):
+        raise RuntimeError("kvstore unavailable")
+
+    monkeypatch.setattr(faiss_index.kvstore, "multi_set", failing_multi_set)
+    with pytest.raises(RuntimeError):
+        await faiss_index.add_chunks(sample_chunks[2:3], sample_embeddings[9:10])
+    monkeypatch.setattr(faiss_index.kvstore, "multi_set", multi_set)
+
+    await faiss_index.add_chunks(sample_chunks[2:4], sample_embeddings[2:4])
+    assert faiss_index.snapshot_ntotal == 4
+
+    for index in (faiss_index, await _reload(faiss_index)):
+        for i in range(4):
+            response = await index.query(sample_embeddings[i] + 0.01, k=1, score_threshold=0.0)
+            assert response.chunks[0].content == sample_chunks[i].content
+
+
+@pytest.mark.asyncio
+async def test_delete(faiss_index, sample_chunks, sample_embeddings):
+    await faiss_index.add_chunks(sample_chunks, sample_embeddings)
+    await faiss_index.delete()
+
+    assert not faiss_index.storage_dir.exists()
+    assert (await faiss_index.kvstore.scan("faiss_")).keys == []
+
+
+@pytest.mark.asyncio
+async def test_adapter_migrates_legacy_index(tmp_path, sample_chunks, sample_embeddings, embedding_dimension):
+    import faiss
+
+    config = FaissVectorIOConfig(
+        kvstore=SqliteKVStoreConfig(db_path=str(tmp_path / "adapter.db")),
+        embedding_batching={"batch_size": 16},
+    )
+    vector_db = VectorDB(
+        identifier="legacy_bank",
+        provider_id="faiss",
+        provider_resource_id="legacy_bank",
+        embedding_model="test-model",
+        embedding_dimension=embedding_dimension,
+    )
+
+    # write the index the way older releases did
+    legacy_index = faiss.IndexFlatL2(embedding_dimension)
+    legacy_index.add(sample_embeddings)
+    buffer = io.BytesIO()
+    np.savetxt(buffer, faiss.serialize_index(legacy_index))
+    legacy_data = {
+        "chunk_by_index": {i: c.model_dump_json() for i, c in enumerate(sample_chunks)},
+        "faiss_index": base64.b64encode(buffer.getvalue()).decode("utf-8"),
+    }
+    store = SqliteKVStoreImpl(config.kvstore)
+    await store.initialize()
+    await store.set(f"{VECTOR_DBS_PREFIX}legacy_bank", vector_db.model_dump_json())
+    await store.set(f"{LEGACY_FAISS_INDEX_PREFIX}legacy_bank", json.dumps(legacy_data))
+
+    adapter = FaissVectorIOAdapter(config, inference_api=None)
+    await adapter.initialize()
+    assert adapter.cache["legacy_bank"].batching.batch_size == 16
+    index = adapter.cache["legacy_bank"].index
+    assert index.ntotal == len(sample_chunks)
+    assert index.storage_dir.parent == tmp_path / "faiss_indexes"
+    assert await store.get(f"{LEGACY_FAISS_INDEX_PREFIX}legacy_bank") is None
+    assert await store.get(f"{FAISS_INDEX_PREFIX}legacy_bank") is not None
+
+    response = await index.query(sample_embeddings[5] + 0.01, k=1, score_threshold=0.0)
+    assert response.chunks[0].content == sample_chunks[5].content
+    await store.shutdown()
+
+
+def _random_chunks(n: int, dimension: int):
+    rng = np.random.default_rng(0)
+    chunks = [Chunk(content=f"chunk {i}", metadata={"document_id": f"doc-{i}"}) for i in range(n)]
+    return chunks, rng.random((n, dimension), dtype=np.float32)
+
+
+@pytest.mark.parametrize(
+    "index_config",
+    [
+        FaissIndexConfig(index_type=FaissIndexType.hnsw, hnsw_m=8),
+        FaissIndexConfig(index_type=FaissIndexType.ivf_flat, nlist=4),
+        FaissIndexConfig(index_type=FaissIndexType.ivf_pq, nlist=2, pq_m=8, pq_nbits=4),
+        FaissIndexConfig(index_type=FaissIndexType.hnsw, metric=FaissMetric.cosine),
+    ],
+    ids=["hnsw", "ivf_flat", "ivf_pq", "hnsw_cosine"],
+)
+@pytest.mark.asyncio
+async def test_ann_index_types(kvstore, embedding_dimension, tmp_path, monkeypatch, index_config):
+    monkeypatch.setattr(faiss_provider, "MIN_SNAPSHOT_VECTORS", 640)
+    chunks, embeddings = _random_chunks(1000, embedding_dimension)
+    index = await FaissIndex.create(embedding_dimension, kvstore, "ann_bank", str(tmp_path / "indexes"), index_config)
+
+    await index.add_chunks(chunks[:640], embeddings[:640])
+    assert index.snapshot_description == index_description(index_config, 640)
+    assert index.snapshot_description != "Flat"
+    # vectors added after the snapshot go to a tail index of the same kind
+    await index.add_chunks(chunks[640:700], embeddings[640:700])
+    assert index.tail.ntotal == 60
+
+    reloaded = await _reload(index)
+    assert reloaded.snapshot_description == index.snapshot_description
+    for i in (10, 650):
+        response = await reloaded.query(
+            embeddings[i] + 0.001, k=3, score_threshold=0.0, params={"ef_search": 128, "nprobe": 4}
+        )
+        assert len(response.chunks) == 3
+        if index_config.index_type != FaissIndexType.ivf_pq:
+            assert response.chunks[0].content == chunks[i].content
+        if index_config.metric == FaissMetric.cosine:
+            assert response.scores[0] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_ivf_trains_once_enough_vectors():
+    config = FaissIndexConfig(index_type=FaissIndexType.ivf_flat)
+    assert index_description(config, 1000) == "Flat"
+    assert index_description(config, 1_000_000) == "IVF4000,Flat"
+    assert index_description(config.model_copy(update={"nlist": 16}), 1000) == "IVF16,Flat"
+    pq_config = FaissIndexConfig(index_type=FaissIndexType.ivf_pq, nlist=16, pq_m=16)
+    assert index_description(pq_config, 1000) == "Flat"
+    assert index_description(pq_config, 10_000) == "IVF16,PQ16x8"
+
+
+def test_pq_m_must_divide_dimension():
+    with pytest.raises(ValueError):
+        FaissIndex(10, index_config=FaissIndexConfig(index_type=FaissIndexType.ivf_pq, pq_m=3))
+
+
+@pytest.mark.asyncio
+async def test_adapter_uses_index_config_from_metadata(tmp_path, embedding_dimension):
+    config = FaissVectorIOConfig(kvstore=SqliteKVStoreConfig(db_path=str(tmp_path / "adapter.db")))
+    adapter = FaissVectorIOAdapter(config, inference_api=None)
+    await adapter.initialize()
+
+    vector_db = VectorDB(
+        identifier="hnsw_bank",
+        provider_id="faiss",
+        provider_resource_id="hnsw_bank",
+        embedding_model="test-model",
+        embedding_dimension=embedding_dimension,
+        metadata={"faiss_index": {"index_type": "hnsw", "metric": "inner_product"}},
+    )
+    await adapter.register_vector_db(vector_db)
+    assert adapter.cache["hnsw_bank"].index.index_config.index_type == FaissIndexType.hnsw
+
+    with pytest.raises(ValueError):
+        await adapter.register_vector_db(
+            vector_db.model_copy(update={"identifier": "bad_bank", "metadata": {"faiss_index": {"index_type": "lsh"}}})
+        )
+    assert "bad_bank" not in [db.identifier for db in await adapter.list_vector_dbs()]
+
+    reopened = FaissVectorIOAdapter(config, inference_api=None)
+    await reopened.initialize()
+    assert reopened.cache["hnsw_bank"].index.index_config.metric == FaissMetric.inner_product
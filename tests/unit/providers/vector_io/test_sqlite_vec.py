@@ -109,3 +109,74 @@ def test_generate_chunk_id():
         "bc744db3-1b25-0a9c-cdff-b6ba3df73c36",
         "f68df25d-d9aa-ab4d-5684-64a233add20d",
     ]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_inserts_and_queries_reuse_connections(tmp_path, sample_chunks, embedding_dimension):
+    index = await SQLiteVecIndex.create(
+        dimension=embedding_dimension, db_path=str(tmp_path / "concurrent.db"), bank_id="concurrent", reader_threads=2
+    )
+    try:
+        await index.add_chunks(
+            sample_chunks, np.random.rand(len(sample_chunks), embedding_dimension).astype(np.float32)
+        )
+
+        async def insert(i):
+            chunk = Chunk(content=f"concurrent {i}", metadata={"document_id": f"concurrent-{i}"})
+            await index.add_chunks([chunk], np.random.rand(1, embedding_dimension).astype(np.float32))
+
+        async def query():
+            response = await index.query(
+                np.random.rand(embedding_dimension).astype(np.float32), k=3, score_threshold=0.0
+            )
+            assert len(response.chunks) == 3
+
+        await asyncio.gather(*[insert(i) for i in range(20)], *[query() for _ in range(20)])
+
+        # one writer plus at most one connection per reader thread, opened once each
+        assert len(index.pool._connections) <= 3
+        rows = await index.pool.read(
+            lambda conn: conn.execute(f"SELECT COUNT(*) FROM {index.metadata_table}").fetchall()
+        )
+        assert rows[0][0] == len(sample_chunks) + 20
+        journal_mode = await index.pool.read(lambda conn: conn.execute("PRAGMA journal_mode").fetchone()[0])
+        assert journal_mode == "wal"
+    finally:
+        await index.delete()
+
+
+@pytest.mark.asyncio
+async def test_indexes_share_pool_per_database(tmp_path, embedding_dimension):
+    db_path = str(tmp_path / "shared.db")
+    first = await SQLiteVecIndex.create(dimension=embedding_dimension, db_path=db_path, bank_id="first")
+    second = await SQLiteVecIndex.create(dimension=embedding_dimension, db_path=db_path, bank_id="second")
+    pool = first.pool
+    assert second.pool is pool
+
+    await first.close()
+    await second.delete()
+    # the pool is closed once the last index releases it
+    with pytest.raises(RuntimeError):
+        await pool.write(lambda conn: None)
+
+
+@pytest.mark.asyncio
+async def test_failed_insert_rolls_back_the_writer_transaction(tmp_path, embedding_dimension):
+    index = await SQLiteVecIndex.create(
+        dimension=embedding_dimension, db_path=str(tmp_path / "rollback.db"), bank_id="rollback"
+    )
+    try:
+        valid = Chunk(content="valid", metadata={"document_id": "doc"})
+        without_document_id = Chunk(content="no document id", metadata={})
+        with pytest.raises(KeyError):
+            await index.add_chunks(
+                [valid, without_document_id], np.random.rand(2, embedding_dimension).astype(np.float32), batch_size=1
+            )
+
+        await index.add_chunks([valid], np.random.rand(1, embedding_dimension).astype(np.float32))
+        rows = await index.pool.read(
+            lambda conn: conn.execute(f"SELECT COUNT(*) FROM {index.metadata_table}").fetchall()
+        )
+        assert rows[0][0] == 1
+    finally:
+        await index.delete()
@@ -0,0 +1,138 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from llama_stack.apis.vector_dbs import VectorDB
+from llama_stack.providers.utils.memory import embedding_cache
+from llama_stack.providers.utils.memory.embedding_cache import EmbeddingCache
+from llama_stack.providers.utils.memory.vector_store import VectorDBWithIndex
+
+
+def make_compute(calls, value=1.0, delay=0.0):
+    async def compute():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return [value, value]
+
+    return compute
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    cache = EmbeddingCache(max_entries=2, ttl_seconds=60)
+    calls = []
+    await cache.get_or_compute("m", "a", make_compute(calls, 1.0))
+    await cache.get_or_compute("m", "b", make_compute(calls, 2.0))
+    # touch "a" so that "b" is the least recently used
+    await cache.get_or_compute("m", "a", make_compute(calls))
+    await cache.get_or_compute("m", "c", make_compute(calls, 3.0))
+
+    assert cache.get("m", "a") is not None
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "c") is not None
+    assert calls == [1.0, 2.0, 3.0]
+
+
+@pytest.mark.asyncio
+async def test_entries_are_keyed_on_model():
+    cache = EmbeddingCache()
+    calls = []
+    first = await cache.get_or_compute("m1", "q", make_compute(calls, 1.0))
+    second = await cache.get_or_compute("m2", "q", make_compute(calls, 2.0))
+    assert first.tolist() == [1.0, 1.0]
+    assert second.tolist() == [2.0, 2.0]
+    assert not first.flags.writeable
+
+
+@pytest.mark.asyncio
+async def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "monotonic", lambda: now[0])
+    cache = EmbeddingCache(ttl_seconds=10)
+    calls = []
+    await cache.get_or_compute("m", "q", make_compute(calls))
+    now[0] += 5
+    await cache.get_or_compute("m", "q", make_compute(calls))
+    assert len(calls) == 1
+
+    now[0] += 10
+    assert cache.get("m", "q") is None
+    await cache.get_or_compute("m", "q", make_compute(calls))
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_computation():
+    cache = EmbeddingCache()
+    calls = []
+    results = await asyncio.gather(*(cache.get_or_compute("m", "q", make_compute(calls, delay=0.01)) for _ in range(5)))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.misses == 1
+    assert cache.hits == 4
+
+
+@pytest.mark.asyncio
+async def test_failed_computation_is_not_cached():
+    cache = EmbeddingCache()
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("m", "q", fail)
+    assert cache.get("m", "q") is None
+
+    calls = []
+    await cache.get_or_compute("m", "q", make_compute(calls))
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def vector_db_with_index():
+    index = MagicMock()
+    index.query = AsyncMock(return_value="response")
+    inference_api = MagicMock()
+    inference_api.embeddings = AsyncMock()
+    vector_db = VectorDB(
+        identifier="db",
+        provider_id="p",
+        embedding_model="model",
+        embedding_dimension=2,
+    )
+    return VectorDBWithIndex(vector_db=vector_db, index=index, inference_api=inference_api)
+
+
+@pytest.mark.asyncio
+async def test_query_chunks_uses_precomputed_embedding(vector_db_with_index):
+    await vector_db_with_index.query_chunks("q", {"max_chunks": 3}, query_embedding=[0.5, 0.25])
+
+    vector_db_with_index.inference_api.embeddings.assert_not_called()
+    embedding, k, _ = vector_db_with_index.index.query.call_args.args
+    assert embedding.tolist() == [0.5, 0.25]
+    assert k == 3
+
+
+@pytest.mark.asyncio
+async def test_query_chunks_rejects_wrong_dimension(vector_db_with_index):
+    with pytest.raises(ValueError):
+        await vector_db_with_index.query_chunks("q", query_embedding=[0.5, 0.25, 0.125])
+
+
+@pytest.mark.asyncio
+async def test_query_chunks_embeds_query_once(vector_db_with_index, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "query_embedding_cache", EmbeddingCache())
+    inference_api = vector_db_with_index.inference_api
+    inference_api.embeddings.return_value = MagicMock(embeddings=[np.array([1.0, 0.0])])
+
+    await vector_db_with_index.query_chunks("same query")
+    await vector_db_with_index.query_chunks("same query")
+    assert inference_api.embeddings.call_count == 1
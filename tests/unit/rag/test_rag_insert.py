@@ -0,0 +1,74 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from llama_stack.apis.tools import RAGDocument
+from llama_stack.providers.inline.tool_runtime.rag.config import RagToolRuntimeConfig
+from llama_stack.providers.inline.tool_runtime.rag.memory import MemoryToolRuntimeImpl
+
+
+def make_documents(n: int):
+    return [
+        RAGDocument(document_id=f"doc-{i}", content=f"https://example.com/{i}.txt", mime_type="text/plain", metadata={})
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+async def rag_runtime():
+    runtime = MemoryToolRuntimeImpl(
+        RagToolRuntimeConfig(max_concurrent_fetches=3, parse_workers=1),
+        vector_io_api=MagicMock(insert_chunks=AsyncMock()),
+        inference_api=MagicMock(),
+        vector_dbs_api=MagicMock(),
+    )
+    await runtime.initialize()
+    yield runtime
+    await runtime.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_insert_fetches_concurrently_with_a_bound(rag_runtime):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, text=f"contents of {request.url.path}")
+
+    await rag_runtime.http_client.aclose()
+    rag_runtime.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    await rag_runtime.insert(make_documents(10), vector_db_id="db")
+
+    assert max_in_flight == 3
+    rag_runtime.vector_io_api.insert_chunks.assert_awaited_once()
+    chunks = rag_runtime.vector_io_api.insert_chunks.call_args.kwargs["chunks"]
+    # chunks keep the order of the documents
+    assert [c.metadata["document_id"] for c in chunks] == [f"doc-{i}" for i in range(10)]
+    assert chunks[4].content == "contents of /4.txt"
+
+
+@pytest.mark.asyncio
+async def test_insert_parses_inline_documents(rag_runtime):
+    documents = [
+        RAGDocument(document_id="inline", content="some inline text", metadata={}),
+        RAGDocument(document_id="data", content="data:text/plain;charset=utf-8,some%20data", metadata={}),
+    ]
+
+    await rag_runtime.insert(documents, vector_db_id="db")
+
+    chunks = rag_runtime.vector_io_api.insert_chunks.call_args.kwargs["chunks"]
+    assert [c.content for c in chunks] == ["some inline text", "some data"]
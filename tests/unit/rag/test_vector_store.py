@@ -4,15 +4,27 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 
+import asyncio
 import base64
 import mimetypes
 import os
 from pathlib import Path
 
+import numpy as np
 import pytest
 
+from llama_stack.apis.inference import EmbeddingsResponse
 from llama_stack.apis.tools import RAGDocument
-from llama_stack.providers.utils.memory.vector_store import URL, content_from_doc
+from llama_stack.apis.vector_dbs import VectorDB
+from llama_stack.apis.vector_io import Chunk
+from llama_stack.providers.utils.memory.config import EmbeddingBatchingConfig
+from llama_stack.providers.utils.memory.vector_store import (
+    URL,
+    EmbeddingIndex,
+    VectorDBWithIndex,
+    batch_chunks,
+    content_from_doc,
+)
 
 DUMMY_PDF_PATH = Path(os.path.abspath(__file__)).parent / "fixtures" / "dummy.pdf"
 # Depending on the machine, this can get parsed a couple of ways
@@ -76,3 +88,122 @@ class TestVectorStore:
         )
         content = await content_from_doc(doc)
         assert content in DUMMY_PDF_TEXT_CHOICES
+
+
+def make_chunks(n: int, token_count: int = 10):
+    return [
+        Chunk(content=f"chunk {i}", metadata={"document_id": f"doc-{i}", "token_count": token_count}) for i in range(n)
+    ]
+
+
+class RecordingIndex(EmbeddingIndex):
+    def __init__(self):
+        self.batches = []
+
+    async def add_chunks(self, chunks, embeddings):
+        assert len(chunks) == len(embeddings)
+        self.batches.append((chunks, embeddings))
+
+    async def query(self, embedding, k, score_threshold):
+        raise NotImplementedError()
+
+    async def delete(self):
+        pass
+
+
+class FakeInference:
+    def __init__(self, fail_on_call=None):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.fail_on_call = fail_on_call
+
+    async def embeddings(self, model_id, contents):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("embedding failed")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return EmbeddingsResponse(embeddings=[[float(len(c)), 0.0] for c in contents])
+
+
+def make_vector_db_with_index(inference, batching=None):
+    vector_db = VectorDB(identifier="db", provider_id="p", embedding_model="model", embedding_dimension=2)
+    return VectorDBWithIndex(
+        vector_db=vector_db,
+        index=RecordingIndex(),
+        inference_api=inference,
+        batching=batching or EmbeddingBatchingConfig(),
+    )
+
+
+class TestBatchChunks:
+    def test_splits_by_count(self):
+        batches = list(batch_chunks(make_chunks(10), max_chunks=4))
+        assert [len(b) for b in batches] == [4, 4, 2]
+
+    def test_splits_by_token_budget(self):
+        batches = list(batch_chunks(make_chunks(10, token_count=10), max_chunks=100, max_tokens=35))
+        assert [len(b) for b in batches] == [3, 3, 3, 1]
+
+    def test_oversized_chunk_gets_its_own_batch(self):
+        chunks = make_chunks(1, token_count=100) + make_chunks(2, token_count=10)
+        batches = list(batch_chunks(chunks, max_chunks=100, max_tokens=50))
+        assert [len(b) for b in batches] == [1, 2]
+
+    def test_rejects_empty_batches(self):
+        with pytest.raises(ValueError):
+            list(batch_chunks(make_chunks(1), max_chunks=0))
+
+
+class TestInsertChunks:
+    @pytest.mark.asyncio
+    async def test_inserts_in_bounded_concurrent_batches(self):
+        inference = FakeInference()
+        vector_db_with_index = make_vector_db_with_index(inference)
+        progress = []
+
+        await vector_db_with_index.insert_chunks(
+            make_chunks(25),
+            batch_size=4,
+            max_concurrency=2,
+            progress_callback=lambda done, total: progress.append((done, total)),
+        )
+
+        batches = vector_db_with_index.index.batches
+        assert inference.calls == 7
+        assert inference.max_in_flight == 2
+        assert all(len(chunks) <= 4 for chunks, _ in batches)
+        assert all(embeddings.dtype == np.float32 for _, embeddings in batches)
+        inserted = sorted(c.metadata["document_id"] for chunks, _ in batches for c in chunks)
+        assert inserted == sorted(f"doc-{i}" for i in range(25))
+        assert progress[-1] == (25, 25)
+        assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+
+    @pytest.mark.asyncio
+    async def test_uses_configured_batching(self):
+        inference = FakeInference()
+        batching = EmbeddingBatchingConfig(batch_size=5, max_concurrency=3)
+        vector_db_with_index = make_vector_db_with_index(inference, batching)
+
+        await vector_db_with_index.insert_chunks(make_chunks(30))
+
+        assert inference.calls == 6
+        assert inference.max_in_flight == 3
+        assert all(len(chunks) == 5 for chunks, _ in vector_db_with_index.index.batches)
+
+        # values passed to insert_chunks take precedence
+        await vector_db_with_index.insert_chunks(make_chunks(30), batch_size=10, max_concurrency=1)
+        assert inference.calls == 9
+        assert inference.max_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_embedding_failure_stops_the_insert(self):
+        inference = FakeInference(fail_on_call=2)
+        vector_db_with_index = make_vector_db_with_index(inference)
+
+        with pytest.raises(RuntimeError):
+            await vector_db_with_index.insert_chunks(make_chunks(40), batch_size=4, max_concurrency=2)
+        assert inference.calls < 10
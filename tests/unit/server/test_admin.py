@@ -0,0 +1,99 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from llama_stack.distribution.datatypes import AdminConfig, ServerConfig, StackRunConfig
+from llama_stack.distribution.inspect import DistributionInspectConfig, DistributionInspectImpl
+from llama_stack.distribution.providers import ProviderImpl, ProviderImplConfig
+from llama_stack.distribution.server.admin import SamplingProfiler, TaskTracker, dump_tasks
+from llama_stack.distribution.server.server import create_app
+from llama_stack.providers.datatypes import Api
+
+
+def make_app(admin: AdminConfig):
+    config = StackRunConfig(image_name="test", providers={}, server=ServerConfig(admin=admin))
+    impls = {
+        Api.inspect: DistributionInspectImpl(DistributionInspectConfig(run_config=config), {}),
+        Api.providers: ProviderImpl(ProviderImplConfig(run_config=config), {}),
+    }
+    return create_app(config, impls)
+
+
+def test_admin_endpoints_are_disabled_by_default():
+    with TestClient(make_app(AdminConfig())) as client:
+        assert client.get("/v1/health").status_code == 200
+        assert client.get("/v1/admin/tasks").status_code == 404
+        assert client.get("/v1/admin/profile", params={"seconds": 0.1}).status_code == 404
+
+
+def test_profile_endpoint():
+    with TestClient(make_app(AdminConfig(enabled=True, max_profile_seconds=1))) as client:
+        response = client.get("/v1/admin/profile", params={"seconds": 0.2, "interval_ms": 5})
+        assert response.status_code == 200
+        assert response.headers["content-disposition"].startswith("attachment; filename=")
+        lines = response.text.splitlines()
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+            assert stack.split(";")[0]
+
+        assert client.get("/v1/admin/profile", params={"seconds": 5}).status_code == 400
+
+
+def test_tasks_endpoint():
+    with TestClient(make_app(AdminConfig(enabled=True))) as client:
+        response = client.get("/v1/admin/tasks")
+        assert response.status_code == 200
+        assert isinstance(response.json()["data"], list)
+
+
+def test_profiler_samples_busy_threads():
+    stop = threading.Event()
+
+    def busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+
+    thread = threading.Thread(target=busy_loop, name="busy-thread")
+    thread.start()
+    try:
+        counts = SamplingProfiler(0.001).run(0.1)
+    finally:
+        stop.set()
+        thread.join()
+
+    busy = [stack for stack in counts if stack.startswith("busy-thread;")]
+    assert busy
+    assert all("busy_loop (" in stack for stack in busy)
+
+
+@pytest.mark.asyncio
+async def test_task_dump_reports_pending_time():
+    tracker = TaskTracker()
+    tracker.install(asyncio.get_running_loop())
+    try:
+        event = asyncio.Event()
+
+        async def waiter():
+            await event.wait()
+
+        task = asyncio.create_task(waiter(), name="waiter")
+        await asyncio.sleep(0.05)
+        tasks = {info.name: info for info in dump_tasks(tracker)}
+        event.set()
+        await task
+    finally:
+        asyncio.get_running_loop().set_task_factory(None)
+
+    assert tasks["waiter"].coroutine.endswith("waiter")
+    assert tasks["waiter"].pending_seconds >= 0.05
+    assert any(frame.startswith("waiter (") for frame in tasks["waiter"].stack)
@@ -0,0 +1,53 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import logging
+
+from llama_stack.apis.inference import UserMessage
+from llama_stack.log import MAX_REPR_LENGTH, Lazy, StructuredMessage, bounded_repr
+
+
+class ReprCounter:
+    def __init__(self):
+        self.calls = 0
+
+    def __repr__(self):
+        self.calls += 1
+        return "counted"
+
+
+def test_message_is_not_formatted_when_disabled(caplog):
+    logger = logging.getLogger("test_lazy_logging")
+    counter = ReprCounter()
+    computed = []
+
+    with caplog.at_level(logging.INFO, logger="test_lazy_logging"):
+        logger.debug(StructuredMessage("event", value=counter, lazy=Lazy(lambda: computed.append(1))))
+    assert counter.calls == 0
+    assert computed == []
+
+    with caplog.at_level(logging.DEBUG, logger="test_lazy_logging"):
+        logger.debug(StructuredMessage("event", value=counter, ids=Lazy(lambda: [1, 2])))
+    assert counter.calls == 1
+    assert caplog.messages == ["event: value=counted, ids=[1, 2]"]
+    assert caplog.records[0].msg.fields["ids"].fn() == [1, 2]
+
+
+def test_bounded_repr_abbreviates_large_values():
+    assert bounded_repr("short") == "'short'"
+    assert len(bounded_repr("x" * 100_000)) < 250
+    assert bounded_repr(list(range(100))) == "[0, 1, 2, 3, 4, 5, 6, 7, ...]"
+
+    messages = [UserMessage(content="x" * 100_000) for _ in range(100)]
+    text = bounded_repr(messages)
+    assert text.startswith("[UserMessage(role='user', content='xxx")
+    assert len(text) <= MAX_REPR_LENGTH
+
+
+def test_bounded_repr_limits_nesting():
+    nested = [[[[[["deep"]]]]]]
+    assert bounded_repr(nested) == "[[[[[...]]]]]"
+    assert bounded_repr({"key": "value"}) == "{'key': 'value'}"
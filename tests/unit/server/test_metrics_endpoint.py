@@ -0,0 +1,81 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from llama_stack.distribution.datatypes import AuthenticationConfig, MetricsConfig, ServerConfig, StackRunConfig
+from llama_stack.distribution.inspect import DistributionInspectConfig, DistributionInspectImpl
+from llama_stack.distribution.providers import ProviderImpl, ProviderImplConfig
+from llama_stack.distribution.server.server import MetricsMiddleware, create_app
+from llama_stack.providers.datatypes import Api
+from llama_stack.providers.utils.telemetry.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT
+
+
+class InspectImpl:
+    async def list_routes(self):
+        return []
+
+    async def health(self):
+        return {"status": "OK"}
+
+    async def version(self):
+        return {"version": "test"}
+
+
+def make_app(server: ServerConfig):
+    config = StackRunConfig(image_name="test", providers={}, server=server)
+    impls = {
+        Api.inspect: DistributionInspectImpl(DistributionInspectConfig(run_config=config), {}),
+        Api.providers: ProviderImpl(ProviderImplConfig(run_config=config), {}),
+    }
+    return create_app(config, impls)
+
+
+def test_metrics_middleware():
+    app = FastAPI()
+    in_flight = []
+
+    @app.get("/v1/health")
+    def health():
+        in_flight.append(REQUESTS_IN_FLIGHT.labels("inspect").value())
+        return {"status": "OK"}
+
+    app.add_middleware(MetricsMiddleware, impls={Api.inspect: InspectImpl()})
+    client = TestClient(app)
+    before, _ = REQUEST_LATENCY.labels("inspect", "/v1/health").snapshot()
+
+    assert client.get("/v1/health").status_code == 200
+    assert client.get("/v1/unknown").status_code == 404
+
+    assert in_flight == [1]
+    assert REQUESTS_IN_FLIGHT.labels("inspect").value() == 0
+    after, _ = REQUEST_LATENCY.labels("inspect", "/v1/health").snapshot()
+    assert after[-1] == before[-1] + 1
+
+
+def test_metrics_endpoint_is_disabled_by_default():
+    with TestClient(make_app(ServerConfig())) as client:
+        assert client.get("/v1/health").status_code == 200
+        assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_endpoint():
+    with TestClient(make_app(ServerConfig(metrics=MetricsConfig(enabled=True)))) as client:
+        assert client.get("/v1/health").status_code == 200
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE llama_stack_request_duration_seconds histogram" in response.text
+        assert 'llama_stack_request_duration_seconds_count{api="inspect",route="/v1/health"}' in response.text
+        assert 'llama_stack_requests_in_flight{api="inspect"} 0' in response.text
+
+
+def test_metrics_endpoint_requires_authentication():
+    server = ServerConfig(metrics=MetricsConfig(enabled=True), auth=AuthenticationConfig(endpoint="http://auth"))
+    with TestClient(make_app(server)) as client:
+        assert client.get("/metrics").status_code == 401
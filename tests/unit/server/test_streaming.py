@@ -0,0 +1,122 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from llama_stack.distribution.datatypes import StreamingConfig
+from llama_stack.distribution.server.server import create_dynamic_typed_route
+from llama_stack.distribution.server.streaming import SSEStreamingResponse
+
+
+async def _events(n: int):
+    for i in range(n):
+        yield f"data: {i}\n\n"
+
+
+async def _run_response(response: SSEStreamingResponse, send_delay: float = 0):
+    bodies = []
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message["body"]:
+            bodies.append(message["body"])
+            await asyncio.sleep(send_delay)
+
+    await response.stream_response(send)
+    return bodies
+
+
+def _make_app(streaming_config=None):
+    async def stream_numbers(n: int, stream: bool = False):
+        async def gen():
+            for i in range(n):
+                yield {"i": i}
+
+        return gen()
+
+    app = FastAPI()
+    app.post("/numbers", response_model=None)(
+        create_dynamic_typed_route(stream_numbers, "post", "/numbers", streaming_config)
+    )
+    return app
+
+
+def _parse_events(text: str):
+    return [json.loads(line[len("data: ") :]) for line in text.split("\n\n") if line]
+
+
+@pytest.mark.parametrize("streaming_config", [None, StreamingConfig(coalesce=True, coalesce_window_ms=5)])
+def test_dynamic_route_streams_all_events(streaming_config):
+    client = TestClient(_make_app(streaming_config))
+    response = client.post("/numbers", json={"n": 50, "stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert _parse_events(response.text) == [{"i": i} for i in range(50)]
+
+
+@pytest.mark.asyncio
+async def test_default_mode_writes_each_event():
+    bodies = await _run_response(SSEStreamingResponse(_events(10)))
+    assert bodies == [f"data: {i}\n\n".encode() for i in range(10)]
+
+
+@pytest.mark.asyncio
+async def test_coalescing_batches_events_for_slow_client():
+    response = SSEStreamingResponse(_events(100), config=StreamingConfig(coalesce=True))
+    bodies = await _run_response(response, send_delay=0.01)
+    assert b"".join(bodies) == b"".join(f"data: {i}\n\n".encode() for i in range(100))
+    assert len(bodies) < 100
+
+
+@pytest.mark.asyncio
+async def test_coalescing_splits_batches_at_max_bytes():
+    # each event is 12 bytes
+    events = [f"data: {i:04d}\n\n".encode() for i in range(20)]
+
+    async def oversized_last():
+        for event in events:
+            yield event
+        yield b"data: " + b"x" * 100 + b"\n\n"
+
+    config = StreamingConfig(coalesce=True, coalesce_max_bytes=30)
+    bodies = await _run_response(SSEStreamingResponse(oversized_last(), config=config), send_delay=0.01)
+    assert b"".join(bodies[:-1]) == b"".join(events)
+    assert all(len(body) <= 30 for body in bodies[:-1])
+    assert any(len(body) == 24 for body in bodies)
+    # an event larger than the limit is written whole
+    assert len(bodies[-1]) == 108
+
+
+@pytest.mark.asyncio
+async def test_coalescing_respects_buffer_limit():
+    produced = 0
+
+    async def counting_events():
+        nonlocal produced
+        for i in range(100):
+            produced += 1
+            yield f"data: {i:04d}\n\n"
+
+    config = StreamingConfig(coalesce=True, max_buffered_bytes=50)
+    response = SSEStreamingResponse(counting_events(), config=config)
+    max_ahead = 0
+    sent = 0
+
+    async def send(message):
+        nonlocal max_ahead, sent
+        if message["type"] == "http.response.body" and message["body"]:
+            sent += message["body"].count(b"data:")
+            max_ahead = max(max_ahead, produced - sent)
+            await asyncio.sleep(0.001)
+
+    await response.stream_response(send)
+    assert sent == 100
+    # each event is 12 bytes, so at most a handful can be pending ahead of the client
+    assert max_ahead <= 6
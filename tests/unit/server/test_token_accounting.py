@@ -0,0 +1,147 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from llama_stack.apis.common.content_types import TextDelta
+from llama_stack.apis.inference import (
+    ChatCompletionResponse,
+    ChatCompletionResponseEvent,
+    ChatCompletionResponseEventType,
+    ChatCompletionResponseStreamChunk,
+    CompletionMessage,
+    StopReason,
+    UserMessage,
+)
+from llama_stack.apis.models import ModelType
+from llama_stack.apis.telemetry import MetricInResponse
+from llama_stack.distribution.routers import routers
+from llama_stack.distribution.routers.routers import InferenceRouter
+
+
+class Provider:
+    def __init__(self, usage=None):
+        self.usage = usage
+
+    async def chat_completion(self, stream=False, **kwargs):
+        if not stream:
+            return ChatCompletionResponse(
+                completion_message=CompletionMessage(content="hello world", stop_reason=StopReason.end_of_turn),
+                metrics=self.usage,
+            )
+
+        async def chunks():
+            for event_type, text in (
+                (ChatCompletionResponseEventType.start, ""),
+                (ChatCompletionResponseEventType.progress, "hello"),
+                (ChatCompletionResponseEventType.progress, " world"),
+                (ChatCompletionResponseEventType.complete, ""),
+            ):
+                yield ChatCompletionResponseStreamChunk(
+                    event=ChatCompletionResponseEvent(event_type=event_type, delta=TextDelta(text=text))
+                )
+
+        return chunks()
+
+
+class RoutingTable:
+    def __init__(self, provider, metadata=None):
+        self.provider = provider
+        self.metadata = metadata or {}
+
+    async def get_model(self, model_id):
+        return SimpleNamespace(
+            model_id=model_id, provider_id="provider", model_type=ModelType.llm, metadata=self.metadata
+        )
+
+    def get_provider_impl(self, model_id):
+        return self.provider
+
+
+class Telemetry:
+    def __init__(self):
+        self.events = []
+
+    async def log_event(self, event):
+        self.events.append(event)
+
+
+@pytest.fixture(autouse=True)
+def current_span(monkeypatch):
+    monkeypatch.setattr(routers, "get_current_span_ids", lambda: ("trace", "span"))
+
+
+def make_router(provider, metadata=None):
+    router = InferenceRouter(RoutingTable(provider, metadata), Telemetry())
+    count_threads = []
+    count_tokens_sync = router._count_tokens_sync
+
+    def recording_count_tokens_sync(*args):
+        count_threads.append(threading.get_ident())
+        return count_tokens_sync(*args)
+
+    router._count_tokens_sync = recording_count_tokens_sync
+    return router, count_threads
+
+
+def usage(response_metrics):
+    return {m.metric: m.value for m in response_metrics}
+
+
+@pytest.mark.asyncio
+async def test_tokens_are_counted_in_a_worker_thread():
+    router, count_threads = make_router(Provider())
+    response = await router.chat_completion("m", [UserMessage(content="hi")])
+
+    completion_tokens = len(router.formatter.encode_dialog_prompt([response.completion_message]).tokens)
+    assert usage(response.metrics)["completion_tokens"] == completion_tokens
+    assert len(count_threads) == 2
+    assert threading.get_ident() not in count_threads
+    assert len(router.telemetry.events) == 3
+
+
+@pytest.mark.asyncio
+async def test_provider_reported_usage_is_used():
+    reported = [
+        MetricInResponse(metric="prompt_tokens", value=7),
+        MetricInResponse(metric="completion_tokens", value=3),
+    ]
+    router, count_threads = make_router(Provider(usage=reported))
+    response = await router.chat_completion("m", [UserMessage(content="hi")])
+
+    assert [m.metric for m in response.metrics] == ["prompt_tokens", "completion_tokens", "total_tokens"]
+    assert usage(response.metrics) == {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10}
+    assert count_threads == []
+    assert {e.metric: e.value for e in router.telemetry.events}["total_tokens"] == 10
+
+
+@pytest.mark.asyncio
+async def test_streamed_tokens_are_counted_from_deltas():
+    router, _ = make_router(Provider())
+    stream = await router.chat_completion("m", [UserMessage(content="hi")], stream=True)
+    chunks = [chunk async for chunk in stream]
+
+    expected = router._count_tokens_sync(
+        [CompletionMessage(content="hello world", stop_reason=StopReason.end_of_turn)], None
+    )
+    assert usage(chunks[-1].metrics)["completion_tokens"] == expected
+    assert all(chunk.metrics is None for chunk in chunks[:-1])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream", [False, True])
+async def test_token_counting_can_be_disabled_per_model(stream):
+    router, count_threads = make_router(Provider(), metadata={"token_counting": False})
+    response = await router.chat_completion("m", [UserMessage(content="hi")], stream=stream)
+    if stream:
+        response = [chunk async for chunk in response][-1]
+
+    assert response.metrics is None
+    assert count_threads == []
+    assert router.telemetry.events == []